@@ -0,0 +1,169 @@
+"""
+Benchmarks the releaser against synthetic repositories, timing every stage of a build (or of a build and release, with
+GitHub stubbed by a local HTTP server), and writes the results as JSON.
+
+    python benchmarks/bench.py run --files 2000 --submodule_depth 2 --release --repeat 3 --output results.json
+    python benchmarks/bench.py generate /tmp/mirror --files 2000
+    python benchmarks/bench.py unzip --members 100000
+    python benchmarks/bench.py compare --repeat 5 [--update]
+
+compare runs a fixed matrix of scenarios and compares each stage's median time (and the peak RSS) with a stored
+baseline, exiting with 1 if any has regressed by more than the threshold (or if there is no baseline). --update stores
+the results in the baseline instead, replacing those of the scenarios run and keeping the others.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import fields
+from pathlib import Path
+from typing import Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from benchmarks import compare, pipeline, synthetic, unzip
+from benchmarks.github_stub import GitHubStub
+
+
+def runScenario(scenario:pipeline.Scenario, repeat:int = 1, mirrorRoot:Optional[str] = None) -> dict :
+    """
+    Run a scenario a number of times, each in a fresh process (so peak RSS is that of the one build), against a freshly
+    generated repository and, for a release, a GitHub stub.
+
+    Args:
+        scenario (pipeline.Scenario): The scenario.
+        repeat (int, optional): The number of runs. Defaults to 1.
+        mirrorRoot (Optional[str], optional): Where to generate the repository. Defaults to a temporary directory.
+
+    Returns:
+        dict: The scenario, where it ran, and the result of each run.
+    """
+    runs:list[dict] = []
+    with pipeline.mirroredRepository(scenario.spec, mirrorRoot) as url, GitHubStub() as stub, tempfile.TemporaryDirectory(prefix="releaser-bench-work-") as work :
+        with pipeline.setEnvironment({"GITHUB_TOKEN": "benchmark", "RELEASER_GITHUB_API_URL": stub.url}) :
+            with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn"), max_tasks_per_child=1) as executor :
+                for _ in range(repeat) :
+                    runs.append(executor.submit(pipeline.runOnce, scenario, url, os.path.join(work, "run")).result())
+    return {"scenario": scenario.describe(), "environment": pipeline.environment(), "timestamp": int(time.time()), "runs": runs}
+
+
+def _addSpecArguments(parser:argparse.ArgumentParser) :
+    for spec_field in fields(synthetic.RepositorySpec) :
+        parser.add_argument(f"--{spec_field.name}", type=type(spec_field.default), default=spec_field.default, help=f"Default: {spec_field.default}.")
+
+
+def _spec(args:argparse.Namespace) -> synthetic.RepositorySpec :
+    return synthetic.RepositorySpec(**{spec_field.name : getattr(args, spec_field.name) for spec_field in fields(synthetic.RepositorySpec)})
+
+
+def _runCommand(args:argparse.Namespace) :
+    options:dict = {"reproducible": args.reproducible, "compression_cache": args.compression_cache, "checksums": not args.no_checksums, "verify": not args.no_verify, **({"api_tag": True} if args.api_tag else {})}
+    scenario:pipeline.Scenario = pipeline.Scenario(args.name, _spec(args), args.release, args.split_size, options)
+    _output(runScenario(scenario, args.repeat, args.mirror), args.output)
+
+
+def _generateCommand(args:argparse.Namespace) :
+    url:str = synthetic.generate(os.path.abspath(args.mirror), _spec(args), args.name)
+    print(json.dumps({"url": url, "environment": synthetic.gitEnvironment(os.path.abspath(args.mirror))}, indent=2))
+
+
+def _unzipCommand(args:argparse.Namespace) :
+    _output({"environment": pipeline.environment(), **unzip.run(args.members, args.size, args.workers, args.repeat)}, args.output)
+
+
+def _compareCommand(args:argparse.Namespace) :
+    scenarios:list[pipeline.Scenario] = [scenario for scenario in compare.MATRIX if not args.scenarios or scenario.name in args.scenarios]
+    if not scenarios :
+        sys.exit(f"No scenarios match {', '.join(args.scenarios)} (expected any of {', '.join(scenario.name for scenario in compare.MATRIX)})")
+    baseline_path:Path = Path(args.baseline)
+    if not args.update and not baseline_path.exists() :
+        sys.exit(f"There is no baseline at {baseline_path} to compare with: store one with --update")
+
+    summaries:dict[str, dict] = {}
+    for scenario in scenarios :
+        print(f"Running {scenario.name} ({args.repeat} runs)...", file=sys.stderr)
+        summaries[scenario.name] = compare.summarise(runScenario(scenario, args.repeat))
+    current:dict = {"environment": pipeline.environment(), "timestamp": int(time.time()), "repeat": args.repeat, "scenarios": summaries}
+
+    if args.update :
+        # The scenarios run replace theirs in the baseline; the others are kept as they were
+        if baseline_path.exists() :
+            current["scenarios"] = {**json.loads(baseline_path.read_text()).get("scenarios", {}), **summaries}
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps(current, indent=2) + "\n")
+        print(f"Stored {', '.join(summaries)} in the baseline in {baseline_path}", file=sys.stderr)
+        return
+
+    baseline:dict = json.loads(baseline_path.read_text())
+    if baseline.get("environment") != current["environment"] :
+        print(f"Warning: the baseline was measured elsewhere ({baseline.get('environment')}), so the comparison may not be meaningful", file=sys.stderr)
+    regressions:list[compare.Regression] = compare.compare(baseline["scenarios"], summaries, args.threshold, args.rss_threshold)
+    if args.output :
+        _output({**current, "baseline": str(baseline_path), "regressions": [regression.describe() for regression in regressions]}, args.output)
+    for regression in regressions :
+        print(f"REGRESSION {regression.describe()}")
+    if regressions :
+        sys.exit(1)
+    print(f"No regressions against {baseline_path}")
+
+
+def _output(results:dict, output:Optional[str]) :
+    text:str = json.dumps(results, indent=2) + "\n"
+    if output :
+        Path(output).write_text(text)
+    else :
+        sys.stdout.write(text)
+
+
+def main() :
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Time the stages of a build (or release) of a synthetic repository.")
+    _addSpecArguments(run_parser)
+    run_parser.add_argument("--name", default="default", help="The name to report the scenario under.")
+    run_parser.add_argument("--release", action="store_true", help="Tag and release to a GitHub stub, rather than only build.")
+    run_parser.add_argument("--api_tag", action="store_true", help="With --release, create the tag through the (stub) GitHub API rather than pushing it.")
+    run_parser.add_argument("--split_size", type=int, default=None, help="Split the release into parts of at most this many bytes.")
+    run_parser.add_argument("--reproducible", action="store_true", help="Build reproducible archives.")
+    run_parser.add_argument("--compression_cache", action="store_true", help="Build with the compression cache.")
+    run_parser.add_argument("--no_checksums", action="store_true", help="Skip the checksums.")
+    run_parser.add_argument("--no_verify", action="store_true", help="Skip verification.")
+    run_parser.add_argument("--repeat", type=int, default=1, help="The number of runs.")
+    run_parser.add_argument("--mirror", default=None, help="Generate the repository here rather than in a temporary directory.")
+    run_parser.add_argument("--output", default=None, help="Write the JSON results to this file rather than stdout.")
+    run_parser.set_defaults(function=_runCommand)
+
+    generate_parser = subparsers.add_parser("generate", help="Generate a synthetic repository (and its submodules) into a mirror.")
+    generate_parser.add_argument("mirror", help="The mirror root.")
+    generate_parser.add_argument("--name", default="main", help="The name of the repository.")
+    _addSpecArguments(generate_parser)
+    generate_parser.set_defaults(function=_generateCommand)
+
+    unzip_parser = subparsers.add_parser("unzip", help="Compare zip_util.unzip with ZipFile.extractall.")
+    unzip_parser.add_argument("--members", type=int, default=100_000, help="The number of members in the archive.")
+    unzip_parser.add_argument("--size", type=int, default=2048, help="The size of each member in bytes.")
+    unzip_parser.add_argument("--workers", type=int, default=None, help="The number of unzip workers. Defaults to the number of CPUs.")
+    unzip_parser.add_argument("--repeat", type=int, default=3, help="The number of runs of each extractor (the best is reported).")
+    unzip_parser.add_argument("--output", default=None, help="Write the JSON results to this file rather than stdout.")
+    unzip_parser.set_defaults(function=_unzipCommand)
+
+    compare_parser = subparsers.add_parser("compare", help="Run the benchmark matrix and compare it with the stored baseline.")
+    compare_parser.add_argument("--baseline", default=str(Path(__file__).resolve().parent / "baselines" / "baseline.json"), help="The baseline file. Default: benchmarks/baselines/baseline.json.")
+    compare_parser.add_argument("--update", action="store_true", help="Store the results in the baseline (replacing those of the scenarios run) rather than compare with it.")
+    compare_parser.add_argument("--scenarios", nargs="*", default=None, help=f"The scenarios to run. Default: all of {', '.join(scenario.name for scenario in compare.MATRIX)}.")
+    compare_parser.add_argument("--repeat", type=int, default=5, help="The number of runs of each scenario. Default: 5.")
+    compare_parser.add_argument("--threshold", type=float, default=0.10, help="The largest allowed increase in a stage's median time, as a fraction. Default: 0.10.")
+    compare_parser.add_argument("--rss_threshold", type=float, default=0.10, help="The largest allowed increase in the median peak RSS, as a fraction. Default: 0.10.")
+    compare_parser.add_argument("--output", default=None, help="Also write the JSON results and regressions to this file.")
+    compare_parser.set_defaults(function=_compareCommand)
+
+    args = parser.parse_args()
+    args.function(args)
+
+
+if __name__ == "__main__" :
+    main()
@@ -0,0 +1,111 @@
+"""
+Compares benchmark results with a stored baseline, to catch changes that make builds slower or bigger.
+
+Each scenario of the matrix is run a number of times, and every stage (and the total, and the peak RSS) is summarised
+by its median and inter-quartile range. A measurement has regressed when its median is more than the threshold above
+the baseline's, and the difference is more than both the noise (the larger of the two IQRs) and a floor, so that a
+stage taking milliseconds doesn't fail the gate on jitter.
+"""
+import statistics
+from dataclasses import dataclass
+
+from benchmarks import pipeline, synthetic
+
+# The benchmark matrix: repositories of several sizes, built and (the small one) released
+MATRIX:list[pipeline.Scenario] = [
+    pipeline.Scenario("small-build", synthetic.RepositorySpec(files=200, submodule_depth=1, submodule_fanout=2, submodule_files=50)),
+    pipeline.Scenario("small-release", synthetic.RepositorySpec(files=200, submodule_depth=1, submodule_fanout=2, submodule_files=50), release=True),
+    pipeline.Scenario("medium-build", synthetic.RepositorySpec(files=2000, submodule_depth=2, submodule_fanout=2, submodule_files=200)),
+    pipeline.Scenario("large-build", synthetic.RepositorySpec(files=10000, median_size=4096, submodule_depth=2, submodule_fanout=3, submodule_files=500)),
+]
+
+# The smallest differences treated as regressions: in seconds, and in bytes of peak RSS
+MIN_SECONDS:float = 0.05
+MIN_BYTES:int = 8 * 1024 * 1024
+
+# The measurement the peak RSS is summarised under, next to the stages
+PEAK_RSS:str = "peak_rss"
+TOTAL:str = "total"
+
+
+@dataclass(frozen=True)
+class Regression() :
+    """
+    A measurement of a scenario that has regressed against the baseline.
+
+    Args:
+        scenario (str): The scenario.
+        measurement (str): The stage, or "total" or "peak_rss".
+        baseline (float): The baseline's median.
+        current (float): The current median.
+        noise (float): The larger of the two IQRs.
+    """
+    scenario:str
+    measurement:str
+    baseline:float
+    current:float
+    noise:float
+
+
+    @property
+    def change(self) -> float :
+        return (self.current - self.baseline) / self.baseline if self.baseline else float("inf")
+
+
+    def describe(self) -> str :
+        unit:str = "B" if self.measurement == PEAK_RSS else "s"
+        return f"{self.scenario} {self.measurement}: {self.baseline:.3f}{unit} -> {self.current:.3f}{unit} ({self.change:+.1%}, noise {self.noise:.3f}{unit})"
+
+
+def summarise(results:dict) -> dict[str, dict[str, float]] :
+    """
+    Summarise the runs of a scenario (as bench.runScenario returns them): the median, quartiles and IQR of each stage, of
+    the total and of the peak RSS. A stage missing from a run (it didn't happen) counts as taking no time.
+
+    Args:
+        results (dict): The results of the scenario.
+
+    Returns:
+        dict[str, dict[str, float]]: The summary of each measurement.
+    """
+    runs:list[dict] = results["runs"]
+    stages:set[str] = {stage for run in runs for stage in run["stages"]}
+    samples:dict[str, list[float]] = {stage : [run["stages"].get(stage, 0.0) for run in runs] for stage in sorted(stages)}
+    samples[TOTAL] = [run["total"] for run in runs]
+    samples[PEAK_RSS] = [float(run["peak_rss"]) for run in runs]
+    return {measurement : _quartiles(values) for measurement, values in samples.items()}
+
+
+def compare(baseline:dict[str, dict], current:dict[str, dict], threshold:float = 0.10, rssThreshold:float = 0.10) -> list[Regression] :
+    """
+    Compare the summaries of scenarios (by name) with the baseline's. Scenarios or measurements the baseline doesn't
+    have are not compared.
+
+    Args:
+        baseline (dict[str, dict]): The baseline summary of each scenario.
+        current (dict[str, dict]): The current summary of each scenario.
+        threshold (float, optional): The largest allowed increase in a stage's median time, as a fraction. Defaults to 0.10.
+        rssThreshold (float, optional): The largest allowed increase in the median peak RSS, as a fraction. Defaults to 0.10.
+
+    Returns:
+        list[Regression]: The measurements that regressed.
+    """
+    regressions:list[Regression] = []
+    for scenario, summary in current.items() :
+        for measurement, stats in summary.items() :
+            base:dict = baseline.get(scenario, {}).get(measurement)
+            if base is None :
+                continue
+            limit, floor = (rssThreshold, MIN_BYTES) if measurement == PEAK_RSS else (threshold, MIN_SECONDS)
+            noise:float = max(base["iqr"], stats["iqr"])
+            difference:float = stats["median"] - base["median"]
+            if difference > base["median"] * limit and difference > max(noise, floor) :
+                regressions.append(Regression(scenario, measurement, base["median"], stats["median"], noise))
+    return regressions
+
+
+def _quartiles(values:list[float]) -> dict[str, float] :
+    if len(values) < 2 :
+        return {"median": values[0], "q1": values[0], "q3": values[0], "iqr": 0.0, "runs": len(values)}
+    q1, median, q3 = statistics.quantiles(values, n=4, method="inclusive")
+    return {"median": median, "q1": q1, "q3": q3, "iqr": q3 - q1, "runs": len(values)}
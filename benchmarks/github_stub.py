@@ -0,0 +1,151 @@
+"""
+A local stand-in for the GitHub API, enough of it for the releaser to create tags (through the API), create a release and
+upload its assets, so that the release stages can be benchmarked without the network. Only the tags created through it
+can be looked up (it has no releases to look up), so pre-flight checks find any other tag free. Point the releaser at it
+with RELEASER_GITHUB_API_URL.
+"""
+import hashlib
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, unquote, urlsplit
+
+
+class GitHubStub() :
+    """
+    Serves the stub API on a free local port until stopped. Use as a context manager.
+    The releases created (and the names and sizes of the assets uploaded to them) are kept in releases, the annotated tag
+    objects created by SHA in tags, and the refs created (e.g. refs/tags/v1) in refs.
+    """
+
+    def __init__(self) :
+        self.releases:list[dict] = []
+        self.tags:dict[str, dict] = {}
+        self.refs:dict[str, dict] = {}
+        self._lock:threading.Lock = threading.Lock()
+        stub:GitHubStub = self
+
+        class Handler(_Handler) :
+            owner = stub
+        self._server:ThreadingHTTPServer = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._thread:Optional[threading.Thread] = None
+
+
+    @property
+    def url(self) -> str :
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+
+    def __enter__(self) -> 'GitHubStub' :
+        self._thread = threading.Thread(target=self._server.serve_forever, name="github-stub", daemon=True)
+        self._thread.start()
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback) :
+        self._server.shutdown()
+        self._server.server_close()
+
+
+    def _createRelease(self, repository:str, request:dict) -> dict :
+        with self._lock :
+            number:int = len(self.releases) + 1
+            release:dict = {
+                "id": number,
+                "url": f"{self.url}/repos/{repository}/releases/{number}",
+                "html_url": f"{self.url}/{repository}/releases/{number}",
+                "upload_url": f"{self.url}/uploads/repos/{repository}/releases/{number}/assets{{?name,label}}",
+                "tag_name": request.get("tag_name"),
+                "name": request.get("name"),
+                "body": request.get("body"),
+                "draft": request.get("draft", False),
+                "prerelease": request.get("prerelease", False),
+                "assets": [],
+            }
+            self.releases.append(release)
+            return release
+
+
+    def _createTag(self, repository:str, request:dict) -> dict :
+        with self._lock :
+            sha:str = hashlib.sha1(json.dumps([repository, request], sort_keys=True).encode("utf-8")).hexdigest()
+            tag:dict = {
+                "sha": sha,
+                "url": f"{self.url}/repos/{repository}/git/tags/{sha}",
+                "tag": request.get("tag"),
+                "message": request.get("message"),
+                "object": {"sha": request.get("object"), "type": request.get("type"), "url": f"{self.url}/repos/{repository}/git/commits/{request.get('object')}"},
+            }
+            self.tags[sha] = tag
+            return tag
+
+
+    # Returns None if the ref already exists
+    def _createRef(self, repository:str, request:dict) -> Optional[dict] :
+        with self._lock :
+            name:str = request.get("ref", "")
+            if name in self.refs :
+                return None
+            sha:str = request.get("sha", "")
+            kind:str = "tag" if sha in self.tags else "commit"
+            ref:dict = {"ref": name, "url": f"{self.url}/repos/{repository}/git/{name}",
+                        "object": {"sha": sha, "type": kind, "url": f"{self.url}/repos/{repository}/git/{kind}s/{sha}"}}
+            self.refs[name] = ref
+            return ref
+
+
+    def _uploadAsset(self, repository:str, number:int, name:str, size:int) -> dict :
+        with self._lock :
+            asset:dict = {"id": number * 1000 + len(self.releases[number - 1]["assets"]) + 1, "name": name, "size": size, "state": "uploaded",
+                          "url": f"{self.url}/repos/{repository}/releases/assets/{name}", "browser_download_url": f"{self.url}/{repository}/releases/download/{name}"}
+            self.releases[number - 1]["assets"].append(asset)
+            return asset
+
+
+class _Handler(BaseHTTPRequestHandler) :
+    owner:GitHubStub
+    protocol_version = "HTTP/1.1"
+
+
+    def do_GET(self) :
+        path:str = urlsplit(self.path).path
+        if match := re.fullmatch(r"/repos/[^/]+/[^/]+/git/ref/(.+)", path) :
+            ref:Optional[dict] = self.owner.refs.get(f"refs/{unquote(match[1])}")
+            return self._reply(200, ref) if ref else self._reply(404, {"message": "Not Found"})
+        match:Optional[re.Match] = re.fullmatch(r"/repos/([^/]+)/([^/]+)", path)
+        if match is None :
+            return self._reply(404, {"message": "Not Found"})
+        full_name:str = f"{match[1]}/{match[2]}"
+        self._reply(200, {"id": 1, "name": match[2], "full_name": full_name, "owner": {"login": match[1]}, "private": False,
+                           "permissions": {"admin": False, "push": True, "pull": True}, "url": f"{self.owner.url}/repos/{full_name}"})
+
+
+    def do_POST(self) :
+        body:bytes = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        parts = urlsplit(self.path)
+        if match := re.fullmatch(r"/repos/([^/]+/[^/]+)/releases", parts.path) :
+            return self._reply(201, self.owner._createRelease(match[1], json.loads(body or b"{}")))
+        if match := re.fullmatch(r"/uploads/repos/([^/]+/[^/]+)/releases/(\d+)/assets", parts.path) :
+            name:str = parse_qs(parts.query).get("name", ["asset"])[0]
+            return self._reply(201, self.owner._uploadAsset(match[1], int(match[2]), name, len(body)))
+        if match := re.fullmatch(r"/repos/([^/]+/[^/]+)/git/tags", parts.path) :
+            return self._reply(201, self.owner._createTag(match[1], json.loads(body or b"{}")))
+        if match := re.fullmatch(r"/repos/([^/]+/[^/]+)/git/refs", parts.path) :
+            ref:Optional[dict] = self.owner._createRef(match[1], json.loads(body or b"{}"))
+            return self._reply(201, ref) if ref else self._reply(422, {"message": "Reference already exists"})
+        self._reply(404, {"message": "Not Found"})
+
+
+    def _reply(self, status:int, payload:dict) :
+        data:bytes = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+    def log_message(self, format, *args) :
+        pass
@@ -0,0 +1,184 @@
+"""
+Times each stage of the releaser's pipeline (clone, clean, zip, verify, checksums, tag, release and upload) building a
+synthetic repository, as release._build and release._buildAndReleaseToGitHub run them.
+
+Stages are timed by wrapping the functions that implement them; a stage that runs inside another (uploading the parts
+of a split release as they are zipped) is counted in both.
+"""
+import functools
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterator, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from benchmarks import synthetic
+
+# The stages timed: name -> (module or class, attribute), resolved once the releaser is imported
+STAGES:dict[str, tuple[str, str]] = {
+    "preflight": ("release", "_preflight"),
+    "clone": ("release", "_cloneRepository"),
+    "changes": ("release", "_determineChanges"),
+    "tag": ("release", "_createTag"),
+    "create_release": ("GitHubRepository", "createRelease"),
+    "clean": ("release", "_cleanRepository"),
+    "clean_git": ("release", "_cleanGit"),
+    "zip": ("release", "_zipRepository"),
+    "verify": ("release", "_verifyRelease"),
+    "checksums": ("release", "_writeChecksums"),
+    "delta": ("release", "_buildDelta"),
+    "upload": ("GitHubRepository", "uploadFileToRelease"),
+    "retention": ("release", "_applyRetention"),
+}
+
+
+@dataclass(frozen=True)
+class Scenario() :
+    """
+    A benchmark: a synthetic repository, and how to build it.
+
+    Args:
+        name (str): The name to report the scenario under.
+        spec (synthetic.RepositorySpec): The repository to build.
+        release (bool): If True, the release is tagged and published (to the GitHub stub), as _buildAndReleaseToGitHub does;
+            otherwise it is only built, as _build does.
+        split_size (Optional[int]): If set, the release is split into parts of at most this many bytes.
+        options (dict): Further keyword arguments for the build (e.g. reproducible=True, compression_cache=True).
+    """
+    name:str
+    spec:synthetic.RepositorySpec = field(default_factory=synthetic.RepositorySpec)
+    release:bool = False
+    split_size:Optional[int] = None
+    options:dict = field(default_factory=dict)
+
+
+    def describe(self) -> dict :
+        return {"name": self.name, "spec": self.spec.describe(), "release": self.release, "split_size": self.split_size, "options": self.options}
+
+
+@contextmanager
+def timedStages() -> Iterator[dict[str, float]] :
+    """
+    Time the pipeline's stages while in the context: the seconds spent in each are added up in the dictionary yielded.
+    """
+    from releaser import release
+    from releaser.utilities import github_util
+    owners:dict[str, object] = {"release": release, "GitHubRepository": github_util.GitHubRepository}
+    timings:dict[str, float] = {}
+    lock:threading.Lock = threading.Lock()
+    originals:list[tuple[object, str, object]] = []
+
+    def timed(stage:str, function) :
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs) :
+            start:float = time.perf_counter()
+            try :
+                return function(*args, **kwargs)
+            finally :
+                with lock :
+                    timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - start
+        return wrapper
+
+    for stage, (owner_name, attribute) in STAGES.items() :
+        owner = owners[owner_name]
+        original = getattr(owner, attribute)
+        originals.append((owner, attribute, original))
+        setattr(owner, attribute, timed(stage, original))
+    try :
+        yield timings
+    finally :
+        for owner, attribute, original in originals :
+            setattr(owner, attribute, original)
+
+
+def runOnce(scenario:Scenario, url:str, workDir:str) -> dict :
+    """
+    Build (and, for a release scenario, publish) the synthetic repository once, timing each stage. The environment must
+    already point git at the mirror (synthetic.gitEnvironment) and, for a release, the releaser at the GitHub stub.
+    Best run in a fresh process, so that its peak RSS is that of this build alone.
+
+    Args:
+        scenario (Scenario): The scenario.
+        url (str): The URL of the synthetic repository.
+        workDir (str): A directory to clone and build in; it is emptied first.
+
+    Returns:
+        dict: The seconds spent in each stage ("stages"), the total, the peak RSS in bytes and the size of what was built.
+    """
+    from releaser import release
+    shutil.rmtree(workDir, ignore_errors=True)
+    os.makedirs(workDir)
+    clone_dir:str = os.path.join(workDir, "clone")
+    release_dir:str = os.path.join(workDir, "release")
+    patterns_file:str = os.path.join(workDir, "clean.txt")
+    Path(patterns_file).write_text("\n".join(synthetic.CLEAN_PATTERNS) + "\n")
+
+    with timedStages() as timings :
+        start:float = time.perf_counter()
+        if scenario.release :
+            tag:str = f"bench-{uuid.uuid4().hex[:12]}"
+            release._buildAndReleaseToGitHub(url, "main", clone_dir, patterns_file, release_dir, "release.zip", tag, "Benchmark", tag, "Benchmark", split_size=scenario.split_size, **scenario.options)
+        else :
+            release._build(url, "main", clone_dir, patterns_file, release_dir, "release.zip", split_size=scenario.split_size, **scenario.options)
+        total:float = time.perf_counter() - start
+
+    return {
+        "stages": dict(sorted(timings.items())),
+        "total": total,
+        "peak_rss": _peakRss(),
+        "release_bytes": sum(path.stat().st_size for path in Path(release_dir).iterdir() if path.is_file()),
+    }
+
+
+def environment() -> dict :
+    """
+    Describe where the benchmarks ran, to be stored with the results.
+    """
+    git_version:str = subprocess.run(["git", "--version"], capture_output=True, text=True).stdout.strip()
+    return {"python": platform.python_version(), "platform": platform.platform(), "machine": platform.machine(), "cpus": os.cpu_count(), "git": git_version}
+
+
+@contextmanager
+def mirroredRepository(spec:synthetic.RepositorySpec, root:Optional[str] = None) -> Iterator[str] :
+    """
+    Generate the synthetic repository into a mirror (a temporary one unless root is given), and point git at it (for this
+    process and any it starts) while in the context.
+
+    Yields:
+        str: The URL of the repository.
+    """
+    with tempfile.TemporaryDirectory(prefix="releaser-bench-") as temporary :
+        mirror_root:str = root or os.path.join(temporary, "mirror")
+        url:str = synthetic.generate(mirror_root, spec)
+        with setEnvironment(synthetic.gitEnvironment(mirror_root)) :
+            yield url
+
+
+@contextmanager
+def setEnvironment(variables:dict[str, str]) -> Iterator[None] :
+    previous:dict[str, Optional[str]] = {name : os.environ.get(name) for name in variables}
+    os.environ.update(variables)
+    try :
+        yield
+    finally :
+        for name, value in previous.items() :
+            if value is None :
+                os.environ.pop(name, None)
+            else :
+                os.environ[name] = value
+
+
+def _peakRss() -> int :
+    # ru_maxrss is in kilobytes on Linux, and bytes on macOS
+    peak:int = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
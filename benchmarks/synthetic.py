@@ -0,0 +1,150 @@
+"""
+Generates synthetic repositories to benchmark against: bare repositories under a mirror root, with nested submodules.
+
+Repositories are addressed as https://github.com/bench/<name>.git (so the releaser handles them as it would real ones)
+and git is pointed at the mirror by gitEnvironment, which rewrites those URLs (insteadOf) for every git process it is
+given to - including the submodule clones and the tag push.
+"""
+import math
+import os
+import random
+import subprocess
+import tempfile
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+# The owner the synthetic repositories are addressed under
+OWNER:str = "bench"
+
+# The clean patterns the benchmarks build with: the releaser's own, plus those the generated junk files match
+CLEAN_PATTERNS:list[str] = [".git", ".git*", ".svn", ".DS_Store", "*.log", "*.tmp"]
+
+_WORDS:list[str] = "the quick brown fox jumps over lazy dog release archive build script deploy config module export function return value".split()
+
+
+@dataclass(frozen=True)
+class RepositorySpec() :
+    """
+    The shape of a synthetic repository (and of each of its submodules).
+
+    Args:
+        files (int): The number of files in the top-level repository.
+        median_size (int): The median file size in bytes (sizes are log-normally distributed).
+        size_spread (float): The spread (sigma) of the log-normal size distribution.
+        max_size (int): The largest a file may be.
+        binary_ratio (float): The fraction of files holding random (incompressible) bytes rather than text.
+        cleaned_ratio (float): The fraction of files the clean patterns remove (*.log and *.tmp).
+        dir_fanout (int): The number of directories at each level of the tree.
+        dir_depth (int): The depth of the directory tree.
+        submodule_depth (int): How deeply submodules are nested (0 for none).
+        submodule_fanout (int): The number of submodules each repository (above the deepest level) has.
+        submodule_files (int): The number of files in each submodule.
+        seed (int): The random seed, so that the same spec always generates the same content.
+    """
+    files:int = 500
+    median_size:int = 2048
+    size_spread:float = 1.5
+    max_size:int = 8 * 1024 * 1024
+    binary_ratio:float = 0.2
+    cleaned_ratio:float = 0.05
+    dir_fanout:int = 8
+    dir_depth:int = 3
+    submodule_depth:int = 1
+    submodule_fanout:int = 2
+    submodule_files:int = 100
+    seed:int = 1
+
+
+    def describe(self) -> dict :
+        return asdict(self)
+
+
+def gitEnvironment(mirrorRoot:str) -> dict[str, str] :
+    """
+    The environment that points git at the mirror: https://github.com/bench/... (and git@github.com:bench/...) is rewritten
+    to the mirror root, local transport is allowed for submodules, and commits have an author.
+
+    Args:
+        mirrorRoot (str): The mirror root.
+
+    Returns:
+        dict[str, str]: The environment variables to add.
+    """
+    settings:list[tuple[str, str]] = [
+        (f"url.{mirrorRoot}/{OWNER}/.insteadOf", f"https://github.com/{OWNER}/"),
+        (f"url.{mirrorRoot}/{OWNER}/.insteadOf", f"git@github.com:{OWNER}/"),
+        ("protocol.file.allow", "always"),
+        ("user.name", "Benchmark"),
+        ("user.email", "benchmark@example.com"),
+        ("init.defaultBranch", "main"),
+    ]
+    environment:dict[str, str] = {"GIT_CONFIG_COUNT": str(len(settings))}
+    for number, (key, value) in enumerate(settings) :
+        environment[f"GIT_CONFIG_KEY_{number}"] = key
+        environment[f"GIT_CONFIG_VALUE_{number}"] = value
+    return environment
+
+
+def remoteUrl(name:str) -> str :
+    return f"https://github.com/{OWNER}/{name}.git"
+
+
+def generate(mirrorRoot:str, spec:RepositorySpec, name:str = "main") -> str :
+    """
+    Generate a repository and its submodules as bare repositories under the mirror root (leaves first).
+
+    Args:
+        mirrorRoot (str): The mirror root; it is created if it does not exist.
+        spec (RepositorySpec): The shape of the repository.
+        name (str, optional): The name of the top-level repository. Defaults to "main".
+
+    Returns:
+        str: The URL of the top-level repository (to be fetched with gitEnvironment).
+    """
+    os.makedirs(os.path.join(mirrorRoot, OWNER), exist_ok=True)
+    environment:dict[str, str] = {**os.environ, **gitEnvironment(mirrorRoot)}
+    _generateRepository(mirrorRoot, spec, name, spec.files, spec.submodule_depth, random.Random(f"{spec.seed}:{name}"), environment)
+    return remoteUrl(name)
+
+
+def _generateRepository(mirrorRoot:str, spec:RepositorySpec, name:str, files:int, depth:int, rng:random.Random, environment:dict[str, str]) :
+    submodules:list[str] = [f"{name}-sub{number}" for number in range(spec.submodule_fanout)] if depth > 0 else []
+    for submodule in submodules :
+        _generateRepository(mirrorRoot, spec, submodule, spec.submodule_files, depth - 1, random.Random(f"{spec.seed}:{submodule}"), environment)
+
+    with tempfile.TemporaryDirectory() as work :
+        _git(["init", "--quiet", work], environment)
+        for number in range(files) :
+            path:Path = Path(work, _randomPath(spec, rng, number))
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(_randomContent(spec, rng, path.suffix))
+            if path.suffix == ".sh" :
+                path.chmod(0o755)
+        for submodule in submodules :
+            _git(["-C", work, "submodule", "--quiet", "add", "-b", "main", remoteUrl(submodule), f"libs/{submodule}"], environment)
+        _git(["-C", work, "add", "-A"], environment)
+        _git(["-C", work, "commit", "--quiet", "-m", f"Synthetic {name}"], environment)
+        _git(["clone", "--quiet", "--bare", work, os.path.join(mirrorRoot, OWNER, f"{name}.git")], environment)
+
+
+def _randomPath(spec:RepositorySpec, rng:random.Random, number:int) -> str :
+    dirs:list[str] = [f"dir{rng.randrange(spec.dir_fanout)}" for _ in range(rng.randint(0, spec.dir_depth))]
+    if rng.random() < spec.cleaned_ratio :
+        suffix:str = rng.choice([".log", ".tmp"])
+    elif rng.random() < spec.binary_ratio :
+        suffix = ".bin"
+    else :
+        suffix = rng.choice([".sh", ".py", ".conf", ".txt"])
+    return "/".join([*dirs, f"file{number}{suffix}"])
+
+
+def _randomContent(spec:RepositorySpec, rng:random.Random, suffix:str) -> bytes :
+    size:int = min(spec.max_size, int(rng.lognormvariate(math.log(max(1, spec.median_size)), spec.size_spread)))
+    if suffix == ".bin" :
+        return rng.randbytes(size)
+    text:str = " ".join(rng.choices(_WORDS, k=size // 5 + 1))
+    return text.encode("ascii")[:size]
+
+
+def _git(arguments:list[str], environment:dict[str, str]) :
+    subprocess.run(["git", *arguments], check=True, env=environment, stdout=subprocess.DEVNULL)
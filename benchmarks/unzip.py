@@ -0,0 +1,62 @@
+"""
+Compares zip_util.unzip with ZipFile.extractall on a synthetic archive of many small files.
+
+    python benchmarks/bench.py unzip --members 100000
+"""
+import os
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+from typing import Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from releaser.utilities import zip_util
+
+
+def run(members:int = 100_000, size:int = 2048, workers:Optional[int] = None, repeat:int = 3) -> dict :
+    """
+    Time each extractor on an archive of the given number of members (the best of a number of runs).
+
+    Args:
+        members (int, optional): The number of members in the archive. Defaults to 100000.
+        size (int, optional): The size of each member in bytes. Defaults to 2048.
+        workers (Optional[int], optional): The number of unzip workers. Defaults to the number of CPUs.
+        repeat (int, optional): The number of runs of each extractor. Defaults to 3.
+
+    Returns:
+        dict: The archive's size, and the seconds each extractor took.
+    """
+    with tempfile.TemporaryDirectory() as work :
+        zip_path:str = os.path.join(work, "bench.zip")
+        _buildArchive(zip_path, members, size)
+
+        def extractAll(target:str) :
+            with zipfile.ZipFile(zip_path) as zip_file :
+                zip_file.extractall(target)
+
+        timings:dict[str, float] = {
+            "ZipFile.extractall" : _time(extractAll, repeat),
+            "zip_util.unzip" : _time(lambda target : zip_util.unzip(zip_path, target, workers=workers), repeat),
+            "zip_util.unzip (one subtree)" : _time(lambda target : zip_util.unzip(zip_path, target, include=["dir00"], workers=workers), repeat),
+        }
+        return {"members": members, "size": size, "archive_bytes": os.path.getsize(zip_path), "timings": timings}
+
+
+def _buildArchive(zip_path:str, members:int, size:int) :
+    payload:bytes = os.urandom(size // 2).hex().encode()[:size]
+    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zip_file :
+        for number in range(members) :
+            zip_file.writestr(f"dir{number % 100:02d}/sub{number % 7}/file{number}.sh", payload)
+
+
+# The best of a number of runs, each into a fresh directory
+def _time(extract, repeat:int) -> float :
+    best:float = float("inf")
+    for _ in range(repeat) :
+        with tempfile.TemporaryDirectory() as target :
+            start:float = time.perf_counter()
+            extract(target)
+            best = min(best, time.perf_counter() - start)
+    return best
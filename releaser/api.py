@@ -0,0 +1,177 @@
+"""
+The releaser as a Python API, for running builds and releases in-process (many of them, sharing the process's caches)
+rather than through the command line:
+
+    from releaser.api import Releaser, BuildSpec
+
+    releaser = Releaser()
+    result = releaser.build(BuildSpec(release_file_name="backend.zip", repository_url="https://github.com/owner/backend.git"))
+    print(result.release_path, result.digests[result.release_name], result.timings)
+
+Nothing here exits the process: invalid arguments raise errors_util.ValidationError, and failures the errors_util.ProjectError
+(or the library error) they are found as.
+"""
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+from releaser import release
+import releaser.constants as constants
+from releaser.utilities import file_util, hash_util, helpers
+
+_logger:logging.Logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BuildSpec() :
+    """
+    What to build, and how: the options of the build command.
+
+    Args:
+        release_file_name (str): The name of the release file (e.g. backend.zip).
+        repository_url (Optional[str], optional): The URL of the repository to clone. Not needed with source_dir. Defaults to None.
+        branch (str, optional): The branch to build. Defaults to "main".
+        repository_target_dir (str, optional): Where to clone the repository to (it is emptied first). Defaults to RELEASER_CLONE_DIR.
+        release_target_dir (str, optional): Where to put the release. Defaults to RELEASER_RELEASE_DIR.
+        patterns_file (str, optional): A file of patterns of files to remove before zipping. Defaults to RELEASER_CLEAN_PATTERNS_FILE.
+        split_size (Optional[int], optional): If set, the release is split into parts holding at most this many bytes. Defaults to None.
+        delta_from (Optional[str], optional): If set, a delta release of the changes since this tag is built too. Defaults to None.
+        checksums (bool, optional): If True, a SHA256SUMS manifest is written. Defaults to True.
+        verify (bool, optional): If True, the archives are verified before they are released. Defaults to True.
+        manifest_index (bool, optional): If True, files unchanged since the last build are not hashed again. Defaults to False.
+        reproducible (bool, optional): If True, the archives are byte-identical for identical contents. Defaults to False.
+        follow_symlinks (bool, optional): If True, what symbolic links point at is archived. Defaults to False.
+        dedup (bool, optional): If True, duplicate files are stored as symbolic links to the first copy. Defaults to False.
+        compression_cache (bool, optional): If True, files are compressed through the shared compression cache. Defaults to False.
+        source_dir (Optional[str], optional): If set, the release is built from this existing checkout in place. Defaults to None.
+    """
+    release_file_name:str
+    repository_url:Optional[str] = None
+    branch:str = "main"
+    repository_target_dir:str = constants.CLONE_DIR
+    release_target_dir:str = constants.RELEASE_DIR
+    patterns_file:str = constants.CLEAN_PATTERNS_FILE
+    split_size:Optional[int] = None
+    delta_from:Optional[str] = None
+    checksums:bool = True
+    verify:bool = True
+    manifest_index:bool = False
+    reproducible:bool = False
+    follow_symlinks:bool = False
+    dedup:bool = False
+    compression_cache:bool = False
+    source_dir:Optional[str] = None
+
+
+    def options(self) -> dict :
+        """
+        The keyword arguments the build takes from the spec (everything bar the repository, directories and name).
+        """
+        return {"split_size": self.split_size, "delta_from": self.delta_from, "checksums": self.checksums, "manifest_index": self.manifest_index, "reproducible": self.reproducible,
+                "follow_symlinks": self.follow_symlinks, "dedup": self.dedup, "verify": self.verify, "compression_cache": self.compression_cache, "source_dir": self.source_dir}
+
+
+@dataclass
+class BuildResult() :
+    """
+    What a build (or release) produced.
+
+    Args:
+        release_path (str): The archive (or, for a split release, the index of its parts).
+        artifacts (list[str]): Every file built: the archive or its parts and index, any delta release and the checksums.
+        digests (dict[str, str]): The SHA-256 digests from the checksums: of each artifact by file name, and of each file in the archive by path within it. Empty if checksums were not written.
+        timings (dict[str, float]): The seconds spent in each stage (clone, inspect, clean, zip, verify, checksums and so on).
+        seconds (float): The seconds the whole build took.
+        tag (Optional[str], optional): The tag created, for a release. Defaults to None.
+        release_url (Optional[str], optional): The URL of the GitHub release, for a release. Defaults to None.
+        critical_path (list[str], optional): For a release, whose stages run at once, the stages that made it take as long as it did, in order. Defaults to empty.
+    """
+    release_path:str
+    artifacts:list[str]
+    digests:dict[str, str] = field(default_factory=dict)
+    timings:dict[str, float] = field(default_factory=dict)
+    seconds:float = 0.0
+    tag:Optional[str] = None
+    release_url:Optional[str] = None
+    critical_path:list[str] = field(default_factory=list)
+
+
+    @property
+    def release_name(self) -> str :
+        return file_util.returnLastPartOfPath(self.release_path)
+
+
+class Releaser() :
+    """
+    Builds and releases repositories in this process. Builds may run at once from several threads (and alongside builds in
+    other processes): a build whose clone directory is in use clones to a sibling of it instead (see release._jobWorkspace).
+
+    Args:
+        keepClients (bool, optional): If True, GitHub clients are kept and reused by later releases. Defaults to True.
+    """
+
+    def __init__(self, keepClients:bool = True) :
+        if keepClients :
+            from releaser.utilities import github_util
+            github_util.keepClients()
+
+
+    def build(self, spec:BuildSpec) -> BuildResult :
+        """
+        Build a release.
+
+        Args:
+            spec (BuildSpec): What to build.
+
+        Returns:
+            BuildResult: What was built.
+
+        Raises:
+            errors_util.ValidationError: If the spec is missing something required, or the repository URL is not valid.
+        """
+        timings:dict[str, float] = {}
+        start:float = time.perf_counter()
+        with release._jobWorkspace(spec.repository_target_dir, spec.source_dir, spec.release_target_dir, spec.release_file_name) as repository_target_dir :
+            artifacts:list[str] = release._build(spec.repository_url, spec.branch, repository_target_dir, spec.patterns_file, spec.release_target_dir, spec.release_file_name, timings=timings, **spec.options())
+        return self._result(spec, artifacts, timings, time.perf_counter() - start)
+
+
+    def release(self, spec:BuildSpec, tag_version:str, tag_description:str, release_version:Optional[str] = None, release_description:Optional[str] = None, api_tag:bool = False) -> BuildResult :
+        """
+        Build a release, tag the repository and publish the release to GitHub.
+
+        Args:
+            spec (BuildSpec): What to build.
+            tag_version (str): The tag to create (e.g. v1.0.1).
+            tag_description (str): The description of the tag.
+            release_version (Optional[str], optional): The name of the GitHub release. Defaults to the tag.
+            release_description (Optional[str], optional): The description of the GitHub release. Defaults to the tag's.
+            api_tag (bool, optional): If True, the tag is created through the GitHub API rather than pushed from the clone. Defaults to False.
+
+        Returns:
+            BuildResult: What was built, with the tag and the release's URL.
+
+        Raises:
+            errors_util.ValidationError: If the spec is missing something required, or the repository URL is not valid.
+        """
+        timings:dict[str, float] = {}
+        critical_path:list[str] = []
+        start:float = time.perf_counter()
+        release_version = release_version if helpers.hasValue(release_version) else tag_version
+        release_description = release_description if helpers.hasValue(release_description) else tag_description
+        with release._jobWorkspace(spec.repository_target_dir, spec.source_dir, spec.release_target_dir, spec.release_file_name) as repository_target_dir :
+            artifacts, release_url = release._buildAndReleaseToGitHub(spec.repository_url, spec.branch, repository_target_dir, spec.patterns_file, spec.release_target_dir, spec.release_file_name,
+                                                                      tag_version, tag_description, release_version, release_description, timings=timings, api_tag=api_tag, critical_path=critical_path, **spec.options())
+        result:BuildResult = self._result(spec, artifacts, timings, time.perf_counter() - start)
+        result.tag = tag_version
+        result.release_url = release_url
+        result.critical_path = critical_path
+        return result
+
+
+    def _result(self, spec:BuildSpec, artifacts:list[str], timings:dict[str, float], seconds:float) -> BuildResult :
+        # The archive comes first, after any parts of a split release - whose index is then the release
+        release_path:str = next((path for path in artifacts if path.endswith(".index.json")), artifacts[0]) if spec.split_size else artifacts[0]
+        sums:Optional[str] = next((path for path in artifacts if path.endswith(".SHA256SUMS")), None)
+        digests:dict[str, str] = hash_util.readSumsFile(sums) if sums else {}
+        return BuildResult(release_path=release_path, artifacts=artifacts, digests=digests, timings=timings, seconds=seconds)
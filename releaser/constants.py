@@ -1,6 +1,7 @@
 import os
+from typing import Optional
 import dotenv
-from .utilities import file_util, time_util
+from .utilities import file_util, time_util, helpers, zip_util
 
 # Load environment variables from .env file
 dotenv.load_dotenv()
@@ -33,9 +34,47 @@ BACKEND_CLONE_DIR:str = os.getenv("RELEASER_BACKEND_CLONE_DIR", f"{CLONE_DIR}/ba
 # Directory to build the release to
 RELEASE_DIR:str = os.getenv("RELEASER_RELEASE_DIR", f"{RUNTIME_DIR}/release")
 
-# Default release names
-FRONTEND_RELEASE_NAME:str = os.getenv("RELEASER_FRONTEND_RELEASE_NAME", f"frontend-{time_util.getCurrentDateTimeString(date_format='%Y%m%d')}.zip")
-BACKEND_RELEASE_NAME:str = os.getenv("RELEASER_BACKEND_RELEASE_NAME", f"backend-{time_util.getCurrentDateTimeString(date_format='%Y%m%d')}.zip")
+# Default release names (FRONTEND_RELEASE_NAME and BACKEND_RELEASE_NAME) - see __getattr__: they hold the date, so they are
+# worked out when they are used rather than once, when this is imported (a long-running job server would keep the date it started on)
+_RELEASE_NAMES:dict[str, tuple[str, str]] = {"FRONTEND_RELEASE_NAME": ("RELEASER_FRONTEND_RELEASE_NAME", "frontend"), "BACKEND_RELEASE_NAME": ("RELEASER_BACKEND_RELEASE_NAME", "backend")}
 
 # Pattern file - clean.txt is a sibling to constants.py
 CLEAN_PATTERNS_FILE:str = os.getenv("RELEASER_CLEAN_PATTERNS_FILE", file_util.buildPath(file_util.getParentDirectory(__file__), "clean.txt"))
+
+
+# Retention of old releases in the release directory - unset means keep everything
+RETAIN_LAST:Optional[int] = int(os.environ["RELEASER_RETAIN_LAST"]) if os.getenv("RELEASER_RETAIN_LAST") else None
+RETAIN_DAYS:Optional[int] = int(os.environ["RELEASER_RETAIN_DAYS"]) if os.getenv("RELEASER_RETAIN_DAYS") else None
+RETAIN_SIZE:Optional[int] = helpers.parseSize(os.environ["RELEASER_RETAIN_SIZE"]) if os.getenv("RELEASER_RETAIN_SIZE") else None
+
+# Reproducible builds stamp every archive entry with this time (seconds since the epoch) - unset means the commit time
+SOURCE_DATE_EPOCH:Optional[int] = int(os.environ["SOURCE_DATE_EPOCH"]) if os.getenv("SOURCE_DATE_EPOCH") else None
+
+# The most memory the files read ahead of the archiver may take up
+READ_AHEAD_MEMORY:int = helpers.parseSize(os.environ["RELEASER_READ_AHEAD_MEMORY"]) if os.getenv("RELEASER_READ_AHEAD_MEMORY") else zip_util.READ_AHEAD_MEMORY
+
+# The compression cache (see --compression_cache): where compressed file contents are kept between builds, and the most they may take up
+COMPRESSION_CACHE_DIR:str = os.getenv("RELEASER_COMPRESSION_CACHE_DIR", f"{RUNTIME_DIR}/compression-cache")
+COMPRESSION_CACHE_SIZE:int = helpers.parseSize(os.environ["RELEASER_COMPRESSION_CACHE_SIZE"]) if os.getenv("RELEASER_COMPRESSION_CACHE_SIZE") else 2 * 1024 * 1024 * 1024
+
+# A mirror root (a local path or URL) to fetch repositories and submodules hosted on the mirrored hosts from, rather than from the hosts themselves
+GIT_MIRROR_ROOT:Optional[str] = os.getenv("RELEASER_GIT_MIRROR_ROOT") or None
+GIT_MIRROR_HOSTS:tuple[str, ...] = tuple(host.strip() for host in os.getenv("RELEASER_GIT_MIRROR_HOSTS", "github.com").split(",") if host.strip())
+
+# The least free space there must be where the repository is cloned and the release built, checked before the clone - 0 turns the check off
+MIN_FREE_SPACE:int = helpers.parseSize(os.environ["RELEASER_MIN_FREE_SPACE"]) if os.getenv("RELEASER_MIN_FREE_SPACE") else 256 * 1024 * 1024
+
+# Where the advisory locks that let jobs run at once on one host are kept (see release._jobWorkspace) - it must be on a
+# file system every process running jobs sees, and that supports flock
+LOCK_DIR:str = os.getenv("RELEASER_LOCK_DIR", f"{RUNTIME_DIR}/locks")
+
+# The job server (see serve and submit): the Unix socket it listens on, and the number of jobs it runs at once
+SERVE_SOCKET:str = os.getenv("RELEASER_SERVE_SOCKET", f"{RUNTIME_DIR}/releaser.sock")
+SERVE_WORKERS:int = int(os.getenv("RELEASER_SERVE_WORKERS", "2"))
+
+
+def __getattr__(name:str) -> str :
+    if name in _RELEASE_NAMES :
+        variable, prefix = _RELEASE_NAMES[name]
+        return os.getenv(variable, f"{prefix}-{time_util.getCurrentDateTimeString(date_format='%Y%m%d')}.zip")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
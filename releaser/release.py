@@ -1,15 +1,39 @@
 #!/usr/bin/env python3
 
 import argparse
+import glob
+import json
 import logging
+import os
+import signal
+import sys
+import threading
+import time
 import traceback
+from contextlib import ExitStack, contextmanager
+from datetime import timedelta
+from typing import TYPE_CHECKING, Callable, Iterator, Optional
 
-from releaser.utilities import github_util, helpers, log_util, git_util, file_util, zip_util, errors_util, time_util
+from releaser.utilities import helpers, log_util, file_util, zip_util, errors_util, time_util, hash_util, manifest_util, retention_util, cache_util, url_util, daemon_util, preflight_util, task_util, lock_util
 import releaser.constants as constants
 
+# GitPython and PyGithub are slow to import, so git_util and github_util (which import them) are imported where they are
+# first used, rather than here: the help, and commands that never clone or publish, don't pay for them
+if TYPE_CHECKING :
+    from releaser.utilities import git_util, github_util
+
 # Logging
 _logger:logging.Logger = logging.getLogger(__name__)
 
+# The commands the job server runs (see serve and submit)
+_JOB_COMMANDS:tuple[str, ...] = ("build-frontend", "release-frontend", "build-backend", "release-backend", "build", "release", "prune")
+
+# The options that are paths, made absolute by the client before it submits a job (the server's working directory differs)
+_PATH_OPTIONS:tuple[str, ...] = ("repo_target_dir", "release_target_dir", "clean_patterns", "source_dir")
+
+# Held while adding to timings, which the tasks of a release add to at once
+_timings_lock:threading.Lock = threading.Lock()
+
 
 # Sets up the whole shebang
 def _init() :
@@ -18,6 +42,13 @@ def _init() :
 
 # Deals with all the command-line interface
 def _commandRunner() :
+    parser, _ = _parser()
+    args:argparse.Namespace = parser.parse_args()
+    args.func(args)
+
+
+# Builds the command-line parser, returning it and the parser of each command
+def _parser() -> tuple[argparse.ArgumentParser, dict[str, argparse.ArgumentParser]] :
     parser = argparse.ArgumentParser(description="Fetch and resolve external dependencies for a project.", formatter_class=argparse.ArgumentDefaultsHelpFormatter)
     subparsers = parser.add_subparsers()
     _buildFrontend(subparsers)
@@ -26,9 +57,10 @@ def _commandRunner() :
     _buildAndReleaseBackend(subparsers)
     _buildRepository(subparsers)
     _buildAndRelease(subparsers)
-
-    args:argparse.Namespace = parser.parse_args()
-    args.func(args)
+    _prune(subparsers)
+    _serve(subparsers)
+    _submit(subparsers)
+    return parser, subparsers.choices
 
 
 # Builds the frontend release.
@@ -40,6 +72,7 @@ def _buildFrontend(subparsers) :
     runner.add_argument("--release_target_dir", "-t", help='Where to put the zipped release', default=constants.RELEASE_DIR)
     runner.add_argument("--release_file_name", "-f", help='The name to use.', default=constants.FRONTEND_RELEASE_NAME)
     runner.add_argument("--clean_patterns", "-p", help='A path to a file containing a list of files to be removed from the repository prior to creating the release.', default=constants.CLEAN_PATTERNS_FILE)
+    _addArchiveArguments(runner)
     runner.set_defaults(func=_buildCommand)
 
 
@@ -56,6 +89,8 @@ def _buildAndReleaseFrontend(subparsers) :
     runner.add_argument("--tag_description", help='The description of the tag to create.', required=True)
     runner.add_argument("--release_version", help='The name of the release to create E.g. v1.11.0. Cannot be the same as a previous release version. Defaults to the tag version.', required=False)
     runner.add_argument("--release_description", help='The description of the release to create Defaults to the tag version.', required=False)
+    runner.add_argument("--api_tag", help='Create the tag on GitHub through its API, on the commit built, rather than pushing it from the clone: no push credentials are needed, and the .git directories are cleaned with the rest.', action="store_true")
+    _addArchiveArguments(runner)
     runner.set_defaults(func=_buildAndReleaseCommand)
 
 
@@ -68,6 +103,7 @@ def _buildBackend(subparsers) :
     runner.add_argument("--release_target_dir", "-t", help='Where to put the zipped release', default=constants.RELEASE_DIR)
     runner.add_argument("--release_file_name", "-f", help='The name to use.', default=constants.BACKEND_RELEASE_NAME)
     runner.add_argument("--clean_patterns", "-p", help='A path to a file containing a list of files to be removed from the repository prior to creating the release.', default=constants.CLEAN_PATTERNS_FILE)
+    _addArchiveArguments(runner)
     runner.set_defaults(func=_buildCommand)
 
 
@@ -84,6 +120,8 @@ def _buildAndReleaseBackend(subparsers) :
     runner.add_argument("--tag_description", help='The description of the tag to create.', required=True)
     runner.add_argument("--release_version", help='The name of the release to create E.g. v1.11.0. Cannot be the same as a previous release version. Defaults to the tag version.', required=False)
     runner.add_argument("--release_description", help='The description of the release to create Defaults to the tag version.', required=False)
+    runner.add_argument("--api_tag", help='Create the tag on GitHub through its API, on the commit built, rather than pushing it from the clone: no push credentials are needed, and the .git directories are cleaned with the rest.', action="store_true")
+    _addArchiveArguments(runner)
     runner.set_defaults(func=_buildAndReleaseCommand)
 
 
@@ -96,6 +134,7 @@ def _buildRepository(subparsers) :
     runner.add_argument("--release_target_dir", "-t", help='Where to put the zipped release', default=constants.RELEASE_DIR)
     runner.add_argument("--release_file_name", "-f", help='The name to use.', default=f"archive-{time_util.getCurrentDateTimeString(date_format='%Y%m%d')}.zip")
     runner.add_argument("--clean_patterns", "-p", help='A path to a file containing a list of files to be removed from the repository prior to creating the release.', default=constants.CLEAN_PATTERNS_FILE)
+    _addArchiveArguments(runner)
     runner.set_defaults(func=_buildCommand)
 
 
@@ -112,9 +151,53 @@ def _buildAndRelease(subparsers) :
     runner.add_argument("--tag_description", help='The description of the tag to create.', required=True)
     runner.add_argument("--release_version", help='The name of the release to create E.g. v1.11.0. Cannot be the same as a previous release version. Defaults to the tag version.', required=False)
     runner.add_argument("--release_description", help='The description of the release to create Defaults to the tag version.', required=False)
+    runner.add_argument("--api_tag", help='Create the tag on GitHub through its API, on the commit built, rather than pushing it from the clone: no push credentials are needed, and the .git directories are cleaned with the rest.', action="store_true")
+    _addArchiveArguments(runner)
     runner.set_defaults(func=_buildAndReleaseCommand)
 
 
+# Prunes old releases from the release directory.
+def _prune(subparsers) :
+    runner = subparsers.add_parser("prune", help="Removes old releases from the release directory.", formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    runner.add_argument("--release_target_dir", "-t", help='The directory holding the releases', default=constants.RELEASE_DIR)
+    runner.add_argument("--pattern", help='Only consider files matching this pattern', default="*")
+    runner.add_argument("--keep_last", help='Keep only the newest N releases of each kind (names differing only in their digits are the same kind)', type=int, default=constants.RETAIN_LAST)
+    runner.add_argument("--max_age_days", help='Remove releases older than this many days', type=int, default=constants.RETAIN_DAYS)
+    runner.add_argument("--max_total_size", help='Remove the oldest releases until the rest take up no more than this (e.g. 10G)', type=helpers.parseSize, default=constants.RETAIN_SIZE)
+    runner.add_argument("--dry_run", help='Report what would be removed without removing anything', action="store_true")
+    runner.set_defaults(func=_pruneCommand)
+
+
+# Serves build, release and prune jobs from a long-running process.
+def _serve(subparsers) :
+    runner = subparsers.add_parser("serve", help="Runs build, release and prune jobs submitted over a Unix socket (see submit), on a pool of workers in this long-running process.", formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    runner.add_argument("--socket", help='The Unix socket to listen on', default=constants.SERVE_SOCKET)
+    runner.add_argument("--workers", help='The number of jobs to run at once', type=int, default=constants.SERVE_WORKERS)
+    runner.set_defaults(func=_serveCommand)
+
+
+# Submits a job to the job server.
+def _submit(subparsers) :
+    runner = subparsers.add_parser("submit", help="Submits a build, release or prune command to the job server (see serve), and waits for it, e.g. submit -- build-frontend --reproducible", formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    runner.add_argument("--socket", help='The Unix socket the server listens on', default=constants.SERVE_SOCKET)
+    runner.add_argument("job", help='The command to run, with its options, as it would be run without the server', nargs=argparse.REMAINDER)
+    runner.set_defaults(func=_submitCommand)
+
+
+# Options shared by all of the build and release commands that control how the archive is produced.
+def _addArchiveArguments(runner) :
+    runner.add_argument("--split_size", help='Split the release into self-contained part archives of at most this much content (e.g. 1900M), with an index file listing which part holds which path.', type=helpers.parseSize, default=None)
+    runner.add_argument("--no_checksums", help='Do not write (or upload) a SHA256SUMS manifest of the release archive(s) and every file in them.', dest="checksums", action="store_false")
+    runner.add_argument("--no_verify", help='Do not verify the archive(s) (every member\'s CRC, and the members against the files built) before they are released.', dest="verify", action="store_false")
+    runner.add_argument("--delta_from", "--delta-from", help='Also build a delta archive, holding only the files changed since this tag (e.g. the previous release), and a manifest of the deleted paths.', default=None)
+    runner.add_argument("--reproducible", help='Build byte-identical archives for identical contents: sorted entries, timestamps from SOURCE_DATE_EPOCH (or the commit time), normalised permissions and a fixed compression level.', action="store_true")
+    runner.add_argument("--follow_symlinks", help='Archive what symbolic links point at rather than the links themselves (links that loop, or point at a directory already archived, are still stored as links).', action="store_true")
+    runner.add_argument("--dedup", help='Store files whose content duplicates another file once, with the duplicates stored as symbolic links to it.', action="store_true")
+    runner.add_argument("--manifest_index", help='Keep an index of the files built (path, size, mtime, inode, git blob SHA and digest) next to the repository target directory, so that files unchanged since the last build are not hashed again, even in a fresh clone.', action="store_true")
+    runner.add_argument("--compression_cache", help='Keep the compressed contents of the files built (keyed by git blob SHA) in a cache shared between builds, so that files compressed by an earlier build are not compressed again.', action="store_true")
+    runner.add_argument("--source_dir", "--source-dir", help='Build from this existing checkout in place, rather than cloning the repository: the files released are those in its git index (and its submodules\') that the clean patterns do not match. Nothing in the checkout is deleted.', default=None)
+
+
 def _buildCommand(args:argparse.Namespace) :
     """
     Builds the release from the given repository and branch to the given directory and name.
@@ -122,10 +205,157 @@ def _buildCommand(args:argparse.Namespace) :
     Args:
         args (argparse.Namespace): The arguments passed to the command.
     """
-    _build(args.repo, args.branch, args.repo_target_dir, args.clean_patterns, args.release_target_dir, args.release_file_name)
+    with _jobWorkspace(args.repo_target_dir, args.source_dir, args.release_target_dir, args.release_file_name) as repository_target_dir :
+        _build(args.repo, args.branch, repository_target_dir, args.clean_patterns, args.release_target_dir, args.release_file_name, split_size=args.split_size, delta_from=args.delta_from, checksums=args.checksums, manifest_index=args.manifest_index, reproducible=args.reproducible, follow_symlinks=args.follow_symlinks, dedup=args.dedup, verify=args.verify, compression_cache=args.compression_cache, source_dir=args.source_dir)
+
+
+def _pruneCommand(args:argparse.Namespace) :
+    """
+    Prunes old releases from the release directory.
+
+    Args:
+        args (argparse.Namespace): The arguments passed to the command.
+    """
+    policy:retention_util.RetentionPolicy = _retentionPolicy(args.keep_last, args.max_age_days, args.max_total_size)
+    if not policy.isSet() :
+        _logger.warning("No retention policy given (--keep_last, --max_age_days or --max_total_size) - nothing to prune.")
+        return
+    with _releaseDirectoryLock(args.release_target_dir) :
+        retention_util.prune(args.release_target_dir, policy, filePattern=args.pattern, dryRun=args.dry_run)
+
+
+def _serveCommand(args:argparse.Namespace) :
+    """
+    Serves jobs on the socket until the process is interrupted or terminated, then waits for the jobs being run.
+    Jobs share this process, so modules are imported once and GitHub clients are kept for reuse.
+
+    Args:
+        args (argparse.Namespace): The arguments passed to the command.
+    """
+    from releaser.utilities import github_util
+    github_util.keepClients()
+    with daemon_util.JobServer(args.socket, _runJob, workers=args.workers) as server :
+        # shutdown() waits for serveForever to return, so it can't be called on the thread serving
+        signal.signal(signal.SIGTERM, lambda signum, frame : threading.Thread(target=server.shutdown).start())
+        try :
+            server.serveForever()
+        except KeyboardInterrupt :
+            pass
+        _logger.info("Stopping once the jobs being run have finished.")
+
+
+def _submitCommand(args:argparse.Namespace) :
+    """
+    Submits a command to the job server, logging what the job logs as it runs. The command's options are parsed here, so
+    the defaults (and the environment they are taken from) are the client's, and paths are made absolute.
+
+    Args:
+        args (argparse.Namespace): The arguments passed to the command.
+
+    Raises:
+        errors_util.ValidationError: If the command is not one the server runs.
+        daemon_util.DaemonError: If the server cannot be reached, or the job fails.
+    """
+    job:list[str] = args.job[1:] if args.job[:1] == ["--"] else args.job
+    if not job or job[0] not in _JOB_COMMANDS :
+        _logger.error(f"Nothing to submit: give one of {', '.join(_JOB_COMMANDS)} and its options")
+        raise errors_util.ValidationError(f"Nothing to submit: give one of {', '.join(_JOB_COMMANDS)} and its options")
+
+    parser, _ = _parser()
+    options:dict = {name : value for name, value in vars(parser.parse_args(job)).items() if name != "func"}
+    for name in _PATH_OPTIONS :
+        if options.get(name) :
+            options[name] = os.path.abspath(options[name])
+
+    def onEvent(event:dict) :
+        if event.get("event") == "log" :
+            _logger.log(logging.getLevelName(event.get("level", "INFO")), f"[job] {event.get('message')}")
+        elif event.get("event") == "accepted" :
+            _logger.info(f"Submitted {job[0]} as job {event.get('job')} to {args.socket}")
+
+    result:dict = daemon_util.submit(args.socket, {"command": job[0], "options": options}, onEvent)
+    _logger.info(f"Job finished: {json.dumps(result)}")
+
+
+def _runJob(job:dict, send:Callable[[dict], None]) -> dict :
+    """
+    Runs a job submitted to the job server: one of the build, release or prune commands, with the options given by
+    argument name (as the command line parses them into) and the command's defaults for the rest. Jobs run at once are
+    kept out of each other's way as they would be run from separate processes (see _jobWorkspace).
+
+    Args:
+        job (dict): The job: {"command": ..., "options": {...}}.
+        send (Callable[[dict], None]): Sends progress events to the client (unused - the job's logging is sent).
+
+    Returns:
+        dict: The result: the command run and how long it took.
+
+    Raises:
+        errors_util.ProjectError: If the job is not a command the server runs, or its options are invalid.
+    """
+    command:Optional[str] = job.get("command")
+    if command not in _JOB_COMMANDS :
+        raise errors_util.ProjectError(f"Unknown job command {command!r} (expected one of {', '.join(_JOB_COMMANDS)})")
+    runner:argparse.ArgumentParser = _parser()[1][command]
+    actions:list[argparse.Action] = [action for action in runner._actions if action.default is not argparse.SUPPRESS]
+
+    options:dict = dict(job.get("options") or {})
+    unknown:set[str] = set(options) - {action.dest for action in actions}
+    if unknown :
+        raise errors_util.ProjectError(f"Unknown options for {command}: {', '.join(sorted(unknown))}")
+    values:dict = {action.dest : action.default for action in actions}
+    for action in actions :
+        if action.dest in options :
+            value = options[action.dest]
+            # Options may be given as they would be on the command line (e.g. a split size of "1900M")
+            values[action.dest] = action.type(value) if isinstance(value, str) and callable(action.type) else value
+    missing:list[str] = [action.option_strings[0] for action in actions if action.required and values.get(action.dest) is None]
+    if missing :
+        raise errors_util.ProjectError(f"Missing options for {command}: {', '.join(missing)}")
+    args:argparse.Namespace = argparse.Namespace(**values)
+
+    started:float = time.perf_counter()
+    runner.get_default("func")(args)
+    return {"status": "ok", "command": command, "seconds": round(time.perf_counter() - started, 3)}
+
+
+@contextmanager
+def _jobWorkspace(repository_target_dir:Optional[str], source_dir:Optional[str] = None, release_target_dir:Optional[str] = None, release_target_file_name:Optional[str] = None) -> Iterator[Optional[str]] :
+    """
+    Claims what a build or release job uses while it runs, with advisory locks kept in RELEASER_LOCK_DIR, so that jobs can
+    run at once - in the job server, or in separate processes on one host - without getting in each other's way:
+    the clone directory, or a numbered sibling of it if another job is using it (see lock_util.claimWorkspace), so that
+    jobs never empty each other's clone; an existing checkout built from in place, waited for; and the release's name in
+    the release directory, waited for, so that two jobs never write the same release at once.
+
+    Args:
+        repository_target_dir (Optional[str]): The directory the repository would be cloned to.
+        source_dir (Optional[str], optional): The existing checkout built from, if any. Defaults to None.
+        release_target_dir (Optional[str], optional): The directory the release is placed in. Defaults to None.
+        release_target_file_name (Optional[str], optional): The name of the release file. Defaults to None.
+
+    Yields:
+        Optional[str]: The directory to clone the repository to: repository_target_dir, or the sibling of it claimed instead.
+    """
+    with ExitStack() as stack :
+        if source_dir :
+            stack.enter_context(lock_util.claimWorkspace(source_dir, constants.LOCK_DIR, derive=False))
+        elif repository_target_dir :
+            repository_target_dir = stack.enter_context(lock_util.claimWorkspace(repository_target_dir, constants.LOCK_DIR)).directory
+        if release_target_dir and release_target_file_name :
+            release:str = file_util.buildPath(release_target_dir, _releaseStem(release_target_file_name))
+            stack.enter_context(lock_util.FileLock(lock_util.lockPath(constants.LOCK_DIR, release), description=f"the release {release}"))
+        yield repository_target_dir
+
+
+def _releaseDirectoryLock(release_target_dir:str) -> lock_util.FileLock :
+    """
+    Gets the lock held while pruning the release directory, so that jobs finishing at once don't prune it together.
+    """
+    return lock_util.FileLock(lock_util.lockPath(constants.LOCK_DIR, release_target_dir), description=f"the release directory {release_target_dir}")
 
 
-def _build(repository_url:str, repository_branch:str, repository_target_dir:str, patterns_file:str, release_target_dir:str, release_target_file_name:str):
+def _build(repository_url:str, repository_branch:str, repository_target_dir:str, patterns_file:str, release_target_dir:str, release_target_file_name:str, split_size:Optional[int] = None, delta_from:Optional[str] = None, checksums:bool = True, manifest_index:bool = False, reproducible:bool = False, follow_symlinks:bool = False, dedup:bool = False, verify:bool = True, compression_cache:bool = False, source_dir:Optional[str] = None, timings:Optional[dict[str, float]] = None) -> list[str] :
     """
     Builds the release from the given repository and branch to the given directory and name.
 
@@ -136,25 +366,73 @@ def _build(repository_url:str, repository_branch:str, repository_target_dir:str,
         patterns_file (str): Path to a file containing patterns of files to remove before creating the release.
         release_target_dir (str): The directory to place the release in.
         release_target_file_name (str): The name of the release file.
+        split_size (Optional[int], optional): If set, the release is split into parts holding at most this many bytes. Defaults to None.
+        delta_from (Optional[str], optional): If set, a delta archive holding the changes since this tag is built too. Defaults to None.
+        checksums (bool, optional): If True, a SHA256SUMS manifest of the archive(s) and every file in them is written. Defaults to True.
+        manifest_index (bool, optional): If True, an index of the files built is kept next to the repository target directory, so unchanged files are not hashed again. Defaults to False.
+        reproducible (bool, optional): If True, the archives are byte-identical for identical contents, timestamped with SOURCE_DATE_EPOCH or the commit time. Defaults to False.
+        follow_symlinks (bool, optional): If True, what symbolic links point at is archived rather than the links themselves. Defaults to False.
+        dedup (bool, optional): If True, files duplicating another file's content are stored as symbolic links to it. Defaults to False.
+        verify (bool, optional): If True, the archives are verified before they are released. Defaults to True.
+        compression_cache (bool, optional): If True, files are compressed through the compression cache shared between builds. Defaults to False.
+        source_dir (Optional[str], optional): If set, the release is built from this existing checkout in place rather than from a clone (the repository URL and branch are not used). Defaults to None.
+        timings (Optional[dict[str, float]], optional): If given, the seconds spent in each stage of the build are added to it. Defaults to None.
+
+    Returns:
+        list[str]: The paths of the files built: the archive (or its parts and their index), any delta release and the checksums.
+
+    Raises:
+        errors_util.ValidationError: If a required argument is not set, or the repository URL is not valid.
     """
-    helpers.assertSet(_logger, "_build::repository_url not set", repository_url)
-    _validateRepositoryUrl(repository_url)
-    helpers.assertSet(_logger, "_build::repository_branch not set", repository_branch)
-    helpers.assertSet(_logger, "_build::repository_target_dir not set", repository_target_dir)
+    if not source_dir :
+        helpers.assertSet(_logger, "_build::repository_url not set", repository_url)
+        _validateRepositoryUrl(repository_url)
+        helpers.assertSet(_logger, "_build::repository_branch not set", repository_branch)
+        helpers.assertSet(_logger, "_build::repository_target_dir not set", repository_target_dir)
     helpers.assertSet(_logger, "_build::patterns_file not set", patterns_file)
     helpers.assertSet(_logger, "_build::release_target_dir not set", release_target_dir)
     helpers.assertSet(_logger, "_build::release_target_file_name not set", release_target_file_name)
 
-    _logger.info(f"Building {release_target_file_name} for {repository_url}:{repository_branch}")
+    _logger.info(f"Building {release_target_file_name} for {source_dir or f'{repository_url}:{repository_branch}'}")
+
+    # Check everything that can be checked before the clone, so that a build that can't succeed fails now rather than after it
+    with _timed(timings, "preflight") :
+        _preflight(repository_url=repository_url, repository_target_dir=repository_target_dir, patterns_file=patterns_file, release_target_dir=release_target_dir, source_dir=source_dir)
+
+    # Clone the repository from the given path (or use the existing checkout in place)
+    with _timed(timings, "clone") :
+        repository:git_util.GitRepository = _openSourceDirectory(source_dir) if source_dir else _cloneRepository(repository_url=repository_url, repository_branch=repository_branch, repository_target_dir=repository_target_dir)
+    build_dir:str = source_dir or repository_target_dir
 
-    # Clone the repository from the given path
-    _cloneRepository(repository_url=repository_url, repository_branch=repository_branch, repository_target_dir=repository_target_dir)
+    # Work out what changed since the delta tag (and when the commit was made) while the repository still has its .git directory
+    with _timed(timings, "inspect") :
+        changes:Optional[git_util.ChangeSet] = _determineChanges(repository=repository, tag_name=delta_from) if delta_from else None
+        source_date_epoch:Optional[int] = _sourceDateEpoch(repository) if reproducible else None
+        blob_shas:Optional[dict[str, str]] = repository.blobShas() if (compression_cache or manifest_index) and not source_dir else None
+        tracked_paths:Optional[list[str]] = repository.trackedFiles() if source_dir else None
 
     # Build the release
-    _buildRelease(repository_target_dir=repository_target_dir, patterns_file=patterns_file, release_target_dir=release_target_dir, release_target_name=release_target_file_name)
+    parts:list[str] = []
+    release_path:str = _buildRelease(repository_target_dir=build_dir, patterns_file=patterns_file, release_target_dir=release_target_dir, release_target_name=release_target_file_name, split_size=split_size, on_part_completed=parts.append, checksums=checksums, manifest_index=manifest_index, source_date_epoch=source_date_epoch, follow_symlinks=follow_symlinks, dedup=dedup, verify=verify, compression_cache=compression_cache, blob_shas=blob_shas, tracked_paths=tracked_paths, timings=timings)
+    artifacts:list[str] = [*parts, release_path]
+
+    # Build the delta release
+    if changes is not None and delta_from :
+        with _timed(timings, "delta") :
+            delta_paths:tuple[str, str] = _buildDelta(changes=changes, delta_from=delta_from, repository_target_dir=build_dir, patterns_file=patterns_file, release_target_dir=release_target_dir, release_target_name=release_target_file_name, source_date_epoch=source_date_epoch, verify=verify, in_place=bool(source_dir))
+            if checksums :
+                _addChecksums(release_target_dir=release_target_dir, release_target_name=release_target_file_name, artifact_paths=list(delta_paths))
+        artifacts.extend(delta_paths)
+    if checksums :
+        artifacts.append(_checksumsPath(release_target_dir, release_target_file_name))
 
     _logger.info(f"{release_target_file_name} built successfully.")
 
+    # Remove old releases, according to the configured retention policy
+    with _timed(timings, "retention") :
+        _applyRetention(release_target_dir=release_target_dir, release_target_name=release_target_file_name)
+    return artifacts
+
 
 def _buildAndReleaseCommand(args:argparse.Namespace) :
     """
@@ -167,10 +445,11 @@ def _buildAndReleaseCommand(args:argparse.Namespace) :
     release_version:str = args.release_version if helpers.hasValue(args.release_version) else args.tag_version
     release_description:str = args.release_description if helpers.hasValue(args.release_description) else args.tag_description
 
-    _buildAndReleaseToGitHub(args.repo, args.branch, args.repo_target_dir, args.clean_patterns, args.release_target_dir, args.release_file_name, args.tag_version, args.tag_description, release_version, release_description)
+    with _jobWorkspace(args.repo_target_dir, args.source_dir, args.release_target_dir, args.release_file_name) as repository_target_dir :
+        _buildAndReleaseToGitHub(args.repo, args.branch, repository_target_dir, args.clean_patterns, args.release_target_dir, args.release_file_name, args.tag_version, args.tag_description, release_version, release_description, split_size=args.split_size, delta_from=args.delta_from, checksums=args.checksums, manifest_index=args.manifest_index, reproducible=args.reproducible, follow_symlinks=args.follow_symlinks, dedup=args.dedup, verify=args.verify, compression_cache=args.compression_cache, source_dir=args.source_dir, api_tag=args.api_tag)
 
 
-def _buildAndReleaseToGitHub(repository_url:str, repository_branch:str, repository_target_dir:str, patterns_file:str, release_target_dir:str, release_target_file_name:str, tag_version:str, tag_description:str, release_version:str, release_description:str) :
+def _buildAndReleaseToGitHub(repository_url:str, repository_branch:str, repository_target_dir:str, patterns_file:str, release_target_dir:str, release_target_file_name:str, tag_version:str, tag_description:str, release_version:str, release_description:str, split_size:Optional[int] = None, delta_from:Optional[str] = None, checksums:bool = True, manifest_index:bool = False, reproducible:bool = False, follow_symlinks:bool = False, dedup:bool = False, verify:bool = True, compression_cache:bool = False, source_dir:Optional[str] = None, api_tag:bool = False, timings:Optional[dict[str, float]] = None, critical_path:Optional[list[str]] = None) -> tuple[list[str], str] :
     """
     Builds the release from the given repository and branch to the given directory and name.
 
@@ -185,11 +464,31 @@ def _buildAndReleaseToGitHub(repository_url:str, repository_branch:str, reposito
         tag_description (str): The description of the tag to create.
         release_version (str): The name of the release to create.
         release_description (str): The description of the release to create.
+        split_size (Optional[int], optional): If set, the release is split into parts holding at most this many bytes, each uploaded as soon as it is built. Defaults to None.
+        delta_from (Optional[str], optional): If set, a delta archive holding the changes since this tag is built and uploaded too. Defaults to None.
+        checksums (bool, optional): If True, a SHA256SUMS manifest of the archive(s) and every file in them is written and uploaded. Defaults to True.
+        manifest_index (bool, optional): If True, an index of the files built is kept next to the repository target directory, so unchanged files are not hashed again. Defaults to False.
+        reproducible (bool, optional): If True, the archives are byte-identical for identical contents, timestamped with SOURCE_DATE_EPOCH or the commit time. Defaults to False.
+        follow_symlinks (bool, optional): If True, what symbolic links point at is archived rather than the links themselves. Defaults to False.
+        dedup (bool, optional): If True, files duplicating another file's content are stored as symbolic links to it. Defaults to False.
+        verify (bool, optional): If True, the archives are verified before they are released. Defaults to True.
+        compression_cache (bool, optional): If True, files are compressed through the compression cache shared between builds. Defaults to False.
+        source_dir (Optional[str], optional): If set, the release is built from this existing checkout in place rather than from a clone (the repository URL and branch are not used). Defaults to None.
+        api_tag (bool, optional): If True, the tag is created on GitHub through its API, on the commit built, rather than pushed from the clone - so the .git directories are cleaned with the rest rather than kept for the push. Defaults to False.
+        timings (Optional[dict[str, float]], optional): If given, the seconds spent in each stage are added to it (stages run at once - the tag and the zip, say - each count in full). Defaults to None.
+        critical_path (Optional[list[str]], optional): If given, the tasks on the critical path of the release (those that made it take as long as it did) are added to it, in order. Defaults to None.
+
+    Returns:
+        tuple[list[str], str]: The paths of the files built and uploaded (as _build), and the URL of the GitHub release.
+
+    Raises:
+        errors_util.ValidationError: If a required argument is not set, or the repository URL is not valid.
     """
-    helpers.assertSet(_logger, "_buildAndReleaseToGitHub::repository_url not set", repository_url)
-    _validateRepositoryUrl(repository_url)
-    helpers.assertSet(_logger, "_buildAndReleaseToGitHub::repository_branch not set", repository_branch)
-    helpers.assertSet(_logger, "_buildAndReleaseToGitHub::repository_target_dir not set", repository_target_dir)
+    if not source_dir :
+        helpers.assertSet(_logger, "_buildAndReleaseToGitHub::repository_url not set", repository_url)
+        _validateRepositoryUrl(repository_url)
+        helpers.assertSet(_logger, "_buildAndReleaseToGitHub::repository_branch not set", repository_branch)
+        helpers.assertSet(_logger, "_buildAndReleaseToGitHub::repository_target_dir not set", repository_target_dir)
     helpers.assertSet(_logger, "_buildAndReleaseToGitHub::patterns_file not set", patterns_file)
     helpers.assertSet(_logger, "_buildAndReleaseToGitHub::release_target_dir not set", release_target_dir)
     helpers.assertSet(_logger, "_buildAndReleaseToGitHub::release_target_file_name not set", release_target_file_name)
@@ -198,40 +497,202 @@ def _buildAndReleaseToGitHub(repository_url:str, repository_branch:str, reposito
     helpers.assertSet(_logger, "_buildAndReleaseToGitHub::release_version not set", release_version)
     helpers.assertSet(_logger, "_buildAndReleaseToGitHub::release_description not set", release_description)
 
-    _logger.info(f"Building release for {repository_url}:{repository_branch}")
-
-    # Clone the repository from the given path
-    repository:git_util.GitRepository = _cloneRepository(repository_url=repository_url, repository_branch=repository_branch, repository_target_dir=repository_target_dir)
-
-    # Create the tag
-    _createTag(repository=repository, tag_name=tag_version, tag_description=tag_description)
-
-    # Create the release - the build cleans the repository, potentially including the .git directory, so create the release while we still can
-    github:github_util.GitHubRepository = github_util.GitHubRepository(repository.getRepository())
-    release:github_util.GitRelease = github.createRelease(release_name=release_version, release_description=release_description, tagName=tag_version)
-
-    # Build the release
-    release_path:str = _buildRelease(repository_target_dir=repository_target_dir, patterns_file=patterns_file, release_target_dir=release_target_dir, release_target_name=release_target_file_name)
-
-    # Upload the release build to the release
-    github.uploadFileToRelease(release=release, file_name=release_target_file_name, file_path=release_path, content_type="application/zip")
-
+    _logger.info(f"Building release for {source_dir or f'{repository_url}:{repository_branch}'}")
+
+    # The release is run as a graph of tasks, each started as soon as the tasks it needs have finished. The tag is pushed
+    # and the GitHub release created while the repository is cleaned and zipped: the .git directories the tag push needs
+    # are left out of the archive rather than cleaned, and only removed once the tag has been pushed (a tag created through
+    # the API needs only the commit's SHA, so they are cleaned with the rest). The uploads start as soon as both the release
+    # and what they upload exist (the parts of a split release as each is built).
+    from releaser.utilities import github_util
+    graph:task_util.TaskGraph = task_util.TaskGraph()
+
+    # Check everything that can be checked before the clone - the token, that the tag is free and so on - so that a release that can't succeed fails now rather than after it
+    def preflight() :
+        with _timed(timings, "preflight") :
+            _preflight(repository_url=repository_url, repository_target_dir=repository_target_dir, patterns_file=patterns_file, release_target_dir=release_target_dir, source_dir=source_dir, tag_version=tag_version)
+    graph.add("preflight", preflight)
+
+    # Clone the repository from the given path (or use the existing checkout in place)
+    def clone() -> 'git_util.GitRepository' :
+        with _timed(timings, "clone") :
+            return _openSourceDirectory(source_dir) if source_dir else _cloneRepository(repository_url=repository_url, repository_branch=repository_branch, repository_target_dir=repository_target_dir)
+    graph.add("clone", clone, after=("preflight",))
+    build_dir:str = source_dir or repository_target_dir
+
+    # Work out what changed since the delta tag (when the commit was made, and which GitHub repository it is) while the repository still has its .git directory
+    def inspect() -> tuple[Optional['git_util.ChangeSet'], Optional[int], Optional[dict[str, str]], Optional[list[str]], Optional[str], 'github_util.GitHubRepository'] :
+        repository:git_util.GitRepository = graph.result("clone")
+        with _timed(timings, "inspect") :
+            changes:Optional[git_util.ChangeSet] = _determineChanges(repository=repository, tag_name=delta_from) if delta_from else None
+            source_date_epoch:Optional[int] = _sourceDateEpoch(repository) if reproducible else None
+            blob_shas:Optional[dict[str, str]] = repository.blobShas() if (compression_cache or manifest_index) and not source_dir else None
+            tracked_paths:Optional[list[str]] = repository.trackedFiles() if source_dir else None
+            sha:Optional[str] = repository.commitSha() if api_tag else None
+            github:github_util.GitHubRepository = github_util.GitHubRepository(repository.getRepository())
+            github.getRepositoryName()
+        return changes, source_date_epoch, blob_shas, tracked_paths, sha, github
+    graph.add("inspect", inspect, after=("clone",))
+
+    # Create the tag (through the API, of the commit built, if api_tag is set)
+    def tag() :
+        with _timed(timings, "tag") :
+            _, _, _, _, sha, github = graph.result("inspect")
+            _createTag(repository=graph.result("clone"), tag_name=tag_version, tag_description=tag_description, sha=sha, github=github)
+    graph.add("tag", tag, after=("inspect",))
+
+    # Create the release, from the tag once it has been pushed
+    def createRelease() -> tuple[github_util.GitHubRepository, github_util.GitRelease] :
+        with _timed(timings, "create_release") :
+            github:github_util.GitHubRepository = graph.result("inspect")[5]
+            return github, github.createRelease(release_name=release_version, release_description=release_description, tagName=tag_version)
+    graph.add("create_release", createRelease, after=("tag",))
+
+    # Upload a file to the release (waiting for the release to be created, if it hasn't been yet)
+    def upload(path:str, name:str, content_type:str) :
+        github, release = graph.result("create_release")
+        with _timed(timings, "upload") :
+            github.uploadFileToRelease(release=release, file_name=name, file_path=path, content_type=content_type)
+
+    # Build the release - split releases upload each part as soon as it has been built
+    parts:list[str] = []
+    def uploadPart(part_path:str) :
+        parts.append(part_path)
+        upload(part_path, file_util.returnLastPartOfPath(part_path), "application/zip")
+
+    def build() -> str :
+        _, source_date_epoch, blob_shas, tracked_paths, _, _ = graph.result("inspect")
+        return _buildRelease(repository_target_dir=build_dir, patterns_file=patterns_file, release_target_dir=release_target_dir, release_target_name=release_target_file_name, split_size=split_size, on_part_completed=uploadPart, checksums=checksums, manifest_index=manifest_index, source_date_epoch=source_date_epoch, follow_symlinks=follow_symlinks, dedup=dedup, verify=verify, compression_cache=compression_cache, blob_shas=blob_shas, tracked_paths=tracked_paths, defer_git=not (source_dir or api_tag), timings=timings)
+    graph.add("build", build, after=("inspect",))
+
+    # Clean the .git directories out of the clone, now the tag has been pushed (an existing checkout is left as it is)
+    clean_git:bool = not (source_dir or api_tag)
+    if clean_git :
+        def cleanGit() :
+            with _timed(timings, "clean") :
+                _cleanGit(repository_target_dir=repository_target_dir, patterns_file=patterns_file)
+        graph.add("clean_git", cleanGit, after=("tag", "build"))
+
+    # Upload the release build (or the index of its parts) to the release
+    def uploadRelease() :
+        release_path:str = graph.result("build")
+        if split_size :
+            upload(release_path, file_util.returnLastPartOfPath(release_path), "application/json")
+        else :
+            upload(release_path, release_target_file_name, "application/zip")
+    graph.add("upload_release", uploadRelease, after=("build", "create_release"))
+    uploads:list[str] = ["upload_release"]
+
+    # Build and upload the delta release
+    if delta_from :
+        def delta() -> tuple[str, str] :
+            changes, source_date_epoch, _, _, _, _ = graph.result("inspect")
+            with _timed(timings, "delta") :
+                delta_path, deleted_path = _buildDelta(changes=changes, delta_from=delta_from, repository_target_dir=build_dir, patterns_file=patterns_file, release_target_dir=release_target_dir, release_target_name=release_target_file_name, source_date_epoch=source_date_epoch, verify=verify, in_place=bool(source_dir))
+            if checksums :
+                _addChecksums(release_target_dir=release_target_dir, release_target_name=release_target_file_name, artifact_paths=[delta_path, deleted_path])
+            return delta_path, deleted_path
+        graph.add("delta", delta, after=("build",))
+
+        def uploadDelta() :
+            delta_path, deleted_path = graph.result("delta")
+            upload(delta_path, file_util.returnLastPartOfPath(delta_path), "application/zip")
+            upload(deleted_path, file_util.returnLastPartOfPath(deleted_path), "text/plain")
+        graph.add("upload_delta", uploadDelta, after=("delta", "create_release"))
+        uploads.append("upload_delta")
+
+    # Upload the checksums of everything released (once the delta's have been added)
+    if checksums :
+        graph.add("upload_checksums", lambda : upload(_checksumsPath(release_target_dir, release_target_file_name), "SHA256SUMS", "text/plain"), after=("delta" if delta_from else "build", "create_release"))
+        uploads.append("upload_checksums")
+
+    # Remove old releases, according to the configured retention policy
+    def retention() :
+        with _timed(timings, "retention") :
+            _applyRetention(release_target_dir=release_target_dir, release_target_name=release_target_file_name)
+    graph.add("retention", retention, after=(*uploads, *(("clean_git",) if clean_git else ())))
+
+    report:task_util.TaskReport = graph.run()
     _logger.info("Release build completed successfully.")
+    _logger.info(f"Critical path: {report.describe()}")
+    if critical_path is not None :
+        critical_path.extend(name for name, _ in report.critical_path)
+
+    artifacts:list[str] = [*parts, graph.result("build")]
+    if delta_from :
+        artifacts.extend(graph.result("delta"))
+    if checksums :
+        artifacts.append(_checksumsPath(release_target_dir, release_target_file_name))
+    return artifacts, graph.result("create_release")[1].html_url
 
 
 def _validateRepositoryUrl(repository_url:str):
     """
-    Validates the repository URL. Exits if the URL is not valid
+    Validates the repository URL.
 
     Args:
         repository_url (str): The URL of the repository to validate.
+
+    Raises:
+        errors_util.ValidationError: If the URL is not valid.
     """
     if not repository_url or not isinstance(repository_url, str) or not helpers.isValidUrl(repository_url) :
         _logger.error(f"Invalid repository URL provided: {repository_url}")
-        return exit(1)
+        raise errors_util.ValidationError(f"Invalid repository URL provided: {repository_url}")
+
+
+def _preflight(repository_url:Optional[str], repository_target_dir:Optional[str], patterns_file:str, release_target_dir:str, source_dir:Optional[str] = None, tag_version:Optional[str] = None) :
+    """
+    Runs the pre-flight checks, all at once: that the clean patterns file can be read, that the clone and release target
+    directories can be written to and have RELEASER_MIN_FREE_SPACE free and, for a release (given the tag), that
+    GITHUB_TOKEN may push to the repository and create releases in it, and that the tag and a release of it don't exist yet.
 
+    Args:
+        repository_url (Optional[str]): The Url of the repository (not used with source_dir).
+        repository_target_dir (Optional[str]): The directory the repository will be cloned to (not used with source_dir).
+        patterns_file (str): Path to the file containing the patterns of files to remove.
+        release_target_dir (str): The directory the release will be placed in.
+        source_dir (Optional[str], optional): The existing checkout the release will be built from, if any. Defaults to None.
+        tag_version (Optional[str], optional): For a release, the tag that will be created. Defaults to None.
 
-def _cloneRepository(repository_url:str, repository_branch:str, repository_target_dir:str) -> git_util.GitRepository :
+    Raises:
+        preflight_util.PreflightError: If any check fails (every failure is reported).
+    """
+    build_dirs:list[str] = [release_target_dir] if source_dir else [repository_target_dir, release_target_dir]
+    checks:dict[str, Callable[[], None]] = {"clean patterns": lambda : preflight_util.checkReadableFile(patterns_file)}
+    for build_dir in build_dirs :
+        checks[f"directory {build_dir}"] = lambda build_dir=build_dir : preflight_util.checkWritableDirectory(build_dir)
+    def checkSpace() :
+        for build_dir in build_dirs :
+            preflight_util.checkFreeSpace(build_dir, constants.MIN_FREE_SPACE)
+    if constants.MIN_FREE_SPACE :
+        checks["disk space"] = checkSpace
+
+    if tag_version :
+        from releaser.utilities import git_util, github_util
+        try :
+            # The repository is named by its URL or, for an existing checkout, the URL of its origin
+            repository_name:str = github_util.repositoryNameFromUrl(git_util.GitRepository.open(source_dir).originUrl() if source_dir else repository_url)
+        except errors_util.ProjectError as e :
+            def unknownRepository(error:Exception = e) :
+                raise error
+            checks["github repository"] = unknownRepository
+        else :
+            checks["github access"] = lambda : github_util.checkAccess(repository_name)
+            # Without a token the access check fails on that alone
+            if os.getenv("GITHUB_TOKEN") :
+                checks["tag"] = lambda : github_util.checkTagIsFree(repository_name, tag_version)
+
+    try :
+        seconds:dict[str, float] = preflight_util.runChecks(checks)
+    except preflight_util.PreflightError as e :
+        for name, message in e.failures.items() :
+            _logger.error(f"Pre-flight check {name} failed: {message}")
+        raise
+    _logger.info(f"Pre-flight checks passed in {max(seconds.values()) * 1000:.0f}ms")
+
+
+def _cloneRepository(repository_url:str, repository_branch:str, repository_target_dir:str) -> 'git_util.GitRepository' :
     """
     Clones the repository from the given path and initializes any submodules.
 
@@ -251,8 +712,10 @@ def _cloneRepository(repository_url:str, repository_branch:str, repository_targe
     # Prepare the repository target directory
     _prepareRepositoryTargetDirectory(repository_target_dir)
 
-    # Clone the repository from the given path
-    repository:git_util.GitRepository = git_util.GitRepository.cloneRepositoryBranch(repo_url=repository_url, branch=repository_branch, clone_target_dir=repository_target_dir)
+    # Clone the repository from the given path (or from the mirror, if one is configured)
+    from releaser.utilities import git_util
+    rewrites:Optional[dict[str, str]] = url_util.mirrorRewrites(constants.GIT_MIRROR_ROOT, constants.GIT_MIRROR_HOSTS) if constants.GIT_MIRROR_ROOT else None
+    repository:git_util.GitRepository = git_util.GitRepository.cloneRepositoryBranch(repo_url=repository_url, branch=repository_branch, clone_target_dir=repository_target_dir, rewrites=rewrites)
 
     # Initialize any submodules in the repository
     repository.initAnySubmodules()
@@ -263,9 +726,28 @@ def _cloneRepository(repository_url:str, repository_branch:str, repository_targe
     return repository
 
 
+def _openSourceDirectory(source_dir:str) -> 'git_util.GitRepository' :
+    """
+    Opens an existing checkout to build from in place. Nothing in it is cleaned or deleted - the release is made from the
+    files in its git index that the clean patterns do not match.
+
+    Args:
+        source_dir (str): The root of the checkout.
+
+    Returns:
+        git_util.GitRepository: The checkout.
+
+    Raises:
+        git_util.GitError: If the directory is not the root of a git checkout.
+    """
+    _logger.info(f"Building from the existing checkout in {source_dir}")
+    from releaser.utilities import git_util
+    return git_util.GitRepository.open(source_dir)
+
+
 def _prepareRepositoryTargetDirectory(repository_target_dir:str) :
     """
-    Prepares the repository target directory by creating it if it doesn't exist and deleting its contents if it does.
+    Prepares the repository target directory by (re)creating it empty. An existing directory is moved to the trash and deleted in the background.
 
     Args:
         repository_target_dir (str): The directory to prepare.
@@ -276,17 +758,21 @@ def _prepareRepositoryTargetDirectory(repository_target_dir:str) :
     helpers.assertSet(_logger, "_prepareRepositoryTargetDirectory::repository_target_dir not set", repository_target_dir)
     _logger.info(f"Preparing repository target directory: {repository_target_dir}")
 
+    # Reap anything a previous run in this directory moved to the trash but didn't get to delete (siblings may be in use by other jobs)
+    file_util.reapTrash(file_util.getParentDirectory(os.path.abspath(repository_target_dir)), name=file_util.returnLastPartOfPath(os.path.abspath(repository_target_dir)))
+
     if file_util.exists(repository_target_dir) :
         if not file_util.isDir(repository_target_dir) :
             raise errors_util.ProjectError(f"{repository_target_dir} is not a directory.")
-        _logger.info(f"Deleting contents of {repository_target_dir}")
-        file_util.deleteContents(repository_target_dir)
-    else :
-        _logger.info(f"Creating directory: {repository_target_dir}")
-        file_util.mkdir(repository_target_dir)
+        # Move the previous clone out of the way so the new clone can start straight away - it is deleted in the background
+        _logger.info(f"Deleting {repository_target_dir} in the background")
+        file_util.deleteInBackground(repository_target_dir)
+
+    _logger.info(f"Creating directory: {repository_target_dir}")
+    file_util.mkdir(repository_target_dir)
 
 
-def _buildRelease(repository_target_dir:str, patterns_file:str, release_target_dir:str, release_target_name:str) -> str :
+def _buildRelease(repository_target_dir:str, patterns_file:str, release_target_dir:str, release_target_name:str, split_size:Optional[int] = None, on_part_completed:Optional[Callable[[str], None]] = None, checksums:bool = True, manifest_index:bool = False, source_date_epoch:Optional[int] = None, follow_symlinks:bool = False, dedup:bool = False, verify:bool = True, compression_cache:bool = False, blob_shas:Optional[dict[str, str]] = None, tracked_paths:Optional[list[str]] = None, defer_git:bool = False, timings:Optional[dict[str, float]] = None) -> str :
     """
     Builds the release from the given repository to the given directory and name.
     Simply cleans the repository of unwanted files and zips it up.
@@ -297,20 +783,111 @@ def _buildRelease(repository_target_dir:str, patterns_file:str, release_target_d
         patterns_file (str): Path to a file containing patterns of files to remove before creating the release.
         release_target_dir (str): The directory to place the release in.
         release_target_name (str): The name of the release file.
+        split_size (Optional[int], optional): If set, the release is split into parts holding at most this many bytes. Defaults to None.
+        on_part_completed (Optional[Callable[[str], None]], optional): Called with the path of each part as soon as it is built. Defaults to None.
+        checksums (bool, optional): If True, a SHA256SUMS manifest of the archive(s) and every file in them is written next to the release. Defaults to True.
+        manifest_index (bool, optional): If True, the index of the files built kept next to the repository target directory is used and updated. Defaults to False.
+        source_date_epoch (Optional[int], optional): If set, the archive is built reproducibly, with every entry stamped with this time. Defaults to None.
+        follow_symlinks (bool, optional): If True, what symbolic links point at is archived rather than the links themselves. Defaults to False.
+        dedup (bool, optional): If True, files duplicating another file's content are stored as symbolic links to it. Defaults to False.
+        verify (bool, optional): If True, the archive (or each part, before it is handed to on_part_completed) is verified. Defaults to True.
+        compression_cache (bool, optional): If True, files are compressed through the compression cache shared between builds. Defaults to False.
+        blob_shas (Optional[dict[str, str]], optional): The git blob SHAs of the repository's files, to identify them to the compression cache and the manifest index by. Defaults to None.
+        tracked_paths (Optional[list[str]], optional): If set, the repository is an existing checkout: rather than cleaning it, the release is made from these paths, less those the clean patterns match. Defaults to None.
+        defer_git (bool, optional): If True, what the clean patterns that match .git (such as .git and .git*) find is left in place - the tag is still to be pushed - and out of the archive, for _cleanGit to remove later. Defaults to False.
+        timings (Optional[dict[str, float]], optional): If given, the seconds spent cleaning, zipping, verifying and writing checksums are added to it. Defaults to None.
 
     Returns:
-        str: The path to the zip file.
+        str: The path to the zip file (or, for a split release, the path to the index of the parts).
+
+    Raises:
+        zip_util.ZipError: If the archive fails verification.
     """
     _logger.info(f"Building release in {repository_target_dir} to {release_target_dir}/{release_target_name}...")
 
     # Prepare the release target directory
     _prepareReleaseTargetDirectory(release_target_dir)
 
-    # Clean the repository
-    _cleanRepository(repository_target_dir=repository_target_dir, patterns_file=patterns_file)
+    # Clean the repository - or, for an existing checkout, which must be left as it is, leave what would be cleaned out of the release
+    paths:Optional[list[str]] = None
+    deferred:Optional[list[str]] = None
+    with _timed(timings, "clean") :
+        if tracked_paths is not None :
+            paths = _uncleanedPaths(paths=tracked_paths, patterns_file=patterns_file)
+        else :
+            deferred = _cleanRepository(repository_target_dir=repository_target_dir, patterns_file=patterns_file, defer_git=defer_git) or None
+
+    # Zip the repository - this is where the actual build happens. Files are hashed as they are zipped.
+    # Files the manifest index records as unchanged since the last build are not hashed again.
+    # Each part of a split release is verified before it is handed over (to be uploaded).
+    digests:Optional[dict[str, str]] = {} if checksums else None
+    verified:list[str] = []
+    def verifyPart(part_path:str) :
+        if verify :
+            verified.extend(zip_util.verify(part_path, digests=digests, requireAll=False))
+        if on_part_completed is not None :
+            on_part_completed(part_path)
+
+    manifest:Optional[manifest_util.ManifestIndex] = manifest_util.ManifestIndex(manifest_util.ManifestIndex.pathFor(repository_target_dir)) if manifest_index else None
+    cache:Optional[cache_util.CompressionCache] = cache_util.CompressionCache(constants.COMPRESSION_CACHE_DIR, constants.COMPRESSION_CACHE_SIZE) if compression_cache else None
+    try :
+        with _timed(timings, "zip") :
+            release_path:str = _zipRepository(repository_target_dir=repository_target_dir, release_target_dir=release_target_dir, release_target_name=release_target_name, split_size=split_size, on_part_completed=verifyPart, digests=digests, manifest=manifest, source_date_epoch=source_date_epoch, follow_symlinks=follow_symlinks, dedup=dedup, cache=cache, blob_shas=blob_shas, paths=paths, exclude=deferred)
+    finally :
+        if manifest is not None :
+            manifest.close()
+        if cache is not None :
+            cache.close()
+
+    # Verify the release before anything is done with it - every member is read back and checked against what was built
+    if verify :
+        with _timed(timings, "verify") :
+            _verifyRelease(release_path=release_path, split=bool(split_size), digests=digests, verified=verified)
 
-    # Zip the repository - this is where the actual build happens
-    return _zipRepository(repository_target_dir=repository_target_dir, release_target_dir=release_target_dir, release_target_name=release_target_name)
+    # Write the checksums of the archive(s) and their contents
+    if digests is not None :
+        with _timed(timings, "checksums") :
+            _writeChecksums(release_target_dir=release_target_dir, release_target_name=release_target_name, release_path=release_path, split=bool(split_size), digests=digests)
+
+    return release_path
+
+
+@contextmanager
+def _timed(timings:Optional[dict[str, float]], stage:str) -> Iterator[None] :
+    """
+    Adds the seconds spent in the context to the stage's time, if timings are being kept (from any thread).
+    """
+    start:float = time.perf_counter()
+    try :
+        yield
+    finally :
+        if timings is not None :
+            with _timings_lock :
+                timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - start
+
+
+def _verifyRelease(release_path:str, split:bool, digests:Optional[dict[str, str]], verified:list[str]) :
+    """
+    Verifies the release archive: the CRC of every member and, given the digests of the files built, that every file is in it with the right content.
+    The parts of a split release have already been verified one by one, so all that is left is to check that none of the files built are missing.
+
+    Args:
+        release_path (str): The path to the zip file (or, for a split release, the index of the parts).
+        split (bool): True if the release was split into parts.
+        digests (Optional[dict[str, str]]): The digests of the files built, by path within the archive, if they were collected.
+        verified (list[str]): The members of the parts already verified (for a split release).
+
+    Raises:
+        zip_util.ZipError: If the archive fails verification.
+    """
+    _logger.info(f"Verifying {release_path}...")
+    if not split :
+        verified = zip_util.verify(release_path, digests=digests)
+    elif digests is not None :
+        missing:list[str] = sorted(set(digests) - set(verified))
+        if missing :
+            raise zip_util.ZipError(f"{len(missing)} files built are missing from the parts of {release_path}: {', '.join(missing[:20])}")
+    _logger.info(f"...verified {len(verified)} members")
 
 
 def _prepareReleaseTargetDirectory(release_target_dir:str) :
@@ -334,20 +911,64 @@ def _prepareReleaseTargetDirectory(release_target_dir:str) :
         file_util.mkdir(release_target_dir)
 
 
-def _cleanRepository(repository_target_dir:str, patterns_file:str) :
+def _cleanRepository(repository_target_dir:str, patterns_file:str, defer_git:bool = False) -> list[str] :
     """
     Cleans the repository by removing the files of the given types.
 
     Args:
         repository_target_dir (str): The directory to clean.
         patterns_file (str): The file containing the patterns of files to remove.
+        defer_git (bool, optional): If True, the patterns that match .git are not applied yet (see _cleanGit). Defaults to False.
+
+    Returns:
+        list[str]: What the deferred patterns match (relative to the repository), to be left out of the archive. Empty unless deferring.
     """
     _logger.info(f"Cleaning repository in {repository_target_dir}...")
-    file_util.removeFilesOfTypes(repository_target_dir, file_util.readListFromFile(patterns_file))
+    patterns:list[str] = file_util.readListFromFile(patterns_file)
+    deferred:list[str] = [pattern for pattern in patterns if _isGitPattern(pattern)] if defer_git else []
+    file_util.removeFilesOfTypes(repository_target_dir, [pattern for pattern in patterns if pattern not in deferred])
     _logger.info(f"...cleaned repository in {repository_target_dir}")
+    return [os.path.relpath(path, repository_target_dir) for path in file_util.findFilesOfTypes(repository_target_dir, deferred)]
 
 
-def _zipRepository(repository_target_dir:str, release_target_dir:str, release_target_name:str) -> str :
+def _cleanGit(repository_target_dir:str, patterns_file:str) :
+    """
+    Finishes cleaning the repository once the tag has been pushed, by removing what the clean patterns that match .git find.
+
+    Args:
+        repository_target_dir (str): The directory to clean.
+        patterns_file (str): The file containing the patterns of files to remove.
+    """
+    _logger.info(f"Cleaning .git out of the repository in {repository_target_dir}...")
+    file_util.removeFilesOfTypes(repository_target_dir, [pattern for pattern in file_util.readListFromFile(patterns_file) if _isGitPattern(pattern)])
+    _logger.info(f"...cleaned .git out of the repository in {repository_target_dir}")
+
+
+def _isGitPattern(pattern:str) -> bool :
+    """
+    Tests whether a clean pattern matches .git (the directory holding the repository, or the file pointing a submodule at it).
+    """
+    return file_util.matchesPatterns(".git", [pattern])
+
+
+def _uncleanedPaths(paths:list[str], patterns_file:str) -> list[str] :
+    """
+    Filters a list of paths down to those that cleaning with the given patterns would leave in place.
+
+    Args:
+        paths (list[str]): The paths, relative to the repository.
+        patterns_file (str): The file containing the patterns of files to remove.
+
+    Returns:
+        list[str]: The paths the patterns do not match.
+    """
+    patterns:list[str] = file_util.readListFromFile(patterns_file)
+    kept:list[str] = [path for path in paths if not file_util.matchesPatterns(path, patterns)]
+    _logger.info(f"{len(paths) - len(kept)} of {len(paths)} tracked paths are left out by the clean patterns")
+    return kept
+
+
+def _zipRepository(repository_target_dir:str, release_target_dir:str, release_target_name:str, split_size:Optional[int] = None, on_part_completed:Optional[Callable[[str], None]] = None, digests:Optional[dict[str, str]] = None, manifest:Optional[manifest_util.ManifestIndex] = None, source_date_epoch:Optional[int] = None, follow_symlinks:bool = False, dedup:bool = False, cache:Optional[cache_util.CompressionCache] = None, blob_shas:Optional[dict[str, str]] = None, paths:Optional[list[str]] = None, exclude:Optional[list[str]] = None) -> str :
     """
     Zips the repository to the given directory and name.
 
@@ -355,15 +976,199 @@ def _zipRepository(repository_target_dir:str, release_target_dir:str, release_ta
         repository_target_dir (str): The directory to zip.
         release_target_dir (str): The directory to place the zip file in.
         release_target_name (str): The name of the zip file.
+        split_size (Optional[int], optional): If set, the repository is zipped into parts holding at most this many bytes. Defaults to None.
+        on_part_completed (Optional[Callable[[str], None]], optional): Called with the path of each part as soon as it is built. Defaults to None.
+        digests (Optional[dict[str, str]], optional): If given, the SHA-256 digest of every file zipped is added to it. Defaults to None.
+        manifest (Optional[manifest_util.ManifestIndex], optional): If given, files it records as unchanged are not hashed again, and it is updated. Defaults to None.
+        source_date_epoch (Optional[int], optional): If set, the repository is zipped reproducibly, with every entry stamped with this time. Defaults to None.
+        follow_symlinks (bool, optional): If True, what symbolic links point at is zipped rather than the links themselves. Defaults to False.
+        dedup (bool, optional): If True, files duplicating another file's content are stored as symbolic links to it. Defaults to False.
+        cache (Optional[cache_util.CompressionCache], optional): If given, files it holds compressed are not compressed again, and what is compressed is added to it. Defaults to None.
+        blob_shas (Optional[dict[str, str]], optional): The git blob SHAs of the files, to identify them to the cache and the manifest index by. Defaults to None.
+        paths (Optional[list[str]], optional): If set, only these paths (relative to the repository) are zipped. Defaults to None.
+        exclude (Optional[list[str]], optional): If set, these paths (relative to the repository), and everything under them, are left out. Defaults to None.
 
     Returns:
-        str: The path to the zip file.
+        str: The path to the zip file (or, for a split release, the path to the index of the parts).
     """
     _logger.info(f"Zipping repository in {repository_target_dir} to {release_target_dir}/{release_target_name}...")
-    return zip_util.zip(repository_target_dir, release_target_dir, release_target_name)
+    if split_size :
+        return zip_util.zipParts(repository_target_dir, release_target_dir, release_target_name, split_size, onPartCompleted=on_part_completed, digests=digests, manifest=manifest, reproducible=source_date_epoch is not None, timestamp=source_date_epoch, followSymlinks=follow_symlinks, dedup=dedup, readAheadMemory=constants.READ_AHEAD_MEMORY, cache=cache, blobShas=blob_shas, paths=paths, exclude=exclude).index_path
+    return zip_util.zip(repository_target_dir, release_target_dir, release_target_name, digests=digests, manifest=manifest, reproducible=source_date_epoch is not None, timestamp=source_date_epoch, followSymlinks=follow_symlinks, dedup=dedup, readAheadMemory=constants.READ_AHEAD_MEMORY, cache=cache, blobShas=blob_shas, paths=paths, exclude=exclude)
+
+
+def _checksumsPath(release_target_dir:str, release_target_name:str) -> str :
+    """
+    Gets the path of the SHA256SUMS manifest for the given release (it is uploaded to GitHub simply as SHA256SUMS).
+
+    Args:
+        release_target_dir (str): The directory the release is placed in.
+        release_target_name (str): The name of the release file.
+
+    Returns:
+        str: The path to the manifest.
+    """
+    return file_util.buildPath(release_target_dir, f"{_releaseStem(release_target_name)}.SHA256SUMS")
+
+
+def _writeChecksums(release_target_dir:str, release_target_name:str, release_path:str, split:bool, digests:dict[str, str]) -> str :
+    """
+    Writes the SHA256SUMS manifest for the release: the digests of the archive(s), by file name, followed by the digests of
+    every file in the archive, by path within it (so individual files can be verified without unpacking the whole archive).
+
+    Args:
+        release_target_dir (str): The directory the release is placed in.
+        release_target_name (str): The name of the release file.
+        release_path (str): The path to the zip file (or, for a split release, the path to the index of the parts).
+        split (bool): If True, the release was split into parts, listed in the index at release_path.
+        digests (dict[str, str]): The digests of the files in the archive, by path within it.
+
+    Returns:
+        str: The path to the manifest.
+    """
+    artifact_paths:list[str] = [release_path]
+    if split :
+        with open(release_path, encoding="utf-8") as index_file :
+            artifact_paths = [file_util.buildPath(release_target_dir, part) for part in json.load(index_file)["parts"]] + [release_path]
+
+    sums_path:str = _checksumsPath(release_target_dir, release_target_name)
+    _logger.info(f"Writing checksums of {len(artifact_paths)} archive(s) and {len(digests)} files to {sums_path}")
+    hash_util.writeSumsFile(sums_path, {file_util.returnLastPartOfPath(path) : hash_util.hashFile(path) for path in artifact_paths})
+    hash_util.writeSumsFile(sums_path, digests, append=True)
+    return sums_path
 
 
-def _createTag(repository:git_util.GitRepository, tag_name:str, tag_description:str) :
+def _addChecksums(release_target_dir:str, release_target_name:str, artifact_paths:list[str]) :
+    """
+    Adds the digests of further artifacts (such as the delta release) to the release's SHA256SUMS manifest.
+
+    Args:
+        release_target_dir (str): The directory the release is placed in.
+        release_target_name (str): The name of the release file.
+        artifact_paths (list[str]): The paths of the artifacts to add.
+    """
+    hash_util.writeSumsFile(_checksumsPath(release_target_dir, release_target_name), {file_util.returnLastPartOfPath(path) : hash_util.hashFile(path) for path in artifact_paths}, append=True)
+
+
+def _releaseStem(release_target_name:str) -> str :
+    """
+    Gets the name of the release without its .zip extension, used to name the files produced alongside it.
+
+    Args:
+        release_target_name (str): The name of the release file.
+
+    Returns:
+        str: The name without the extension.
+    """
+    return release_target_name[:-len(".zip")] if release_target_name.endswith(".zip") else release_target_name
+
+
+def _retentionPolicy(keep_last:Optional[int], max_age_days:Optional[int], max_total_size:Optional[int]) -> retention_util.RetentionPolicy :
+    """
+    Builds a retention policy from its settings.
+
+    Args:
+        keep_last (Optional[int]): Keep only the newest N releases of each kind.
+        max_age_days (Optional[int]): Remove releases older than this many days.
+        max_total_size (Optional[int]): Remove the oldest releases until the rest take up no more than this many bytes.
+
+    Returns:
+        retention_util.RetentionPolicy: The policy.
+    """
+    return retention_util.RetentionPolicy(keep_last=keep_last, max_age=timedelta(days=max_age_days) if max_age_days is not None else None, max_total_bytes=max_total_size)
+
+
+def _applyRetention(release_target_dir:str, release_target_name:str) :
+    """
+    Prunes old releases from the release directory after a build, if a retention policy is configured (RELEASER_RETAIN_*).
+    The files of the release just built are never removed.
+
+    Args:
+        release_target_dir (str): The directory holding the releases.
+        release_target_name (str): The name of the release just built.
+    """
+    policy:retention_util.RetentionPolicy = _retentionPolicy(constants.RETAIN_LAST, constants.RETAIN_DAYS, constants.RETAIN_SIZE)
+    if policy.isSet() :
+        _logger.info(f"Applying retention policy to {release_target_dir}...")
+        with _releaseDirectoryLock(release_target_dir) :
+            retention_util.prune(release_target_dir, policy, protect=[f"{glob.escape(_releaseStem(release_target_name))}*"])
+
+
+def _determineChanges(repository:'git_util.GitRepository', tag_name:str) -> 'git_util.ChangeSet' :
+    """
+    Determines the paths changed in the repository since the given tag.
+
+    Args:
+        repository (git_util.GitRepository): The cloned repository.
+        tag_name (str): The tag to compare against.
+
+    Returns:
+        git_util.ChangeSet: The changed paths.
+    """
+    _logger.info(f"Determining changes since {tag_name} in {repository.getRepository().working_dir}...")
+    changes:git_util.ChangeSet = repository.changesSince(tag_name)
+    _logger.info(f"...{len(changes.added)} added, {len(changes.modified)} modified and {len(changes.deleted)} deleted since {tag_name}")
+    return changes
+
+
+def _sourceDateEpoch(repository:'git_util.GitRepository') -> int :
+    """
+    Gets the time to stamp the entries of a reproducible build with: SOURCE_DATE_EPOCH if it is set, otherwise the commit time.
+
+    Args:
+        repository (git_util.GitRepository): The repository being built.
+
+    Returns:
+        int: The time, in seconds since the epoch.
+    """
+    if constants.SOURCE_DATE_EPOCH is not None :
+        return constants.SOURCE_DATE_EPOCH
+    return repository.commitTime()
+
+
+def _buildDelta(changes:'git_util.ChangeSet', delta_from:str, repository_target_dir:str, patterns_file:str, release_target_dir:str, release_target_name:str, source_date_epoch:Optional[int] = None, verify:bool = True, in_place:bool = False) -> tuple[str, str] :
+    """
+    Builds the delta release (the added and modified files that survived cleaning) and the manifest of deleted paths,
+    next to the full release. The repository must already have been cleaned (or be an existing checkout, built from in place).
+
+    Args:
+        changes (git_util.ChangeSet): The changes since the delta tag.
+        delta_from (str): The tag the changes are relative to.
+        repository_target_dir (str): The (cleaned) repository directory, or the existing checkout.
+        patterns_file (str): Path to the file containing the clean patterns (deleted paths that would be cleaned are not listed).
+        release_target_dir (str): The directory to place the delta release in.
+        release_target_name (str): The name of the full release file.
+        source_date_epoch (Optional[int], optional): If set, the delta archive is built reproducibly, with every entry stamped with this time. Defaults to None.
+        verify (bool, optional): If True, the CRC of every member of the delta archive is checked once it is built. Defaults to True.
+        in_place (bool, optional): If True, the repository is an existing checkout built from in place, which still has what is cleaned. Defaults to False.
+
+    Returns:
+        tuple[str, str]: The paths to the delta zip file and the deleted paths manifest.
+    """
+    delta_name:str = f"{_releaseStem(release_target_name)}.delta-{delta_from.replace('/', '-')}"
+    _logger.info(f"Building delta release {delta_name} in {release_target_dir}...")
+
+    # The delta archive - leaving out what is cleaned. A cleaned clone no longer has it (zipFiles skips what doesn't exist),
+    # but for the .git patterns, which may not have been applied yet; a checkout built from in place still has all of it
+    patterns:list[str] = file_util.readListFromFile(patterns_file)
+    uncleaned:list[str] = patterns if in_place else [pattern for pattern in patterns if _isGitPattern(pattern)]
+    changed:list[str] = [path for path in changes.changed() if not file_util.matchesPatterns(path, uncleaned)]
+    delta_path:str = zip_util.zipFiles(repository_target_dir, release_target_dir, f"{delta_name}.zip", changed, reproducible=source_date_epoch is not None, timestamp=source_date_epoch)
+    if verify :
+        zip_util.verify(delta_path)
+
+    # The paths the deployer should delete - ignoring anything that was never released because it is cleaned
+    deleted:list[str] = sorted(path for path in set(changes.deleted) - set(changes.changed()) if not file_util.matchesPatterns(path, patterns))
+    deleted_path:str = file_util.buildPath(release_target_dir, f"{delta_name}.deleted.txt")
+    with file_util.atomicPath(deleted_path) as temporary_path, open(temporary_path, "w", encoding="utf-8") as deleted_file :
+        deleted_file.write(f"# Paths deleted since {delta_from}, relative to the root of {release_target_name}\n")
+        deleted_file.writelines(f"{path}\n" for path in deleted)
+
+    _logger.info(f"...built delta release {delta_path} and deleted paths manifest {deleted_path}")
+    return delta_path, deleted_path
+
+
+def _createTag(repository:'git_util.GitRepository', tag_name:str, tag_description:str, sha:Optional[str] = None, github:Optional['github_util.GitHubRepository'] = None) :
     """
     Creates a tag in the repository.
 
@@ -371,7 +1176,17 @@ def _createTag(repository:git_util.GitRepository, tag_name:str, tag_description:
         repository (git_util.GitRepository): The repository to create the tag in.
         tag_name (str): The name of the tag to create.
         tag_description (str): The description of the tag to create.
+        sha (Optional[str], optional): If set, the tag is created of this commit on GitHub, through its API, rather than in the clone and pushed. Defaults to None.
+        github (Optional[github_util.GitHubRepository], optional): The repository on GitHub, to create the tag through the API in. Defaults to the clone's origin.
     """
+    if sha :
+        if github is None :
+            from releaser.utilities import github_util
+            github = github_util.GitHubRepository(repository.getRepository())
+        _logger.info(f"Creating tag {tag_name} of {sha} in {github.getRepositoryName()} through the GitHub API...")
+        github.createTag(tagName=tag_name, tagDescription=tag_description, sha=sha)
+        _logger.info(f"...created tag {tag_name} in {github.getRepositoryName()}")
+        return
     _logger.info(f"Creating tag {tag_name} in {repository.getRepository().working_dir}...")
     repository.createTag(tag_name=tag_name, tag_description=tag_description)
     _logger.info(f"...created tag {tag_name} in {repository.getRepository().working_dir}")
@@ -381,6 +1196,9 @@ def main() :
     try :
         _init()
         _commandRunner()
+    except (errors_util.ValidationError, preflight_util.PreflightError) :
+        # Already logged where it was found - bad input or a failed pre-flight check, not a failure worth a traceback
+        sys.exit(1)
     except Exception :
         _logger.error(f"Command caught an exception (may not be harmful): {traceback.format_exc()}")
         raise
@@ -0,0 +1,194 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+from .errors_util import UtilityError
+
+_logger:logging.Logger = logging.getLogger(__name__)
+
+# When the cache grows past its limit, the least recently used payloads are evicted until it is down to this fraction of it
+_EVICT_TO:float = 0.9
+
+
+@dataclass
+class CachedPayload() :
+    """
+    A compressed payload, as it appears in a zip file.
+
+    Args:
+        crc (int): The CRC-32 of the uncompressed data.
+        file_size (int): The size of the uncompressed data.
+        payload (bytes): The compressed data.
+    """
+    crc:int
+    file_size:int
+    payload:bytes
+
+
+class CompressionCache() :
+    """
+    An on-disk cache of compressed file contents, keyed by the content (a git blob SHA or a content digest), the compression
+    method and the level, so that content that was compressed by an earlier build doesn't have to be compressed again.
+    Payloads are kept as files under the cache directory, indexed by an SQLite database, and the least recently used are
+    evicted once they take up more than the size limit. The cache can be shared by builds running at the same time, and
+    used from several threads.
+
+    Use as a context manager, or call close() when done.
+
+    Args:
+        dir (str): The cache directory; it is created if it does not exist.
+        maxBytes (int): The most the cached payloads may take up.
+
+    Raises:
+        CacheError: If the cache cannot be opened.
+    """
+
+    def __init__(self, dir:str, maxBytes:int) :
+        self._dir:str = dir
+        self._max_bytes:int = maxBytes
+        self._lock:threading.Lock = threading.Lock()
+        self._touched:dict[str, float] = {}
+        self._added:int = 0
+        self.hits:int = 0
+        self.misses:int = 0
+        try :
+            os.makedirs(dir, exist_ok=True)
+            self._connection:sqlite3.Connection = sqlite3.connect(os.path.join(dir, "index.sqlite"), timeout=30, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("CREATE TABLE IF NOT EXISTS payloads (key TEXT PRIMARY KEY, crc INTEGER NOT NULL, file_size INTEGER NOT NULL, compress_size INTEGER NOT NULL, last_used REAL NOT NULL) WITHOUT ROWID")
+            self._connection.commit()
+        except (OSError, sqlite3.Error) as e :
+            raise CacheError(f"Failed to open the compression cache in {dir}: {e}") from e
+
+
+    def __enter__(self) -> 'CompressionCache' :
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback) :
+        self.close()
+
+
+    def get(self, contentKey:str, method:int, level:int) -> Optional[CachedPayload] :
+        """
+        Look up a payload.
+
+        Args:
+            contentKey (str): What identifies the content (e.g. 'git:<blob sha>' or 'sha256:<digest>').
+            method (int): The compression method (e.g. zipfile.ZIP_DEFLATED).
+            level (int): The compression level.
+
+        Returns:
+            Optional[CachedPayload]: The payload, or None if it isn't cached.
+        """
+        key:str = _key(contentKey, method, level)
+        with self._lock :
+            row:Optional[tuple] = self._connection.execute("SELECT crc, file_size FROM payloads WHERE key = ?", (key,)).fetchone()
+        if row is None :
+            self.misses += 1
+            return None
+        try :
+            with open(self._payloadPath(key), "rb") as payload_file :
+                payload:bytes = payload_file.read()
+        except OSError :
+            # Evicted by another build since it was looked up
+            self.misses += 1
+            return None
+
+        with self._lock :
+            self._touched[key] = time.time()
+        self.hits += 1
+        return CachedPayload(crc=row[0], file_size=row[1], payload=payload)
+
+
+    def put(self, contentKey:str, method:int, level:int, entry:CachedPayload) :
+        """
+        Add a payload, evicting the least recently used payloads if the cache grows past its limit.
+
+        Args:
+            contentKey (str): What identifies the content.
+            method (int): The compression method.
+            level (int): The compression level.
+            entry (CachedPayload): The payload.
+        """
+        key:str = _key(contentKey, method, level)
+        path:str = self._payloadPath(key)
+        try :
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temporary_path:str = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temporary_path, "wb") as payload_file :
+                payload_file.write(entry.payload)
+            os.replace(temporary_path, path)
+            with self._lock, self._connection :
+                self._connection.execute("INSERT OR REPLACE INTO payloads (key, crc, file_size, compress_size, last_used) VALUES (?, ?, ?, ?, ?)", (key, entry.crc, entry.file_size, len(entry.payload), time.time()))
+                self._added += len(entry.payload)
+        except (OSError, sqlite3.Error) as e :
+            # The cache is only an optimisation - failing to add to it mustn't fail the build
+            _logger.warning(f"Failed to add to the compression cache in {self._dir}: {e}")
+            return
+
+        if self._added > self._max_bytes * (1 - _EVICT_TO) :
+            self.evict()
+
+
+    def evict(self) -> int :
+        """
+        Evict the least recently used payloads until the cache is back within its limit.
+
+        Returns:
+            int: The number of bytes evicted.
+        """
+        with self._lock, self._connection :
+            self._flushTouched()
+            self._added = 0
+            total:int = self._connection.execute("SELECT COALESCE(SUM(compress_size), 0) FROM payloads").fetchone()[0]
+            if total <= self._max_bytes :
+                return 0
+            evicted:int = 0
+            for key, size in self._connection.execute("SELECT key, compress_size FROM payloads ORDER BY last_used").fetchall() :
+                if total - evicted <= self._max_bytes * _EVICT_TO :
+                    break
+                self._connection.execute("DELETE FROM payloads WHERE key = ?", (key,))
+                try :
+                    os.remove(self._payloadPath(key))
+                except FileNotFoundError :
+                    pass
+                evicted += size
+        _logger.debug(f"Evicted {evicted} bytes from the compression cache in {self._dir}")
+        return evicted
+
+
+    def close(self) :
+        """
+        Record which payloads were used, and close the cache.
+        """
+        with self._lock :
+            try :
+                with self._connection :
+                    self._flushTouched()
+            except sqlite3.Error as e :
+                _logger.warning(f"Failed to update the compression cache in {self._dir}: {e}")
+            self._connection.close()
+        _logger.debug(f"Compression cache in {self._dir}: {self.hits} hits, {self.misses} misses")
+
+
+    # Records the last use of the payloads used since the last flush (in one go, rather than a write per hit)
+    def _flushTouched(self) :
+        self._connection.executemany("UPDATE payloads SET last_used = ? WHERE key = ?", ((used, key) for key, used in self._touched.items()))
+        self._touched.clear()
+
+
+    def _payloadPath(self, key:str) -> str :
+        return os.path.join(self._dir, key[:2], key)
+
+
+def _key(contentKey:str, method:int, level:int) -> str :
+    return hashlib.sha256(f"{contentKey}\0{method}\0{level}".encode("utf-8")).hexdigest()
+
+
+class CacheError(UtilityError) :
+    """Raised by the cache utility functions to indicate some issue."""
@@ -0,0 +1,261 @@
+import contextvars
+import json
+import logging
+import os
+import socket
+import socketserver
+import stat
+import tempfile
+import threading
+import traceback
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+from .errors_util import UtilityError
+
+_logger:logging.Logger = logging.getLogger(__name__)
+
+# A job handler: given the job and a function to send progress events with, it runs the job and returns its result
+JobHandler = Callable[[dict, Callable[[dict], None]], dict]
+
+# The job being run, set in the job's context so that it holds on the job's thread and on whatever runs in a copy of its
+# context (such as the tasks of a task_util.TaskGraph): what is logged there goes to the job's client
+_current_job:contextvars.ContextVar[Optional[int]] = contextvars.ContextVar("releaser_job", default=None)
+
+
+class JobServer() :
+    """
+    Serves jobs over a Unix domain socket, running them on a pool of worker threads in this (long-running) process, so
+    that they share its imported modules and whatever state the handler keeps warm between jobs.
+
+    The protocol is JSON lines: the client sends one job (a JSON object) on a line and the server replies with events,
+    one per line, until the job is done: {"event": "accepted", "job": <id>}, then any number of
+    {"event": "log", "level": ..., "message": ...} with what the job logs (at INFO or above), and finally
+    {"event": "result", "job": <id>, "result": {...}} or {"event": "error", "job": <id>, "message": ...}. A job of
+    {"command": "ping"} is answered at once with a result.
+
+    Use as a context manager, or call close() when done.
+
+    Args:
+        socketPath (str): Where to create the socket. A stale socket left there (nothing listening on it) is replaced.
+        handler (JobHandler): Runs each job.
+        workers (int, optional): The number of jobs run at once. Defaults to 2.
+
+    Raises:
+        DaemonError: If the socket cannot be created (for example another server is listening on it).
+    """
+
+    def __init__(self, socketPath:str, handler:JobHandler, workers:int = 2) :
+        self._socket_path:str = socketPath
+        self._handler:JobHandler = handler
+        self._executor:ThreadPoolExecutor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="releaser-job")
+        self._lock:threading.Lock = threading.Lock()
+        self._next_job:int = 1
+        self.workers:int = max(1, workers)
+
+        _removeStaleSocket(socketPath)
+        os.makedirs(os.path.dirname(os.path.abspath(socketPath)), exist_ok=True)
+        server:JobServer = self
+
+        class Handler(_ConnectionHandler) :
+            owner = server
+        # Only this user may submit jobs: the socket is bound in a directory only this user can enter, made private to
+        # them, and only then linked into place - so there is never a moment another user could connect to it (which
+        # changing the umask, for the whole process, or its mode after binding, would leave)
+        private_dir:str = tempfile.mkdtemp(prefix=".rs-", dir=os.path.dirname(os.path.abspath(socketPath)))
+        bound_path:str = os.path.join(private_dir, "s")
+        try :
+            self._server:socketserver.ThreadingUnixStreamServer = socketserver.ThreadingUnixStreamServer(bound_path, Handler)
+            try :
+                os.chmod(bound_path, stat.S_IRUSR | stat.S_IWUSR)
+                # Unlike a rename, a link never replaces a socket another server created meanwhile
+                os.link(bound_path, socketPath)
+            except OSError :
+                self._server.server_close()
+                raise
+        except OSError as e :
+            raise DaemonError(f"Cannot listen on {socketPath}: {e}") from e
+        finally :
+            try :
+                os.unlink(bound_path)
+            except FileNotFoundError :
+                pass
+            os.rmdir(private_dir)
+        self._server.daemon_threads = True
+        _logger.info(f"Serving jobs on {socketPath} with {self.workers} workers")
+
+
+    def __enter__(self) -> 'JobServer' :
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback) :
+        self.close()
+
+
+    def serveForever(self) :
+        """
+        Serve jobs until shutdown() is called (from another thread) or the process is interrupted.
+        """
+        self._server.serve_forever()
+
+
+    def shutdown(self) :
+        """
+        Stop serving: serveForever returns once the jobs being run have finished.
+        """
+        self._server.shutdown()
+
+
+    def close(self) :
+        """
+        Wait for the jobs being run, and remove the socket.
+        """
+        self._executor.shutdown(wait=True)
+        self._server.server_close()
+        try :
+            os.unlink(self._socket_path)
+        except FileNotFoundError :
+            pass
+
+
+    def _run(self, job:dict, send:Callable[[dict], None]) :
+        with self._lock :
+            job_id:int = self._next_job
+            self._next_job += 1
+        send({"event": "accepted", "job": job_id})
+
+        if job.get("command") == "ping" :
+            send({"event": "result", "job": job_id, "result": {"status": "ok", "workers": self.workers, "pid": os.getpid()}})
+            return
+
+        future:Future = self._executor.submit(self._runJob, job_id, job, send)
+        try :
+            send({"event": "result", "job": job_id, "result": future.result()})
+        except BaseException as e :
+            send({"event": "error", "job": job_id, "message": _describe(e)})
+
+
+    def _runJob(self, job_id:int, job:dict, send:Callable[[dict], None]) -> dict :
+        _logger.info(f"Running job {job_id}: {job.get('command')}")
+        handler:_JobLogHandler = _JobLogHandler(job_id, send)
+        logging.getLogger().addHandler(handler)
+        token:contextvars.Token = _current_job.set(job_id)
+        try :
+            return self._handler(job, send)
+        except BaseException as e :
+            # SystemExit included, so that a job can't stop the server
+            _logger.error(f"Job {job_id} failed: {traceback.format_exc()}")
+            raise DaemonError(_describe(e)) from e
+        finally :
+            _current_job.reset(token)
+            logging.getLogger().removeHandler(handler)
+            _logger.info(f"Job {job_id} done")
+
+
+def submit(socketPath:str, job:dict, onEvent:Optional[Callable[[dict], None]] = None, timeout:Optional[float] = None) -> dict :
+    """
+    Submit a job to a JobServer and wait for its result, passing on the events it sends meanwhile.
+
+    Args:
+        socketPath (str): The server's socket.
+        job (dict): The job.
+        onEvent (Optional[Callable[[dict], None]], optional): Called with each event (log lines included) as it arrives. Defaults to None.
+        timeout (Optional[float], optional): The most seconds to wait for the server to send anything. Defaults to waiting for ever.
+
+    Returns:
+        dict: The job's result.
+
+    Raises:
+        DaemonError: If the server cannot be reached, the connection is lost, or the job failed.
+    """
+    try :
+        connection:socket.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        connection.settimeout(timeout)
+        connection.connect(socketPath)
+    except OSError as e :
+        raise DaemonError(f"Cannot connect to the server on {socketPath}: {e}") from e
+
+    with connection, connection.makefile("rwb") as stream :
+        try :
+            stream.write(json.dumps(job).encode("utf-8") + b"\n")
+            stream.flush()
+            for line in stream :
+                event:dict = json.loads(line)
+                if onEvent :
+                    onEvent(event)
+                if event.get("event") == "result" :
+                    return event["result"]
+                if event.get("event") == "error" :
+                    raise DaemonError(f"Job {event.get('job')} failed: {event.get('message')}")
+        except (OSError, ValueError) as e :
+            raise DaemonError(f"Lost the connection to the server on {socketPath}: {e}") from e
+    raise DaemonError(f"The server on {socketPath} closed the connection before the job finished")
+
+
+class _ConnectionHandler(socketserver.StreamRequestHandler) :
+    owner:JobServer
+
+
+    def handle(self) :
+        lock:threading.Lock = threading.Lock()
+
+        def send(event:dict) :
+            with lock :
+                try :
+                    self.wfile.write(json.dumps(event, default=str).encode("utf-8") + b"\n")
+                    self.wfile.flush()
+                except OSError :
+                    # The client went away - the job runs to the end regardless
+                    pass
+
+        line:bytes = self.rfile.readline()
+        try :
+            job:Any = json.loads(line)
+            if not isinstance(job, dict) :
+                raise ValueError("a job must be a JSON object")
+        except ValueError as e :
+            send({"event": "error", "job": None, "message": f"Invalid job: {e}"})
+            return
+        self.owner._run(job, send)
+
+
+class _JobLogHandler(logging.Handler) :
+    """Sends what is logged while running a job (on its thread, or in its tasks) to the job's client."""
+
+    def __init__(self, job:int, send:Callable[[dict], None]) :
+        super().__init__(logging.INFO)
+        self._job:int = job
+        self._send:Callable[[dict], None] = send
+
+
+    def emit(self, record:logging.LogRecord) :
+        # Handlers are called on the thread that logs, in its context
+        if _current_job.get() == self._job :
+            self._send({"event": "log", "level": record.levelname, "logger": record.name, "message": record.getMessage()})
+
+
+def _describe(e:BaseException) -> str :
+    if isinstance(e, SystemExit) :
+        return f"the job exited with status {e.code}"
+    return str(e) or type(e).__name__
+
+
+def _removeStaleSocket(socketPath:str) :
+    if not os.path.exists(socketPath) :
+        return
+    if not stat.S_ISSOCK(os.stat(socketPath).st_mode) :
+        raise DaemonError(f"Cannot listen on {socketPath}: it exists and is not a socket")
+    probe:socket.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try :
+        probe.connect(socketPath)
+    except OSError :
+        # Nothing is listening: it was left by a server that didn't shut down cleanly
+        os.unlink(socketPath)
+        return
+    finally :
+        probe.close()
+    raise DaemonError(f"Cannot listen on {socketPath}: another server is listening on it")
+
+
+class DaemonError(UtilityError) :
+    """Raised by the daemon utility functions to indicate some issue."""
@@ -7,3 +7,7 @@ class ProjectError(Exception):
     
 class UtilityError(ProjectError) :
     """Raised by utility functions.""" 
+
+
+class ValidationError(ProjectError) :
+    """Raised when a required value is missing or invalid (the command line exits with 1 on it)."""
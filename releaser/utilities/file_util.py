@@ -2,12 +2,43 @@ import logging
 import shutil
 import os
 import glob
+import fnmatch
+import stat
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Iterator, Optional
 from . import helpers, time_util, errors_util
 
+try :
+    import fcntl, grp, pwd
+except ImportError : # not available on Windows
+    fcntl = grp = pwd = None
+
 _logger:logging.Logger = logging.getLogger(__name__)
 
+# Marks the name of a path moved to the trash (see moveToTrash)
+TRASH_MARKER:str = ".trash-"
+
+# Marks the name of a file still being written (see atomicPath)
+PARTIAL_MARKER:str = ".partial-"
+
+# The Linux ioctl that clones (reflinks) one file into another
+_FICLONE:int = 0x40049409
+
+# How many levels of a tree are split into separately walked sub-trees when walking in parallel
+_PARALLEL_WALK_DEPTH:int = 2
+
+# The most copy_file_range is asked to copy in one go
+_COPY_FILE_RANGE_CHUNK:int = 1024 * 1024 * 1024
+
+# The trash entries being reaped by this process, so that reapTrash leaves them to the thread already reaping them
+_reaping:set[str] = set()
+_reaping_lock:threading.Lock = threading.Lock()
+
 def mkdir(dir:str, parents:bool = True, exist_ok:bool = True, mode:int = 511, user:Optional[str] = None, group:Optional[str] = None) :
     """
     Create a directory (and parent structure if required) if it doesn't already exist.
@@ -70,7 +101,7 @@ def isFile(path:str) -> bool :
 
 def ensurePathExists(path:str) -> bool :
     """
-    Ensure the target path exists. Exits if the path doesn't exist.
+    Ensure the target path exists.
 
     Args:
         path (str): The path to check.
@@ -78,12 +109,12 @@ def ensurePathExists(path:str) -> bool :
     Returns:
         bool: True if the path exists.
 
-    Side Effects:
-        Exits the program if the path does not exist.
+    Raises:
+        errors_util.ValidationError: If the path does not exist.
     """
     if helpers.isEmpty(path) or not exists(path) :
-        _logger.error(f"{path} does not exist. Exiting.")
-        exit(1)
+        _logger.error(f"{path} does not exist.")
+        raise errors_util.ValidationError(f"{path} does not exist.")
     return True
 
 
@@ -146,14 +177,15 @@ def getUserDirectory() -> str :
     return str(Path.home().absolute().resolve())
 
 
-def copy(source:str, dest:str, sourceDirectoryContentsOnly:Optional[bool]=False) -> bool :
+def copy(source:str, dest:str, sourceDirectoryContentsOnly:Optional[bool]=False, allowHardlinks:bool = False) -> bool :
     """
-    Copy files or directories.
+    Copy files or directories (see copyTree for how the data is copied).
 
     Args:
         source (str): The source file or directory.
         dest (str): The destination path.
         sourceDirectoryContentsOnly (bool, optional): If True, only copy the contents of a source directory (has no effect if source is a file). Defaults to False.
+        allowHardlinks (bool, optional): If True, files may be hard linked rather than copied. Defaults to False.
 
     Returns:
         bool: The path to the newly copied file / destination directory. Empty String indicates an error.
@@ -162,13 +194,17 @@ def copy(source:str, dest:str, sourceDirectoryContentsOnly:Optional[bool]=False)
         if Path(source).exists() :
             if Path(source).is_dir() :
                 if sourceDirectoryContentsOnly :
-                    return copyContents(source, dest)
+                    return copyContents(source, dest, allowHardlinks=allowHardlinks)
                 else :
                     _logger.debug("Copying directory from " + source + " -> " + dest)
-                    return helpers.hasValue(shutil.copytree(source, dest, dirs_exist_ok=True))
+                    copied:CopyReport = copyTree(source, dest, allowHardlinks=allowHardlinks)
+                    _logger.debug(f"Copied {copied}")
+                    return True
             else :
                 _logger.debug("Copying " + source + " -> " + dest)
-                return helpers.hasValue(shutil.copy2(source, dest))
+                copied:CopyReport = copyFile(source, dest, allowHardlinks=allowHardlinks)
+                _logger.debug(f"Copied {copied}")
+                return True
         else :
             _logger.error(f"Can't copy - {source} does not exist")
             return False
@@ -177,23 +213,28 @@ def copy(source:str, dest:str, sourceDirectoryContentsOnly:Optional[bool]=False)
         return False
 
 
-def copyContents(dir:str, dest:str) -> bool:
+def copyContents(dir:str, dest:str, allowHardlinks:bool = False) -> bool:
     """
-    Copy the contents of a directory to a destination.
+    Copy the contents of a directory to a destination, so dir/name is copied to dest/name.
 
     Args:
         dir (str): The source directory.
         dest (str): The destination directory.
+        allowHardlinks (bool, optional): If True, files may be hard linked rather than copied. Defaults to False.
 
     Returns:
         bool: The destination directory, if successful.
     """
     if os.path.exists(dest) and os.path.isdir(dest) :
         if os.path.exists(dir) and os.path.isdir(dir) :
-            _logger.error("Copying contents of %s -> %s", dir, dest)
-            for name in os.listdir(dir):
-                copy(os.path.join(dir, name), dest, False) # copy files and complete directories
-            return True
+            _logger.debug("Copying contents of %s -> %s", dir, dest)
+            try :
+                copied:CopyReport = copyTree(dir, dest, allowHardlinks=allowHardlinks)
+                _logger.debug(f"Copied {copied}")
+                return True
+            except Exception :
+                _logger.error(f"Failed to copy contents of {dir} -> {dest}", exc_info=True)
+                return False
         else :
             _logger.error("Cannot copy contents of %s as it does not exist", dir)
             return False
@@ -202,6 +243,107 @@ def copyContents(dir:str, dest:str) -> bool:
         return False
 
 
+def copyTree(source:str, dest:str, allowHardlinks:bool = False, workers:Optional[int] = None) -> 'CopyReport' :
+    """
+    Copy a directory tree (with the semantics of shutil.copytree: symbolic links are followed and dest may already exist),
+    copying the files in parallel. Each file is copied with copyFile, so data is shared rather than copied where the filesystem allows.
+
+    Args:
+        source (str): The source directory.
+        dest (str): The destination directory.
+        allowHardlinks (bool, optional): If True, files may be hard linked rather than copied. Defaults to False.
+        workers (Optional[int], optional): The number of files to copy concurrently. Defaults to the number of CPUs.
+
+    Returns:
+        CopyReport: How much was copied and how much shared.
+    """
+    # Let copytree create the directory structure, collecting the files to copy rather than copying them one by one
+    files:list[tuple[str, str]] = []
+    shutil.copytree(source, dest, dirs_exist_ok=True, copy_function=lambda src, dst : files.append((src, dst)))
+
+    report:CopyReport = CopyReport()
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1, thread_name_prefix="copy") as executor :
+        for file_report in executor.map(lambda pair : copyFile(pair[0], pair[1], allowHardlinks=allowHardlinks), files) :
+            report.add(file_report)
+    return report
+
+
+def copyFile(source:str, dest:str, allowHardlinks:bool = False) -> 'CopyReport' :
+    """
+    Copy a file (with the semantics of shutil.copy2: dest may be a directory and metadata is copied), sharing the data
+    rather than copying it where possible. In order, the first of these that works is used:
+        1. A reflink (copy-on-write clone, FICLONE) - the data is shared until either copy is modified.
+        2. A hard link, if allowed - the two paths are then the same file.
+        3. os.copy_file_range - the data is copied in the kernel (some filesystems share it).
+        4. A plain copy.
+
+    Args:
+        source (str): The source file.
+        dest (str): The destination file or directory.
+        allowHardlinks (bool, optional): If True, the file may be hard linked rather than copied. Defaults to False.
+
+    Returns:
+        CopyReport: How much was copied and how much shared.
+    """
+    if os.path.isdir(dest) :
+        dest = os.path.join(dest, os.path.basename(source))
+    size:int = os.stat(source).st_size
+
+    # The destination may be a hard link to the source (e.g. from a previous copy) - don't truncate the source through it
+    if os.path.exists(dest) and os.path.samefile(source, dest) :
+        if allowHardlinks :
+            return CopyReport(files=1, bytes_shared=size)
+        os.unlink(dest)
+
+    if _reflink(source, dest) :
+        shutil.copystat(source, dest)
+        return CopyReport(files=1, bytes_shared=size)
+
+    if allowHardlinks and _hardlink(source, dest) :
+        return CopyReport(files=1, bytes_shared=size)
+
+    if not _copyFileRange(source, dest) :
+        shutil.copyfile(source, dest)
+    shutil.copystat(source, dest)
+    return CopyReport(files=1, bytes_copied=size)
+
+
+# Clones the file (FICLONE ioctl) - only supported on Linux, on filesystems with reflinks (btrfs, XFS, bcachefs, ...)
+def _reflink(source:str, dest:str) -> bool :
+    if fcntl is None :
+        return False
+    try :
+        with open(source, "rb") as source_file, open(dest, "wb") as dest_file :
+            fcntl.ioctl(dest_file.fileno(), _FICLONE, source_file.fileno())
+        return True
+    except OSError :
+        return False
+
+
+# Hard links the file, replacing anything already at the destination
+def _hardlink(source:str, dest:str) -> bool :
+    try :
+        if os.path.lexists(dest) :
+            os.unlink(dest)
+        os.link(source, dest)
+        return True
+    except OSError :
+        return False
+
+
+# Copies the file in the kernel with copy_file_range (where the platform has it)
+def _copyFileRange(source:str, dest:str) -> bool :
+    if not hasattr(os, "copy_file_range") :
+        return False
+    try :
+        with open(source, "rb") as source_file, open(dest, "wb") as dest_file :
+            while os.copy_file_range(source_file.fileno(), dest_file.fileno(), _COPY_FILE_RANGE_CHUNK) :
+                pass
+        return True
+    except OSError :
+        return False
+
+
 def chown(path:str, user:str, group:str) :
     """
     Change the ownership of a file or directory (but not the contents of the directory).
@@ -215,30 +357,40 @@ def chown(path:str, user:str, group:str) :
     shutil.chown(path, user, group)
 
 
-def chown_recursive(path:str, user:str, group:str) :
+def chown_recursive(path:str, user:str, group:str, workers:Optional[int] = None) -> int :
     """
     Change the ownership of a directory and its contents.
+    The tree is walked once, with every change made relative to an open directory file descriptor (so paths are never
+    resolved again), and entries that already have the right owner are skipped. Symbolic links are changed themselves, not followed.
 
     Args:
         path (str): A path, or Path-like object.
         user (str): The user group (name, or uid).
         group (str): The group (name or group id).
+        workers (Optional[int], optional): If more than 1, sub-trees are walked on a pool of this many threads (for very wide trees). Defaults to None.
+
+    Returns:
+        int: The number of entries whose ownership was changed.
     """
     _logger.debug("chown -R %s:%s %s...", user, group, path)
+    uid, gid = _resolveOwner(user, group)
 
     # Change ownership for the top-level folder
-    chown(path, user, group)
-
-    for root, dirs, files in os.walk(path):
-        # chown all sub-directories
-        for dir in dirs:
-            chown(os.path.join(root, dir), user, group)
-
-        # chown all files
-        for file in files:
-            chown(os.path.join(root, file), user, group)
+    changed:int = 0
+    top:os.stat_result = os.stat(path)
+    if not _ownedBy(top, uid, gid) :
+        os.chown(path, uid, gid)
+        changed += 1
+
+    def visit(dir_fd:int, entry:os.DirEntry) -> bool :
+        if _ownedBy(entry.stat(follow_symlinks=False), uid, gid) :
+            return False
+        os.chown(entry.name, uid, gid, dir_fd=dir_fd, follow_symlinks=False)
+        return True
 
-    _logger.debug("...chown %s completed", path)
+    changed += _walkTreeFds(str(path), visit, workers)
+    _logger.debug("...chown %s completed (%d changed)", path, changed)
+    return changed
 
 
 def chmod(path:str, permissions:int) :
@@ -253,49 +405,147 @@ def chmod(path:str, permissions:int) :
     os.chmod(path, permissions)
 
 
-def chmod_recursive(path:str, permissions:int) :
+def chmod_recursive(path:str, permissions:int, workers:Optional[int] = None) -> int :
     """
     Change the permissions of a directory and its contents.
+    The tree is walked once, with every change made relative to an open directory file descriptor (so paths are never
+    resolved again), and entries that already have the right permissions are skipped. Symbolic links are left alone
+    (their permissions are meaningless, and changing them would change whatever they point to). Directories are changed
+    after their contents, so permissions that leave the owner unable to list or enter them (such as 0o600) apply to the
+    whole tree.
 
     Args:
         path (str): A path, or Path-like object.
         permissions (int): An octal string (e.g. 0o750).
+        workers (Optional[int], optional): If more than 1, sub-trees are walked on a pool of this many threads (for very wide trees). Defaults to None.
+
+    Returns:
+        int: The number of entries whose permissions were changed.
     """
     _logger.debug("chmod -R %s %s...", permissions, path)
 
-    # Change permissions for the top-level folder
-    chmod(path, permissions)
-
-    for root, dirs, files in os.walk(path):
-        # chmod all sub-directories
-        for dir in dirs:
-            chmod(os.path.join(root, dir), permissions)
-
-        # chmod all files
-        for file in files:
-            chmod(os.path.join(root, file), permissions)
-
-    _logger.debug("...chmod %s completed", path)
+    def visit(dir_fd:int, entry:os.DirEntry) -> bool :
+        if entry.is_symlink() or stat.S_IMODE(entry.stat(follow_symlinks=False).st_mode) == permissions :
+            return False
+        os.chmod(entry.name, permissions, dir_fd=dir_fd)
+        return True
+
+    changed:int = _walkTreeFds(str(path), visit, workers)
+
+    # Change permissions for the top-level folder, last of all
+    if stat.S_IMODE(os.stat(path).st_mode) != permissions :
+        os.chmod(path, permissions)
+        changed += 1
+    _logger.debug("...chmod %s completed (%d changed)", path, changed)
+    return changed
+
+
+# Resolves a user and group (names or ids) to a uid and gid (-1 meaning leave unchanged), once per walk rather than per entry
+def _resolveOwner(user:Optional[str], group:Optional[str]) -> tuple[int, int] :
+    def resolve(value, lookup) -> int :
+        if value is None :
+            return -1
+        if isinstance(value, int) or str(value).isdigit() :
+            return int(value)
+        try :
+            return lookup(value)
+        except KeyError as e :
+            raise FileError(f"No such user or group: {value}") from e
+
+    return resolve(user, lambda name : pwd.getpwnam(name).pw_uid), resolve(group, lambda name : grp.getgrnam(name).gr_gid)
+
+
+# Tests whether the stat shows the given owner (-1 matching anything)
+def _ownedBy(stat_result:os.stat_result, uid:int, gid:int) -> bool :
+    return (uid == -1 or stat_result.st_uid == uid) and (gid == -1 or stat_result.st_gid == gid)
+
+
+# Walks the tree below path (not path itself), calling visit(dir_fd, entry) for every entry with the file descriptor of
+# the directory holding it, and for every directory only once its contents have been visited (so a visit that shuts the
+# walk out of a directory, such as chmod 0o600, comes too late to stop it). Directories are opened relative to their
+# parent's descriptor, never following symbolic links. With workers, the sub-trees found below the first few levels are
+# walked concurrently. Returns how many visits returned True.
+def _walkTreeFds(path:str, visit:Callable[[int, os.DirEntry], bool], workers:Optional[int] = None) -> int :
+    def walkDir(dir_fd:int, depth:int, subtrees:Optional[list[tuple[int, os.DirEntry]]] = None, fds:Optional[list[int]] = None, shallow:Optional[list[tuple[int, os.DirEntry]]] = None) -> int :
+        count:int = 0
+        subdirs:list[os.DirEntry] = []
+        with os.scandir(dir_fd) as entries :
+            for entry in entries :
+                if entry.is_dir(follow_symlinks=False) :
+                    subdirs.append(entry)
+                elif visit(dir_fd, entry) :
+                    count += 1
+
+        for entry in subdirs :
+            # Walking in parallel, the directories below the first few levels are left to the pool, and those above them
+            # (held open for it) are visited once it is done
+            if subtrees is not None and depth + 1 >= _PARALLEL_WALK_DEPTH :
+                subtrees.append((dir_fd, entry))
+                continue
+            child_fd:int = os.open(entry.name, os.O_RDONLY | os.O_DIRECTORY | os.O_NOFOLLOW, dir_fd=dir_fd)
+            if subtrees is not None :
+                fds.append(child_fd)
+                count += walkDir(child_fd, depth + 1, subtrees, fds, shallow)
+                shallow.append((dir_fd, entry))
+                continue
+            try :
+                count += walkDir(child_fd, depth + 1)
+            finally :
+                os.close(child_fd)
+            if visit(dir_fd, entry) :
+                count += 1
+        return count
+
+    def walkSubtree(parent_fd:int, entry:os.DirEntry) -> int :
+        child_fd:int = os.open(entry.name, os.O_RDONLY | os.O_DIRECTORY | os.O_NOFOLLOW, dir_fd=parent_fd)
+        try :
+            count:int = walkDir(child_fd, _PARALLEL_WALK_DEPTH)
+        finally :
+            os.close(child_fd)
+        return count + (1 if visit(parent_fd, entry) else 0)
+
+    top_fd:int = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+    if not workers or workers <= 1 :
+        try :
+            return walkDir(top_fd, 0)
+        finally :
+            os.close(top_fd)
+
+    fds:list[int] = [top_fd]
+    try :
+        subtrees:list[tuple[int, os.DirEntry]] = []
+        shallow:list[tuple[int, os.DirEntry]] = []
+        total:int = walkDir(top_fd, 0, subtrees, fds, shallow)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="walk") as executor :
+            total += sum(executor.map(lambda subtree : walkSubtree(*subtree), subtrees))
+        # Listed deepest first, as each directory was walked before it was added
+        total += sum(1 for dir_fd, entry in shallow if visit(dir_fd, entry))
+        return total
+    finally :
+        for fd in fds :
+            os.close(fd)
 
 
 def delete(path:str) :
     """
     Delete the given target path. If the path points to a symbolic link then it is unlinked.
+    Directories are removed with a single (file descriptor relative, where the platform supports it) shutil.rmtree walk.
 
     Args:
         path (str): The path to delete.
     """
-    toDelete:Path = Path(path)
-    if toDelete.exists() :
-        if toDelete.is_dir() and not toDelete.is_symlink() :
-            _logger.debug("rm -r %s", toDelete.absolute())
-            deleteContents(str(toDelete.absolute()))
-            toDelete.rmdir()
-        else :
-            _logger.debug("rm %s", toDelete.absolute())
-            toDelete.unlink()
+    try :
+        is_dir:bool = stat.S_ISDIR(os.lstat(path).st_mode)
+    except FileNotFoundError :
+        _logger.debug("Not deleting non-existent path %s", path)
+        return
+
+    if is_dir :
+        _logger.debug("rm -r %s", path)
+        shutil.rmtree(path)
     else :
-        _logger.debug("Not deleting non-existent path %s", toDelete.absolute())
+        _logger.debug("rm %s", path)
+        os.unlink(path)
 
 
 def deleteContents(dir:str) :
@@ -305,10 +555,160 @@ def deleteContents(dir:str) :
     Args:
         dir (str): The directory whose contents will be deleted.
     """
-    toDelete:Path = Path(dir)
-    if toDelete.exists() :
-        for name in os.listdir(dir):
-            delete(os.path.join(dir, name))
+    try :
+        with os.scandir(dir) as entries :
+            for entry in entries :
+                if entry.is_dir(follow_symlinks=False) :
+                    shutil.rmtree(entry.path)
+                else :
+                    os.unlink(entry.path)
+    except FileNotFoundError :
+        _logger.debug("Not deleting contents of non-existent directory %s", dir)
+
+
+def moveToTrash(path:str) -> Optional[str] :
+    """
+    Atomically move a path out of the way by renaming it to a trash entry alongside it (in the same directory, so on the
+    same filesystem). The trash can then be reaped (deleted) at leisure, for example with reapInBackground.
+
+    Args:
+        path (str): The path to move to the trash.
+
+    Returns:
+        Optional[str]: The path of the trash entry, or None if the path doesn't exist or cannot be renamed (for example a mount point).
+    """
+    source:str = os.path.normpath(path)
+    trash_path:str = os.path.join(os.path.dirname(source), f".{os.path.basename(source)}{TRASH_MARKER}{uuid.uuid4().hex}")
+    try :
+        os.rename(source, trash_path)
+    except FileNotFoundError :
+        return None
+    except OSError as e :
+        _logger.warning(f"Unable to move {path} to the trash ({e}).")
+        return None
+
+    _logger.debug(f"Moved {path} to the trash at {trash_path}")
+    return trash_path
+
+
+@contextmanager
+def atomicPath(path:str) -> Iterator[str] :
+    """
+    Write a file atomically: the path yielded is a temporary file alongside it (hidden, so directory scans skip it) to
+    write to, which replaces the file in one step (os.replace) once the context is left - so that readers, and other
+    processes, see the old file or the whole new one, never one half written. If the context is left by an error, the
+    temporary file is removed and the file is left as it was.
+
+    Args:
+        path (str): The file to write.
+
+    Yields:
+        str: The temporary file to write to instead.
+    """
+    temporary_path:str = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}{PARTIAL_MARKER}{uuid.uuid4().hex}")
+    try :
+        yield temporary_path
+        os.replace(temporary_path, path)
+    except BaseException :
+        try :
+            os.unlink(temporary_path)
+        except FileNotFoundError :
+            pass
+        raise
+
+
+def reapInBackground(trashPath:str) -> threading.Thread :
+    """
+    Delete a trash entry on a background thread. The thread is not a daemon, so the interpreter finishes the job before
+    exiting; anything left behind by a killed process is picked up by reapTrash.
+
+    Args:
+        trashPath (str): The trash entry to delete.
+
+    Returns:
+        threading.Thread: The (started) thread doing the deleting.
+    """
+    _claimReaping(trashPath)
+    def reap() :
+        try :
+            delete(trashPath)
+            _logger.debug(f"Reaped {trashPath}")
+        except Exception :
+            _logger.warning(f"Unable to reap {trashPath} - it will be reaped next time.", exc_info=True)
+        finally :
+            _releaseReaping(trashPath)
+
+    thread:threading.Thread = threading.Thread(target=reap, name=f"reap-{os.path.basename(trashPath)}")
+    thread.start()
+    return thread
+
+
+def deleteInBackground(path:str) -> Optional[threading.Thread] :
+    """
+    Delete the given path without waiting for it to go: it is atomically moved to the trash and then deleted on a background thread.
+    If the path cannot be moved it is deleted in the foreground instead.
+
+    Args:
+        path (str): The path to delete.
+
+    Returns:
+        Optional[threading.Thread]: The thread doing the deleting, or None if there was nothing left to do in the background.
+    """
+    trash_path:Optional[str] = moveToTrash(path)
+    if trash_path is None :
+        delete(path)
+        return None
+    return reapInBackground(trash_path)
+
+
+def reapTrash(dir:str, background:bool = True, name:Optional[str] = None) -> list[threading.Thread] :
+    """
+    Reap every trash entry (see moveToTrash) still present in the given directory, for example left behind by a process
+    that was killed before its background reaping finished.
+
+    Args:
+        dir (str): The directory to look for trash entries in.
+        background (bool, optional): If True, reap on background threads rather than waiting. Defaults to True.
+        name (Optional[str], optional): If set, only the trash of paths of this name is reaped (not, say, that of a sibling
+            another process is still reaping). Defaults to all of it.
+
+    Returns:
+        list[threading.Thread]: The threads doing the reaping (empty if not reaping in the background).
+    """
+    threads:list[threading.Thread] = []
+    try :
+        with os.scandir(dir) as entries :
+            trash_paths:list[str] = [entry.path for entry in entries if entry.name.startswith(f".{name}{TRASH_MARKER}" if name else ".") and TRASH_MARKER in entry.name]
+    except FileNotFoundError :
+        return threads
+
+    for trash_path in trash_paths :
+        # Trash this process is already reaping (say, the clone the last job moved out of the way) is left to it
+        if not _claimReaping(trash_path) :
+            continue
+        _logger.info(f"Reaping left over trash {trash_path}")
+        if background :
+            threads.append(reapInBackground(trash_path))
+        else :
+            try :
+                delete(trash_path)
+            finally :
+                _releaseReaping(trash_path)
+    return threads
+
+
+# Records that a trash entry is being reaped, returning False if it already was
+def _claimReaping(trashPath:str) -> bool :
+    with _reaping_lock :
+        if os.path.abspath(trashPath) in _reaping :
+            return False
+        _reaping.add(os.path.abspath(trashPath))
+        return True
+
+
+def _releaseReaping(trashPath:str) :
+    with _reaping_lock :
+        _reaping.discard(os.path.abspath(trashPath))
 
 
 def emptyFileContents(filePath:str) :
@@ -342,16 +742,53 @@ def findNewestFileInDirectory(dir:str, filePattern:str = "*") -> Optional[str]:
 
     Args:
         dir (str): The target directory.
-        filePattern (str, optional): A pathname pattern, for example '*.txt'. Defaults to '*'.
+        filePattern (str, optional): A pathname pattern, for example '*.txt' or 'logs/*.txt'. Defaults to '*'.
 
     Returns:
         str: The path to the newest file, or None if not found.
     """
-    newestFile:Optional[str] = None
-    if exists(dir) :
-        list_of_files = glob.iglob(os.path.join(dir, filePattern))
-        newestFile = max(list_of_files, default=None, key=os.path.getmtime)
-    return newestFile
+    # A pattern reaching into sub-directories is left to glob; a plain name pattern needs only one scan of the directory
+    if "/" in filePattern or os.sep in filePattern :
+        if not exists(dir) :
+            return None
+        return max(glob.iglob(os.path.join(dir, filePattern)), default=None, key=os.path.getmtime)
+    newest:Optional[FileEntry] = max(scanDirectory(dir, filePattern, filesOnly=False), default=None, key=lambda entry : entry.mtime)
+    return newest.path if newest is not None else None
+
+
+def scanDirectory(dir:str, filePattern:str = "*", recursive:bool = False, filesOnly:bool = True) -> list['FileEntry'] :
+    """
+    List the entries of a directory matching a pattern (as glob would: names starting with '.' only match patterns that do),
+    along with their size and modification time, in a single os.scandir pass (the stat comes with the directory listing
+    where the platform allows, and is fetched at most once per entry otherwise). Symbolic links are not followed.
+
+    Args:
+        dir (str): The directory to scan.
+        filePattern (str, optional): A file name pattern, for example '*.zip'. Defaults to '*'.
+        recursive (bool, optional): If True, sub-directories are scanned too. Defaults to False.
+        filesOnly (bool, optional): If True, only regular files are listed. Defaults to True.
+
+    Returns:
+        list[FileEntry]: The matching entries (an empty list if the directory doesn't exist).
+    """
+    found:list[FileEntry] = []
+    match_hidden:bool = filePattern.startswith(".")
+    pending:list[str] = [dir]
+    while pending :
+        try :
+            with os.scandir(pending.pop()) as entries :
+                for entry in entries :
+                    is_dir:bool = entry.is_dir(follow_symlinks=False)
+                    if recursive and is_dir :
+                        pending.append(entry.path)
+                    if (filesOnly and not entry.is_file(follow_symlinks=False)) or (entry.name.startswith(".") and not match_hidden) :
+                        continue
+                    if fnmatch.fnmatch(entry.name, filePattern) :
+                        entry_stat:os.stat_result = entry.stat(follow_symlinks=False)
+                        found.append(FileEntry(path=entry.path, name=entry.name, size=entry_stat.st_size, mtime=entry_stat.st_mtime, is_dir=is_dir))
+        except (FileNotFoundError, NotADirectoryError) :
+            continue
+    return found
 
 
 def howOldIsFile(path:str) -> Optional[time_util.timedelta] :
@@ -382,12 +819,9 @@ def removeFiles(dir:str, delta:time_util.timedelta, recursive:bool = False) :
         delta (time.timedelta): The maximum age of the file.
         recursive (bool, optional): If True, will find files in subdirectories. Defaults to False.
     """
-    if exists(dir) :
-        contents = glob.iglob(os.path.join(dir, "*"), recursive=recursive)
-        for item in contents :
-            age:Optional[time_util.timedelta] = howOldIsFile(item)
-            if os.path.isfile(item) and age is not None and age > delta :
-                delete(item)
+    for entry in scanDirectory(dir, recursive=recursive) :
+        if time_util.howOld(entry.mtime) > delta :
+            delete(entry.path)
 
 
 def readFile(path:str, encoding:str = "utf-8") -> str :
@@ -467,5 +901,110 @@ def removeFilesOfTypes(dir:str, types:list[str]) :
     _logger.debug(f"Removed files of types {types} from {dir}")
     
 
+def findFilesOfTypes(dir:str, types:list[str]) -> list[str] :
+    """
+    Find the files of the given types in the given directory: what removeFilesOfTypes would remove.
+
+    Args:
+        dir (str): The directory to inspect.
+        types (list[str]): The types of files to find.
+
+    Returns:
+        list[str]: The paths of the files (and directories) found.
+    """
+    found:list[str] = []
+    if exists(dir) :
+        for pattern in types:
+            found.extend(glob.iglob(os.path.join(dir, '**', pattern), recursive=True))
+    return found
+
+
+def matchesPatterns(relativePath:str, patterns:list[str]) -> bool :
+    """
+    Test whether a path (relative to a directory being cleaned) would be removed by removeFilesOfTypes with the given patterns.
+    That is the case if the path, or any of its parent directories, matches one of the patterns as glob matches them there
+    (see findFilesOfTypes): not under a directory whose name starts with '.', and with names starting with '.' matched only
+    by patterns that do.
+
+    Args:
+        relativePath (str): The path to test, relative to the directory being cleaned ('/' separated).
+        patterns (list[str]): The patterns (as read from a clean patterns file).
+
+    Returns:
+        bool: True if the path would be removed.
+    """
+    parts:list[str] = [part for part in relativePath.split("/") if part]
+    for pattern in patterns :
+        pattern_parts:list[str] = [part for part in pattern.split("/") if part]
+        if not pattern_parts :
+            continue
+        # A pattern can match the path itself or any parent directory, but glob's ** doesn't go into hidden directories
+        for end in range(len(pattern_parts), len(parts) + 1) :
+            start:int = end - len(pattern_parts)
+            if start > 0 and parts[start - 1].startswith(".") :
+                break
+            candidate:list[str] = parts[start:end]
+            if all(_globMatches(part, pattern_part) for part, pattern_part in zip(candidate, pattern_parts)) :
+                return True
+    return False
+
+
+# Test whether a name matches a pattern as glob matches it: names starting with '.' only match patterns that do
+def _globMatches(name:str, pattern:str) -> bool :
+    if name.startswith(".") and not pattern.startswith(".") :
+        return False
+    return fnmatch.fnmatchcase(name, pattern)
+
+
+@dataclass
+class FileEntry() :
+    """
+    A directory entry, as listed by scanDirectory.
+
+    Args:
+        path (str): The path to the entry.
+        name (str): The name of the entry.
+        size (int): The size of the entry in bytes.
+        mtime (float): The modification time of the entry (seconds since the epoch).
+        is_dir (bool): True if the entry is a directory.
+    """
+    path:str
+    name:str
+    size:int
+    mtime:float
+    is_dir:bool = False
+
+
+@dataclass
+class CopyReport() :
+    """
+    How much data a copy actually copied, and how much it shared with the source (reflinks and hard links).
+
+    Args:
+        files (int): The number of files copied.
+        bytes_copied (int): The number of bytes actually copied.
+        bytes_shared (int): The number of bytes shared with the source rather than copied.
+    """
+    files:int = 0
+    bytes_copied:int = 0
+    bytes_shared:int = 0
+
+
+    def add(self, other:'CopyReport') :
+        """
+        Add another report to this one.
+
+        Args:
+            other (CopyReport): The report to add.
+        """
+        self.files += other.files
+        self.bytes_copied += other.bytes_copied
+        self.bytes_shared += other.bytes_shared
+
+
+    def __str__(self) -> str :
+        return f"{self.files} files: {self.bytes_copied} bytes copied, {self.bytes_shared} bytes shared"
+
+
 class FileError(errors_util.UtilityError) :
     """Raised by the file utility functions to indicate some issue."""
\ No newline at end of file
@@ -1,8 +1,15 @@
 import logging
-from git import Repo, TagReference
+import os
+from dataclasses import dataclass, field
+from git import InvalidGitRepositoryError, NoSuchPathError, Repo, TagReference
 from git.util import T
 from .errors_util import UtilityError
-from . import helpers, file_util
+from typing import Optional
+from . import helpers, file_util, url_util
+
+# The file mode git uses for submodule (gitlink) entries
+_GITLINK_MODE:str = "160000"
+_NULL_MODE:str = "000000"
 
 # Logging
 _logger:logging.Logger = logging.getLogger(__name__)
@@ -15,13 +22,15 @@ class GitRepository() :
     Args:
         repo_url (str): The URL of the Git repository to clone.
         repository (Repo): The repository object.
+        rewrites (Optional[dict[str, str]], optional): URL rewrites (see url_util.mirrorRewrites) applied to the submodules. Defaults to None.
     """
 
-    def __init__(self, repo_url:str, repository:Repo) :
+    def __init__(self, repo_url:str, repository:Repo, rewrites:Optional[dict[str, str]] = None) :
         helpers.assertSet(_logger, "GitRepository::The repository URL is not set", repo_url)
         helpers.assertSet(_logger, "GitRepository::The repository is not set", repository)
         self._repo_url:str = repo_url
         self._repository:Repo = repository
+        self._rewrites:Optional[dict[str, str]] = rewrites
         
         
     @classmethod
@@ -56,15 +65,44 @@ class GitRepository() :
 
 
     @classmethod
-    def cloneRepositoryBranch(cls, repo_url, clone_target_dir:str, branch:str, depth:int = 1) -> 'GitRepository' :
+    def open(cls, path:str) -> 'GitRepository' :
+        """
+        Open an existing checkout in place (nothing is cloned, and nothing in it is changed).
+
+        Args:
+            path (str): The root of the checkout's working tree.
+
+        Returns:
+            GitRepository: The checkout, with the URL of its origin remote (or its path, if it has no origin).
+
+        Raises:
+            GitError: If the path is not the root of a git working tree.
+        """
+        try :
+            repository:Repo = Repo(path)
+        except (InvalidGitRepositoryError, NoSuchPathError) as e :
+            raise GitError(f"{path} is not a git repository: {e}") from e
+        if repository.working_tree_dir is None or not os.path.samefile(repository.working_tree_dir, path) :
+            raise GitError(f"{path} is not the root of a git working tree.")
+
+        repo_url:str = next(iter(repository.remote("origin").urls), path) if "origin" in repository.remotes else path
+        _logger.debug(f"Opened the checkout of {repo_url} in {path}")
+        return cls(repo_url, repository)
+
+
+    @classmethod
+    def cloneRepositoryBranch(cls, repo_url, clone_target_dir:str, branch:str, depth:int = 1, rewrites:Optional[dict[str, str]] = None) -> 'GitRepository' :
         """
         Clone a Git repository from the given URL to the specified path.
+        Given rewrites (see url_util.mirrorRewrites), the repository and its submodules are fetched from where they lead, such
+        as a local mirror - but the clone's origin is still the given URL, so tags are pushed there.
 
         Args:
             repo_url (str): The URL of the Git repository to clone.
             clone_target_dir (str): The local path where the repository should be cloned.
             branch (str): The branch of the Git repository to clone.
             depth (int): The depth of the Git repository to clone. Defaults to 1, a shallow clone (no history)
+            rewrites (Optional[dict[str, str]], optional): URL rewrites, applied as git applies insteadOf. Defaults to None.
 
         Returns:
             Git: A Git object representing the cloned repository.
@@ -74,11 +112,14 @@ class GitRepository() :
         """
         if helpers.hasValue(repo_url) and helpers.isValidUrl(repo_url) :
             if helpers.hasValue(clone_target_dir) and file_util.isDir(clone_target_dir) :
-                _logger.debug(f"Cloning repository from {repo_url} to {clone_target_dir}")
+                fetch_url:str = _fetchUrl(repo_url, rewrites)
+                _logger.debug(f"Cloning repository from {fetch_url} to {clone_target_dir}")
                 try:
-                    repository:Repo = Repo.clone_from(repo_url, clone_target_dir, branch=branch, depth=depth) # Using depth=1 for a shallow clone (not interested in history)
+                    repository:Repo = Repo.clone_from(fetch_url, clone_target_dir, branch=branch, depth=depth) # Using depth=1 for a shallow clone (not interested in history)
+                    if fetch_url != repo_url :
+                        repository.remote("origin").set_url(repo_url)
                     _logger.debug(f"Repository cloned successfully to {clone_target_dir}") 
-                    return cls(repo_url, repository)
+                    return cls(repo_url, repository, rewrites)
                 except Exception as e:
                     _logger.error(f"Error cloning repository: {e}")
                     raise GitError(f"Failed to clone repository from {repo_url} to {clone_target_dir}") from e
@@ -96,7 +137,12 @@ class GitRepository() :
             repository (Repo): The Repo object representing the repository in which to initialize submodules.
         """
         _logger.debug(f"Initializing submodules in {self._repository.working_dir}...")
-        self._repository.submodule_update(init=True, recursive=True)
+        if self._rewrites :
+            # Through git itself, which applies the rewrites to every submodule it clones (however deeply nested)
+            settings:list[str] = [argument for setting in url_util.gitConfigFor(self._rewrites) for argument in ("-c", setting)]
+            self._repository.git.execute(["git", *settings, "submodule", "update", "--init", "--recursive"])
+        else :
+            self._repository.submodule_update(init=True, recursive=True)
         _logger.debug(f"Submodules initialized in {self._repository.working_dir}") 
         
         
@@ -151,6 +197,210 @@ class GitRepository() :
         return file_path
     
     
+    def changesSince(self, tag_name:str) -> 'ChangeSet' :
+        """
+        Determine the paths that were added, modified and deleted between the given tag and the checked out commit,
+        recursing into any submodules whose pointer changed. Works on shallow clones - the tag is fetched if required.
+
+        Args:
+            tag_name (str): The tag to compare against (e.g. the previous release).
+
+        Returns:
+            ChangeSet: The changed paths, relative to the root of the repository.
+
+        Raises:
+            GitError: If the tag cannot be found or the changes cannot be determined.
+        """
+        helpers.assertSet(_logger, "GitRepository::The tag name is not set", tag_name)
+        _logger.debug(f"Determining changes in {self._repository.working_dir} since {tag_name}...")
+
+        try :
+            if not self._hasCommit(self._repository, f"refs/tags/{tag_name}") :
+                self._repository.git.fetch("--depth=1", "origin", "tag", tag_name, "--no-tags")
+            changes:ChangeSet = self._changesBetween(self._repository, f"refs/tags/{tag_name}", "HEAD")
+        except Exception as e:
+            _logger.error(f"Failed to determine changes since {tag_name} in {self._repository.working_dir}: {e}")
+            raise GitError(f"Failed to determine changes since {tag_name} in {self._repository.working_dir}") from e
+
+        _logger.debug(f"...{len(changes.added)} added, {len(changes.modified)} modified and {len(changes.deleted)} deleted since {tag_name}")
+        return changes
+
+
+    @classmethod
+    def _changesBetween(cls, repository:Repo, old_rev:str, new_rev:str) -> 'ChangeSet' :
+        """
+        Determine the changes between two commits of the given repository, recursing into changed submodules.
+
+        Args:
+            repository (Repo): The repository to compare within.
+            old_rev (str): The old commit.
+            new_rev (str): The new commit.
+
+        Returns:
+            ChangeSet: The changed paths, relative to the root of the given repository.
+        """
+        changes:ChangeSet = ChangeSet()
+        fields:list[str] = repository.git.diff("--raw", "--no-renames", "--no-abbrev", "-z", old_rev, new_rev).split("\0")
+
+        # -z raw output is ':<old mode> <new mode> <old sha> <new sha> <status>' followed by the path
+        for header, path in zip(fields[0::2], fields[1::2]) :
+            old_mode, new_mode, old_sha, new_sha, status = header.lstrip(":").split(" ")
+            if old_mode == _GITLINK_MODE or new_mode == _GITLINK_MODE :
+                changes.extend(cls._submoduleChanges(repository, path, old_mode, new_mode, old_sha, new_sha), prefix=path)
+            elif status == "A" :
+                changes.added.append(path)
+            elif status == "D" :
+                changes.deleted.append(path)
+            else :
+                changes.modified.append(path)
+
+        return changes
+
+
+    @classmethod
+    def _submoduleChanges(cls, repository:Repo, path:str, old_mode:str, new_mode:str, old_sha:str, new_sha:str) -> 'ChangeSet' :
+        """
+        Determine the changes within a submodule whose pointer changed (or which was added or removed).
+
+        Args:
+            repository (Repo): The repository containing the submodule.
+            path (str): The path of the submodule within the repository.
+            old_mode (str): The old file mode of the path.
+            new_mode (str): The new file mode of the path.
+            old_sha (str): The old commit of the submodule.
+            new_sha (str): The new commit of the submodule.
+
+        Returns:
+            ChangeSet: The changed paths, relative to the root of the submodule.
+        """
+        changes:ChangeSet = ChangeSet()
+
+        # A removed submodule - its contents are no longer known, so the whole directory is deleted
+        if new_mode != _GITLINK_MODE :
+            changes.deleted.append("")
+            if new_mode != _NULL_MODE :
+                changes.added.append("")
+            return changes
+
+        submodule:Repo = Repo(os.path.join(str(repository.working_dir), path))
+        tracked:list[str] = cls._trackedFiles(submodule)
+
+        # A new submodule (or a file that became one) - everything in it is new
+        if old_mode != _GITLINK_MODE :
+            if old_mode != _NULL_MODE :
+                changes.deleted.append("")
+            changes.added.extend(tracked)
+            return changes
+
+        # A moved submodule pointer - compare the two commits, fetching the old one if need be
+        try :
+            if not cls._hasCommit(submodule, old_sha) :
+                submodule.git.fetch("--depth=1", "origin", old_sha, "--no-tags")
+            return cls._changesBetween(submodule, old_sha, new_sha)
+        except Exception as e :
+            _logger.warning(f"Cannot compare submodule {path} to {old_sha} ({e}) - treating all of its files as modified.")
+            changes.modified.extend(tracked)
+            return changes
+
+
+    @staticmethod
+    def _hasCommit(repository:Repo, rev:str) -> bool :
+        """
+        Test whether the given revision is available in the repository.
+
+        Args:
+            repository (Repo): The repository to look in.
+            rev (str): The revision to look for.
+
+        Returns:
+            bool: True if the revision resolves to a commit available locally.
+        """
+        try :
+            repository.git.cat_file("-e", f"{rev}^{{commit}}")
+            return True
+        except Exception :
+            return False
+
+
+    @staticmethod
+    def _trackedFiles(repository:Repo) -> list[str] :
+        """
+        List the files tracked by the repository (and its submodules) at the checked out commit.
+
+        Args:
+            repository (Repo): The repository to list.
+
+        Returns:
+            list[str]: The tracked paths, relative to the root of the repository.
+        """
+        output:str = repository.git.ls_files("-z", "--recurse-submodules")
+        return [path for path in output.split("\0") if path]
+
+
+    def commitTime(self) -> int :
+        """
+        Get the time the checked out commit was committed, for example to timestamp a reproducible build with.
+
+        Returns:
+            int: The commit time, in seconds since the epoch.
+        """
+        return int(self._repository.head.commit.committed_date)
+
+
+    def originUrl(self) -> str :
+        """
+        Get the URL of the repository's origin remote, for example to name the GitHub repository an existing checkout is of.
+
+        Returns:
+            str: The URL.
+
+        Raises:
+            GitError: If the repository has no origin remote.
+        """
+        if "origin" not in self._repository.remotes :
+            raise GitError(f"{self._repository.working_tree_dir} has no origin remote.")
+        return self._repository.remotes.origin.url
+
+
+    def commitSha(self) -> str :
+        """
+        Get the SHA of the checked out commit, for example to tag it through the GitHub API rather than from the clone.
+
+        Returns:
+            str: The commit's SHA.
+        """
+        return self._repository.head.commit.hexsha
+
+
+    def trackedFiles(self) -> list[str] :
+        """
+        List the files in the index of the repository (and its initialised submodules), rather than walking the working tree.
+
+        Returns:
+            list[str]: The tracked paths, relative to the root of the repository ('/' separated).
+        """
+        return self._trackedFiles(self._repository)
+
+
+    def blobShas(self) -> dict[str, str] :
+        """
+        Get the blob SHA of every regular file tracked by the repository (and its submodules), as recorded in the index,
+        for example to identify the files' content without reading them. Symbolic links and submodules are left out.
+
+        Returns:
+            dict[str, str]: The blob SHAs, keyed by path relative to the root of the repository.
+        """
+        blob_shas:dict[str, str] = {}
+        output:str = self._repository.git.ls_files("-s", "-z", "--recurse-submodules")
+        for line in output.split("\0") :
+            # <mode> <sha> <stage>\t<path>
+            details, _, path = line.partition("\t")
+            fields:list[str] = details.split()
+            if path and len(fields) == 3 and fields[0] in ("100644", "100755") :
+                blob_shas[path] = fields[1]
+        return blob_shas
+
+
     def getRepository(self) -> Repo:
         """
         Get the repository for this GitRepository.
@@ -161,6 +411,56 @@ class GitRepository() :
         return self._repository
         
     
+@dataclass
+class ChangeSet() :
+    """
+    The paths that changed between two commits.
+
+    Args:
+        added (list[str]): Paths that were added.
+        modified (list[str]): Paths whose content (or type) changed.
+        deleted (list[str]): Paths that were deleted.
+    """
+    added:list[str] = field(default_factory=list)
+    modified:list[str] = field(default_factory=list)
+    deleted:list[str] = field(default_factory=list)
+
+
+    def extend(self, other:'ChangeSet', prefix:str = "") :
+        """
+        Add the changes from another change set, optionally placing them under a prefix (such as a submodule path).
+
+        Args:
+            other (ChangeSet): The changes to add.
+            prefix (str, optional): The path to place the other changes under. Defaults to "".
+        """
+        def place(path:str) -> str :
+            return "/".join(part for part in (prefix, path) if part)
+
+        self.added.extend(place(path) for path in other.added)
+        self.modified.extend(place(path) for path in other.modified)
+        self.deleted.extend(place(path) for path in other.deleted)
+
+
+    def changed(self) -> list[str] :
+        """
+        Get the paths whose current content is needed (i.e. added or modified).
+
+        Returns:
+            list[str]: The added and modified paths.
+        """
+        return sorted(set(self.added) | set(self.modified))
+
+
+# Where to fetch a repository from: the URL rewritten (as insteadOf would), with local paths turned into file:// URLs, as git
+# ignores the depth of a clone from a plain path
+def _fetchUrl(repo_url:str, rewrites:Optional[dict[str, str]]) -> str :
+    fetch_url:str = url_util.rewrite(repo_url, rewrites)
+    if "://" not in fetch_url and url_util.parseRemote(fetch_url).isLocal() :
+        fetch_url = f"file://{fetch_url}"
+    return fetch_url
+
+
 class GitError(UtilityError):
     """
     Wraps underlying exceptions to make handling them easier for calling code.
@@ -1,25 +1,146 @@
 import logging
 import os
+import threading
 from typing import Optional
 from git import Repo
-from github import Github, Auth 
+from github import Github, Auth, BadCredentialsException, GithubException, UnknownObjectException
 from github.GitRelease import GitRelease
+from github.Repository import Repository
 from releaser.utilities import file_util
 from . import errors_util, helpers
 
 _logger:logging.Logger = logging.getLogger(__name__)
 
+# The GitHub clients kept for reuse, by API URL, token and laziness, once keepClients() is called (None when they are not kept)
+_clients:Optional[dict[tuple[Optional[str], str, bool], Github]] = None
+_clients_lock:threading.Lock = threading.Lock()
+
+
+def keepClients(keep:bool = True) :
+    """
+    Keep the GitHub clients created (and their open connections) for reuse by later releases to the same API with the same
+    token, rather than creating a client for each release. For long-running processes, such as the job server.
+
+    Args:
+        keep (bool, optional): True to keep clients, False to stop (and drop those kept). Defaults to True.
+    """
+    global _clients
+    with _clients_lock :
+        _clients = {} if keep else None
+
+
+# A lazy client's objects are fetched from GitHub only when their attributes are read, so getting a repository just to
+# call its endpoints costs no request
+def _client(api_url:Optional[str], token:str, lazy:bool = False) -> Github :
+    with _clients_lock :
+        if _clients is not None and (api_url, token, lazy) in _clients :
+            return _clients[(api_url, token, lazy)]
+        client:Github = Github(base_url=api_url, auth=Auth.Token(token), lazy=lazy) if api_url else Github(auth=Auth.Token(token), lazy=lazy)
+        if _clients is not None :
+            _clients[(api_url, token, lazy)] = client
+        return client
+
+
+def repositoryNameFromUrl(url:str) -> str :
+    """
+    Get the name (Owner/Repository) of a GitHub repository from its URL.
+
+    Args:
+        url (str): The URL (https://github.com/Owner/Repository.git or git@github.com:Owner/Repository.git).
+
+    Returns:
+        str: The name (Owner/Repository).
+
+    Raises:
+        GitHubError: If the URL is not of a GitHub repository.
+    """
+    # Remove protocol and domain
+    if url.startswith("https://github.com/"):
+        repo_path = url[len("https://github.com/"):]
+    elif url.startswith("git@github.com:"):
+        repo_path = url[len("git@github.com:"):]
+    else:
+        raise GitHubError(f"The repository is a GitHub repository ({url}).")
+
+    # Remove .git suffix if present
+    if repo_path.endswith(".git"):
+        repo_path = repo_path[:-4]
+
+    # Remove trailing slash if present
+    return repo_path.rstrip("/")
+
+
+def checkAccess(repositoryName:str) :
+    """
+    Check GITHUB_TOKEN is set and accepted, and lets the releaser push to the repository (the tag) and create releases in it.
+    The token's scopes are checked if GitHub reports them (classic tokens), and the permissions it grants on the repository otherwise.
+
+    Args:
+        repositoryName (str): The name (Owner/Repository) of the repository.
+
+    Raises:
+        GitHubError: If the token is missing or rejected, the repository cannot be seen, or the token cannot write to it.
+    """
+    github:Github = _client(os.getenv("RELEASER_GITHUB_API_URL"), _token())
+    try :
+        repository:Repository = github.get_repo(repositoryName)
+    except BadCredentialsException as e :
+        raise GitHubError("GITHUB_TOKEN was rejected by GitHub (it is not valid, or has expired)") from e
+    except UnknownObjectException as e :
+        raise GitHubError(f"The repository {repositoryName} does not exist, or GITHUB_TOKEN cannot see it") from e
+    except GithubException as e :
+        raise GitHubError(f"Cannot get the repository {repositoryName} from GitHub: {e}") from e
+
+    scopes:Optional[list[str]] = github.oauth_scopes
+    if scopes is not None and "repo" not in scopes and ("public_repo" not in scopes or repository.private) :
+        raise GitHubError(f"GITHUB_TOKEN does not have the {'repo' if repository.private else 'repo or public_repo'} scope needed to release {repositoryName} (it has {', '.join(scopes) or 'none'})")
+    if repository.permissions is not None and not repository.permissions.push :
+        raise GitHubError(f"GITHUB_TOKEN cannot push to {repositoryName}")
+
+
+def checkTagIsFree(repositoryName:str, tagName:str) :
+    """
+    Check the repository on GitHub does not already have a tag, or a release of the tag.
+
+    Args:
+        repositoryName (str): The name (Owner/Repository) of the repository.
+        tagName (str): The tag.
+
+    Raises:
+        GitHubError: If the tag or a release of it exists, or GitHub cannot be asked.
+    """
+    repository:Repository = _client(os.getenv("RELEASER_GITHUB_API_URL"), _token(), lazy=True).get_repo(repositoryName)
+    for what, lookup in (("tag", lambda : repository.get_git_ref(f"tags/{tagName}").object), ("release of the tag", lambda : repository.get_release(tagName))) :
+        try :
+            lookup()
+        except UnknownObjectException :
+            continue
+        except GithubException as e :
+            raise GitHubError(f"Cannot check whether {repositoryName} has the {what} {tagName}: {e}") from e
+        raise GitHubError(f"{repositoryName} already has the {what} {tagName}")
+
+
+def _token() -> str :
+    token:Optional[str] = os.getenv('GITHUB_TOKEN')
+    if not token:
+        raise GitHubError("GITHUB_TOKEN environment variable is not set")
+    return token
+
+
 class GitHubRepository() :
     """
     Utility class for interacting with GitHub.
+    The API used is RELEASER_GITHUB_API_URL if it is set (e.g. GitHub Enterprise, or a local stub), otherwise api.github.com.
     """
 
     def __init__(self, git_repository:Repo) :
         helpers.assertSet(_logger, "GitHub::The git repository is not set", git_repository)
         self._git_repository:Repo = git_repository
+        self._repository_name:Optional[str] = None
        
         self._token:str = self._getGitHubToken()
-        self._github:Github = Github(auth=Auth.Token(self._token))
+        self._api_url:Optional[str] = os.getenv("RELEASER_GITHUB_API_URL")
+        self._github:Github = _client(self._api_url, self._token)
         
         
     def createRelease(self, release_name:str, release_description:str, tagName:str) -> GitRelease:
@@ -38,6 +159,34 @@ class GitHubRepository() :
         helpers.assertSet(_logger, "GitHub::The release description is not set", release_description)
         helpers.assertSet(_logger, "GitHub::The tag name is not set", tagName)
         return self._getGitHubRepository().create_git_release(tagName, name=release_name, message=release_description, draft=False, prerelease=False)
+
+
+    def createTag(self, tagName:str, tagDescription:str, sha:str) -> str :
+        """
+        Create an annotated tag of a commit on GitHub, through the API: the tag object, then the ref pointing at it. Unlike
+        pushing a tag from a clone, this needs neither the clone's .git directory nor credentials to push with.
+
+        Args:
+            tagName (str): The name of the tag.
+            tagDescription (str): The description (message) of the tag.
+            sha (str): The SHA of the commit to tag.
+
+        Returns:
+            str: The SHA of the tag object.
+
+        Raises:
+            GitHubError: If GitHub refuses the tag (for example, because it already exists).
+        """
+        helpers.assertSet(_logger, "GitHub::The tag name is not set", tagName)
+        helpers.assertSet(_logger, "GitHub::The tag description is not set", tagDescription)
+        helpers.assertSet(_logger, "GitHub::The commit SHA is not set", sha)
+        repository:Repository = _client(self._api_url, self._token, lazy=True).get_repo(self.getRepositoryName())
+        try :
+            tag_sha:str = repository.create_git_tag(tagName, tagDescription, sha, "commit").sha
+            repository.create_git_ref(f"refs/tags/{tagName}", tag_sha)
+        except GithubException as e :
+            raise GitHubError(f"Cannot create the tag {tagName} in {self.getRepositoryName()}: {e}") from e
+        return tag_sha
  
  
     def uploadFileToRelease(self, release:GitRelease, file_name:str, file_path:str, content_type:str = "") :
@@ -91,40 +240,24 @@ class GitHubRepository() :
         Returns:
             str: The token.
         """
-        token:Optional[str] = os.getenv('GITHUB_TOKEN')
-        if not token:
-            raise GitHubError("GITHUB_TOKEN environment variable is not set")
-        return token
+        return _token()
 
 
     def getRepositoryName(self) -> str:
         """
-        Get the name (Owner/Repository) of this repository.
+        Get the name (Owner/Repository) of this repository. It is read from the clone's origin once, and kept - so the clone's
+        .git directory can be removed after the first call.
         
         Returns:
             str: The name (Owner/Repository) of this repository.
         """
-        return self._determineRepositoryName()
+        if self._repository_name is None :
+            self._repository_name = self._determineRepositoryName()
+        return self._repository_name
     
     
     def _determineRepositoryName(self) -> str:
-    
-        url:str = self._getRepository().remotes.origin.url
-                
-        # Remove protocol and domain
-        if url.startswith("https://github.com/"):
-            repo_path = url[len("https://github.com/"):]
-        elif url.startswith("git@github.com:"):
-            repo_path = url[len("git@github.com:"):]
-        else:
-            raise GitHubError(f"The repository is a GitHub repository ({url}).")
-
-        # Remove .git suffix if present
-        if repo_path.endswith(".git"):
-            repo_path = repo_path[:-4]
-
-        # Remove trailing slash if present
-        return repo_path.rstrip("/")
+        return repositoryNameFromUrl(self._getRepository().remotes.origin.url)
 
 
     def _getRepository(self) -> Repo:
@@ -0,0 +1,242 @@
+import hashlib
+import logging
+import os
+import stat
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Mapping, NamedTuple, Optional
+from . import file_util
+from .errors_util import UtilityError
+
+_logger:logging.Logger = logging.getLogger(__name__)
+
+# Files are read in chunks of this size, so large files never have to be held in memory
+DEFAULT_CHUNK_SIZE:int = 1024 * 1024
+
+# Reusable read buffers, one per hashing thread
+_buffers:threading.local = threading.local()
+
+
+def hashFile(path:str, chunkSize:int = DEFAULT_CHUNK_SIZE) -> str :
+    """
+    Compute the SHA-256 digest of a file, reading it in chunks.
+
+    Args:
+        path (str): The path to the file.
+        chunkSize (int, optional): The number of bytes to read at a time. Defaults to 1MiB.
+
+    Returns:
+        str: The hex digest of the file's contents.
+
+    Raises:
+        HashError: If the file cannot be read.
+    """
+    buffer:bytearray = getattr(_buffers, "buffer", None) or bytearray(0)
+    if len(buffer) != chunkSize :
+        buffer = bytearray(chunkSize)
+        _buffers.buffer = buffer
+    view:memoryview = memoryview(buffer)
+
+    digest = hashlib.sha256()
+    try :
+        with open(path, "rb", buffering=0) as file :
+            while read := file.readinto(buffer) :
+                digest.update(view[:read])
+    except OSError as e :
+        raise HashError(f"Failed to hash {path}: {e}") from e
+    return digest.hexdigest()
+
+
+def writeSumsFile(path:str, digests:dict[str, str], append:bool = False) :
+    """
+    Write digests in the format used by sha256sum (and understood by `sha256sum -c`): '<digest>  <path>' per line.
+
+    Args:
+        path (str): The path of the sums file to write.
+        digests (dict[str, str]): The digests, keyed by the path they belong to.
+        append (bool, optional): If True, add to an existing sums file rather than replacing it. Defaults to False.
+    """
+    _logger.debug(f"Writing {len(digests)} digests to {path}")
+    # Written alongside and moved into place (with what it already held, if appending), so it is never seen half written
+    with file_util.atomicPath(path) as temporary_path, open(temporary_path, "w", encoding="utf-8") as sums_file :
+        if append and os.path.exists(path) :
+            with open(path, encoding="utf-8") as existing_file :
+                sums_file.writelines(existing_file)
+        sums_file.writelines(f"{digest}  {name}\n" for name, digest in digests.items())
+
+
+def readSumsFile(path:str) -> dict[str, str] :
+    """
+    Read a sums file written by writeSumsFile (or sha256sum).
+
+    Args:
+        path (str): The path of the sums file to read.
+
+    Returns:
+        dict[str, str]: The digests, keyed by the path they belong to.
+    """
+    digests:dict[str, str] = {}
+    with open(path, encoding="utf-8") as sums_file :
+        for line in sums_file :
+            digest, separator, name = line.rstrip("\n").partition("  ")
+            if separator :
+                digests[name.lstrip("*")] = digest
+    return digests
+
+
+class FileRecord(NamedTuple) :
+    """
+    A file's digest along with the stat signature it was computed for. If the signature is unchanged, so is the digest.
+
+    Args:
+        size (int): The size of the file.
+        mtime_ns (int): The modification time of the file in nanoseconds.
+        inode (int): The inode of the file.
+        digest (str): The SHA-256 hex digest of the file's contents.
+        blob_sha (Optional[str], optional): The git blob SHA the file was checked out from, if known. Defaults to None.
+    """
+    size:int
+    mtime_ns:int
+    inode:int
+    digest:str
+    blob_sha:Optional[str] = None
+
+
+    def matches(self, stat_result:os.stat_result) -> bool :
+        """
+        Test whether a file's stat still matches the signature the digest was computed for.
+
+        Args:
+            stat_result (os.stat_result): The file's current stat.
+
+        Returns:
+            bool: True if the digest can be reused.
+        """
+        return self.size == stat_result.st_size and self.mtime_ns == stat_result.st_mtime_ns and self.inode == stat_result.st_ino
+
+
+class TreeHasher() :
+    """
+    Hashes the files of a directory tree in parallel as they are handed to it, so that a walk that already happens
+    (for example the archiver's) can feed it rather than walking the tree a second time.
+    Given the records of a previous run (see manifest_util), files whose stat signature is unchanged are not hashed again.
+    Given the git blob SHAs of the files too, files checked out from a blob of the same size as one recorded are not hashed
+    again either, even if the tree was cloned afresh since (which changes every file's mtime and inode).
+
+    Use as a context manager; digests() waits for the outstanding work.
+
+    Args:
+        root (str): The root of the tree; digests are keyed by path relative to it ('/' separated).
+        workers (Optional[int], optional): The number of hashing threads. Defaults to the number of CPUs.
+        chunkSize (int, optional): The number of bytes to read at a time. Defaults to 1MiB.
+        known (Optional[Mapping[str, FileRecord]], optional): The records of a previous run, by relative path. Defaults to None.
+        blobShas (Optional[Mapping[str, str]], optional): The git blob SHAs the files were checked out from, by relative path
+            (only for a checkout whose files have not been changed since, such as a fresh clone). Defaults to None.
+    """
+
+    def __init__(self, root:str, workers:Optional[int] = None, chunkSize:int = DEFAULT_CHUNK_SIZE, known:Optional[Mapping[str, FileRecord]] = None, blobShas:Optional[Mapping[str, str]] = None) :
+        self._root:Path = Path(root)
+        self._chunk_size:int = chunkSize
+        self._known:Mapping[str, FileRecord] = known or {}
+        self._blob_shas:Mapping[str, str] = blobShas or {}
+        self._known_blobs:dict[tuple[str, int], str] = {(record.blob_sha, record.size) : record.digest for record in self._known.values() if record.blob_sha} if blobShas else {}
+        self._executor:ThreadPoolExecutor = ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1, thread_name_prefix="hash")
+        self._futures:dict[str, Future] = {}
+        self._stats:dict[str, os.stat_result] = {}
+        self._reused:int = 0
+
+
+    def __enter__(self) -> 'TreeHasher' :
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback) :
+        self._executor.shutdown(wait=True, cancel_futures=exc_type is not None)
+
+
+    def add(self, path:Path, stat_result:Optional[os.stat_result] = None, digest:Optional[str] = None) :
+        """
+        Queue a path for hashing. Anything that isn't a regular file (directories, symbolic links) is ignored.
+
+        Args:
+            path (Path): The path to hash, within the root.
+            stat_result (Optional[os.stat_result], optional): The path's stat, if the caller already has it. Defaults to None.
+            digest (Optional[str], optional): The path's digest, if the caller has already computed it (for example from
+                the data it read to archive). Defaults to None.
+        """
+        stat_result = stat_result or path.lstat()
+        if not stat.S_ISREG(stat_result.st_mode) :
+            return
+
+        name:str = path.relative_to(self._root).as_posix()
+        self._stats[name] = stat_result
+        if digest is None :
+            digest = self.reusableDigest(path, stat_result)
+            self._reused += digest is not None
+        if digest is not None :
+            future:Future = Future()
+            future.set_result(digest)
+            self._futures[name] = future
+        else :
+            self._futures[name] = self._executor.submit(hashFile, str(path), self._chunk_size)
+
+
+    def reusableDigest(self, path:Path, stat_result:os.stat_result) -> Optional[str] :
+        """
+        Get the digest a previous run recorded for a path, if its stat signature is unchanged (or it was checked out from a
+        blob of the same size as a file recorded), so it needn't be hashed again.
+
+        Args:
+            path (Path): The path, within the root.
+            stat_result (os.stat_result): The path's stat.
+
+        Returns:
+            Optional[str]: The digest, or None if the path has to be hashed.
+        """
+        name:str = path.relative_to(self._root).as_posix()
+        record:Optional[FileRecord] = self._known.get(name)
+        if record is not None and record.matches(stat_result) :
+            return record.digest
+        blob_sha:Optional[str] = self._blob_shas.get(name)
+        return self._known_blobs.get((blob_sha, stat_result.st_size)) if blob_sha is not None else None
+
+
+    def digests(self) -> dict[str, str] :
+        """
+        Wait for all queued hashing to finish.
+
+        Returns:
+            dict[str, str]: The digests, keyed by path relative to the root, in path order.
+
+        Raises:
+            HashError: If any file cannot be hashed.
+        """
+        return {name : self._futures[name].result() for name in sorted(self._futures)}
+
+
+    def records(self) -> dict[str, FileRecord] :
+        """
+        Wait for all queued hashing to finish.
+
+        Returns:
+            dict[str, FileRecord]: The digests along with the stat signatures they were computed for, keyed by relative path.
+
+        Raises:
+            HashError: If any file cannot be hashed.
+        """
+        return {name : FileRecord(self._stats[name].st_size, self._stats[name].st_mtime_ns, self._stats[name].st_ino, digest, self._blob_shas.get(name)) for name, digest in self.digests().items()}
+
+
+    def reused(self) -> int :
+        """
+        Get the number of files whose digest was reused from a previous run rather than computed.
+
+        Returns:
+            int: The number of files.
+        """
+        return self._reused
+
+
+class HashError(UtilityError) :
+    """Raised by the hash utility functions to indicate some issue."""
@@ -1,20 +1,24 @@
 import logging
 from typing import Any, Optional
-from sys import exit
+from . import url_util
+from .errors_util import ValidationError
 
 
 def assertSet(logger: logging.Logger, message: str, variable: Any):
     """
-    Exits the program is the given variable is None. 
+    Raises a ValidationError if the given variable is not set.
     This is used to ensure that required variables are set before continuing.
 
     Args:
         logger (logging.Logger): uses the caller's modules' logger to make any resulting logs more contextually relevant
         message (str): The message to log if the variable is not set.
-        variable (Any): The variable to check. If it is None, the program will exit with an error message.
+        variable (Any): The variable to check. If it is None, an error message is logged and a ValidationError raised.
+
+    Raises:
+        ValidationError: If the variable is not set.
     """
     if not isSet(logger, message, variable) : 
-        exit(1)
+        raise ValidationError(message)
 
 
 def isSet(logger: logging.Logger, message: str, variable: Any): 
@@ -93,12 +97,36 @@ def getKey(config: dict, key) -> Any:
 
 def isValidUrl(url:str) -> bool:
     """
-    Simply tests a string to see if it is a valid URL (starts with http).
+    Tests a string to see if it is a valid git remote: an http(s)://, ssh://, git:// or file:// URL, an absolute path, or an
+    scp-style [user@]host:path (see url_util.parseRemote).
 
     Args:
         url (str): The string to test.
 
     Returns:
-        bool: True if the string is a valid URL, otherwise False.
+        bool: True if the string is a valid remote, otherwise False.
+    """
+    return hasValue(url) and url_util.isValidRemote(url)
+
+
+def parseSize(size:str) -> int:
+    """
+    Parses a human readable size (for example 1500, 512K, 1.5G or 2GiB) into a number of bytes.
+    Suffixes are binary multiples (K = 1024).
+
+    Args:
+        size (str): The size to parse.
+
+    Returns:
+        int: The number of bytes.
+
+    Raises:
+        ValueError: If the size cannot be parsed.
     """
-    return hasValue(url) and url.startswith("http")
\ No newline at end of file
+    multipliers:dict[str, int] = {"": 1, "B": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+    value:str = size.strip().upper().removesuffix("IB").removesuffix("B") if hasValue(size) else ""
+    suffix:str = value[-1:] if value[-1:].isalpha() else ""
+    number:str = value[:-1] if suffix else value
+    if suffix not in multipliers or not number :
+        raise ValueError(f"Invalid size: {size}")
+    return int(float(number) * multipliers[suffix])
@@ -0,0 +1,226 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from typing import Optional
+from .errors_util import UtilityError
+
+try :
+    import fcntl
+except ImportError : # not available on Windows
+    fcntl = None
+
+_logger:logging.Logger = logging.getLogger(__name__)
+
+# How long to wait between attempts to take a lock that is held, when waiting for it with a timeout
+_POLL_SECONDS:float = 0.05
+
+# Without fcntl, locks only keep out the other threads of this process: a lock for each lock file path
+_local_locks:dict[str, threading.Lock] = {}
+_local_locks_lock:threading.Lock = threading.Lock()
+
+
+def lockPath(lockDir:str, resource:str) -> str :
+    """
+    Get the lock file that guards a resource (such as a directory, or a release file), so that every process locking the
+    resource locks the same file. Lock files are kept together in a directory of their own, rather than next to what they
+    guard (which may be a checkout that is not the releaser's to write in), and are never removed - removing a lock file
+    another process is waiting on would let a third take the "same" lock at once.
+
+    Args:
+        lockDir (str): The directory the lock files are kept in.
+        resource (str): The path of the resource.
+
+    Returns:
+        str: The path of the lock file.
+    """
+    resource = os.path.realpath(resource)
+    name:str = "".join(character if character.isalnum() or character in "-_." else "_" for character in os.path.basename(resource))[:64]
+    return os.path.join(lockDir, f"{name}-{hashlib.sha256(resource.encode('utf-8')).hexdigest()[:16]}.lock")
+
+
+class FileLock() :
+    """
+    An advisory lock on a file (flock), exclusive unless shared: it keeps out every other holder of the lock, whether in
+    another process or another thread of this one (each FileLock opens the file for itself). The lock goes when it is
+    released, or with the process. Use as a context manager, to wait for the lock for as long as it takes.
+
+    Args:
+        path (str): The lock file (created, with its directory, if need be).
+        shared (bool, optional): If True, other shared holders are let in (but no exclusive one). Defaults to False.
+        description (Optional[str], optional): What the lock guards, for the log. Defaults to the path.
+    """
+
+    def __init__(self, path:str, shared:bool = False, description:Optional[str] = None) :
+        self._path:str = path
+        self._shared:bool = shared
+        self._description:str = description or path
+        self._fd:Optional[int] = None
+        self._local:Optional[threading.Lock] = None
+
+
+    @property
+    def locked(self) -> bool :
+        """True while the lock is held."""
+        return self._fd is not None or self._local is not None
+
+
+    def acquire(self, blocking:bool = True, timeout:Optional[float] = None) -> bool :
+        """
+        Take the lock.
+
+        Args:
+            blocking (bool, optional): If False, give up at once if another holds the lock. Defaults to True.
+            timeout (Optional[float], optional): The most seconds to wait for the lock. Defaults to waiting for ever.
+
+        Returns:
+            bool: True if the lock was taken, False if another held it (not blocking, or for longer than the timeout).
+
+        Raises:
+            LockError: If the lock is already held, or the lock file cannot be opened.
+        """
+        if self.locked :
+            raise LockError(f"The lock on {self._description} is already held")
+        if fcntl is None :
+            return self._acquireLocal(blocking, timeout)
+
+        try :
+            os.makedirs(os.path.dirname(self._path) or ".", exist_ok=True)
+            fd:int = os.open(self._path, os.O_RDWR | os.O_CREAT, 0o666)
+        except OSError as e :
+            raise LockError(f"Cannot open the lock file {self._path} for {self._description}: {e.strerror}") from e
+        operation:int = fcntl.LOCK_SH if self._shared else fcntl.LOCK_EX
+        try :
+            if self._tryLock(fd, operation) :
+                self._fd = fd
+                return True
+            if not blocking :
+                os.close(fd)
+                return False
+
+            _logger.info(f"Waiting for {self._description}, which another job is using...")
+            started:float = time.monotonic()
+            if timeout is None :
+                fcntl.flock(fd, operation)
+            else :
+                while not self._tryLock(fd, operation) :
+                    if time.monotonic() - started >= timeout :
+                        os.close(fd)
+                        return False
+                    time.sleep(_POLL_SECONDS)
+            _logger.info(f"...waited {time.monotonic() - started:.1f}s for {self._description}")
+        except BaseException :
+            os.close(fd)
+            raise
+        self._fd = fd
+        return True
+
+
+    def release(self) :
+        """
+        Release the lock, if it is held.
+        """
+        if self._fd is not None :
+            fd, self._fd = self._fd, None
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+        if self._local is not None :
+            local, self._local = self._local, None
+            local.release()
+
+
+    def __enter__(self) -> 'FileLock' :
+        self.acquire()
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback) :
+        self.release()
+
+
+    @staticmethod
+    def _tryLock(fd:int, operation:int) -> bool :
+        try :
+            fcntl.flock(fd, operation | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError :
+            return False
+
+
+    # Without fcntl, a (never shared) lock for this process alone
+    def _acquireLocal(self, blocking:bool, timeout:Optional[float]) -> bool :
+        with _local_locks_lock :
+            local:threading.Lock = _local_locks.setdefault(os.path.abspath(self._path), threading.Lock())
+        if not local.acquire(blocking, timeout if blocking and timeout is not None else -1) :
+            return False
+        self._local = local
+        return True
+
+
+class Workspace() :
+    """
+    A directory claimed for the sole use of a job, until released (see claimWorkspace). Use as a context manager.
+
+    Args:
+        directory (str): The directory.
+        lock (FileLock): The lock held on it.
+    """
+
+    def __init__(self, directory:str, lock:FileLock) :
+        self.directory:str = directory
+        self._lock:FileLock = lock
+
+
+    def release(self) :
+        """
+        Release the directory, for another job to use.
+        """
+        self._lock.release()
+
+
+    def __enter__(self) -> 'Workspace' :
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback) :
+        self.release()
+
+
+def claimWorkspace(directory:str, lockDir:str, derive:bool = True) -> Workspace :
+    """
+    Claim a directory for a job's sole use, so that jobs running at once - in this process or others - don't work in (and
+    empty) the same directory. If another job is using the directory, the job is given the first of its numbered siblings
+    (directory-2, directory-3 and so on) that no job is using instead, rather than waiting: the siblings are kept, and
+    reused by later jobs, so a host running N jobs at once settles on N directories.
+
+    Args:
+        directory (str): The directory wanted.
+        lockDir (str): The directory the lock files are kept in (see lockPath).
+        derive (bool, optional): If False, the job waits for the directory itself (for example a checkout built from in
+            place, which can't be swapped for another) rather than being given a sibling. Defaults to True.
+
+    Returns:
+        Workspace: The directory claimed (which need not exist yet).
+
+    Raises:
+        LockError: If a lock file cannot be opened.
+    """
+    if not derive :
+        lock:FileLock = FileLock(lockPath(lockDir, directory), description=directory)
+        lock.acquire()
+        return Workspace(directory, lock)
+
+    number:int = 1
+    while True :
+        candidate:str = directory if number == 1 else f"{directory.rstrip(os.sep)}-{number}"
+        lock = FileLock(lockPath(lockDir, candidate), description=candidate)
+        if lock.acquire(blocking=False) :
+            if number > 1 :
+                _logger.info(f"{directory} is being used by another job, so working in {candidate}")
+            return Workspace(candidate, lock)
+        number += 1
+
+
+class LockError(UtilityError) :
+    """Raised by the lock utility functions to indicate some issue."""
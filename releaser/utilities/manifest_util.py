@@ -0,0 +1,190 @@
+import logging
+import os
+import sqlite3
+import stat
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterator, Optional
+from . import hash_util
+from .errors_util import UtilityError
+
+_logger:logging.Logger = logging.getLogger(__name__)
+
+# Bump when the schema changes; an index with another version is discarded rather than migrated
+_SCHEMA_VERSION:int = 2
+
+
+@dataclass
+class ManifestDiff() :
+    """
+    How a directory tree changed since the index last recorded it. Paths are relative to the tree's root ('/' separated).
+
+    Args:
+        added (list[str]): The files that are new.
+        changed (list[str]): The files whose contents changed.
+        removed (list[str]): The files that no longer exist.
+        unchanged (int): The number of files whose contents are unchanged.
+        reused (int): The number of files whose digest was taken from the index rather than computed.
+    """
+    added:list[str] = field(default_factory=list)
+    changed:list[str] = field(default_factory=list)
+    removed:list[str] = field(default_factory=list)
+    unchanged:int = 0
+    reused:int = 0
+
+
+    def isEmpty(self) -> bool :
+        """
+        Test whether anything changed.
+
+        Returns:
+            bool: True if no files were added, changed or removed.
+        """
+        return not (self.added or self.changed or self.removed)
+
+
+class ManifestIndex() :
+    """
+    A persistent index of the files in a directory tree (path, size, mtime_ns, inode, SHA-256 digest and, where known, the
+    git blob SHA the file was checked out from), kept in an SQLite database, so that the next run only has to hash the files
+    whose stat signature changed - or, for a fresh clone, whose blob changed.
+
+    Use as a context manager, or call close() when done.
+
+    Args:
+        indexPath (str): The path of the index database; it is created if it does not exist.
+
+    Raises:
+        ManifestError: If the index cannot be opened.
+    """
+
+    def __init__(self, indexPath:str) :
+        self._path:str = indexPath
+        try :
+            self._connection:sqlite3.Connection = sqlite3.connect(indexPath)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            version:int = self._connection.execute("PRAGMA user_version").fetchone()[0]
+            if version != _SCHEMA_VERSION :
+                self._connection.execute("DROP TABLE IF EXISTS files")
+                self._connection.execute(f"PRAGMA user_version={_SCHEMA_VERSION}")
+            self._connection.execute("CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, inode INTEGER NOT NULL, digest TEXT NOT NULL, blob_sha TEXT) WITHOUT ROWID")
+            self._connection.commit()
+        except sqlite3.Error as e :
+            raise ManifestError(f"Failed to open the manifest index {indexPath}: {e}") from e
+
+
+    def __enter__(self) -> 'ManifestIndex' :
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback) :
+        self.close()
+
+
+    @staticmethod
+    def pathFor(dir:str) -> str :
+        """
+        Get where the index for a directory is kept: next to it (not inside it, so it is never archived or cleaned), as a hidden file.
+
+        Args:
+            dir (str): The directory the index is for.
+
+        Returns:
+            str: The path of the index database.
+        """
+        path:Path = Path(dir).absolute()
+        return str(path.parent / f".{path.name}.manifest.sqlite")
+
+
+    def close(self) :
+        """
+        Close the index.
+        """
+        self._connection.close()
+
+
+    def records(self) -> dict[str, hash_util.FileRecord] :
+        """
+        Get everything the index holds.
+
+        Returns:
+            dict[str, hash_util.FileRecord]: The records, keyed by path relative to the tree's root.
+        """
+        return {path : hash_util.FileRecord(size, mtime_ns, inode, digest, blob_sha) for path, size, mtime_ns, inode, digest, blob_sha in self._connection.execute("SELECT path, size, mtime_ns, inode, digest, blob_sha FROM files")}
+
+
+    def replace(self, records:dict[str, hash_util.FileRecord]) -> ManifestDiff :
+        """
+        Replace the contents of the index with the given records (for example those of a TreeHasher that just walked the tree).
+
+        Args:
+            records (dict[str, hash_util.FileRecord]): The records, keyed by path relative to the tree's root.
+
+        Returns:
+            ManifestDiff: How the records differ from what the index held before.
+
+        Raises:
+            ManifestError: If the index cannot be written.
+        """
+        diff:ManifestDiff = _diff(self.records(), records)
+        try :
+            with self._connection :
+                self._connection.execute("DELETE FROM files")
+                self._connection.executemany("INSERT INTO files (path, size, mtime_ns, inode, digest, blob_sha) VALUES (?, ?, ?, ?, ?, ?)", ((path, *record) for path, record in records.items()))
+        except sqlite3.Error as e :
+            raise ManifestError(f"Failed to write the manifest index {self._path}: {e}") from e
+        return diff
+
+
+    def refresh(self, root:str, workers:Optional[int] = None) -> ManifestDiff :
+        """
+        Walk a directory tree, hashing only the files whose stat signature differs from the one recorded, and record the result.
+
+        Args:
+            root (str): The root of the tree.
+            workers (Optional[int], optional): The number of hashing threads. Defaults to the number of CPUs.
+
+        Returns:
+            ManifestDiff: The files added, changed and removed since the index was last refreshed.
+
+        Raises:
+            ManifestError: If the index cannot be written.
+            HashError: If a file cannot be hashed.
+        """
+        _logger.debug(f"Refreshing the manifest index {self._path} from {root}")
+        with hash_util.TreeHasher(root, workers=workers, known=self.records()) as hasher :
+            for path, stat_result in _walkFiles(Path(root)) :
+                hasher.add(path, stat_result)
+            diff:ManifestDiff = self.replace(hasher.records())
+            diff.reused = hasher.reused()
+
+        _logger.debug(f"Manifest of {root}: {len(diff.added)} added, {len(diff.changed)} changed, {len(diff.removed)} removed, {diff.unchanged} unchanged ({diff.reused} not rehashed)")
+        return diff
+
+
+def _diff(before:dict[str, hash_util.FileRecord], after:dict[str, hash_util.FileRecord]) -> ManifestDiff :
+    diff:ManifestDiff = ManifestDiff(removed=sorted(path for path in before if path not in after))
+    for path in sorted(after) :
+        if path not in before :
+            diff.added.append(path)
+        elif before[path].digest != after[path].digest :
+            diff.changed.append(path)
+        else :
+            diff.unchanged += 1
+    return diff
+
+
+# Yields each regular file of the tree with its lstat; symbolic links are not followed
+def _walkFiles(dir:Path) -> Iterator[tuple[Path, os.stat_result]] :
+    with os.scandir(dir) as entries :
+        for entry in entries :
+            stat_result:os.stat_result = entry.stat(follow_symlinks=False)
+            if stat.S_ISDIR(stat_result.st_mode) :
+                yield from _walkFiles(dir / entry.name)
+            elif stat.S_ISREG(stat_result.st_mode) :
+                yield dir / entry.name, stat_result
+
+
+class ManifestError(UtilityError) :
+    """Raised by the manifest utility functions to indicate some issue."""
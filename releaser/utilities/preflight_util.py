@@ -0,0 +1,122 @@
+import logging
+import os
+import shutil
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional
+from .errors_util import UtilityError
+
+_logger:logging.Logger = logging.getLogger(__name__)
+
+
+def runChecks(checks:dict[str, Callable[[], None]], workers:Optional[int] = None) -> dict[str, float] :
+    """
+    Run pre-flight checks at once, each on its own thread, and wait for them all - so that everything wrong is reported
+    together, in the time the slowest check takes. A check passes unless it raises.
+
+    Args:
+        checks (dict[str, Callable[[], None]]): The checks, by name.
+        workers (Optional[int], optional): The most checks run at once. Defaults to all of them.
+
+    Returns:
+        dict[str, float]: The seconds each check took, by name.
+
+    Raises:
+        PreflightError: If any check failed, with every failure in failures.
+    """
+    if not checks :
+        return {}
+
+    def timed(check:Callable[[], None]) -> float :
+        start:float = time.perf_counter()
+        check()
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=workers or len(checks), thread_name_prefix="releaser-preflight") as executor :
+        futures:dict[str, Future] = {name : executor.submit(timed, check) for name, check in checks.items()}
+
+    seconds:dict[str, float] = {}
+    failures:dict[str, str] = {}
+    for name, future in futures.items() :
+        try :
+            seconds[name] = future.result()
+        except Exception as e :
+            failures[name] = str(e) or type(e).__name__
+    if failures :
+        raise PreflightError("Pre-flight checks failed: " + "; ".join(f"{name}: {message}" for name, message in failures.items()), failures)
+    _logger.debug(f"Pre-flight checks passed: {', '.join(f'{name} ({seconds[name] * 1000:.0f}ms)' for name in checks)}")
+    return seconds
+
+
+def checkReadableFile(path:str) :
+    """
+    Check a file exists and can be read.
+
+    Args:
+        path (str): The file.
+
+    Raises:
+        PreflightError: If it does not exist, is not a file or cannot be read.
+    """
+    if not os.path.isfile(path) :
+        raise PreflightError(f"{path} does not exist or is not a file")
+    try :
+        with open(path, "rb") :
+            pass
+    except OSError as e :
+        raise PreflightError(f"{path} cannot be read: {e.strerror}") from e
+
+
+def checkWritableDirectory(path:str) :
+    """
+    Check a directory can be written to or, if it does not exist yet, created: the nearest part of the path that exists
+    must be a directory this process can write to.
+
+    Args:
+        path (str): The directory.
+
+    Raises:
+        PreflightError: If it (or the nearest part of the path that exists) is not a directory, or is not writable.
+    """
+    existing:str = _nearestExisting(path)
+    if not os.path.isdir(existing) :
+        raise PreflightError(f"{existing} is not a directory" if existing == os.path.abspath(path) else f"{path} cannot be created: {existing} is not a directory")
+    if not os.access(existing, os.W_OK | os.X_OK) :
+        raise PreflightError(f"{existing} is not writable")
+
+
+def checkFreeSpace(path:str, minimum:int) :
+    """
+    Check the file system a directory is (or will be) on has at least some space free.
+
+    Args:
+        path (str): The directory (which need not exist yet).
+        minimum (int): The fewest bytes that must be free.
+
+    Raises:
+        PreflightError: If less is free.
+    """
+    free:int = shutil.disk_usage(_nearestExisting(path)).free
+    if free < minimum :
+        raise PreflightError(f"Only {free / 2**20:.0f}MiB is free for {path} (at least {minimum / 2**20:.0f}MiB is needed)")
+
+
+def _nearestExisting(path:str) -> str :
+    path = os.path.abspath(path)
+    while not os.path.lexists(path) and os.path.dirname(path) != path :
+        path = os.path.dirname(path)
+    return path
+
+
+class PreflightError(UtilityError) :
+    """
+    Raised when pre-flight checks fail.
+
+    Args:
+        message (str): What was wrong.
+        failures (Optional[dict[str, str]], optional): For runChecks, what each check that failed found, by name. Defaults to None.
+    """
+
+    def __init__(self, message:str, failures:Optional[dict[str, str]] = None) :
+        super().__init__(message)
+        self.failures:dict[str, str] = failures or {}
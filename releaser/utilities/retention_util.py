@@ -0,0 +1,202 @@
+import fnmatch
+import logging
+import re
+import time
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Iterable, Optional
+from . import file_util
+from .errors_util import UtilityError
+
+_logger:logging.Logger = logging.getLogger(__name__)
+
+# Runs of digits (dates, times, versions) are what distinguish one release of a kind from the next
+_DIGITS:re.Pattern = re.compile(r"\d+")
+
+# The files built alongside a release (its parts and their index, its checksums and its deltas), named after its stem
+_RELEASE_FILE:re.Pattern = re.compile(r"^(?P<stem>.+?)(?:\.part\d+\.zip|\.index\.json|\.SHA256SUMS|\.delta-.+\.zip|\.delta-.+\.deleted\.txt|\.zip)$")
+
+
+@dataclass
+class RetentionPolicy() :
+    """
+    Which releases to keep. A release - with all of its files (see releaseOf) - is removed if any of the policies that are
+    set says so.
+
+    Args:
+        keep_last (Optional[int]): Keep only the newest N releases of each kind (see familyOf).
+        max_age (Optional[timedelta]): Remove releases older than this.
+        max_total_bytes (Optional[int]): Remove the oldest releases until the releases kept take up no more than this.
+    """
+    keep_last:Optional[int] = None
+    max_age:Optional[timedelta] = None
+    max_total_bytes:Optional[int] = None
+
+
+    def isSet(self) -> bool :
+        """
+        Test whether any policy is set.
+
+        Returns:
+            bool: True if at least one policy is set (otherwise nothing is ever removed).
+        """
+        return self.keep_last is not None or self.max_age is not None or self.max_total_bytes is not None
+
+
+@dataclass
+class PruneReport() :
+    """
+    What a prune kept and removed (or, for a dry run, would have removed).
+
+    Args:
+        dry_run (bool): True if nothing was actually removed.
+        kept (list[file_util.FileEntry]): The files kept, newest first.
+        removed (list[tuple[file_util.FileEntry, str]]): The files removed, newest first, with the reason why.
+    """
+    dry_run:bool = False
+    kept:list[file_util.FileEntry] = field(default_factory=list)
+    removed:list[tuple[file_util.FileEntry, str]] = field(default_factory=list)
+
+
+    def bytesFreed(self) -> int :
+        """
+        Get the number of bytes the removed files took up.
+
+        Returns:
+            int: The number of bytes.
+        """
+        return sum(entry.size for entry, _ in self.removed)
+
+
+    def describe(self) -> list[str] :
+        """
+        Describe the outcome, a line per file removed followed by a summary.
+
+        Returns:
+            list[str]: The lines of the report.
+        """
+        verb:str = "Would remove" if self.dry_run else "Removed"
+        lines:list[str] = [f"{verb} {entry.name} ({entry.size} bytes, {_age(entry).days} days old): {reason}" for entry, reason in self.removed]
+        lines.append(f"{verb} {len(self.removed)} files ({self.bytesFreed()} bytes), kept {len(self.kept)} files ({sum(entry.size for entry in self.kept)} bytes)")
+        return lines
+
+
+def releaseOf(name:str) -> str :
+    """
+    Get the release a file belongs to: the stem it is named after, so that frontend-20250101.zip, its parts
+    (frontend-20250101.part001.zip), their index (frontend-20250101.index.json), its checksums and its deltas all belong to
+    frontend-20250101. A file that isn't named like a release file is a release of its own.
+
+    Args:
+        name (str): The name of the file.
+
+    Returns:
+        str: The release.
+    """
+    match:Optional[re.Match] = _RELEASE_FILE.match(name)
+    return match.group("stem") if match else name
+
+
+def familyOf(name:str) -> str :
+    """
+    Get the kind of release a file belongs to, by blanking out the digits in its release's name, so that
+    frontend-20250101.zip, frontend-20250102.part001.zip and frontend-20250102.SHA256SUMS are the same kind, but
+    backend-20250101.zip is not.
+
+    Args:
+        name (str): The name of the file.
+
+    Returns:
+        str: The kind of release.
+    """
+    return _DIGITS.sub("#", releaseOf(name))
+
+
+def prune(dir:str, policy:RetentionPolicy, filePattern:str = "*", dryRun:bool = False, protect:Iterable[str] = ()) -> PruneReport :
+    """
+    Remove the release files in a directory that the policy doesn't keep. Releases are kept or removed whole - every part,
+    index, checksum and delta file of a release together (see releaseOf) - so no release is left half there. Everything is
+    decided from a single scan of the directory.
+
+    Args:
+        dir (str): The directory holding the releases.
+        policy (RetentionPolicy): The retention policy.
+        filePattern (str, optional): Only files matching this pattern are considered. Defaults to '*'.
+        dryRun (bool, optional): If True, report what would be removed without removing anything. Defaults to False.
+        protect (Iterable[str], optional): File name patterns that are never removed, along with the rest of their release (for example the release just built). Defaults to none.
+
+    Returns:
+        PruneReport: What was kept and removed.
+
+    Raises:
+        RetentionError: If a file cannot be removed.
+    """
+    _logger.debug(f"Pruning {dir} ({filePattern}) with {policy}{' (dry run)' if dryRun else ''}")
+    report:PruneReport = PruneReport(dry_run=dryRun)
+    entries:list[file_util.FileEntry] = sorted(file_util.scanDirectory(dir, filePattern), key=lambda entry : (-entry.mtime, entry.name))
+    protect_patterns:list[str] = list(protect)
+    protected:set[str] = {entry.name for entry in entries if any(fnmatch.fnmatchcase(entry.name, pattern) for pattern in protect_patterns)}
+
+    reasons:dict[str, str] = _selectForRemoval(entries, policy, protected)
+    for entry in entries :
+        if entry.name in reasons :
+            report.removed.append((entry, reasons[entry.name]))
+        else :
+            report.kept.append(entry)
+
+    if not dryRun :
+        for entry, reason in report.removed :
+            try :
+                file_util.delete(entry.path)
+            except OSError as e :
+                raise RetentionError(f"Failed to remove {entry.path}: {e}") from e
+
+    for line in report.describe() :
+        _logger.info(line)
+    return report
+
+
+# Decides which of the entries (newest first) to remove, returning the reason for each by name. Releases are decided on
+# whole: a release is as new as its newest file, takes up the space of all of them, and is protected if any of them is.
+def _selectForRemoval(entries:list[file_util.FileEntry], policy:RetentionPolicy, protected:set[str]) -> dict[str, str] :
+    releases:dict[str, list[file_util.FileEntry]] = {}
+    for entry in entries :
+        releases.setdefault(releaseOf(entry.name), []).append(entry)
+    protected_releases:set[str] = {release for release, files in releases.items() if any(entry.name in protected for entry in files)}
+
+    reasons:dict[str, str] = {}
+    seen_per_family:dict[str, int] = {}
+    # The entries are newest first, so the releases are too, by their newest file
+    for release, files in releases.items() :
+        family:str = _DIGITS.sub("#", release)
+        seen_per_family[family] = seen_per_family.get(family, 0) + 1
+        if release in protected_releases :
+            continue
+        if policy.keep_last is not None and seen_per_family[family] > policy.keep_last :
+            reasons[release] = f"more than the newest {policy.keep_last} of {family}"
+        elif policy.max_age is not None and _age(files[0]) > policy.max_age :
+            reasons[release] = f"older than {policy.max_age.days} days"
+
+    # Of whatever is left, the newest releases get the space budget first
+    if policy.max_total_bytes is not None :
+        total:int = sum(entry.size for release in protected_releases for entry in releases[release])
+        over_budget:bool = False
+        for release, files in releases.items() :
+            if release in protected_releases or release in reasons :
+                continue
+            size:int = sum(entry.size for entry in files)
+            over_budget = over_budget or total + size > policy.max_total_bytes
+            if over_budget :
+                reasons[release] = f"over the {policy.max_total_bytes} byte budget"
+            else :
+                total += size
+
+    return {entry.name : reasons[release] for release, files in releases.items() if release in reasons for entry in files}
+
+
+def _age(entry:file_util.FileEntry) -> timedelta :
+    return timedelta(seconds=max(0.0, time.time() - entry.mtime))
+
+
+class RetentionError(UtilityError) :
+    """Raised by the retention utility functions to indicate some issue."""
@@ -0,0 +1,195 @@
+import contextvars
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable, Optional
+from .errors_util import UtilityError
+
+_logger:logging.Logger = logging.getLogger(__name__)
+
+
+class TaskGraph() :
+    """
+    Runs a small graph of tasks on a pool of threads: each task starts as soon as every task it comes after has finished,
+    so independent tasks (a network round trip and a local build, say) overlap. Tasks are added in an order that respects
+    their dependencies (a task can only come after tasks already added), which keeps the graph acyclic.
+
+    If a task fails, the tasks that come after it are not run, the tasks already running are waited for, and run() raises
+    the error of the first task that failed.
+
+    Each task runs in a copy of the context run() was called in (see contextvars), so what the caller has set there - such
+    as the job it is running, see daemon_util - holds for its tasks too.
+
+    Args:
+        workers (Optional[int], optional): The most tasks run at once. Defaults to as many as there are tasks.
+    """
+
+    def __init__(self, workers:Optional[int] = None) :
+        self._workers:Optional[int] = workers
+        self._tasks:dict[str, _Task] = {}
+        self._lock:threading.Lock = threading.Lock()
+        self._executor:Optional[ThreadPoolExecutor] = None
+        self._context:Optional[contextvars.Context] = None
+        self._start:float = 0.0
+
+
+    def add(self, name:str, function:Callable[[], Any], after:Iterable[str] = ()) :
+        """
+        Add a task.
+
+        Args:
+            name (str): The task's name (e.g. the stage it runs).
+            function (Callable[[], Any]): Runs the task, returning its result.
+            after (Iterable[str], optional): The tasks it must come after. Defaults to none.
+
+        Raises:
+            TaskError: If the name is taken, or a task it comes after has not been added.
+        """
+        if name in self._tasks :
+            raise TaskError(f"There is already a task {name}")
+        unknown:list[str] = [dependency for dependency in after if dependency not in self._tasks]
+        if unknown :
+            raise TaskError(f"Task {name} comes after tasks that have not been added: {', '.join(unknown)}")
+        task:_Task = _Task(name, function, [self._tasks[dependency] for dependency in after])
+        for dependency in task.after :
+            dependency.before.append(task)
+        self._tasks[name] = task
+
+
+    def result(self, name:str, timeout:Optional[float] = None) -> Any :
+        """
+        Wait for a task to finish and return its result - for a task that needs another's result part way through, rather
+        than only once it has finished (when it would come after it).
+
+        Args:
+            name (str): The task.
+            timeout (Optional[float], optional): The most seconds to wait. Defaults to waiting for ever.
+
+        Returns:
+            Any: What the task returned.
+
+        Raises:
+            Exception: What the task raised, or TaskError if it was not run because a task it comes after failed.
+        """
+        return self._tasks[name].future.result(timeout)
+
+
+    def run(self) -> 'TaskReport' :
+        """
+        Run the tasks, and wait for them all.
+
+        Returns:
+            TaskReport: When each task ran.
+
+        Raises:
+            Exception: The error of the first task that failed.
+        """
+        tasks:list[_Task] = list(self._tasks.values())
+        if not tasks :
+            return TaskReport({})
+        self._start = time.perf_counter()
+        self._context = contextvars.copy_context()
+        with ThreadPoolExecutor(max_workers=self._workers or len(tasks), thread_name_prefix="releaser-task") as executor :
+            self._executor = executor
+            for task in tasks :
+                if not task.after :
+                    self._submit(task)
+            wait([task.future for task in tasks])
+        self._executor = None
+        self._context = None
+
+        failed:list[_Task] = sorted((task for task in tasks if task.error is not None), key=lambda task : task.finished)
+        if failed :
+            raise failed[0].error
+        return TaskReport({task.name : (task.started, task.finished) for task in tasks}, _criticalPath(tasks))
+
+
+    def _execute(self, task:'_Task') :
+        task.started = time.perf_counter() - self._start
+        try :
+            value:Any = task.function()
+        except BaseException as e :
+            task.finished = time.perf_counter() - self._start
+            task.error = e
+            _logger.debug(f"Task {task.name} failed after {task.finished - task.started:.3f}s: {e}")
+            self._skip(task.before, task.name)
+            task.future.set_exception(e)
+            return
+        task.finished = time.perf_counter() - self._start
+        task.future.set_result(value)
+
+        with self._lock :
+            for following in task.before :
+                following.waiting -= 1
+                if following.waiting == 0 and not following.future.done() :
+                    self._submit(following)
+
+
+    # A context can only be entered by one thread at a time, so each task is given its own copy
+    def _submit(self, task:'_Task') :
+        self._executor.submit(self._context.copy().run, self._execute, task)
+
+
+    def _skip(self, tasks:list['_Task'], failed:str) :
+        for task in tasks :
+            with self._lock :
+                if task.future.done() :
+                    continue
+                task.future.set_exception(TaskError(f"Task {task.name} was not run, because {failed} failed"))
+            self._skip(task.before, failed)
+
+
+@dataclass
+class TaskReport() :
+    """
+    When each task of a graph ran.
+
+    Args:
+        spans (dict[str, tuple[float, float]]): The seconds after the graph started that each task started and finished, by name.
+        critical_path (list[tuple[str, float]], optional): The critical path - the chain of tasks, each waiting on the one
+            before, that ended with the task that finished last (speeding up any other task would not have made the graph
+            any quicker) - first to last, with the seconds each took. Defaults to empty.
+    """
+    spans:dict[str, tuple[float, float]]
+    critical_path:list[tuple[str, float]] = field(default_factory=list)
+
+
+    @property
+    def seconds(self) -> float :
+        """The seconds the graph took to run."""
+        return max((finished for _, finished in self.spans.values()), default=0.0)
+
+
+    def describe(self) -> str :
+        """The critical path, as text (e.g. "clone 3.10s > build 2.00s > upload 0.40s of 5.60s")."""
+        return " > ".join(f"{name} {seconds:.2f}s" for name, seconds in self.critical_path) + f" of {self.seconds:.2f}s"
+
+
+# Walks back from the task that finished last, through whichever task it came after finished last
+def _criticalPath(tasks:list['_Task']) -> list[tuple[str, float]] :
+    path:list[tuple[str, float]] = []
+    task:Optional[_Task] = max(tasks, key=lambda task : task.finished, default=None)
+    while task is not None :
+        path.append((task.name, task.finished - task.started))
+        task = max(task.after, key=lambda dependency : dependency.finished, default=None)
+    return list(reversed(path))
+
+
+class _Task() :
+
+    def __init__(self, name:str, function:Callable[[], Any], after:list['_Task']) :
+        self.name:str = name
+        self.function:Callable[[], Any] = function
+        self.after:list[_Task] = after
+        self.before:list[_Task] = []
+        self.waiting:int = len(after)
+        self.future:Future = Future()
+        self.started:float = 0.0
+        self.finished:float = 0.0
+        self.error:Optional[BaseException] = None
+
+
+class TaskError(UtilityError) :
+    """Raised by the task utility functions to indicate some issue."""
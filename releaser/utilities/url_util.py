@@ -0,0 +1,164 @@
+import os
+import re
+from typing import NamedTuple, Optional
+from urllib.parse import urlsplit
+from .errors_util import UtilityError
+
+# The URL schemes git remotes can use (as well as absolute paths and scp-style [user@]host:path)
+REMOTE_SCHEMES:tuple[str, ...] = ("http", "https", "ssh", "git", "file")
+
+# scp-style remotes: [user@]host:path, where no '/' comes before the ':' (as git tells them apart from paths)
+_SCP_REMOTE:re.Pattern = re.compile(r"^(?:(?P<user>[^@/:\s]+)@)?(?P<host>[A-Za-z0-9._-]+|\[[0-9A-Fa-f:.]+\]):(?P<path>[^\s]+)$")
+
+
+class RemoteUrl(NamedTuple) :
+    """
+    A git remote, as parsed by parseRemote.
+
+    Args:
+        scheme (str): One of REMOTE_SCHEMES ('ssh' for scp-style remotes, 'file' for absolute paths).
+        host (Optional[str]): The host, or None for a local remote.
+        path (str): The path of the repository on the host (or on this machine).
+        user (Optional[str], optional): The user, if given. Defaults to None.
+        port (Optional[int], optional): The port, if given. Defaults to None.
+    """
+    scheme:str
+    host:Optional[str]
+    path:str
+    user:Optional[str] = None
+    port:Optional[int] = None
+
+
+    def isLocal(self) -> bool :
+        """
+        Test whether the remote is on this machine (a file:// URL or a path), such as a mirror on a local or NFS disk.
+
+        Returns:
+            bool: True if the remote is local.
+        """
+        return self.scheme == "file"
+
+
+def parseRemote(url:str) -> RemoteUrl :
+    """
+    Parse a git remote: an http(s)://, ssh://, git:// or file:// URL, an absolute path, or an scp-style [user@]host:path.
+
+    Args:
+        url (str): The remote.
+
+    Returns:
+        RemoteUrl: The parsed remote.
+
+    Raises:
+        UrlError: If the remote is not one of the above, or is malformed (for example has no host, or has a host or path
+            that git could mistake for a command line option).
+    """
+    if not url or not isinstance(url, str) or any(ord(character) < 0x20 or character.isspace() for character in url) :
+        raise UrlError(f"Invalid remote: {url!r}")
+
+    if "://" in url :
+        try :
+            parts = urlsplit(url)
+            port:Optional[int] = parts.port
+        except ValueError as e :
+            raise UrlError(f"Invalid remote URL {url}: {e}") from e
+        scheme:str = parts.scheme.lower()
+        if scheme not in REMOTE_SCHEMES :
+            raise UrlError(f"Unsupported remote URL scheme '{parts.scheme}' in {url} (expected one of {', '.join(REMOTE_SCHEMES)})")
+        if scheme == "file" :
+            if parts.hostname not in (None, "", "localhost") or not parts.path.startswith("/") :
+                raise UrlError(f"Invalid file URL {url}: it must be file:///absolute/path")
+            return RemoteUrl("file", None, parts.path)
+        if not parts.hostname or parts.hostname.startswith("-") or not parts.path.strip("/") :
+            raise UrlError(f"Invalid remote URL {url}: it must have a host and a repository path")
+        return RemoteUrl(scheme, parts.hostname, parts.path, parts.username, port)
+
+    if os.path.isabs(url) :
+        return RemoteUrl("file", None, url)
+
+    match:Optional[re.Match] = _SCP_REMOTE.match(url)
+    if match is None or match["host"].startswith("-") or match["path"].startswith("-") :
+        raise UrlError(f"Invalid remote: {url} (expected a URL, an absolute path or [user@]host:path)")
+    return RemoteUrl("ssh", match["host"], match["path"], match["user"])
+
+
+def isValidRemote(url:str) -> bool :
+    """
+    Test whether a string is a git remote that parseRemote accepts.
+
+    Args:
+        url (str): The string to test.
+
+    Returns:
+        bool: True if it is a valid remote.
+    """
+    try :
+        parseRemote(url)
+        return True
+    except UrlError :
+        return False
+
+
+def mirrorRewrites(mirrorRoot:str, hosts:tuple[str, ...] = ("github.com",)) -> dict[str, str] :
+    """
+    Build the rewrites (as git's url.<base>.insteadOf does) that redirect the repositories of the given hosts, whichever way
+    they are addressed (https, ssh or scp-style), to a mirror root, so https://github.com/owner/repo.git is fetched from
+    <mirrorRoot>/owner/repo.git.
+
+    Args:
+        mirrorRoot (str): The mirror root: an absolute path, or any remote URL the repositories can be found under.
+        hosts (tuple[str, ...], optional): The hosts to redirect. Defaults to GitHub.
+
+    Returns:
+        dict[str, str]: The replacement for each URL prefix.
+
+    Raises:
+        UrlError: If the mirror root is not a valid remote.
+    """
+    parseRemote(mirrorRoot)
+    base:str = mirrorRoot.rstrip("/") + "/"
+    rewrites:dict[str, str] = {}
+    for host in hosts :
+        for prefix in (f"https://{host}/", f"http://{host}/", f"ssh://git@{host}/", f"git@{host}:") :
+            rewrites[prefix] = base
+    return rewrites
+
+
+def rewrite(url:str, rewrites:Optional[dict[str, str]]) -> str :
+    """
+    Apply rewrites to a URL as git applies insteadOf: the longest matching prefix is replaced.
+
+    Args:
+        url (str): The URL.
+        rewrites (Optional[dict[str, str]]): The replacement for each URL prefix.
+
+    Returns:
+        str: The rewritten URL (or the URL as it is, if no prefix matches).
+    """
+    matching:list[str] = [prefix for prefix in (rewrites or {}) if url.startswith(prefix)]
+    if not matching :
+        return url
+    prefix:str = max(matching, key=len)
+    return rewrites[prefix] + url[len(prefix):]
+
+
+def gitConfigFor(rewrites:Optional[dict[str, str]]) -> list[str] :
+    """
+    Get the git configuration (as name=value, to pass with -c) that makes git itself apply the rewrites, for example to the
+    submodules it clones. Local transport is allowed for submodules too if any rewrite leads to a local mirror, as git
+    otherwise refuses it.
+
+    Args:
+        rewrites (Optional[dict[str, str]]): The replacement for each URL prefix.
+
+    Returns:
+        list[str]: The configuration settings.
+    """
+    settings:list[str] = [f"url.{base}.insteadOf={prefix}" for prefix, base in (rewrites or {}).items()]
+    if any(parseRemote(base).isLocal() for base in (rewrites or {}).values()) :
+        settings.append("protocol.file.allow=always")
+    return settings
+
+
+class UrlError(UtilityError) :
+    """Raised by the URL utility functions to indicate some issue."""
@@ -1,20 +1,82 @@
+import hashlib
+import json
 import logging
+import mmap
+import os
+import threading
+from collections import deque
+import shutil
+import stat
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import Callable, Iterator, Mapping, NamedTuple, Optional, Union
 import zipfile
+import zlib
 from zipfile import ZipFile
-from . import file_util
+from . import cache_util, file_util, hash_util, manifest_util
 from .errors_util import UtilityError
 
 _logger:logging.Logger = logging.getLogger(__name__)
 
-def zip(sourceDir:str, zipDir:str, zipName:str) -> str :
+# Reproducible archives: entries are stamped with this time unless told otherwise (the earliest a zip can record, 1980-01-01)
+EARLIEST_TIMESTAMP:int = 315532800
+
+# Reproducible archives: a fixed compression level, so the output does not depend on the library's default
+REPRODUCIBLE_COMPRESS_LEVEL:int = 6
+
+# Read-ahead: the files read ahead of the compressor are held in buffers taking up no more than this in total
+READ_AHEAD_MEMORY:int = 64 * 1024 * 1024
+
+# Read-ahead: at most this many files are read ahead of the compressor
+READ_AHEAD_FILES:int = 32
+
+# Read-ahead: files at least this large (or larger than the memory cap) are memory mapped rather than read into a buffer
+MMAP_MIN_SIZE:int = 16 * 1024 * 1024
+
+# Extracted files at least this large have their space preallocated (for smaller files it costs more than it saves)
+PREALLOCATE_MIN_SIZE:int = 1024 * 1024
+
+# The fixed-size part of a member's local file header, which is followed by its name and extra field
+_LOCAL_HEADER:struct.Struct = struct.Struct("<4s2B4HL2L2H")
+
+def zip(sourceDir:str, zipDir:str, zipName:str, digests:Optional[dict[str, str]] = None, manifest:Optional[manifest_util.ManifestIndex] = None, reproducible:bool = False, timestamp:Optional[int] = None, followSymlinks:bool = False, dedup:bool = False, readAheadMemory:int = READ_AHEAD_MEMORY, cache:Optional[cache_util.CompressionCache] = None, blobShas:Optional[Mapping[str, str]] = None, paths:Optional[list[str]] = None, exclude:Optional[list[str]] = None) -> str :
     """
     Zips the specified directory to the specified target directory.
+    Symbolic links are stored as links (as zip and unzip -X do on Unix) rather than having what they point at copied in.
+    Files are read (and hashed) by a small pool of threads ahead of the compressor, so reading and compressing overlap.
 
     Args:
         sourceDir (str): The directory to zip.
         zipDir (str): The directory to place the zip file in.
         zipName (str): The name of the zip file.
+        digests (Optional[dict[str, str]], optional): If given, the SHA-256 digest of every file zipped is added to it (keyed by
+            path within the archive). The files are hashed in parallel as the archiver walks the directory. Defaults to None.
+        manifest (Optional[manifest_util.ManifestIndex], optional): If given, files it records as unchanged (by their stat or,
+            given blobShas, their git blob) are not hashed again, and it is updated with what was zipped. Defaults to None.
+        reproducible (bool, optional): If True, the archive is byte-identical for identical contents: entries are sorted by path,
+            stamped with the timestamp, given normalised permissions (0644, or 0755 if executable) and compressed at a fixed level.
+            Defaults to False.
+        timestamp (Optional[int], optional): The time (seconds since the epoch, e.g. SOURCE_DATE_EPOCH) to stamp the entries of
+            a reproducible archive with. Defaults to 1980-01-01.
+        followSymlinks (bool, optional): If True, symbolic links are replaced by what they point at, except where that would
+            loop back on itself or archive a directory a second time (such links are stored as links). Defaults to False.
+        dedup (bool, optional): If True, files whose content is identical to a file earlier in path order are stored as relative
+            symbolic links to it rather than a second copy. Defaults to False.
+        readAheadMemory (int, optional): The most memory the files read ahead of the compressor may take up. Defaults to 64MiB.
+        cache (Optional[cache_util.CompressionCache], optional): If given, files it holds a compressed payload for are not
+            compressed again (their payload is copied into the archive as it is), and what is compressed is added to it.
+            Defaults to None.
+        blobShas (Optional[Mapping[str, str]], optional): The git blob SHAs of the files (keyed by path within the archive), to
+            identify their content to the cache and the manifest by. Files without one are identified by their SHA-256 digest
+            (and their stat, to the manifest). Only for files unchanged since they were checked out. Defaults to None.
+        paths (Optional[list[str]], optional): If given, only these paths (relative to the source directory, e.g. the files
+            tracked by git) are zipped, rather than everything under it. Paths that are not files or links are skipped.
+            Defaults to None.
+        exclude (Optional[list[str]], optional): If given, these paths (relative to the source directory) and everything under
+            them are left out - as if they had been deleted first, but without walking into them. Defaults to None.
         
     Returns:
         str: The path to the zip file.
@@ -31,17 +93,32 @@ def zip(sourceDir:str, zipDir:str, zipName:str) -> str :
     # Create the path to the zip file
     zip_path:str = f"{zipDir}/{zipName}"  
 
-    # delete the zip file if it already exists
-    file_util.delete(zip_path) 
-
     # Convert to Path object
     dir:Path = Path(sourceDir)
     
     # Zip the directory
     try :
-        with _createZipFileForWrite(zip_path) as zip_file:
-            for entry in dir.rglob("*"):
-                zip_file.write(entry, entry.relative_to(dir))
+        date_time:Optional[tuple] = _zipDateTime(timestamp) if reproducible else None
+        entries:list[_TreeEntry] = _entries(dir, paths, followSymlinks, exclude)
+        if reproducible :
+            entries = _archiveOrder(dir, entries)
+        links:dict[Path, str] = _duplicates(dir, entries) if dedup else {}
+        hashing:bool = digests is not None or manifest is not None
+        # Written alongside and moved into place (replacing the last build) once complete, as _writeArchive does
+        with file_util.atomicPath(zip_path) as temporary_path, _createZipFileForWrite(temporary_path) as zip_file, _treeHasher(sourceDir, manifest, blobShas) as hasher :
+            # Files are hashed from what is read to archive them, unless the manifest already has their digest
+            # (or, for the compression cache, if it has no blob SHA to be identified by)
+            def shouldHash(entry:_TreeEntry) -> bool :
+                if not hashing and (cache is None or _contentKey(dir, entry, None, blobShas) is not None) :
+                    return False
+                return hasher.reusableDigest(entry.path, entry.stat) is None
+
+            for entry, data, digest in _ReadAhead(entries, readAheadMemory, shouldHash) :
+                if hashing :
+                    hasher.add(entry.path, entry.stat, digest)
+                content_key:Optional[str] = _contentKey(dir, entry, digest or hasher.reusableDigest(entry.path, entry.stat), blobShas) if cache is not None else None
+                _writeEntry(zip_file, dir, entry, date_time, links.get(entry.path), data, cache, content_key)
+            _collectDigests(hasher, digests, manifest)
     except Exception as exc :
         _logger.error(f"Unable to zip {sourceDir} -> {zip_path}", exc_info=True)
         raise ZipError(f"Unable to zip {sourceDir} -> {zip_path}") from exc
@@ -52,13 +129,151 @@ def zip(sourceDir:str, zipDir:str, zipName:str) -> str :
     return zip_path
 
 
-def unzip(zipPath:str, targetDir:str) :
+def zipFiles(sourceDir:str, zipDir:str, zipName:str, paths:list[str], reproducible:bool = False, timestamp:Optional[int] = None) -> str :
+    """
+    Zips the given files (paths relative to the source directory) to the specified target directory.
+    Paths that no longer exist (for example because they were cleaned) are skipped. Symbolic links are stored as links.
+
+    Args:
+        sourceDir (str): The directory the paths are relative to.
+        zipDir (str): The directory to place the zip file in.
+        zipName (str): The name of the zip file.
+        paths (list[str]): The paths to include.
+        reproducible (bool, optional): If True, the archive is byte-identical for identical contents (see zip). Defaults to False.
+        timestamp (Optional[int], optional): The time to stamp the entries of a reproducible archive with. Defaults to 1980-01-01.
+
+    Returns:
+        str: The path to the zip file.
+
+    Raises:
+        ZipError: If an error is encountered.
+    """
+    _logger.debug(f"Zipping {len(paths)} paths from {sourceDir} -> {zipDir}/{zipName}")
+
+    # Validate the source and target directories
+    _validateSourceDirectory(sourceDir)
+    _validateTargetDirectory(zipDir)
+
+    zip_path:str = f"{zipDir}/{zipName}"
+    dir:Path = Path(sourceDir)
+    entries:list[_TreeEntry] = _listedEntries(dir, paths)
+
+    try :
+        _writeArchive(dir, zip_path, entries, _zipDateTime(timestamp) if reproducible else None)
+    except Exception as exc :
+        _logger.error(f"Unable to zip {sourceDir} -> {zip_path}", exc_info=True)
+        raise ZipError(f"Unable to zip {sourceDir} -> {zip_path}") from exc
+
+    _logger.debug(f"Zipped {len(entries)} files from {sourceDir} -> {zip_path}")
+    return zip_path
+
+
+def zipParts(sourceDir:str, zipDir:str, zipName:str, maxPartSize:int, workers:Optional[int] = None, onPartCompleted:Optional[Callable[[str], None]] = None, digests:Optional[dict[str, str]] = None, manifest:Optional[manifest_util.ManifestIndex] = None, reproducible:bool = False, timestamp:Optional[int] = None, followSymlinks:bool = False, dedup:bool = False, readAheadMemory:int = READ_AHEAD_MEMORY, cache:Optional[cache_util.CompressionCache] = None, blobShas:Optional[Mapping[str, str]] = None, paths:Optional[list[str]] = None, exclude:Optional[list[str]] = None) -> 'SplitArchive' :
+    """
+    Zips the specified directory into a number of self-contained part archives, none of which (unless a single file is larger
+    than the limit) hold more than maxPartSize bytes of content. Files are bin-packed by size (first-fit decreasing), the parts
+    are written concurrently and an index file mapping each path to the part holding it is written alongside the parts.
+
+    Args:
+        sourceDir (str): The directory to zip.
+        zipDir (str): The directory to place the part files (and index) in.
+        zipName (str): The name of the (unsplit) zip file, e.g. release.zip. Parts are named release.part001.zip etc.
+        maxPartSize (int): The maximum number of bytes of (uncompressed) content per part.
+        workers (Optional[int], optional): The number of parts to build concurrently. Defaults to the number of CPUs.
+        onPartCompleted (Optional[Callable[[str], None]], optional): Called with the path of each part as soon as it is written.
+        digests (Optional[dict[str, str]], optional): If given, the SHA-256 digest of every file zipped is added to it (keyed by
+            path within the archive). The files are hashed in parallel as they are packed. Defaults to None.
+        manifest (Optional[manifest_util.ManifestIndex], optional): If given, files it records as unchanged are not hashed
+            again, and it is updated with what was zipped. Defaults to None.
+        reproducible (bool, optional): If True, each part is byte-identical for identical contents (see zip). Defaults to False.
+        timestamp (Optional[int], optional): The time to stamp the entries of reproducible parts with. Defaults to 1980-01-01.
+        followSymlinks (bool, optional): If True, symbolic links are replaced by what they point at (see zip). Defaults to False.
+        dedup (bool, optional): If True, duplicate files are stored as links to the first copy (see zip), which is always placed
+            in the same part so that each part stays self-contained. Defaults to False.
+        readAheadMemory (int, optional): The most memory the files read ahead of the compressors (shared between the parts
+            being built) may take up. Defaults to 64MiB.
+        cache (Optional[cache_util.CompressionCache], optional): If given, files it holds a compressed payload for are not
+            compressed again, and what is compressed is added to it (see zip). Defaults to None.
+        blobShas (Optional[Mapping[str, str]], optional): The git blob SHAs of the files, to identify their content to the cache
+            and the manifest by (see zip). Defaults to None.
+        paths (Optional[list[str]], optional): If given, only these paths are zipped (see zip). Defaults to None.
+        exclude (Optional[list[str]], optional): If given, these paths and everything under them are left out (see zip). Defaults to None.
+
+    Returns:
+        SplitArchive: The paths to the parts and the index file.
+
+    Raises:
+        ZipError: If an error is encountered.
+    """
+    _logger.debug(f"Zipping {sourceDir} -> {zipDir}/{zipName} in parts of at most {maxPartSize} bytes")
+
+    # Validate the source and target directories
+    _validateSourceDirectory(sourceDir)
+    _validateTargetDirectory(zipDir)
+    if maxPartSize <= 0 :
+        raise ZipError(f"The maximum part size must be positive, not {maxPartSize}.")
+
+    # Pack the files into parts (hashing them on the way if asked to)
+    dir:Path = Path(sourceDir)
+    with _treeHasher(sourceDir, manifest, blobShas) as hasher :
+        bins:list[_PartBin] = _packParts(dir, maxPartSize, hasher if digests is not None or manifest is not None else None, followSymlinks, dedup, paths, exclude)
+        _collectDigests(hasher, digests, manifest)
+    stem:str = zipName[:-len(".zip")] if zipName.endswith(".zip") else zipName
+    width:int = max(3, len(str(len(bins))))
+    part_names:list[str] = [f"{stem}.part{number:0{width}d}.zip" for number in range(1, len(bins) + 1)]
+
+    # Build the parts concurrently, handing each one over as soon as it is complete
+    split:SplitArchive = SplitArchive(index_path=f"{zipDir}/{stem}.index.json")
+    date_time:Optional[tuple] = _zipDateTime(timestamp) if reproducible else None
+    workers = min(workers or os.cpu_count() or 1, len(bins))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="zip-part") as executor :
+        futures = [executor.submit(_writeArchive, dir, f"{zipDir}/{part_names[number]}", bin.entries, date_time, bin.links, readAheadMemory // workers, cache, blobShas) for number, bin in enumerate(bins)]
+        for future in as_completed(futures) :
+            try :
+                part_path:str = future.result()
+            except ZipError :
+                raise
+            except Exception as exc :
+                _logger.error(f"Unable to zip {sourceDir} -> {zipDir}/{zipName} in parts", exc_info=True)
+                raise ZipError(f"Unable to zip {sourceDir} -> {zipDir}/{zipName} in parts") from exc
+            _logger.debug(f"Zipped part {part_path}")
+            # Outside the error handling above: what the callback raises (a failed upload, say) is its own error, not the zip's
+            if onPartCompleted is not None :
+                onPartCompleted(part_path)
+
+    split.parts = [f"{zipDir}/{name}" for name in part_names]
+
+    # Write the index of which part holds which path
+    index:dict = {
+        "archive": zipName,
+        "parts": part_names,
+        "files": {entry.path.relative_to(dir).as_posix() : part_names[number] for number, bin in enumerate(bins) for entry in bin.entries},
+    }
+    with file_util.atomicPath(split.index_path) as temporary_path, open(temporary_path, "w", encoding="utf-8") as index_file :
+        json.dump(index, index_file, indent=2, sort_keys=True)
+
+    _logger.debug(f"Zipped {sourceDir} -> {len(split.parts)} parts indexed by {split.index_path}")
+
+    return split
+
+
+def unzip(zipPath:str, targetDir:str, include:Optional[list[str]] = None, exclude:Optional[list[str]] = None, workers:Optional[int] = None) -> int :
     """
     Unzip (extracts all from) the specified zip file to the specified directory.
+    Files are extracted in parallel: the members are split by size across worker threads, each reading through its own
+    handle on the archive, and each output file is preallocated before it is written. The Unix permissions recorded in the
+    archive for each file are restored (whatever the umask). Symbolic links stored as links are restored as links, once everything else has been extracted.
 
     Parameters:
         zipPath - the path to the zip file to extract.
         targetDir - the directory to zip into.
+        include - if given, only members matching one of these patterns (or inside a directory that does) are extracted,
+            e.g. ['scripts/deploy'] for just that subtree. The patterns work as they do for cleaning (see file_util.matchesPatterns).
+        exclude - members matching one of these patterns (or inside a directory that does) are not extracted.
+        workers - the number of extraction threads. Defaults to the number of CPUs.
+
+    Returns:
+        The number of members extracted.
 
     Raises:
         ZipError if an error is encountered.
@@ -73,14 +288,82 @@ def unzip(zipPath:str, targetDir:str) :
     file_util.mkdir(targetDir, mode=0o744) # make target directory in case it doesn't exist.
     try :
         with _createZipFileForRead(zipPath) as zip :
-            zip.extractall(targetDir)
+            members:list[zipfile.ZipInfo] = [info for info in zip.infolist() if _selected(info.filename, include, exclude)]
+            root:str = os.path.realpath(targetDir)
+            paths:dict[str, str] = {info.filename : _extractPath(root, info.filename) for info in members}
+            files:list[zipfile.ZipInfo] = [info for info in members if not info.is_dir() and not _isSymlink(info)]
+
+            # Directories first, so the workers never race to create them
+            for directory in sorted({paths[info.filename] if info.is_dir() else os.path.dirname(paths[info.filename]) for info in members}) :
+                os.makedirs(directory, exist_ok=True)
+
+            buckets:list[list[zipfile.ZipInfo]] = _splitBySize(files, workers or os.cpu_count() or 1)
+            with ThreadPoolExecutor(max_workers=len(buckets), thread_name_prefix="unzip") as executor :
+                for future in [executor.submit(_extractFiles, zipPath, bucket, paths) for bucket in buckets] :
+                    future.result()
+
+            for info in members :
+                if _isSymlink(info) :
+                    _restoreSymlink(zip, info, root)
+    except ZipError :
+        raise
     except Exception as exc :
         _logger.error(f"Unable to extract zip file at {zipPath}", exc_info=True)
         raise ZipError(f"Unable to extract zip file at {zipPath}") from exc
 
-    _logger.debug(f"Unzipped {zipPath} -> {targetDir}")
+    _logger.debug(f"Unzipped {len(members)} members of {zipPath} -> {targetDir}")
+    return len(members)
     
     
+def verify(zipPath:str, digests:Optional[dict[str, str]] = None, requireAll:bool = True, workers:Optional[int] = None) -> list[str] :
+    """
+    Verifies an archive without extracting it: every member is read (in parallel, streaming) and its CRC checked and,
+    given the digests the archive was built from, its content is checked against them and the members against the files
+    they list.
+
+    Args:
+        zipPath (str): The path to the zip file to verify.
+        digests (Optional[dict[str, str]], optional): The SHA-256 digests of the files that should be in the archive, keyed by
+            path within it (as collected by zip). Defaults to None, in which case only the CRCs are checked.
+        requireAll (bool, optional): If True, every file in the digests must be in the archive. Set to False to verify one part of
+            a split archive. Defaults to True.
+        workers (Optional[int], optional): The number of threads reading the archive. Defaults to the number of CPUs.
+
+    Returns:
+        list[str]: The names of the members verified.
+
+    Raises:
+        ZipError: If the archive cannot be read, a member is corrupt or doesn't match its digest, or the members don't match
+            the digests.
+    """
+    _logger.debug(f"Verifying {zipPath}")
+    _validateZipPath(zipPath)
+    try :
+        with _createZipFileForRead(zipPath) as zip_file :
+            members:list[zipfile.ZipInfo] = zip_file.infolist()
+    except Exception as exc :
+        raise ZipError(f"Unable to read {zipPath}: {exc}") from exc
+
+    problems:list[str] = []
+    files:list[zipfile.ZipInfo] = [info for info in members if not info.is_dir() and not _isSymlink(info)]
+    if digests is not None :
+        names:set[str] = {info.filename for info in members if not info.is_dir()}
+        problems.extend(f"{info.filename}: not in the build" for info in files if info.filename not in digests)
+        if requireAll :
+            problems.extend(f"{name}: missing" for name in sorted(set(digests) - names))
+
+    buckets:list[list[zipfile.ZipInfo]] = _splitBySize(files, workers or os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=len(buckets), thread_name_prefix="verify") as executor :
+        for future in [executor.submit(_verifyFiles, zipPath, bucket, digests) for bucket in buckets] :
+            problems.extend(future.result())
+
+    if problems :
+        _logger.error(f"{zipPath} failed verification: {'; '.join(problems[:20])}")
+        raise ZipError(f"{zipPath} failed verification ({len(problems)} problems): {'; '.join(problems[:20])}")
+    _logger.debug(f"Verified {len(members)} members of {zipPath}")
+    return [info.filename for info in members]
+
+
 def isValidZipPath(zipPath:str) -> bool :
     """
     Returns true if the file at the specified path is a zip file.
@@ -139,6 +422,408 @@ def _validateSourceDirectory(sourceDir:str) :
         raise ZipError("The source directory has not been specified.")
 
 
+# Creates the hasher for a walk of the source directory, primed with what the manifest (if any) already knows
+def _treeHasher(sourceDir:str, manifest:Optional[manifest_util.ManifestIndex], blobShas:Optional[Mapping[str, str]] = None) -> hash_util.TreeHasher :
+    return hash_util.TreeHasher(sourceDir, known=manifest.records() if manifest is not None else None, blobShas=blobShas if manifest is not None else None)
+
+
+# Hands the hasher's results to whichever of the digests and manifest were asked for
+def _collectDigests(hasher:hash_util.TreeHasher, digests:Optional[dict[str, str]], manifest:Optional[manifest_util.ManifestIndex]) :
+    if manifest is not None :
+        records:dict[str, hash_util.FileRecord] = hasher.records()
+        diff:manifest_util.ManifestDiff = manifest.replace(records)
+        _logger.debug(f"Manifest: {len(diff.added)} added, {len(diff.changed)} changed, {len(diff.removed)} removed, {hasher.reused()} files not rehashed")
+        if digests is not None :
+            digests.update((name, record.digest) for name, record in records.items())
+    elif digests is not None :
+        digests.update(hasher.digests())
+
+
+# Packs the entries of the directory into bins of at most maxPartSize bytes (first-fit decreasing).
+# Directories are only stored when empty (they are implied by the files otherwise) and go in the first part.
+# Duplicates (when deduplicating) go in the same part as the file they link to. Any hasher given is handed each file.
+# Given paths, only those are packed rather than the whole directory, and given exclusions, they are left out.
+def _packParts(dir:Path, maxPartSize:int, hasher:Optional[hash_util.TreeHasher] = None, followSymlinks:bool = False, dedup:bool = False, paths:Optional[list[str]] = None, exclude:Optional[list[str]] = None) -> list['_PartBin'] :
+    entries:list[_TreeEntry] = _entries(dir, paths, followSymlinks, exclude)
+    links:dict[Path, str] = _duplicates(dir, entries) if dedup else {}
+    parents:set[Path] = {entry.path.parent for entry in entries}
+    files:list[_TreeEntry] = []
+    duplicates:list[_TreeEntry] = []
+    empty_dirs:list[_TreeEntry] = []
+    for entry in entries :
+        if stat.S_ISDIR(entry.stat.st_mode) :
+            if entry.path not in parents :
+                empty_dirs.append(entry)
+            continue
+        if hasher is not None :
+            hasher.add(entry.path, entry.stat)
+        (duplicates if entry.path in links else files).append(entry)
+
+    bins:list[_PartBin] = []
+    bin_of:dict[Path, _PartBin] = {}
+    for entry in sorted(files, key=lambda entry: (-entry.stat.st_size, str(entry.path))) :
+        size:int = entry.stat.st_size
+        target:Optional[_PartBin] = next((bin for bin in bins if bin.size + size <= maxPartSize), None)
+        if target is None :
+            if size > maxPartSize :
+                _logger.warning(f"{entry.path} ({size} bytes) is larger than the maximum part size ({maxPartSize} bytes) - it gets a part of its own.")
+            target = _PartBin()
+            bins.append(target)
+        target.entries.append(entry)
+        target.size += size
+        bin_of[entry.path] = target
+
+    if not bins :
+        bins.append(_PartBin())
+    bins[0].entries.extend(empty_dirs)
+    for entry in duplicates :
+        target = bin_of[_linkedPath(entry.path, links[entry.path])]
+        target.entries.append(entry)
+        target.links[entry.path] = links[entry.path]
+
+    # Keep each part in a stable path order
+    for bin in bins :
+        bin.entries.sort(key=lambda entry: entry.path)
+    return bins
+
+
+# Writes an archive containing the given entries (stored relative to dir), reproducibly if given a date_time.
+# Entries in links are stored as symbolic links to the given target rather than with their content.
+# Given a cache, files are compressed through it (those without a blob SHA are hashed as they are read, to identify them).
+def _writeArchive(dir:Path, zip_path:str, entries:list['_TreeEntry'], date_time:Optional[tuple] = None, links:Optional[dict[Path, str]] = None, readAheadMemory:int = READ_AHEAD_MEMORY, cache:Optional[cache_util.CompressionCache] = None, blobShas:Optional[Mapping[str, str]] = None) -> str :
+    links = links or {}
+    should_hash:Callable[[_TreeEntry], bool] = lambda entry : cache is not None and _contentKey(dir, entry, None, blobShas) is None
+    # Written alongside and moved into place once complete, so that no one sees (or uploads) a half-written archive
+    with file_util.atomicPath(zip_path) as temporary_path, _createZipFileForWrite(temporary_path) as zip_file :
+        for entry, data, digest in _ReadAhead(_archiveOrder(dir, entries) if date_time is not None else entries, readAheadMemory, should_hash) :
+            content_key:Optional[str] = _contentKey(dir, entry, digest, blobShas) if cache is not None else None
+            _writeEntry(zip_file, dir, entry, date_time, links.get(entry.path), data, cache, content_key)
+    return zip_path
+
+
+# Writes an entry to the archive - as it is, or, given a date_time, with everything but the path and contents normalised.
+# Symbolic links (and, given a link_target, duplicates) are stored as links. A file's data is taken from data if given
+# (as read ahead), and read from the file otherwise. Given a cache and the content's key, data read into a buffer is
+# compressed through the cache.
+def _writeEntry(zip_file:ZipFile, dir:Path, entry:'_TreeEntry', date_time:Optional[tuple] = None, link_target:Optional[str] = None, data:Optional[Union[memoryview, mmap.mmap]] = None, cache:Optional[cache_util.CompressionCache] = None, content_key:Optional[str] = None) :
+    name:str = entry.path.relative_to(dir).as_posix()
+    stat_result:os.stat_result = entry.stat
+    if stat.S_ISLNK(stat_result.st_mode) or link_target is not None :
+        info:zipfile.ZipInfo = _normalisedInfo(name, date_time or time.localtime(stat_result.st_mtime)[:6], stat.S_IFLNK | 0o777)
+        zip_file.writestr(info, link_target if link_target is not None else os.readlink(entry.path))
+        return
+
+    if stat.S_ISDIR(stat_result.st_mode) :
+        if date_time is None :
+            zip_file.write(entry.path, name)
+            return
+        info = _normalisedInfo(f"{name}/", date_time, stat.S_IFDIR | 0o755)
+        info.external_attr |= 0x10  # MS-DOS directory flag
+        zip_file.writestr(info, b"")
+        return
+
+    if date_time is None :
+        info = zipfile.ZipInfo(name, time.localtime(stat_result.st_mtime)[:6])
+        info.external_attr = (stat_result.st_mode & 0xFFFF) << 16
+    else :
+        info = _normalisedInfo(name, date_time, stat.S_IFREG | (0o755 if stat_result.st_mode & 0o111 else 0o644))
+        # ZipInfo only has a public compress_level from Python 3.13
+        setattr(info, "compress_level" if hasattr(info, "compress_level") else "_compresslevel", REPRODUCIBLE_COMPRESS_LEVEL)
+    info.compress_type = zipfile.ZIP_DEFLATED
+    info.file_size = len(data) if data is not None else stat_result.st_size
+    if cache is not None and content_key is not None and isinstance(data, memoryview) and _canSplice(zip_file) :
+        _writeCached(zip_file, info, data, cache, content_key, REPRODUCIBLE_COMPRESS_LEVEL if date_time is not None else zlib.Z_DEFAULT_COMPRESSION)
+        return
+    with zip_file.open(info, "w") as target :
+        if data is None :
+            with open(entry.path, "rb") as source :
+                shutil.copyfileobj(source, target, 1024 * 1024)
+        else :
+            # In chunks, so the compressor's output for a large file is never held in memory all at once
+            view:memoryview = memoryview(data)
+            try :
+                for offset in range(0, len(view), 1024 * 1024) :
+                    target.write(view[offset:offset + 1024 * 1024])
+            finally :
+                view.release()
+
+
+# Writes a file's data through the compression cache: a payload cached by an earlier build is copied into the archive as it
+# is; otherwise the data is compressed here (with the same settings ZipFile would use) and the payload cached for next time.
+# A cached payload is only used if it is for data of the same size (a blob SHA can describe other content than the file's
+# when git filters, such as line ending conversion, rewrite it on checkout).
+def _writeCached(zip_file:ZipFile, info:zipfile.ZipInfo, data:memoryview, cache:cache_util.CompressionCache, content_key:str, level:int) :
+    cached:Optional[cache_util.CachedPayload] = cache.get(content_key, info.compress_type, level)
+    # A payload is only used for the very data it was compressed from: a checkout can differ from its blob (line endings,
+    # filters) and still be the same size, so the CRC has to match too
+    crc:int = zlib.crc32(data)
+    if cached is None or cached.file_size != len(data) or cached.crc != crc :
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+        chunks:list[bytes] = [compressor.compress(data[offset:offset + 1024 * 1024]) for offset in range(0, len(data), 1024 * 1024)]
+        chunks.append(compressor.flush())
+        cached = cache_util.CachedPayload(crc=crc, file_size=len(data), payload=b"".join(chunks))
+        cache.put(content_key, info.compress_type, level, cached)
+    _spliceEntry(zip_file, info, cached)
+
+
+# Whether an already compressed payload can be spliced into the archive (which relies on ZipFile's internals, as its
+# public API can only write data it compresses itself)
+def _canSplice(zip_file:ZipFile) -> bool :
+    return getattr(zip_file, "_seekable", False) and all(hasattr(zip_file, attribute) for attribute in ("_lock", "_writecheck", "start_dir", "_didModify"))
+
+
+# Appends a member whose payload is already compressed: its local header, then the payload, as ZipFile.open(..., "w")
+# would have written them (but without a data descriptor, as the sizes and CRC are known up front)
+def _spliceEntry(zip_file:ZipFile, info:zipfile.ZipInfo, cached:cache_util.CachedPayload) :
+    info.file_size = cached.file_size
+    info.compress_size = len(cached.payload)
+    info.CRC = cached.crc
+    info.flag_bits = 0
+    zip64:bool = info.file_size > zipfile.ZIP64_LIMIT or info.compress_size > zipfile.ZIP64_LIMIT
+    with zip_file._lock :
+        if getattr(zip_file, "_writing", False) :
+            raise ValueError("Can't write to the ZIP file while there is another write handle open on it.")
+        zip_file._writecheck(info)
+        zip_file._didModify = True
+        zip_file.fp.seek(zip_file.start_dir)
+        info.header_offset = zip_file.fp.tell()
+        zip_file.fp.write(info.FileHeader(zip64))
+        zip_file.fp.write(cached.payload)
+        zip_file.start_dir = zip_file.fp.tell()
+        zip_file.filelist.append(info)
+        zip_file.NameToInfo[info.filename] = info
+
+
+# What identifies a file's content to the compression cache: its git blob SHA if it has one, otherwise its SHA-256 digest
+# (if known)
+def _contentKey(dir:Path, entry:'_TreeEntry', digest:Optional[str], blobShas:Optional[Mapping[str, str]]) -> Optional[str] :
+    if not stat.S_ISREG(entry.stat.st_mode) :
+        return None
+    blob_sha:Optional[str] = blobShas.get(entry.path.relative_to(dir).as_posix()) if blobShas else None
+    if blob_sha is not None :
+        return f"git:{blob_sha}"
+    return f"sha256:{digest}" if digest is not None else None
+
+
+def _normalisedInfo(name:str, date_time:tuple, mode:int) -> zipfile.ZipInfo :
+    info:zipfile.ZipInfo = zipfile.ZipInfo(name, date_time)
+    info.create_system = 3  # Unix, wherever the archive is built, so the permissions are read back
+    info.external_attr = mode << 16
+    return info
+
+
+# The entries in the order a reproducible archive stores them: by path within the archive
+def _archiveOrder(dir:Path, entries:list['_TreeEntry']) -> list['_TreeEntry'] :
+    return sorted(entries, key=lambda entry : entry.path.relative_to(dir).as_posix())
+
+
+# The entries to archive: those of the given paths, or of the whole directory, less the excluded paths and what is under them.
+def _entries(dir:Path, paths:Optional[list[str]], followSymlinks:bool = False, exclude:Optional[list[str]] = None) -> list['_TreeEntry'] :
+    excluded:set[Path] = {dir / path for path in exclude or []}
+    if paths is not None :
+        return [entry for entry in _listedEntries(dir, paths, followSymlinks) if not excluded.intersection((entry.path, *entry.path.parents))]
+    return _walkTree(dir, followSymlinks, excluded)
+
+
+# The entries for the given paths (relative to dir), in path order: the regular files and symbolic links among them (links
+# to files are replaced by the file when following). Paths that no longer exist (for example because they were cleaned)
+# are skipped, as is anything else, such as the directory of an uninitialised submodule.
+def _listedEntries(dir:Path, paths:list[str], followSymlinks:bool = False) -> list['_TreeEntry'] :
+    entries:list[_TreeEntry] = []
+    for path in sorted(set(paths)) :
+        try :
+            stat_result:os.stat_result = (dir / path).lstat()
+        except FileNotFoundError :
+            continue
+        if followSymlinks and stat.S_ISLNK(stat_result.st_mode) :
+            try :
+                target_stat:os.stat_result = (dir / path).stat()
+                stat_result = target_stat if stat.S_ISREG(target_stat.st_mode) else stat_result
+            except OSError :
+                pass  # A dangling link stays a link
+        if stat.S_ISREG(stat_result.st_mode) or stat.S_ISLNK(stat_result.st_mode) :
+            entries.append(_TreeEntry(dir / path, stat_result))
+    return entries
+
+
+# Walks the directory, pairing each entry with its lstat. If following symbolic links, links are paired with the stat of
+# what they point at, and linked directories are walked once the rest of the tree has been - unless the directory has
+# already been archived (identified by device and inode), as it has if the link points inside the tree or loops back on
+# itself, in which case the link is stored as a link.
+def _walkTree(dir:Path, followSymlinks:bool = False, excluded:Optional[set[Path]] = None) -> list['_TreeEntry'] :
+    entries:list[_TreeEntry] = []
+    visited:set[tuple[int, int]] = set()
+    links:list[_TreeEntry] = []
+    excluded = excluded or set()
+    _walkInto(dir, dir.stat(), entries, visited, links if followSymlinks else None, excluded)
+
+    while links :
+        link:_TreeEntry = links.pop(0)
+        try :
+            target:os.stat_result = link.path.stat()
+        except OSError :
+            _logger.warning(f"{link.path} is a broken symbolic link - storing it as a link.")
+            entries.append(link)
+            continue
+        if stat.S_ISDIR(target.st_mode) :
+            if (target.st_dev, target.st_ino) in visited :
+                _logger.warning(f"{link.path} points at a directory that is already archived (or loops back on itself) - storing it as a link.")
+                entries.append(link)
+                continue
+            entries.append(_TreeEntry(link.path, target))
+            _walkInto(link.path, target, entries, visited, links, excluded)
+        else :
+            entries.append(_TreeEntry(link.path, target))
+    return entries
+
+
+# Adds the contents of a directory to the entries. Symbolic links are set aside in links, if given, to be followed later.
+# Excluded paths are skipped (directories without being walked into).
+def _walkInto(dir:Path, dir_stat:os.stat_result, entries:list['_TreeEntry'], visited:set[tuple[int, int]], links:Optional[list['_TreeEntry']], excluded:Optional[set[Path]] = None) :
+    visited.add((dir_stat.st_dev, dir_stat.st_ino))
+    with os.scandir(dir) as scan :
+        children:list[os.DirEntry] = sorted(scan, key=lambda child: child.name)
+    for child in children :
+        if excluded and dir / child.name in excluded :
+            continue
+        entry:_TreeEntry = _TreeEntry(dir / child.name, child.stat(follow_symlinks=False))
+        if links is not None and stat.S_ISLNK(entry.stat.st_mode) :
+            links.append(entry)
+        elif stat.S_ISDIR(entry.stat.st_mode) :
+            entries.append(entry)
+            _walkInto(entry.path, entry.stat, entries, visited, links, excluded)
+        else :
+            entries.append(entry)
+
+
+# Finds the regular files whose content duplicates that of a file earlier in path order, returning the (relative)
+# link to the first copy for each. Only files sharing a size with another file are hashed.
+def _duplicates(dir:Path, entries:list['_TreeEntry']) -> dict[Path, str] :
+    by_size:dict[int, list[Path]] = {}
+    for entry in entries :
+        if stat.S_ISREG(entry.stat.st_mode) and entry.stat.st_size > 0 :
+            by_size.setdefault(entry.stat.st_size, []).append(entry.path)
+    candidates:list[Path] = [path for paths in by_size.values() if len(paths) > 1 for path in paths]
+    if not candidates :
+        return {}
+
+    with ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix="dedup") as executor :
+        digests:list[str] = list(executor.map(hash_util.hashFile, (str(path) for path in candidates)))
+
+    originals:dict[str, Path] = {}
+    links:dict[Path, str] = {}
+    for number in sorted(range(len(candidates)), key=lambda number: candidates[number].relative_to(dir).as_posix()) :
+        path:Path = candidates[number]
+        original:Path = originals.setdefault(digests[number], path)
+        if original is not path :
+            links[path] = os.path.relpath(original, path.parent)
+    _logger.debug(f"Storing {len(links)} duplicate files as links")
+    return links
+
+
+# The path a relative link made by _duplicates points at
+def _linkedPath(link:Path, target:str) -> Path :
+    return Path(os.path.normpath(link.parent / target))
+
+
+# Tests whether an archive entry is a symbolic link (stored as such on Unix)
+def _isSymlink(info:zipfile.ZipInfo) -> bool :
+    return info.create_system == 3 and stat.S_ISLNK(info.external_attr >> 16)
+
+
+# Recreates a symbolic link stored in the archive
+def _restoreSymlink(zip_file:ZipFile, info:zipfile.ZipInfo, root:str) :
+    path:str = _extractPath(root, info.filename)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if os.path.lexists(path) :
+        os.unlink(path)
+    os.symlink(zip_file.read(info).decode("utf-8"), path)
+
+
+# Where a member is extracted to (root being the real path of the target directory), refusing any member whose
+# path would land outside of it
+def _extractPath(root:str, name:str) -> str :
+    path:str = os.path.normpath(os.path.join(root, name))
+    if os.path.isabs(name) or not path.startswith(root + os.sep) :
+        raise ZipError(f"Refusing to extract {name} outside of {root}")
+    return path
+
+
+# Tests whether a member is selected by the include and exclude patterns
+def _selected(name:str, include:Optional[list[str]], exclude:Optional[list[str]]) -> bool :
+    if include and not file_util.matchesPatterns(name, include) :
+        return False
+    return not (exclude and file_util.matchesPatterns(name, exclude))
+
+
+# Splits the members into (at most) count buckets of roughly equal size, largest first
+def _splitBySize(members:list[zipfile.ZipInfo], count:int) -> list[list[zipfile.ZipInfo]] :
+    buckets:list[list[zipfile.ZipInfo]] = [[] for _ in range(max(1, min(count, len(members))))]
+    sizes:list[int] = [0] * len(buckets)
+    for info in sorted(members, key=lambda info: -info.file_size) :
+        smallest:int = sizes.index(min(sizes))
+        buckets[smallest].append(info)
+        sizes[smallest] += info.file_size + 1
+    return buckets
+
+
+# Extracts the files through a file handle of its own. A ZipFile serialises reads from several threads, and opening one
+# per thread would parse the central directory again each time, so the members (already parsed) are read directly.
+def _extractFiles(zipPath:str, members:list[zipfile.ZipInfo], paths:dict[str, str]) :
+    with open(zipPath, "rb") as archive :
+        for info in members :
+            path:str = paths[info.filename]
+            with _openMember(archive, info) as source, open(path, "wb") as target :
+                if info.file_size >= PREALLOCATE_MIN_SIZE and hasattr(os, "posix_fallocate") :
+                    try :
+                        os.posix_fallocate(target.fileno(), 0, info.file_size)
+                    except OSError :
+                        pass  # not supported by the file system - it just grows as it is written
+                shutil.copyfileobj(source, target, 1024 * 1024)
+            mode:int = info.external_attr >> 16
+            if info.create_system == 3 and stat.S_ISREG(mode) :
+                os.chmod(path, stat.S_IMODE(mode))
+
+
+# Reads each member through to the end (which checks its CRC), hashing it if there are digests to check it against.
+# Returns the problems found.
+def _verifyFiles(zipPath:str, members:list[zipfile.ZipInfo], digests:Optional[dict[str, str]]) -> list[str] :
+    problems:list[str] = []
+    buffer:bytearray = bytearray(1024 * 1024)
+    with open(zipPath, "rb") as archive :
+        for info in members :
+            expected:Optional[str] = digests.get(info.filename) if digests is not None else None
+            digest = hashlib.sha256() if expected is not None else None
+            try :
+                with _openMember(archive, info) as source :
+                    while read := source.readinto(buffer) :
+                        if digest is not None :
+                            digest.update(memoryview(buffer)[:read])
+            except (zipfile.BadZipFile, ZipError, OSError, EOFError, zlib.error) as e :
+                problems.append(f"{info.filename}: {e}")
+                continue
+            if digest is not None and digest.hexdigest() != expected :
+                problems.append(f"{info.filename}: content does not match its digest")
+    return problems
+
+
+# Opens a member for reading (decompressing and checking its CRC) from a plain handle on the archive
+def _openMember(archive, info:zipfile.ZipInfo) -> zipfile.ZipExtFile :
+    if info.flag_bits & 0x1 :
+        raise ZipError(f"{info.filename} is encrypted.")
+    archive.seek(info.header_offset)
+    header:tuple = _LOCAL_HEADER.unpack(archive.read(_LOCAL_HEADER.size))
+    if header[0] != zipfile.stringFileHeader :
+        raise ZipError(f"Bad local header for {info.filename}.")
+    archive.seek(header[10] + header[11], os.SEEK_CUR)
+    return zipfile.ZipExtFile(archive, "r", info, None, False)
+
+
+# Converts seconds since the epoch (UTC, so the result doesn't depend on the local timezone) to a zip date_time
+def _zipDateTime(timestamp:Optional[int]) -> tuple :
+    return time.gmtime(max(timestamp if timestamp is not None else EARLIEST_TIMESTAMP, EARLIEST_TIMESTAMP))[:6]
+
+
 def _createZipFileForRead(path:str) -> ZipFile :
     return ZipFile(path, "r")
 
@@ -146,5 +831,132 @@ def _createZipFileForWrite(path:str) -> ZipFile :
     return ZipFile(path, "w", zipfile.ZIP_DEFLATED)
 
 
+@dataclass
+class SplitArchive() :
+    """
+    The result of zipping a directory in parts.
+
+    Args:
+        index_path (str): The path to the index file listing which part holds which path.
+        parts (list[str]): The paths to the part archives, in part order.
+    """
+    index_path:str
+    parts:list[str] = field(default_factory=list)
+
+
+class _ReadAhead() :
+    """
+    Reads the files among the entries ahead of the archiver, on a small pool of threads, so that waiting for reads overlaps
+    with compressing. Iterating gives (entry, data, digest) for each entry in order: data is None for anything but a regular
+    file, and digest is the file's SHA-256 digest if shouldHash said to compute it. Small files are read into reusable
+    buffers; large ones are memory mapped (and the kernel asked to read them ahead). The data is only valid until the next
+    entry is asked for. No more than maxFiles files, taking up no more than maxMemory in buffers, are held at once.
+    """
+
+    def __init__(self, entries:list['_TreeEntry'], maxMemory:int = READ_AHEAD_MEMORY, shouldHash:Optional[Callable[['_TreeEntry'], bool]] = None, readers:int = 4, maxFiles:int = READ_AHEAD_FILES) :
+        self._entries:list[_TreeEntry] = entries
+        self._max_memory:int = max(1, maxMemory)
+        self._should_hash:Callable[[_TreeEntry], bool] = shouldHash or (lambda entry : False)
+        self._readers:int = readers
+        self._max_files:int = max(1, maxFiles)
+        self._free_buffers:list[bytearray] = []
+        self._lock:threading.Lock = threading.Lock()
+
+
+    def __iter__(self) -> Iterator[tuple['_TreeEntry', Optional[Union[memoryview, mmap.mmap]], Optional[str]]] :
+        pending:deque = deque()
+        next_entry:int = 0
+        in_use:int = 0
+        with ThreadPoolExecutor(max_workers=self._readers, thread_name_prefix="read-ahead") as executor :
+            try :
+                while pending or next_entry < len(self._entries) :
+                    # Keep up to maxFiles files (and maxMemory bytes) in flight - but always at least one
+                    while next_entry < len(self._entries) and len(pending) < self._max_files :
+                        entry:_TreeEntry = self._entries[next_entry]
+                        cost:int = self._cost(entry)
+                        if pending and in_use + cost > self._max_memory :
+                            break
+                        pending.append((entry, cost, executor.submit(self._read, entry) if stat.S_ISREG(entry.stat.st_mode) else None))
+                        in_use += cost
+                        next_entry += 1
+
+                    entry, cost, future = pending.popleft()
+                    data, digest = future.result() if future is not None else (None, None)
+                    try :
+                        yield entry, data, digest
+                    finally :
+                        in_use -= cost
+                        self._release(data, self._max_memory - in_use)
+            finally :
+                for _, _, future in pending :
+                    if future is not None and not future.cancel() and future.exception() is None :
+                        self._release(future.result()[0], 0)
+
+
+    # The buffer memory an entry takes up while it is held (memory mapped files are backed by the page cache instead)
+    def _cost(self, entry:'_TreeEntry') -> int :
+        return entry.stat.st_size if stat.S_ISREG(entry.stat.st_mode) and not self._mapped(entry.stat.st_size) else 0
+
+
+    def _mapped(self, size:int) -> bool :
+        return size >= min(MMAP_MIN_SIZE, self._max_memory)
+
+
+    def _read(self, entry:'_TreeEntry') -> tuple[Union[memoryview, mmap.mmap], Optional[str]] :
+        with open(entry.path, "rb", buffering=0) as file :
+            size:int = os.fstat(file.fileno()).st_size
+            if size and self._mapped(size) :
+                mapped:mmap.mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+                if hasattr(mapped, "madvise") :
+                    mapped.madvise(mmap.MADV_SEQUENTIAL)
+                    mapped.madvise(mmap.MADV_WILLNEED)
+                # Large files are left to the hasher's own threads, rather than holding up the archiver
+                return mapped, None
+
+            view:memoryview = memoryview(self._buffer(size))[:size]
+            read:int = 0
+            while read < size and (count := file.readinto(view[read:])) :
+                read += count
+            view = view[:read]
+            return view, hashlib.sha256(view).hexdigest() if self._should_hash(entry) else None
+
+
+    # A free buffer of at least the given size, or a new one if there isn't one
+    def _buffer(self, size:int) -> bytearray :
+        with self._lock :
+            fitting:list[bytearray] = [buffer for buffer in self._free_buffers if len(buffer) >= size]
+            if fitting :
+                buffer:bytearray = min(fitting, key=len)
+                self._free_buffers.remove(buffer)
+                return buffer
+        return bytearray(size)
+
+
+    # Returns a buffer to the free list (keeping no more than spare bytes of them, so the buffers held and free stay
+    # within maxMemory), or unmaps a memory mapped file
+    def _release(self, data:Optional[Union[memoryview, mmap.mmap]], spare:int) :
+        if isinstance(data, mmap.mmap) :
+            data.close()
+        elif isinstance(data, memoryview) :
+            buffer = data.obj
+            data.release()
+            with self._lock :
+                self._free_buffers.append(buffer)
+                while self._free_buffers and sum(len(free) for free in self._free_buffers) > spare :
+                    self._free_buffers.remove(max(self._free_buffers, key=len))
+
+
+class _TreeEntry(NamedTuple) :
+    path:Path
+    stat:os.stat_result
+
+
+@dataclass
+class _PartBin() :
+    entries:list[_TreeEntry] = field(default_factory=list)
+    links:dict[Path, str] = field(default_factory=dict)
+    size:int = 0
+
+
 class ZipError(UtilityError) :
     """Raised by the zip utility functions to indicate some issue."""
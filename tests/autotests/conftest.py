@@ -0,0 +1,8 @@
+import pytest
+from releaser import constants
+
+
+@pytest.fixture(autouse=True)
+def lock_dir(tmp_path, monkeypatch):
+    """Keep the lock files of the jobs run by a test in its own directory, rather than the runtime directory in the cwd."""
+    monkeypatch.setattr(constants, "LOCK_DIR", str(tmp_path / "locks"))
@@ -0,0 +1,73 @@
+import pytest
+import os
+from unittest import mock
+from git import Repo
+from releaser import api, release
+from releaser.utilities import errors_util, hash_util
+
+
+@pytest.fixture(autouse=True)
+def no_retention(monkeypatch):
+    monkeypatch.setattr(release.constants, "RETAIN_LAST", None)
+    monkeypatch.setattr(release.constants, "RETAIN_DAYS", None)
+    monkeypatch.setattr(release.constants, "RETAIN_SIZE", None)
+
+
+def _checkout(tmp_path):
+    checkout = tmp_path / "checkout"
+    (checkout / "d").mkdir(parents=True)
+    repo = Repo.init(checkout)
+    (checkout / "a.sh").write_text("a" * 600)
+    (checkout / "d" / "e.sh").write_text(os.urandom(600).hex())
+    repo.index.add(["a.sh", "d/e.sh"])
+    repo.index.commit("initial")
+    patterns = tmp_path / "clean.txt"
+    patterns.write_text(".git\n")
+    return str(checkout), str(patterns)
+
+def test_build_returns_artifacts_digests_and_timings(tmp_path):
+    checkout, patterns = _checkout(tmp_path)
+    spec = api.BuildSpec(release_file_name="release.zip", source_dir=checkout, patterns_file=patterns, release_target_dir=str(tmp_path / "rel"))
+
+    result = api.Releaser(keepClients=False).build(spec)
+
+    assert result.release_path == str(tmp_path / "rel" / "release.zip")
+    assert result.artifacts == [result.release_path, str(tmp_path / "rel" / "release.SHA256SUMS")]
+    assert result.digests["release.zip"] == hash_util.hashFile(result.release_path)
+    assert set(result.digests) == {"release.zip", "a.sh", "d/e.sh"}
+    assert {"clone", "inspect", "clean", "zip", "verify", "checksums"} <= set(result.timings)
+    assert result.seconds >= result.timings["zip"]
+    assert result.tag is None and result.release_url is None
+
+def test_build_split_release_path_is_index(tmp_path):
+    checkout, patterns = _checkout(tmp_path)
+    spec = api.BuildSpec(release_file_name="release.zip", source_dir=checkout, patterns_file=patterns, release_target_dir=str(tmp_path / "rel"), split_size=1000, checksums=False)
+
+    result = api.Releaser(keepClients=False).build(spec)
+
+    assert result.release_path == str(tmp_path / "rel" / "release.index.json")
+    assert result.artifacts[-1] == result.release_path
+    assert len(result.artifacts) == 3
+    assert result.digests == {}
+
+def test_build_invalid_spec_raises():
+    with pytest.raises(errors_util.ValidationError):
+        api.Releaser(keepClients=False).build(api.BuildSpec(release_file_name="release.zip", repository_url="not a url"))
+
+def test_release_defaults_release_to_tag(monkeypatch):
+    called = {}
+    def fake_release(*args, **kwargs):
+        called["args"] = args
+        kwargs["timings"]["tag"] = 0.5
+        kwargs["critical_path"].extend(["clone", "build", "upload_release"])
+        return ["/tmp/rel/release.zip"], "https://github.com/o/r/releases/tag/v1"
+    monkeypatch.setattr(release, "_buildAndReleaseToGitHub", fake_release)
+    monkeypatch.setattr(hash_util, "readSumsFile", mock.Mock(side_effect=AssertionError("no checksums built")))
+
+    result = api.Releaser(keepClients=False).release(api.BuildSpec(release_file_name="release.zip", repository_url="https://github.com/o/r.git"), "v1", "First")
+
+    assert called["args"][6:10] == ("v1", "First", "v1", "First")
+    assert result.tag == "v1"
+    assert result.release_url == "https://github.com/o/r/releases/tag/v1"
+    assert result.timings == {"tag": 0.5}
+    assert result.critical_path == ["clone", "build", "upload_release"]
@@ -0,0 +1,120 @@
+import pytest
+import json
+import os
+import subprocess
+import tempfile
+from benchmarks import bench, compare, pipeline, synthetic
+from benchmarks.github_stub import GitHubStub
+
+_SPEC = synthetic.RepositorySpec(files=20, median_size=512, max_size=4096, dir_depth=2, submodule_depth=2, submodule_fanout=2, submodule_files=5)
+
+
+def test_generate_nested_submodules():
+    """Test the synthetic repository and its nested submodules are generated as bare repositories, cloneable through the mirror."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        mirror = os.path.join(tmpdir, "mirror")
+        url = synthetic.generate(mirror, _SPEC)
+
+        assert url == "https://github.com/bench/main.git"
+        assert sorted(os.listdir(os.path.join(mirror, "bench"))) == ["main-sub0-sub0.git", "main-sub0-sub1.git", "main-sub0.git", "main-sub1-sub0.git", "main-sub1-sub1.git", "main-sub1.git", "main.git"]
+
+        clone = os.path.join(tmpdir, "clone")
+        environment = {**os.environ, **synthetic.gitEnvironment(mirror)}
+        subprocess.run(["git", "clone", "--quiet", "--recurse-submodules", url, clone], check=True, env=environment)
+        assert os.path.isdir(os.path.join(clone, "libs", "main-sub1", "libs", "main-sub1-sub0"))
+
+
+def test_github_stub_records_releases():
+    """Test the GitHub stub creates releases and records the assets uploaded to them."""
+    import urllib.request
+    with GitHubStub() as stub:
+        request = urllib.request.Request(f"{stub.url}/repos/bench/main/releases", data=json.dumps({"tag_name": "v1"}).encode(), method="POST")
+        with urllib.request.urlopen(request) as response:
+            release = json.load(response)
+        upload = release["upload_url"].split("{")[0] + "?name=release.zip"
+        urllib.request.urlopen(urllib.request.Request(upload, data=b"zipped", method="POST")).close()
+
+    assert stub.releases[0]["tag_name"] == "v1"
+    assert stub.releases[0]["assets"][0]["name"] == "release.zip"
+    assert stub.releases[0]["assets"][0]["size"] == 6
+
+
+def test_run_scenario_release():
+    """Test a release scenario runs end to end against the stub, timing every stage, with results that serialise as JSON."""
+    scenario = pipeline.Scenario("test", _SPEC, release=True)
+
+    results = json.loads(json.dumps(bench.runScenario(scenario)))
+
+    assert results["scenario"]["spec"]["files"] == 20
+    assert results["environment"]["git"].startswith("git version")
+    assert len(results["runs"]) == 1
+    run = results["runs"][0]
+    assert {"clone", "tag", "create_release", "clean", "zip", "verify", "checksums", "upload"} <= set(run["stages"])
+    assert run["total"] >= run["stages"]["zip"]
+    assert run["peak_rss"] > 0
+    assert run["release_bytes"] > 0
+
+
+def _results(totals, zips, rss):
+    return {"runs": [{"stages": {"zip": zip_time}, "total": total, "peak_rss": peak} for total, zip_time, peak in zip(totals, zips, rss)]}
+
+
+def test_summarise_median_and_iqr():
+    """Test runs are summarised by the median and IQR of each stage, the total and the peak RSS."""
+    summary = compare.summarise(_results([1.0, 2.0, 3.0, 4.0, 5.0], [0.5, 0.5, 0.6, 0.7, 0.7], [100, 100, 100, 100, 100]))
+
+    assert summary["total"]["median"] == 3.0
+    assert summary["total"]["iqr"] == 2.0
+    assert summary["zip"]["median"] == 0.6
+    assert summary["peak_rss"] == {"median": 100.0, "q1": 100.0, "q3": 100.0, "iqr": 0.0, "runs": 5}
+
+
+def test_compare_flags_regressions_beyond_noise():
+    """Test only slowdowns beyond the threshold, the noise and the floor are regressions."""
+    baseline = {"small": compare.summarise(_results([2.0, 2.0, 2.0], [1.0, 1.0, 1.0], [100_000_000] * 3))}
+    slower = {"small": compare.summarise(_results([2.1, 2.1, 2.1], [1.5, 1.5, 1.5], [150_000_000] * 3))}
+    noisy = {"small": compare.summarise(_results([2.0, 2.0, 2.0], [0.5, 1.5, 2.5], [100_000_000] * 3))}
+    jitter = {"small": compare.summarise(_results([2.0, 2.0, 2.0], [1.04, 1.04, 1.04], [100_000_000] * 3))}
+
+    regressions = compare.compare(baseline, slower)
+    assert [(regression.measurement, regression.current) for regression in regressions] == [("zip", 1.5), ("peak_rss", 150_000_000)]
+    assert compare.compare(baseline, noisy) == []
+    assert compare.compare(baseline, jitter, threshold=0.01) == []
+    assert compare.compare({}, slower) == []
+
+
+def test_compare_command_exits_on_regression(monkeypatch, capsys):
+    """Test the compare command fails without a baseline, stores one with --update, then exits with 1 when a stage regresses against it."""
+    timings = iter([1.0, 2.0])
+    monkeypatch.setattr(bench, "runScenario", lambda scenario, repeat: _results([next(timings)] * 1, [0.5], [100]))
+    with tempfile.TemporaryDirectory() as tmpdir:
+        baseline = os.path.join(tmpdir, "baselines", "baseline.json")
+        monkeypatch.setattr("sys.argv", ["bench.py", "compare", "--scenarios", "small-build", "--repeat", "1", "--baseline", baseline])
+        with pytest.raises(SystemExit) as exit_info:
+            bench.main()
+        assert exit_info.value.code != 0
+        assert not os.path.exists(baseline)
+
+        monkeypatch.setattr("sys.argv", ["bench.py", "compare", "--scenarios", "small-build", "--repeat", "1", "--baseline", baseline, "--update"])
+        bench.main()
+        assert json.load(open(baseline))["scenarios"]["small-build"]["total"]["median"] == 1.0
+
+        monkeypatch.setattr("sys.argv", ["bench.py", "compare", "--scenarios", "small-build", "--repeat", "1", "--baseline", baseline])
+        with pytest.raises(SystemExit) as exit_info:
+            bench.main()
+
+    assert exit_info.value.code == 1
+    assert "REGRESSION small-build total" in capsys.readouterr().out
+
+def test_compare_command_update_merges_scenarios(monkeypatch):
+    """Test updating the baseline for some scenarios keeps those of the others."""
+    monkeypatch.setattr(bench, "runScenario", lambda scenario, repeat: _results([3.0], [0.5], [100]))
+    with tempfile.TemporaryDirectory() as tmpdir:
+        baseline = os.path.join(tmpdir, "baseline.json")
+        with open(baseline, "w") as f:
+            json.dump({"scenarios": {"small-build": {"total": {"median": 1.0}}, "other": {"total": {"median": 2.0}}}}, f)
+        monkeypatch.setattr("sys.argv", ["bench.py", "compare", "--scenarios", "small-build", "--repeat", "1", "--baseline", baseline, "--update"])
+        bench.main()
+        scenarios = json.load(open(baseline))["scenarios"]
+    assert scenarios["small-build"]["total"]["median"] == 3.0
+    assert scenarios["other"] == {"total": {"median": 2.0}}
@@ -1,6 +1,10 @@
 import pytest
+import logging
+import os
+import threading
 from unittest import mock
 from releaser import release
+from releaser.utilities import daemon_util, git_util, github_util
 
 @pytest.fixture(autouse=True)
 def patch_logger():
@@ -14,28 +18,47 @@ def test_validateRepositoryUrl_valid(monkeypatch):
 
 def test_validateRepositoryUrl_invalid(monkeypatch):
     monkeypatch.setattr(release.helpers, "isValidUrl", lambda url: False)
-    with pytest.raises(SystemExit):
+    with pytest.raises(release.errors_util.ValidationError):
         release._validateRepositoryUrl("not_a_url")
 
 def test_prepareRepositoryTargetDirectory_creates_dir(monkeypatch):
     monkeypatch.setattr(release.file_util, "exists", lambda d: False)
+    monkeypatch.setattr(release.file_util, "reapTrash", mock.Mock())
     mkdir = mock.Mock()
     monkeypatch.setattr(release.file_util, "mkdir", mkdir)
     monkeypatch.setattr(release.helpers, "assertSet", lambda *a, **k: None)
     release._prepareRepositoryTargetDirectory("/tmp/testdir")
     mkdir.assert_called_once_with("/tmp/testdir")
 
-def test_prepareRepositoryTargetDirectory_deletes_contents(monkeypatch):
+def test_prepareRepositoryTargetDirectory_deletes_in_background(monkeypatch):
     monkeypatch.setattr(release.file_util, "exists", lambda d: True)
     monkeypatch.setattr(release.file_util, "isDir", lambda d: True)
+    monkeypatch.setattr(release.file_util, "reapTrash", mock.Mock())
+    mkdir = mock.Mock()
+    monkeypatch.setattr(release.file_util, "mkdir", mkdir)
     delete = mock.Mock()
-    monkeypatch.setattr(release.file_util, "deleteContents", delete)
+    monkeypatch.setattr(release.file_util, "deleteInBackground", delete)
     monkeypatch.setattr(release.helpers, "assertSet", lambda *a, **k: None)
     release._prepareRepositoryTargetDirectory("/tmp/testdir")
     delete.assert_called_once_with("/tmp/testdir")
+    mkdir.assert_called_once_with("/tmp/testdir")
+    release.file_util.reapTrash.assert_called_once_with("/tmp", name="testdir")
+
+def test_prepareRepositoryTargetDirectory_replaces_existing_clone(tmp_path):
+    target = tmp_path / "clone"
+    (target / "sub").mkdir(parents=True)
+    (target / "sub" / "file.txt").write_text("old")
+    (tmp_path / ".clone.trash-stale").mkdir()
+    release._prepareRepositoryTargetDirectory(str(target))
+    assert target.is_dir() and list(target.iterdir()) == []
+    for thread in release.file_util.threading.enumerate():
+        if thread.name.startswith("reap-"):
+            thread.join()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["clone"]
 
 def test_prepareRepositoryTargetDirectory_not_a_dir(monkeypatch):
     monkeypatch.setattr(release.file_util, "exists", lambda d: True)
+    monkeypatch.setattr(release.file_util, "reapTrash", mock.Mock())
     monkeypatch.setattr(release.file_util, "isDir", lambda d: False)
     monkeypatch.setattr(release.helpers, "assertSet", lambda *a, **k: None)
     with pytest.raises(release.errors_util.ProjectError):
@@ -63,19 +86,167 @@ def test_cleanRepository_calls_removeFilesOfTypes(monkeypatch):
     release._cleanRepository("/tmp/repo", "patterns.txt")
     remove.assert_called_once_with("/tmp/repo", ["*.tmp"])
 
+def test_buildRelease_defers_git_until_cleanGit(tmp_path):
+    repo_dir = tmp_path / "repo"
+    (repo_dir / ".git" / "objects").mkdir(parents=True)
+    (repo_dir / ".git" / "HEAD").write_text("ref: refs/heads/main")
+    (repo_dir / "sub").mkdir()
+    (repo_dir / "sub" / ".git").write_text("gitdir: ../.git/modules/sub")
+    (repo_dir / ".gitignore").write_text("*.log")
+    (repo_dir / "a.sh").write_text("a")
+    (repo_dir / "build.log").write_text("cleaned now")
+    patterns = tmp_path / "clean.txt"
+    patterns.write_text(".git\n.git*\n*.log\n")
+
+    release_path = release._buildRelease(str(repo_dir), str(patterns), str(tmp_path / "rel"), "release.zip", defer_git=True)
+
+    # sub is stored as the empty directory it is once cleaned
+    assert release.zip_util.verify(release_path) == ["a.sh", "sub/"]
+    assert (repo_dir / ".git" / "HEAD").exists() and (repo_dir / "sub" / ".git").exists()
+    assert not (repo_dir / "build.log").exists()
+    release._cleanGit(str(repo_dir), str(patterns))
+    assert sorted(os.listdir(repo_dir)) == ["a.sh", "sub"]
+    assert os.listdir(repo_dir / "sub") == []
+
 def test_zipRepository_calls_zip(monkeypatch):
     zip_mock = mock.Mock(return_value="/tmp/release.zip")
     monkeypatch.setattr(release.zip_util, "zip", zip_mock)
     result = release._zipRepository("/tmp/repo", "/tmp/rel", "release.zip")
-    zip_mock.assert_called_once_with("/tmp/repo", "/tmp/rel", "release.zip")
+    zip_mock.assert_called_once_with("/tmp/repo", "/tmp/rel", "release.zip", digests=None, manifest=None, reproducible=False, timestamp=None, followSymlinks=False, dedup=False, readAheadMemory=release.constants.READ_AHEAD_MEMORY, cache=None, blobShas=None, paths=None, exclude=None)
     assert result == "/tmp/release.zip"
 
+def test_zipRepository_split_calls_zipParts(monkeypatch):
+    split = mock.Mock(index_path="/tmp/rel/release.index.json")
+    zip_parts = mock.Mock(return_value=split)
+    monkeypatch.setattr(release.zip_util, "zipParts", zip_parts)
+    callback = mock.Mock()
+    result = release._zipRepository("/tmp/repo", "/tmp/rel", "release.zip", split_size=100, on_part_completed=callback)
+    zip_parts.assert_called_once_with("/tmp/repo", "/tmp/rel", "release.zip", 100, onPartCompleted=callback, digests=None, manifest=None, reproducible=False, timestamp=None, followSymlinks=False, dedup=False, readAheadMemory=release.constants.READ_AHEAD_MEMORY, cache=None, blobShas=None, paths=None, exclude=None)
+    assert result == "/tmp/rel/release.index.json"
+
+def test_buildDelta_writes_delta_and_deleted_manifest(tmp_path):
+    repo_dir = tmp_path / "repo"
+    (repo_dir / "d").mkdir(parents=True)
+    (repo_dir / "a.sh").write_text("a")
+    (repo_dir / "d" / "e.sh").write_text("e")
+    (repo_dir / "keep.sh").write_text("unchanged")
+    patterns = tmp_path / "clean.txt"
+    patterns.write_text("*.log\n")
+    rel_dir = tmp_path / "rel"
+    rel_dir.mkdir()
+    changes = git_util.ChangeSet(added=["d/e.sh"], modified=["a.sh", "cleaned.log"], deleted=["gone.sh", "old.log"])
+
+    delta_path, deleted_path = release._buildDelta(changes, "v1.0", str(repo_dir), str(patterns), str(rel_dir), "release.zip")
+
+    import zipfile
+    assert delta_path.endswith("release.delta-v1.0.zip")
+    with zipfile.ZipFile(delta_path) as zf:
+        assert sorted(zf.namelist()) == ["a.sh", "d/e.sh"]
+    lines = [line for line in open(deleted_path).read().splitlines() if not line.startswith("#")]
+    assert lines == ["gone.sh"]
+
+def test_buildDelta_keeps_hidden_files_the_full_release_ships(tmp_path):
+    repo_dir = tmp_path / "repo"
+    (repo_dir / ".config").mkdir(parents=True)
+    for path in ["a.sh", ".x.log", ".config/.gitignore", "cleaned.log", ".gitignore"]:
+        (repo_dir / path).write_text(path)
+    patterns = tmp_path / "clean.txt"
+    patterns.write_text(".git\n.git*\n*.log\n")
+    rel_dir = tmp_path / "rel"
+    rel_dir.mkdir()
+    changes = git_util.ChangeSet(modified=["a.sh", ".x.log", ".config/.gitignore", "cleaned.log", ".gitignore"], deleted=[".y.log", ".config/.DS_Store", "old.log", ".gitattributes"])
+
+    import zipfile
+    # A checkout built from in place still has what is cleaned, so what the patterns match is left out
+    delta_path, deleted_path = release._buildDelta(changes, "v1.0", str(repo_dir), str(patterns), str(rel_dir), "release.zip", in_place=True)
+    with zipfile.ZipFile(delta_path) as zf:
+        assert sorted(zf.namelist()) == [".config/.gitignore", ".x.log", "a.sh"]
+    lines = [line for line in open(deleted_path).read().splitlines() if not line.startswith("#")]
+    assert lines == [".config/.DS_Store", ".y.log"]
+
+    # A cleaned clone no longer has it, but for what the .git patterns find (cleaned once the tag is pushed)
+    release._cleanRepository(str(repo_dir), str(patterns), defer_git=True)
+    delta_path, _ = release._buildDelta(changes, "v1.0", str(repo_dir), str(patterns), str(rel_dir), "release.zip")
+    with zipfile.ZipFile(delta_path) as zf:
+        assert sorted(zf.namelist()) == [".config/.gitignore", ".x.log", "a.sh"]
+
+def test_writeChecksums_lists_archive_then_files(tmp_path):
+    archive = tmp_path / "release.zip"
+    archive.write_bytes(b"zip")
+    sums_path = release._writeChecksums(str(tmp_path), "release.zip", str(archive), False, {"a.sh": "aa", "d/e.sh": "ee"})
+    import hashlib
+    assert sums_path == str(tmp_path / "release.SHA256SUMS")
+    assert open(sums_path).read().splitlines() == [f"{hashlib.sha256(b'zip').hexdigest()}  release.zip", "aa  a.sh", "ee  d/e.sh"]
+
+def test_applyRetention_only_when_configured(monkeypatch):
+    prune = mock.Mock()
+    monkeypatch.setattr(release.retention_util, "prune", prune)
+    monkeypatch.setattr(release.constants, "RETAIN_LAST", None)
+    monkeypatch.setattr(release.constants, "RETAIN_DAYS", None)
+    monkeypatch.setattr(release.constants, "RETAIN_SIZE", None)
+    release._applyRetention("/tmp/rel", "release-1.zip")
+    prune.assert_not_called()
+    monkeypatch.setattr(release.constants, "RETAIN_LAST", 3)
+    release._applyRetention("/tmp/rel", "release-1.zip")
+    prune.assert_called_once()
+    assert prune.call_args.kwargs["protect"] == ["release-1*"]
+
+def test_sourceDateEpoch_prefers_environment(monkeypatch):
+    repo = mock.Mock()
+    repo.commitTime.return_value = 1700000000
+    monkeypatch.setattr(release.constants, "SOURCE_DATE_EPOCH", None)
+    assert release._sourceDateEpoch(repo) == 1700000000
+    monkeypatch.setattr(release.constants, "SOURCE_DATE_EPOCH", 1600000000)
+    assert release._sourceDateEpoch(repo) == 1600000000
+
+def test_zipRepository_reproducible(monkeypatch):
+    zip_mock = mock.Mock(return_value="/tmp/release.zip")
+    monkeypatch.setattr(release.zip_util, "zip", zip_mock)
+    release._zipRepository("/tmp/repo", "/tmp/rel", "release.zip", source_date_epoch=1700000000)
+    zip_mock.assert_called_once_with("/tmp/repo", "/tmp/rel", "release.zip", digests=None, manifest=None, reproducible=True, timestamp=1700000000, followSymlinks=False, dedup=False, readAheadMemory=release.constants.READ_AHEAD_MEMORY, cache=None, blobShas=None, paths=None, exclude=None)
+
+def test_buildRelease_verifies_parts_before_handing_them_over(tmp_path, monkeypatch):
+    repo_dir = tmp_path / "repo"
+    repo_dir.mkdir()
+    (repo_dir / "a.sh").write_text("a")
+    patterns = tmp_path / "clean.txt"
+    patterns.write_text("*.log\n")
+    monkeypatch.setattr(release.zip_util, "verify", mock.Mock(side_effect=release.zip_util.ZipError("corrupt")))
+    uploaded = mock.Mock()
+    with pytest.raises(release.zip_util.ZipError):
+        release._buildRelease(str(repo_dir), str(patterns), str(tmp_path / "rel"), "release.zip", split_size=1, on_part_completed=uploaded)
+    uploaded.assert_not_called()
+
+def test_buildRelease_verifies_release(tmp_path):
+    repo_dir = tmp_path / "repo"
+    repo_dir.mkdir()
+    (repo_dir / "a.sh").write_text("a")
+    patterns = tmp_path / "clean.txt"
+    patterns.write_text("*.log\n")
+    release_path = release._buildRelease(str(repo_dir), str(patterns), str(tmp_path / "rel"), "release.zip")
+    assert release.zip_util.verify(release_path) == ["a.sh"]
+
+def test_verifyRelease_split_detects_missing_files():
+    with pytest.raises(release.zip_util.ZipError, match="b.sh"):
+        release._verifyRelease("/tmp/rel/release.index.json", True, {"a.sh": "aa", "b.sh": "bb"}, ["a.sh"])
+    release._verifyRelease("/tmp/rel/release.index.json", True, {"a.sh": "aa"}, ["a.sh"])
+
 def test_createTag_calls_repo(monkeypatch):
     repo = mock.Mock()
     repo.getRepository.return_value.working_dir = "/tmp/repo"
     release._createTag(repo, "v1.0", "desc")
     repo.createTag.assert_called_once_with(tag_name="v1.0", tag_description="desc")
 
+def test_createTag_through_api(monkeypatch):
+    repo = mock.Mock()
+    github_repo = mock.Mock()
+    github_repository_class = mock.Mock(return_value=github_repo)
+    monkeypatch.setattr(github_util, "GitHubRepository", github_repository_class)
+    release._createTag(repo, "v1.0", "desc", sha="abc123")
+    github_repository_class.assert_called_once_with(repo.getRepository.return_value)
+    github_repo.createTag.assert_called_once_with(tagName="v1.0", tagDescription="desc", sha="abc123")
+    repo.createTag.assert_not_called()
+
 def test_buildCommand_calls_build(monkeypatch):
     called = {}
     def fake_build(*args, **kwargs):
@@ -84,6 +255,7 @@ def test_buildCommand_calls_build(monkeypatch):
     args = mock.Mock()
     args.repo = "repo"
     args.branch = "main"
+    args.source_dir = None
     args.repo_target_dir = "dir"
     args.clean_patterns = "patterns"
     args.release_target_dir = "rel"
@@ -99,6 +271,7 @@ def test_buildAndReleaseCommand_uses_tag_if_release_not_set(monkeypatch):
     args = mock.Mock()
     args.repo = "repo"
     args.branch = "main"
+    args.source_dir = None
     args.repo_target_dir = "dir"
     args.clean_patterns = "patterns"
     args.release_target_dir = "rel"
@@ -114,18 +287,298 @@ def test_buildAndReleaseCommand_uses_tag_if_release_not_set(monkeypatch):
 def test_buildAndReleaseToGitHub_calls_all(monkeypatch):
     monkeypatch.setattr(release.helpers, "assertSet", lambda *a, **k: None)
     monkeypatch.setattr(release, "_validateRepositoryUrl", lambda url: None)
+    preflight = mock.Mock()
+    monkeypatch.setattr(release, "_preflight", preflight)
     repo = mock.Mock()
     repo.getRepository.return_value = mock.Mock(working_dir="/tmp/repo")
     monkeypatch.setattr(release, "_cloneRepository", lambda **kwargs: repo)
     monkeypatch.setattr(release, "_createTag", lambda **kwargs: None)
     github_repo = mock.Mock()
-    github_repo.createRelease.return_value = "release"
+    github_repo.createRelease.return_value = mock.Mock(html_url="https://github.com/o/r/releases/tag")
     github_repo.uploadFileToRelease = mock.Mock()
-    monkeypatch.setattr(release.github_util, "GitHubRepository", lambda r: github_repo)
-    monkeypatch.setattr(release, "_buildRelease", lambda **kwargs: "/tmp/release.zip")
-    release._buildAndReleaseToGitHub(
+    monkeypatch.setattr(github_util, "GitHubRepository", lambda r: github_repo)
+    build_release = mock.Mock(return_value="/tmp/release.zip")
+    monkeypatch.setattr(release, "_buildRelease", build_release)
+    clean_git = mock.Mock()
+    monkeypatch.setattr(release, "_cleanGit", clean_git)
+    timings = {}
+    critical_path = []
+    artifacts, release_url = release._buildAndReleaseToGitHub(
         "repo_url", "branch", "target_dir", "patterns", "rel_dir", "rel_name",
-        "tag", "tag_desc", "rel_ver", "rel_desc"
+        "tag", "tag_desc", "rel_ver", "rel_desc", timings=timings, critical_path=critical_path
     )
+    assert build_release.call_args.kwargs["defer_git"] is True
+    clean_git.assert_called_once_with(repository_target_dir="target_dir", patterns_file="patterns")
+    assert critical_path[:3] == ["preflight", "clone", "inspect"] and critical_path[-1] == "retention"
     github_repo.createRelease.assert_called_once()
-    github_repo.uploadFileToRelease.assert_called_once()
+    uploads = [call.kwargs["file_name"] for call in github_repo.uploadFileToRelease.call_args_list]
+    assert uploads == ["rel_name", "SHA256SUMS"]
+    assert artifacts == ["/tmp/release.zip", "rel_dir/rel_name.SHA256SUMS"]
+    assert release_url == "https://github.com/o/r/releases/tag"
+    assert preflight.call_args.kwargs["tag_version"] == "tag"
+    assert {"preflight", "clone", "tag", "create_release", "upload"} <= set(timings)
+
+def test_buildAndReleaseToGitHub_api_tag_cleans_git_with_the_rest(monkeypatch):
+    monkeypatch.setattr(release.helpers, "assertSet", lambda *a, **k: None)
+    monkeypatch.setattr(release, "_validateRepositoryUrl", lambda url: None)
+    monkeypatch.setattr(release, "_preflight", mock.Mock())
+    repo = mock.Mock()
+    repo.commitSha.return_value = "abc123"
+    monkeypatch.setattr(release, "_cloneRepository", lambda **kwargs: repo)
+    create_tag = mock.Mock()
+    monkeypatch.setattr(release, "_createTag", create_tag)
+    github_repo = mock.Mock()
+    github_repo.createRelease.return_value = mock.Mock(html_url="https://github.com/o/r/releases/tag")
+    monkeypatch.setattr(github_util, "GitHubRepository", lambda r: github_repo)
+    build_release = mock.Mock(return_value="/tmp/release.zip")
+    monkeypatch.setattr(release, "_buildRelease", build_release)
+    clean_git = mock.Mock()
+    monkeypatch.setattr(release, "_cleanGit", clean_git)
+    critical_path = []
+    release._buildAndReleaseToGitHub(
+        "repo_url", "branch", "target_dir", "patterns", "rel_dir", "rel_name",
+        "tag", "tag_desc", "rel_ver", "rel_desc", api_tag=True, critical_path=critical_path
+    )
+    create_tag.assert_called_once_with(repository=repo, tag_name="tag", tag_description="tag_desc", sha="abc123", github=github_repo)
+    assert build_release.call_args.kwargs["defer_git"] is False
+    clean_git.assert_not_called()
+    assert "clean_git" not in critical_path
+
+def test_build_fails_preflight_before_cloning(tmp_path, monkeypatch):
+    monkeypatch.setattr(release, "_cloneRepository", mock.Mock(side_effect=AssertionError("cloned")))
+    (tmp_path / "file").write_text("in the way")
+    with pytest.raises(release.preflight_util.PreflightError) as error_info:
+        release._build("https://github.com/o/r.git", "main", str(tmp_path / "clone"), str(tmp_path / "missing.txt"), str(tmp_path / "file" / "rel"), "release.zip")
+    assert set(error_info.value.failures) == {"clean patterns", f"directory {tmp_path / 'file' / 'rel'}"}
+
+def test_release_fails_preflight_without_token(tmp_path, monkeypatch):
+    monkeypatch.setattr(release, "_cloneRepository", mock.Mock(side_effect=AssertionError("cloned")))
+    monkeypatch.delenv("GITHUB_TOKEN", raising=False)
+    patterns = tmp_path / "clean.txt"
+    patterns.write_text(".git\n")
+    with pytest.raises(release.preflight_util.PreflightError) as error_info:
+        release._buildAndReleaseToGitHub("https://github.com/o/r.git", "main", str(tmp_path / "clone"), str(patterns), str(tmp_path / "rel"), "release.zip", "v1", "desc", "v1", "desc")
+    assert set(error_info.value.failures) == {"github access"}
+    assert "GITHUB_TOKEN" in error_info.value.failures["github access"]
+
+def test_release_from_checkout_without_origin_fails_preflight(tmp_path, monkeypatch):
+    from git import Repo
+    checkout = tmp_path / "checkout"
+    Repo.init(checkout).index.commit("empty")
+    patterns = tmp_path / "clean.txt"
+    patterns.write_text(".git\n")
+    with pytest.raises(release.preflight_util.PreflightError) as error_info:
+        release._preflight(None, None, str(patterns), str(tmp_path / "rel"), source_dir=str(checkout), tag_version="v1")
+    assert set(error_info.value.failures) == {"github repository"}
+    assert "no origin remote" in error_info.value.failures["github repository"]
+
+def test_jobWorkspace_gives_concurrent_jobs_their_own_clone(tmp_path, monkeypatch):
+    clone = str(tmp_path / "clone")
+    with release._jobWorkspace(clone, None, str(tmp_path / "rel"), "a.zip") as first:
+        with release._jobWorkspace(clone, None, str(tmp_path / "rel"), "b.zip") as second:
+            assert (first, second) == (clone, f"{clone}-2")
+    with release._jobWorkspace(clone, None, str(tmp_path / "rel"), "a.zip") as again:
+        assert again == clone
+
+def test_jobWorkspace_waits_for_the_same_release(tmp_path, monkeypatch):
+    import threading, time
+    order = []
+    def job(name):
+        with release._jobWorkspace(str(tmp_path / name), None, str(tmp_path / "rel"), "release.zip"):
+            order.append(f"{name} started")
+            time.sleep(0.1)
+            order.append(f"{name} finished")
+    with release._jobWorkspace(str(tmp_path / "first"), None, str(tmp_path / "rel"), "release.zip"):
+        second = threading.Thread(target=job, args=("second",))
+        second.start()
+        time.sleep(0.1)
+        order.append("first finished")
+    second.join(5)
+    assert order == ["first finished", "second started", "second finished"]
+
+def test_main_exits_on_invalid_arguments(monkeypatch):
+    monkeypatch.setattr(release, "_init", lambda: None)
+    monkeypatch.setattr("sys.argv", ["archive-and-release", "build", "--repo", "not a url"])
+    with pytest.raises(SystemExit) as exit_info:
+        release.main()
+    assert exit_info.value.code == 1
+
+def test_build_from_source_dir_leaves_checkout_untouched(tmp_path, monkeypatch):
+    from git import Repo
+    checkout = tmp_path / "checkout"
+    (checkout / "d").mkdir(parents=True)
+    repo = Repo.init(checkout)
+    (checkout / "a.sh").write_text("a")
+    (checkout / "d" / "e.sh").write_text("e")
+    (checkout / "build.log").write_text("tracked but cleaned")
+    repo.index.add(["a.sh", "d/e.sh", "build.log"])
+    repo.index.commit("initial")
+    (checkout / "untracked.sh").write_text("untracked")
+    patterns = tmp_path / "clean.txt"
+    patterns.write_text("*.log\n")
+    monkeypatch.setattr(release, "_cloneRepository", mock.Mock(side_effect=AssertionError("cloned")))
+    monkeypatch.setattr(release.constants, "RETAIN_LAST", None)
+    monkeypatch.setattr(release.constants, "RETAIN_DAYS", None)
+    monkeypatch.setattr(release.constants, "RETAIN_SIZE", None)
+
+    release._build(None, None, None, str(patterns), str(tmp_path / "rel"), "release.zip", source_dir=str(checkout))
+
+    import zipfile
+    with zipfile.ZipFile(tmp_path / "rel" / "release.zip") as zf:
+        assert sorted(zf.namelist()) == ["a.sh", "d/e.sh"]
+    assert (checkout / "build.log").exists() and (checkout / "untracked.sh").exists()
+
+def _tagged_checkout(tmp_path):
+    """A checkout tagged v1.0, with a file changed, one added and one deleted since."""
+    from git import Repo
+    checkout = tmp_path / "checkout"
+    checkout.mkdir()
+    repo = Repo.init(checkout)
+    (checkout / "a.sh").write_text("a")
+    (checkout / "gone.sh").write_text("gone")
+    repo.index.add(["a.sh", "gone.sh"])
+    repo.index.commit("initial")
+    repo.create_tag("v1.0")
+    (checkout / "a.sh").write_text("changed")
+    (checkout / "b.sh").write_text("b")
+    repo.index.remove(["gone.sh"], working_tree=True)
+    repo.index.add(["a.sh", "b.sh"])
+    repo.index.commit("second")
+    (tmp_path / "clean.txt").write_text("*.log\n")
+    return checkout
+
+def _runCli(monkeypatch, *argv):
+    monkeypatch.setattr(release, "_init", lambda: None)
+    monkeypatch.setattr(release.constants, "RETAIN_LAST", None)
+    monkeypatch.setattr(release.constants, "RETAIN_DAYS", None)
+    monkeypatch.setattr(release.constants, "RETAIN_SIZE", None)
+    monkeypatch.setattr("sys.argv", ["archive-and-release", *argv])
+    release.main()
+
+def test_build_command_builds_delta(tmp_path, monkeypatch):
+    checkout = _tagged_checkout(tmp_path)
+
+    _runCli(monkeypatch, "build", "--source_dir", str(checkout), "-p", str(tmp_path / "clean.txt"), "-t", str(tmp_path / "rel"), "-f", "release.zip", "--delta_from", "v1.0")
+
+    import zipfile
+    with zipfile.ZipFile(tmp_path / "rel" / "release.delta-v1.0.zip") as zf:
+        assert sorted(zf.namelist()) == ["a.sh", "b.sh"]
+    lines = [line for line in (tmp_path / "rel" / "release.delta-v1.0.deleted.txt").read_text().splitlines() if not line.startswith("#")]
+    assert lines == ["gone.sh"]
+    assert "release.delta-v1.0.zip" in (tmp_path / "rel" / "release.SHA256SUMS").read_text()
+
+def test_build_command_without_checksums(tmp_path, monkeypatch):
+    checkout = _tagged_checkout(tmp_path)
+
+    _runCli(monkeypatch, "build", "--source_dir", str(checkout), "-p", str(tmp_path / "clean.txt"), "-t", str(tmp_path / "rel"), "-f", "release.zip", "--delta_from", "v1.0", "--no_checksums")
+
+    assert sorted(os.listdir(tmp_path / "rel")) == ["release.delta-v1.0.deleted.txt", "release.delta-v1.0.zip", "release.zip"]
+
+def test_writeChecksums_split_lists_parts_and_index(tmp_path):
+    import hashlib, json
+    (tmp_path / "release.part001.zip").write_bytes(b"part")
+    index = tmp_path / "release.index.json"
+    index.write_text(json.dumps({"parts": ["release.part001.zip"]}))
+    sums_path = release._writeChecksums(str(tmp_path), "release.zip", str(index), True, {"a.sh": "aa"})
+    assert open(sums_path).read().splitlines() == [f"{hashlib.sha256(b'part').hexdigest()}  release.part001.zip", f"{hashlib.sha256(index.read_bytes()).hexdigest()}  release.index.json", "aa  a.sh"]
+
+def test_build_reuses_manifest_digests_across_clones(tmp_path, monkeypatch):
+    from git import Repo
+    source = tmp_path / "source"
+    (source / "d").mkdir(parents=True)
+    repo = Repo.init(source, initial_branch="main")
+    (source / "a.sh").write_text("a")
+    (source / "d" / "e.sh").write_text("e")
+    repo.index.add(["a.sh", "d/e.sh"])
+    repo.index.commit("initial")
+    repo.clone(tmp_path / "mirror" / "o" / "r.git", bare=True)
+    (tmp_path / "clean.txt").write_text("*.log\n")
+    monkeypatch.setattr(release.constants, "GIT_MIRROR_ROOT", str(tmp_path / "mirror"))
+    monkeypatch.setattr(release.constants, "RETAIN_LAST", None)
+    monkeypatch.setattr(release.constants, "RETAIN_DAYS", None)
+    monkeypatch.setattr(release.constants, "RETAIN_SIZE", None)
+    reused = []
+    collect = release.zip_util._collectDigests
+    def spy(hasher, digests, manifest):
+        reused.append(hasher.reused())
+        collect(hasher, digests, manifest)
+    monkeypatch.setattr(release.zip_util, "_collectDigests", spy)
+
+    for _ in range(2):
+        release._build("https://github.com/o/r.git", "main", str(tmp_path / "clone"), str(tmp_path / "clean.txt"), str(tmp_path / "rel"), "release.zip", manifest_index=True)
+
+    # The second clone is a fresh checkout, but its files come from the blobs the first build recorded
+    assert reused == [0, 2]
+
+def test_runJob_fills_defaults_and_parses_options(monkeypatch):
+    called = {}
+    monkeypatch.setattr(release, "_build", lambda *args, **kwargs: called.update(args=args, kwargs=kwargs))
+    result = release._runJob({"command": "build", "options": {"repo": "https://github.com/o/r.git", "split_size": "2K", "reproducible": True}}, lambda event: None)
+    assert result["status"] == "ok" and result["command"] == "build"
+    assert called["args"][0] == "https://github.com/o/r.git"
+    assert called["args"][1] == "main"
+    assert called["kwargs"]["split_size"] == 2048
+    assert called["kwargs"]["reproducible"] is True
+    assert called["kwargs"]["checksums"] is True
+
+def test_runJob_rejects_invalid_jobs(monkeypatch):
+    monkeypatch.setattr(release, "_buildAndReleaseToGitHub", mock.Mock(side_effect=AssertionError("ran")))
+    with pytest.raises(release.errors_util.ProjectError, match="Unknown job command"):
+        release._runJob({"command": "serve"}, lambda event: None)
+    with pytest.raises(release.errors_util.ProjectError, match="Unknown options for release: colour"):
+        release._runJob({"command": "release", "options": {"colour": "red"}}, lambda event: None)
+    with pytest.raises(release.errors_util.ProjectError, match="Missing options for release: --tag_version, --tag_description"):
+        release._runJob({"command": "release", "options": {"repo": "https://github.com/o/r.git"}}, lambda event: None)
+
+def test_served_release_job_streams_the_logs_of_its_stages(tmp_path, monkeypatch, caplog):
+    caplog.set_level(logging.INFO)
+    monkeypatch.setattr(release, "_validateRepositoryUrl", lambda url: None)
+    monkeypatch.setattr(release, "_preflight", mock.Mock())
+    repo = mock.Mock()
+    repo.getRepository.return_value = mock.Mock(working_dir=str(tmp_path / "clone"))
+    monkeypatch.setattr(release, "_cloneRepository", lambda **kwargs: repo)
+    monkeypatch.setattr(release, "_createTag", lambda **kwargs: None)
+    github_repo = mock.Mock()
+    github_repo.createRelease.return_value = mock.Mock(html_url="https://github.com/o/r/releases/tag")
+    monkeypatch.setattr(github_util, "GitHubRepository", lambda r: github_repo)
+    monkeypatch.setattr(release, "_cleanGit", mock.Mock())
+    monkeypatch.setattr(release, "_applyRetention", mock.Mock())
+    # The build runs on one of the release's task threads, not the job's
+    def build_release(**kwargs):
+        logging.getLogger("releaser.utilities.zip_util").info(f"zipping on {threading.current_thread().name}")
+        return str(tmp_path / "rel" / "release.zip")
+    monkeypatch.setattr(release, "_buildRelease", build_release)
+
+    socket_path = str(tmp_path / "releaser.sock")
+    server = daemon_util.JobServer(socket_path, release._runJob, workers=1)
+    thread = threading.Thread(target=server.serveForever, daemon=True)
+    thread.start()
+    try:
+        events = []
+        options = {"repo": "https://github.com/o/r.git", "repo_target_dir": str(tmp_path / "clone"), "release_target_dir": str(tmp_path / "rel"), "release_file_name": "release.zip", "tag_version": "v1", "tag_description": "desc", "checksums": False}
+        result = daemon_util.submit(socket_path, {"command": "release", "options": options}, events.append)
+    finally:
+        server.shutdown()
+        thread.join()
+        server.close()
+
+    assert result["status"] == "ok"
+    messages = [event["message"] for event in events if event["event"] == "log"]
+    assert any(message.startswith("zipping on releaser-task") for message in messages)
+    assert events[-1]["event"] == "result"
+
+def test_submitCommand_sends_parsed_options_with_absolute_paths(monkeypatch):
+    submitted = {}
+    def fake_submit(socket_path, job, on_event):
+        submitted.update(socket=socket_path, job=job)
+        on_event({"event": "log", "level": "INFO", "message": "building"})
+        return {"status": "ok"}
+    monkeypatch.setattr(release.daemon_util, "submit", fake_submit)
+    args = mock.Mock(socket="/tmp/releaser.sock", job=["--", "build", "--repo", "https://github.com/o/r.git", "--repo_target_dir", "relative/clone", "--split_size", "1K"])
+    release._submitCommand(args)
+    assert submitted["socket"] == "/tmp/releaser.sock"
+    assert submitted["job"]["command"] == "build"
+    options = submitted["job"]["options"]
+    assert options["repo_target_dir"] == os.path.abspath("relative/clone")
+    assert options["split_size"] == 1024
+    assert "func" not in options
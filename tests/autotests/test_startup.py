@@ -0,0 +1,48 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+# The most importing releaser.release may take for the help, in microseconds (the best of a few runs). It takes around
+# 100ms; importing PyGithub and GitPython up front took it to nearly 300ms.
+_IMPORT_TIME_TARGET_US = 200_000
+
+# The packages the help must not import: GitPython and PyGithub are imported when a command first clones or publishes
+_DEFERRED_PACKAGES = ("git", "github")
+
+_ROOT = str(Path(__file__).resolve().parents[2])
+
+_HELP = "import sys; sys.argv = ['archive-and-release', '--help']; from releaser import release; release.main()"
+
+
+def _importTimes(tmp_path, code):
+    """Run the code with -X importtime, returning the cumulative import time (in microseconds) of each module."""
+    env = {**os.environ, "RELEASER_HOME": str(tmp_path), "PYTHONPATH": _ROOT}
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=tmp_path, env=env, capture_output=True, text=True)
+    assert completed.returncode == 0, completed.stderr
+    times = {}
+    for line in completed.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line[len("import time:"):].split("|")
+            if cumulative.strip().isdigit():
+                times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_help_does_not_import_git_or_github(tmp_path):
+    """Test the help is shown without importing GitPython or PyGithub."""
+    times = _importTimes(tmp_path, _HELP)
+    assert "releaser.release" in times
+    assert [name for name in times if name.split(".")[0] in _DEFERRED_PACKAGES] == []
+
+
+def test_help_import_time_under_target(tmp_path):
+    """Test importing the releaser for the help stays under the target."""
+    best = min(_importTimes(tmp_path, _HELP)["releaser.release"] for _ in range(3))
+    assert best < _IMPORT_TIME_TARGET_US, f"importing releaser.release took {best / 1000:.0f}ms (target {_IMPORT_TIME_TARGET_US / 1000:.0f}ms)"
+
+
+def test_release_imports_github_when_used(tmp_path):
+    """Test GitPython and PyGithub are imported with the utilities that use them."""
+    times = _importTimes(tmp_path, "from releaser import release; from releaser.utilities import github_util")
+    assert "github" in times and "git" in times
@@ -0,0 +1,41 @@
+import os
+import tempfile
+import zipfile
+from releaser.utilities import cache_util
+
+
+def _payload(size):
+    return cache_util.CachedPayload(crc=size, file_size=size * 2, payload=b"x" * size)
+
+def test_put_and_get():
+    """Test a payload is found again, also by a later cache on the same directory, and only for the same method and level."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        with cache_util.CompressionCache(tmpdir, 1024) as cache:
+            cache.put("git:abc", zipfile.ZIP_DEFLATED, 6, _payload(10))
+            assert cache.get("git:abc", zipfile.ZIP_DEFLATED, 9) is None
+        with cache_util.CompressionCache(tmpdir, 1024) as cache:
+            assert cache.get("git:abc", zipfile.ZIP_DEFLATED, 6) == _payload(10)
+            assert (cache.hits, cache.misses) == (1, 0)
+
+def test_evicts_least_recently_used():
+    """Test the cache evicts the payloads used least recently once it grows past its limit."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        with cache_util.CompressionCache(tmpdir, 350) as cache:
+            cache.put("a", zipfile.ZIP_DEFLATED, 6, _payload(100))
+            cache.put("b", zipfile.ZIP_DEFLATED, 6, _payload(100))
+            cache.put("c", zipfile.ZIP_DEFLATED, 6, _payload(100))
+            assert cache.get("a", zipfile.ZIP_DEFLATED, 6) is not None
+            cache.put("d", zipfile.ZIP_DEFLATED, 6, _payload(100))
+            assert cache.get("b", zipfile.ZIP_DEFLATED, 6) is None
+            for key in ("a", "c", "d"):
+                assert cache.get(key, zipfile.ZIP_DEFLATED, 6) is not None
+        payload_files = [name for dir, _, names in os.walk(tmpdir) for name in names if len(name) == 64]
+        assert len(payload_files) == 3
+
+def test_missing_payload_file_is_a_miss():
+    """Test a payload whose file has gone (evicted by another build) is treated as not cached."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        with cache_util.CompressionCache(tmpdir, 1024) as cache:
+            cache.put("a", zipfile.ZIP_DEFLATED, 6, _payload(10))
+            os.remove(cache._payloadPath(cache_util._key("a", zipfile.ZIP_DEFLATED, 6)))
+            assert cache.get("a", zipfile.ZIP_DEFLATED, 6) is None
@@ -0,0 +1,140 @@
+import pytest
+import logging
+import os
+import socket
+import tempfile
+import threading
+from releaser.utilities import daemon_util
+
+_logger = logging.getLogger("test_daemon_util")
+
+
+def _handler(job, send):
+    if job.get("command") == "exit":
+        raise SystemExit(1)
+    _logger.info(f"building {job['command']}")
+    return {"built": job["command"]}
+
+
+def _serving(socket_path, handler=_handler, workers=2):
+    server = daemon_util.JobServer(socket_path, handler, workers=workers)
+    thread = threading.Thread(target=server.serveForever, daemon=True)
+    thread.start()
+    return server, thread
+
+
+def _stop(server, thread):
+    server.shutdown()
+    thread.join()
+    server.close()
+
+def test_submit_streams_logs_then_result(caplog):
+    """Test a job's logging is streamed to the client before its result, and the socket is removed on close."""
+    caplog.set_level(logging.INFO)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        socket_path = os.path.join(tmpdir, "releaser.sock")
+        server, thread = _serving(socket_path)
+        try:
+            events = []
+            result = daemon_util.submit(socket_path, {"command": "build"}, events.append)
+            assert daemon_util.submit(socket_path, {"command": "ping"})["status"] == "ok"
+        finally:
+            _stop(server, thread)
+
+        assert result == {"built": "build"}
+        assert [event["event"] for event in events] == ["accepted", "log", "result"]
+        assert events[1]["message"] == "building build"
+        assert not os.path.exists(socket_path)
+
+def test_failing_job_does_not_stop_server():
+    """Test a job that fails (even by exiting) is reported to its client, and the server goes on serving."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        socket_path = os.path.join(tmpdir, "releaser.sock")
+        server, thread = _serving(socket_path)
+        try:
+            with pytest.raises(daemon_util.DaemonError, match="exited with status 1"):
+                daemon_util.submit(socket_path, {"command": "exit"})
+            assert daemon_util.submit(socket_path, {"command": "build"}) == {"built": "build"}
+        finally:
+            _stop(server, thread)
+
+def test_jobs_run_concurrently_on_workers():
+    """Test jobs run on the pool of workers at the same time."""
+    barrier = threading.Barrier(2, timeout=10)
+    def handler(job, send):
+        barrier.wait()
+        return {"job": job["command"]}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        socket_path = os.path.join(tmpdir, "releaser.sock")
+        server, thread = _serving(socket_path, handler, workers=2)
+        try:
+            results = []
+            clients = [threading.Thread(target=lambda name=name: results.append(daemon_util.submit(socket_path, {"command": name}, timeout=20))) for name in ("a", "b")]
+            for client in clients:
+                client.start()
+            for client in clients:
+                client.join()
+        finally:
+            _stop(server, thread)
+        assert sorted(result["job"] for result in results) == ["a", "b"]
+
+def test_invalid_job_is_rejected():
+    """Test a line that is not a JSON object is answered with an error."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        socket_path = os.path.join(tmpdir, "releaser.sock")
+        server, thread = _serving(socket_path)
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+                connection.connect(socket_path)
+                connection.sendall(b"[1, 2]\n")
+                reply = connection.makefile("rb").readline()
+        finally:
+            _stop(server, thread)
+        assert b"Invalid job" in reply
+
+def test_stale_socket_replaced_but_live_one_refused():
+    """Test a socket nothing listens on is replaced, but one a server is listening on is not."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        socket_path = os.path.join(tmpdir, "releaser.sock")
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale.bind(socket_path)
+        stale.close()
+
+        server, thread = _serving(socket_path)
+        try:
+            with pytest.raises(daemon_util.DaemonError, match="another server"):
+                daemon_util.JobServer(socket_path, _handler)
+        finally:
+            _stop(server, thread)
+
+def test_socket_is_private_from_the_start():
+    """Test the socket is bound where only this user can reach it, whatever the umask, and is left only for this user."""
+    import stat
+    bound_in = []
+    server_class = daemon_util.socketserver.ThreadingUnixStreamServer
+    class RecordingServer(server_class):
+        def server_bind(self):
+            super().server_bind()
+            bound_in.append(stat.S_IMODE(os.stat(os.path.dirname(self.server_address)).st_mode))
+    with tempfile.TemporaryDirectory() as tmpdir:
+        socket_path = os.path.join(tmpdir, "releaser.sock")
+        previous = os.umask(0)
+        try:
+            daemon_util.socketserver.ThreadingUnixStreamServer = RecordingServer
+            server, thread = _serving(socket_path)
+        finally:
+            daemon_util.socketserver.ThreadingUnixStreamServer = server_class
+            os.umask(previous)
+        try:
+            assert bound_in == [0o700]
+            assert stat.S_IMODE(os.stat(socket_path).st_mode) == 0o600
+            assert os.listdir(tmpdir) == ["releaser.sock"]
+            assert daemon_util.submit(socket_path, {"command": "ping"}, lambda event: None)
+        finally:
+            _stop(server, thread)
+
+def test_submit_without_server():
+    """Test submitting to a socket nothing listens on raises DaemonError."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        with pytest.raises(daemon_util.DaemonError, match="Cannot connect"):
+            daemon_util.submit(os.path.join(tmpdir, "missing.sock"), {"command": "build"})
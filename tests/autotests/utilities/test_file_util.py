@@ -89,6 +89,16 @@ def test_findNewestFileInDirectory():
         newest = file_util.findNewestFileInDirectory(tmpdir, '*.txt')
         assert newest == f2
 
+def test_findNewestFileInDirectory_in_sub_directories():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for name, mtime in [('a/x.txt', 1), ('b/y.txt', 2), ('z.txt', 3)]:
+            os.makedirs(os.path.dirname(os.path.join(tmpdir, name)), exist_ok=True)
+            with open(os.path.join(tmpdir, name), 'w') as f:
+                f.write(name)
+            os.utime(os.path.join(tmpdir, name), (mtime, mtime))
+        assert file_util.findNewestFileInDirectory(tmpdir, '*/*.txt') == os.path.join(tmpdir, 'b', 'y.txt')
+        assert file_util.findNewestFileInDirectory(os.path.join(tmpdir, 'missing'), '*/*.txt') is None
+
 def test_readFile_success():
     with tempfile.NamedTemporaryFile('w+', delete=False) as tmpfile:
         tmpfile.write('hello')
@@ -131,3 +141,274 @@ def test_removeFilesOfTypes():
         file_util.removeFilesOfTypes(tmpdir, ['*.log'])
         assert not os.path.exists(f1)
         assert os.path.exists(f2)
+
+def test_matchesPatterns():
+    patterns = ['.git', '*.log', 'build/tmp']
+    assert file_util.matchesPatterns('.git', patterns)
+    assert file_util.matchesPatterns('.git/config', patterns)
+    assert file_util.matchesPatterns('sub/module/.git', patterns)
+    assert file_util.matchesPatterns('logs/today.log', patterns)
+    assert file_util.matchesPatterns('x/build/tmp/a.txt', patterns)
+    assert not file_util.matchesPatterns('build/a.txt', patterns)
+    assert not file_util.matchesPatterns('.github/workflow.yml', patterns)
+    assert not file_util.matchesPatterns('src/main.sh', patterns)
+    assert not file_util.matchesPatterns('.x.log', patterns)
+    assert not file_util.matchesPatterns('.hidden/a.log', patterns)
+    assert not file_util.matchesPatterns('.hidden/sub/.git', patterns)
+
+def test_matchesPatterns_selects_what_findFilesOfTypes_finds():
+    patterns = file_util.readListFromFile(os.path.join(os.path.dirname(file_util.__file__), '..', 'clean.txt')) + ['*.log', 'build/tmp', '*']
+    paths = ['.gitignore', '.github/workflow.yml', '.config/.gitignore', '.config/.DS_Store', '.config/a.log', '.DS_Store',
+             'src/.DS_Store', 'src/.git/config', 'src/a.log', 'src/.x.log', 'src/build/tmp/a.txt', '.hidden/build/tmp/a.txt', 'README']
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for path in paths:
+            os.makedirs(os.path.dirname(os.path.join(tmpdir, path)), exist_ok=True)
+            with open(os.path.join(tmpdir, path), 'w') as f:
+                f.write(path)
+        for count in range(1, len(patterns) + 1):
+            found = [os.path.relpath(path, tmpdir) for path in file_util.findFilesOfTypes(tmpdir, patterns[:count])]
+            removed = {path for path in paths if any(path == match or path.startswith(match + '/') for match in found)}
+            assert {path for path in paths if file_util.matchesPatterns(path, patterns[:count])} == removed, patterns[:count]
+
+def test_delete_directory_tree_and_symlinks():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        d = os.path.join(tmpdir, 'd')
+        os.makedirs(os.path.join(d, 'a', 'b'))
+        with open(os.path.join(d, 'a', 'b', 'f.txt'), 'w') as file:
+            file.write('x')
+        outside = os.path.join(tmpdir, 'outside')
+        os.mkdir(outside)
+        os.symlink(outside, os.path.join(d, 'link'))
+        os.symlink('missing', os.path.join(d, 'broken'))
+        file_util.deleteContents(d)
+        assert os.listdir(d) == []
+        assert os.path.isdir(outside)  # symbolic links are unlinked, not followed
+        file_util.delete(d)
+        assert not os.path.exists(d)
+        file_util.delete(d)  # deleting something that isn't there is fine
+
+def test_deleteInBackground_and_reapTrash():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        d = os.path.join(tmpdir, 'd')
+        os.makedirs(os.path.join(d, 'sub'))
+        thread = file_util.deleteInBackground(d)
+        assert not os.path.exists(d)  # gone (to the trash) straight away
+        thread.join()
+        assert os.listdir(tmpdir) == []
+
+        stale = os.path.join(tmpdir, '.d' + file_util.TRASH_MARKER + 'left-over')
+        os.makedirs(os.path.join(stale, 'sub'))
+        file_util.reapTrash(tmpdir, background=False)
+        assert os.listdir(tmpdir) == []
+
+def test_reapTrash_of_one_name():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        mine = os.path.join(tmpdir, '.d' + file_util.TRASH_MARKER + 'left-over')
+        theirs = os.path.join(tmpdir, '.d-2' + file_util.TRASH_MARKER + 'being-reaped')
+        os.makedirs(mine)
+        os.makedirs(theirs)
+        file_util.reapTrash(tmpdir, background=False, name='d')
+        assert os.listdir(tmpdir) == [os.path.basename(theirs)]
+
+def test_reapTrash_skips_trash_being_reaped(monkeypatch):
+    import threading
+    with tempfile.TemporaryDirectory() as tmpdir:
+        trash = os.path.join(tmpdir, '.d' + file_util.TRASH_MARKER + 'being-reaped')
+        os.makedirs(trash)
+        started, finish = threading.Event(), threading.Event()
+        delete = file_util.delete
+        def slow_delete(path):
+            started.set()
+            finish.wait(5)
+            delete(path)
+        monkeypatch.setattr(file_util, 'delete', slow_delete)
+        reaper = file_util.reapInBackground(trash)
+        started.wait(5)
+        assert file_util.reapTrash(tmpdir, name='d') == []
+        finish.set()
+        reaper.join(5)
+        assert os.listdir(tmpdir) == []
+        assert file_util._reaping == set()
+
+def test_atomicPath_replaces_file_once_written():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, 'release.zip')
+        with open(path, 'w') as f:
+            f.write('old')
+        with file_util.atomicPath(path) as temporary_path:
+            with open(temporary_path, 'w') as f:
+                f.write('new')
+            assert os.path.basename(temporary_path).startswith('.release.zip' + file_util.PARTIAL_MARKER)
+            with open(path) as f:
+                assert f.read() == 'old'  # untouched until the new file is complete
+        with open(path) as f:
+            assert f.read() == 'new'
+        assert os.listdir(tmpdir) == ['release.zip']
+
+def test_atomicPath_leaves_file_on_error():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, 'release.zip')
+        with open(path, 'w') as f:
+            f.write('old')
+        with pytest.raises(RuntimeError):
+            with file_util.atomicPath(path) as temporary_path:
+                with open(temporary_path, 'w') as f:
+                    f.write('half')
+                raise RuntimeError('failed part way')
+        with open(path) as f:
+            assert f.read() == 'old'
+        assert os.listdir(tmpdir) == ['release.zip']
+
+def test_moveToTrash_missing_path():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        assert file_util.moveToTrash(os.path.join(tmpdir, 'missing')) is None
+
+def test_copyTree_copies_nested_tree_and_reports():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        src = os.path.join(tmpdir, 'src')
+        os.makedirs(os.path.join(src, 'a', 'b'))
+        for name, content in [('top.txt', 'top'), ('a/one.txt', '1'), ('a/b/two.txt', '22')]:
+            with open(os.path.join(src, name), 'w') as f:
+                f.write(content)
+        os.utime(os.path.join(src, 'top.txt'), (1000, 1000))
+        dst = os.path.join(tmpdir, 'dst')
+        report = file_util.copyTree(src, dst, workers=2)
+        assert report.files == 3
+        assert report.bytes_copied + report.bytes_shared == 6
+        with open(os.path.join(dst, 'a', 'b', 'two.txt')) as f:
+            assert f.read() == '22'
+        assert os.stat(os.path.join(dst, 'top.txt')).st_mtime == 1000  # metadata copied, as copy2 would
+
+def test_copyFile_hardlinks_when_allowed():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        src = os.path.join(tmpdir, 'src.txt')
+        with open(src, 'w') as f:
+            f.write('hello')
+        dst = os.path.join(tmpdir, 'dst.txt')
+        report = file_util.copyFile(src, dst, allowHardlinks=True)
+        assert report.bytes_shared == 5 and report.bytes_copied == 0
+        # Copying again without hard links breaks the link rather than truncating the source
+        report = file_util.copyFile(src, dst)
+        assert not os.path.samefile(src, dst)
+        with open(src) as f:
+            assert f.read() == 'hello'
+        with open(dst) as f:
+            assert f.read() == 'hello'
+
+def test_copyFile_without_reflinks_falls_back(monkeypatch):
+    monkeypatch.setattr(file_util, '_reflink', lambda s, d: False)
+    monkeypatch.setattr(file_util, '_copyFileRange', lambda s, d: False)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        src = os.path.join(tmpdir, 'src.txt')
+        with open(src, 'w') as f:
+            f.write('hello')
+        os.mkdir(os.path.join(tmpdir, 'dir'))
+        report = file_util.copyFile(src, os.path.join(tmpdir, 'dir'))
+        assert report.bytes_copied == 5
+        with open(os.path.join(tmpdir, 'dir', 'src.txt')) as f:
+            assert f.read() == 'hello'
+
+def test_copyContents_keeps_subdirectories():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        src = os.path.join(tmpdir, 'src')
+        os.makedirs(os.path.join(src, 'sub'))
+        with open(os.path.join(src, 'sub', 'f.txt'), 'w') as f:
+            f.write('x')
+        dst = os.path.join(tmpdir, 'dst')
+        os.mkdir(dst)
+        assert file_util.copyContents(src, dst)
+        assert os.path.exists(os.path.join(dst, 'sub', 'f.txt'))
+
+def _make_wide_tree(base):
+    for i in range(5):
+        for j in range(3):
+            d = os.path.join(base, f'd{i}', f'e{j}', 'f')
+            os.makedirs(d)
+            with open(os.path.join(d, 'file.txt'), 'w') as f:
+                f.write('x')
+    os.symlink('d0', os.path.join(base, 'link'))
+
+@pytest.mark.parametrize('workers', [None, 4])
+def test_chmod_recursive_changes_and_skips(workers):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        root = os.path.join(tmpdir, 'root')
+        os.mkdir(root)
+        _make_wide_tree(root)
+        entries = 5 + 15 + 15 + 15  # d*, e*, f, file.txt (the symbolic link is left alone)
+        assert file_util.chmod_recursive(root, 0o750, workers=workers) == entries + 1
+        for current, dirs, files in os.walk(root):
+            for name in dirs + files:
+                if not os.path.islink(os.path.join(current, name)):
+                    assert os.stat(os.path.join(current, name)).st_mode & 0o777 == 0o750
+        # Nothing left to change the second time round
+        assert file_util.chmod_recursive(root, 0o750, workers=workers) == 0
+
+@pytest.mark.parametrize('workers', [None, 4])
+def test_chmod_recursive_locks_owner_out_last(workers):
+    def restore(d):
+        os.chmod(d, 0o700)
+        for entry in os.scandir(d):
+            if entry.is_dir(follow_symlinks=False):
+                restore(entry.path)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        root = os.path.join(tmpdir, 'root')
+        os.mkdir(root)
+        _make_wide_tree(root)
+        try:
+            # Directories the owner can no longer enter are changed after what is in them
+            assert file_util.chmod_recursive(root, 0o600, workers=workers) == 5 + 15 + 15 + 15 + 1
+        finally:
+            restore(root)
+        assert os.stat(os.path.join(root, 'd4', 'e2', 'f', 'file.txt')).st_mode & 0o777 == 0o600
+
+@pytest.mark.parametrize('workers', [None, 4])
+def test_walkTreeFds_visits_directories_after_their_contents(workers):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        _make_wide_tree(tmpdir)
+        order = []
+        def visit(dir_fd, entry):
+            order.append((os.fstat(dir_fd).st_ino, entry.inode()))
+            return True
+        assert file_util._walkTreeFds(tmpdir, visit, workers) == 5 + 15 + 15 + 15 + 1
+        visited_at = {inode: position for position, (_, inode) in enumerate(order)}
+        for position, (parent, _) in enumerate(order):
+            assert position < visited_at.get(parent, len(order))
+
+@pytest.mark.parametrize('workers', [None, 4])
+def test_chown_recursive_skips_matching_owner(workers):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        _make_wide_tree(tmpdir)
+        assert file_util.chown_recursive(tmpdir, str(os.getuid()), str(os.getgid()), workers=workers) == 0
+
+@pytest.mark.skipif(os.geteuid() != 0, reason='changing ownership needs root')
+def test_chown_recursive_changes_owner_without_following_links():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        root = os.path.join(tmpdir, 'root')
+        os.mkdir(root)
+        _make_wide_tree(root)
+        outside = os.path.join(tmpdir, 'outside.txt')
+        with open(outside, 'w') as f:
+            f.write('x')
+        os.symlink(outside, os.path.join(root, 'outside-link'))
+        assert file_util.chown_recursive(root, '12345', '12345', workers=4) == 5 + 15 + 15 + 15 + 2 + 1
+        assert os.stat(os.path.join(root, 'd4', 'e2', 'f', 'file.txt')).st_uid == 12345
+        assert os.lstat(os.path.join(root, 'outside-link')).st_uid == 12345
+        assert os.stat(outside).st_uid == os.getuid()
+
+def test_scanDirectory_and_removeFiles():
+    import datetime
+    with tempfile.TemporaryDirectory() as tmpdir:
+        os.makedirs(os.path.join(tmpdir, 'sub'))
+        for name in ['old.zip', '.hidden.zip', 'new.zip', 'sub/old.zip']:
+            with open(os.path.join(tmpdir, name), 'w') as f:
+                f.write('x')
+        os.utime(os.path.join(tmpdir, 'old.zip'), (1, 1))
+        os.utime(os.path.join(tmpdir, 'sub', 'old.zip'), (1, 1))
+        assert sorted(e.name for e in file_util.scanDirectory(tmpdir, '*.zip')) == ['new.zip', 'old.zip']
+        assert sorted(e.name for e in file_util.scanDirectory(tmpdir, '.*')) == ['.hidden.zip']
+        assert len(file_util.scanDirectory(tmpdir, '*.zip', recursive=True)) == 3
+        assert file_util.scanDirectory(os.path.join(tmpdir, 'missing')) == []
+        file_util.removeFiles(tmpdir, datetime.timedelta(days=1))
+        assert sorted(os.listdir(tmpdir)) == ['.hidden.zip', 'new.zip', 'sub']
+        file_util.removeFiles(tmpdir, datetime.timedelta(days=1), recursive=True)
+        assert os.listdir(os.path.join(tmpdir, 'sub')) == []
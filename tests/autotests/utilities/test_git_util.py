@@ -114,6 +114,22 @@ def test_create_release_tag():
     mock_remote.push.assert_called_once_with("refs/tags/v1.0.0")
 
 
+def test_commit_time():
+    """Test the commit time is that of the checked out commit."""
+    mock_repo = create_mock_repo()
+    mock_repo.head.commit.committed_date = 1700000000
+    git_repo = git_util.GitRepository("https://github.com/test/repo", mock_repo)
+    assert git_repo.commitTime() == 1700000000
+
+
+def test_commit_sha():
+    """Test the commit SHA is that of the checked out commit."""
+    mock_repo = create_mock_repo()
+    mock_repo.head.commit.hexsha = "0123456789abcdef0123456789abcdef01234567"
+    git_repo = git_util.GitRepository("https://github.com/test/repo", mock_repo)
+    assert git_repo.commitSha() == "0123456789abcdef0123456789abcdef01234567"
+
+
 def test_git_error_inheritance():
     """Test that GitError inherits from UtilityError."""
     assert issubclass(git_util.GitError, git_util.UtilityError)
@@ -141,3 +157,127 @@ def test_git_repository_repr():
     # Test that the object can be converted to string (for debugging)
     str_repr = str(git_repo)
     assert "GitRepository" in str_repr or "object" in str_repr 
+
+
+def _commit_files(repo, files, message):
+    """Write (or, for None content, delete) files in a real repository and commit them."""
+    import os
+    for path, content in files.items():
+        full_path = os.path.join(repo.working_dir, path)
+        if content is None:
+            repo.index.remove([path], working_tree=True)
+            continue
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, "w") as f:
+            f.write(content)
+        repo.index.add([path])
+    return repo.index.commit(message)
+
+
+def test_changes_since_tag_recurses_into_submodules():
+    """Test changesSince reports added, modified and deleted paths, including inside a moved submodule."""
+    import os
+    with tempfile.TemporaryDirectory() as tmpdir:
+        sub = Repo.init(os.path.join(tmpdir, "sub"))
+        _commit_files(sub, {"lib.sh": "v1", "old.sh": "old"}, "sub v1")
+
+        main = Repo.init(os.path.join(tmpdir, "main"))
+        _commit_files(main, {"a.sh": "a", "b.sh": "b", "c.sh": "c"}, "main v1")
+        main.git.execute(["git", "-c", "protocol.file.allow=always", "submodule", "add", os.path.join(tmpdir, "sub"), "libs/sub"])
+        main.index.commit("add submodule")
+        main.create_tag("v1.0.0")
+
+        # Move the submodule on and change the main repository
+        _commit_files(sub, {"lib.sh": "v2", "old.sh": None, "new.sh": "new"}, "sub v2")
+        checkout = Repo(os.path.join(main.working_dir, "libs/sub"))
+        checkout.git.pull("origin", sub.active_branch.name)
+        main.git.add("libs/sub")
+        _commit_files(main, {"a.sh": "a2", "b.sh": None, "d/e.sh": "e"}, "main v2")
+
+        changes = git_util.GitRepository("https://github.com/test/repo", main).changesSince("v1.0.0")
+
+        assert sorted(changes.added) == ["d/e.sh", "libs/sub/new.sh"]
+        assert sorted(changes.modified) == ["a.sh", "libs/sub/lib.sh"]
+        assert sorted(changes.deleted) == ["b.sh", "libs/sub/old.sh"]
+        assert changes.changed() == ["a.sh", "d/e.sh", "libs/sub/lib.sh", "libs/sub/new.sh"]
+
+
+def test_blob_shas_are_those_of_regular_files():
+    """Test blobShas gives the blob SHA of each tracked regular file, leaving out symbolic links."""
+    import os
+    with tempfile.TemporaryDirectory() as tmpdir:
+        main = Repo.init(os.path.join(tmpdir, "main"))
+        _commit_files(main, {"a.sh": "a", "d/b.sh": "b"}, "main v1")
+        os.symlink("a.sh", os.path.join(main.working_dir, "link.sh"))
+        main.index.add(["link.sh"])
+        main.index.commit("add link")
+
+        blob_shas = git_util.GitRepository("https://github.com/test/repo", main).blobShas()
+
+        assert blob_shas == {"a.sh": main.git.hash_object("a.sh"), "d/b.sh": main.git.hash_object("d/b.sh")}
+
+
+def test_changes_since_unknown_tag():
+    """Test changesSince raises a GitError for a tag that cannot be found."""
+    import os
+    with tempfile.TemporaryDirectory() as tmpdir:
+        main = Repo.init(os.path.join(tmpdir, "main"))
+        _commit_files(main, {"a.sh": "a"}, "main v1")
+        with pytest.raises(git_util.GitError):
+            git_util.GitRepository("https://github.com/test/repo", main).changesSince("v9.9.9")
+
+
+def test_change_set_extend_with_prefix():
+    """Test ChangeSet.extend places changes under the prefix."""
+    changes = git_util.ChangeSet(added=["x"])
+    changes.extend(git_util.ChangeSet(added=["a"], modified=["b"], deleted=[""]), prefix="sub")
+    assert changes.added == ["x", "sub/a"]
+    assert changes.modified == ["sub/b"]
+    assert changes.deleted == ["sub"]
+
+
+def test_open_existing_checkout_lists_tracked_files():
+    """Test open uses a checkout in place, and trackedFiles lists its index rather than its working tree."""
+    import os
+    with tempfile.TemporaryDirectory() as tmpdir:
+        main = Repo.init(os.path.join(tmpdir, "main"))
+        _commit_files(main, {"a.sh": "a", "d/b.sh": "b"}, "main v1")
+        main.create_remote("origin", "https://github.com/test/repo")
+        with open(os.path.join(tmpdir, "main", "untracked.sh"), "w") as f:
+            f.write("untracked")
+
+        git_repo = git_util.GitRepository.open(os.path.join(tmpdir, "main"))
+
+        assert git_repo._repo_url == "https://github.com/test/repo"
+        assert sorted(git_repo.trackedFiles()) == ["a.sh", "d/b.sh"]
+        with pytest.raises(git_util.GitError):
+            git_util.GitRepository.open(os.path.join(tmpdir, "main", "d"))
+        with pytest.raises(git_util.GitError):
+            git_util.GitRepository.open(tmpdir)
+
+
+def test_clone_from_mirror_rewrites_submodules():
+    """Test cloning through mirror rewrites fetches the repository and its submodules from the mirror, keeping the real origin."""
+    import os
+    from releaser.utilities import url_util
+    with tempfile.TemporaryDirectory() as tmpdir:
+        mirror = os.path.join(tmpdir, "mirror")
+        sub = Repo.init(os.path.join(tmpdir, "work", "sub"))
+        _commit_files(sub, {"lib.sh": "lib"}, "sub")
+        Repo.clone_from(sub.working_dir, os.path.join(mirror, "owner", "sub.git"), bare=True)
+        main = Repo.init(os.path.join(tmpdir, "work", "main"), initial_branch="main")
+        _commit_files(main, {"a.sh": "a"}, "main")
+        main.git.execute(["git", "-c", "protocol.file.allow=always", "submodule", "add", sub.working_dir, "libs/sub"])
+        main.git.config("-f", ".gitmodules", "submodule.libs/sub.url", "https://github.com/owner/sub.git")
+        main.git.add(".gitmodules")
+        main.index.commit("add submodule")
+        Repo.clone_from(main.working_dir, os.path.join(mirror, "owner", "main.git"), bare=True)
+
+        target = os.path.join(tmpdir, "clone")
+        os.makedirs(target)
+        git_repo = git_util.GitRepository.cloneRepositoryBranch("https://github.com/owner/main.git", target, "main", rewrites=url_util.mirrorRewrites(mirror))
+        git_repo.initAnySubmodules()
+
+        assert git_repo.getRepository().remote("origin").url == "https://github.com/owner/main.git"
+        with open(os.path.join(target, "libs", "sub", "lib.sh")) as f:
+            assert f.read() == "lib"
@@ -2,10 +2,12 @@ import pytest
 import os
 from unittest.mock import Mock, patch, MagicMock
 from git import Repo
-from github import Github, Auth
+from github import Github, Auth, BadCredentialsException, GithubException, UnknownObjectException
 from github.GitRelease import GitRelease
 
+from releaser.utilities import github_util
 from releaser.utilities.github_util import GitHubRepository, GitHubError
+from releaser.utilities.errors_util import ValidationError
 
 
 class TestGitHubRepository:
@@ -60,7 +62,7 @@ class TestGitHubRepository:
     
     def test_init_none_repository(self):
         """Test initialization fails when repository is None."""
-        with pytest.raises(SystemExit):
+        with pytest.raises(ValidationError):
             GitHubRepository(None)  # type: ignore
     
     def test_get_repository_name_https(self, mock_repo):
@@ -116,6 +118,15 @@ class TestGitHubRepository:
                 github_repo = GitHubRepository(mock_repo)
                 with pytest.raises(GitHubError, match="The repository is a GitHub repository"):
                     github_repo.getRepositoryName()
+
+    def test_get_repository_name_is_kept(self, mock_repo):
+        """Test the name is read from the clone once, so it is still known once the clone's .git directory has gone."""
+        with patch.dict(os.environ, {'GITHUB_TOKEN': 'test_token'}):
+            with patch('releaser.utilities.github_util.Github'):
+                github_repo = GitHubRepository(mock_repo)
+                assert github_repo.getRepositoryName() == "testowner/testrepo"
+                del mock_repo.remotes.origin
+                assert github_repo.getRepositoryName() == "testowner/testrepo"
     
     def test_create_release_success(self, mock_repo, mock_github_repo, mock_git_release):
         """Test successful release creation."""
@@ -148,7 +159,7 @@ class TestGitHubRepository:
         with patch.dict(os.environ, {'GITHUB_TOKEN': 'test_token'}):
             with patch('releaser.utilities.github_util.Github'):
                 github_repo = GitHubRepository(mock_repo)
-                with pytest.raises(SystemExit):
+                with pytest.raises(ValidationError):
                     github_repo.createRelease(None, "description", "tag")  # type: ignore
     
     def test_create_release_missing_description(self, mock_repo):
@@ -156,7 +167,7 @@ class TestGitHubRepository:
         with patch.dict(os.environ, {'GITHUB_TOKEN': 'test_token'}):
             with patch('releaser.utilities.github_util.Github'):
                 github_repo = GitHubRepository(mock_repo)
-                with pytest.raises(SystemExit):
+                with pytest.raises(ValidationError):
                     github_repo.createRelease("name", None, "tag")  # type: ignore
     
     def test_create_release_missing_tag(self, mock_repo):
@@ -164,8 +175,33 @@ class TestGitHubRepository:
         with patch.dict(os.environ, {'GITHUB_TOKEN': 'test_token'}):
             with patch('releaser.utilities.github_util.Github'):
                 github_repo = GitHubRepository(mock_repo)
-                with pytest.raises(SystemExit):
+                with pytest.raises(ValidationError):
                     github_repo.createRelease("name", "description", None)  # type: ignore
+
+    def test_create_tag_success(self, mock_repo, mock_github_repo):
+        """Test a tag is created through the API as an annotated tag object of the commit, then a ref to it."""
+        mock_github_repo.create_git_tag.return_value.sha = "tagsha"
+
+        with patch.dict(os.environ, {'GITHUB_TOKEN': 'test_token'}):
+            with patch('releaser.utilities.github_util.Github') as mock_github_class:
+                mock_github_class.return_value.get_repo.return_value = mock_github_repo
+
+                assert GitHubRepository(mock_repo).createTag("v1.0.0", "Release 1.0.0", "commitsha") == "tagsha"
+
+                mock_github_class.return_value.get_repo.assert_called_once_with("testowner/testrepo")
+                assert mock_github_class.call_args.kwargs["lazy"] is True
+                mock_github_repo.create_git_tag.assert_called_once_with("v1.0.0", "Release 1.0.0", "commitsha", "commit")
+                mock_github_repo.create_git_ref.assert_called_once_with("refs/tags/v1.0.0", "tagsha")
+
+    def test_create_tag_refused(self, mock_repo, mock_github_repo):
+        """Test GitHub refusing the tag (it already exists, say) raises a GitHubError."""
+        mock_github_repo.create_git_ref.side_effect = GithubException(422, {"message": "Reference already exists"}, None)
+
+        with patch.dict(os.environ, {'GITHUB_TOKEN': 'test_token'}):
+            with patch('releaser.utilities.github_util.Github') as mock_github_class:
+                mock_github_class.return_value.get_repo.return_value = mock_github_repo
+                with pytest.raises(GitHubError, match="Cannot create the tag v1.0.0 in testowner/testrepo"):
+                    GitHubRepository(mock_repo).createTag("v1.0.0", "Release 1.0.0", "commitsha")
     
     def test_upload_file_to_release_success_with_content_type(self, mock_repo, mock_git_release):
         """Test successful file upload to release with content type."""
@@ -246,7 +282,7 @@ class TestGitHubRepository:
         with patch.dict(os.environ, {'GITHUB_TOKEN': 'test_token'}):
             with patch('releaser.utilities.github_util.Github'):
                 github_repo = GitHubRepository(mock_repo)
-                with pytest.raises(SystemExit):
+                with pytest.raises(ValidationError):
                     github_repo.uploadFileToRelease(
                         release=None,  # type: ignore
                         file_name="test.zip",
@@ -258,7 +294,7 @@ class TestGitHubRepository:
         with patch.dict(os.environ, {'GITHUB_TOKEN': 'test_token'}):
             with patch('releaser.utilities.github_util.Github'):
                 github_repo = GitHubRepository(mock_repo)
-                with pytest.raises(SystemExit):
+                with pytest.raises(ValidationError):
                     github_repo.uploadFileToRelease(
                         release=mock_git_release,
                         file_name=None,  # type: ignore
@@ -270,7 +306,7 @@ class TestGitHubRepository:
         with patch.dict(os.environ, {'GITHUB_TOKEN': 'test_token'}):
             with patch('releaser.utilities.github_util.Github'):
                 github_repo = GitHubRepository(mock_repo)
-                with pytest.raises(SystemExit):
+                with pytest.raises(ValidationError):
                     github_repo.uploadFileToRelease(
                         release=mock_git_release,
                         file_name="test.zip",
@@ -315,6 +351,119 @@ class TestGitHubRepository:
                 
                 assert result == mock_repo
 
+    def test_keep_clients_reuses_client(self, mock_repo):
+        """Test clients are reused for the same API and token once keepClients is called, and created per repository otherwise."""
+        with patch.dict(os.environ, {'GITHUB_TOKEN': 'test_token'}):
+            with patch('releaser.utilities.github_util.Github') as mock_github_class:
+                try:
+                    github_util.keepClients()
+                    GitHubRepository(mock_repo)
+                    GitHubRepository(mock_repo)
+                    assert mock_github_class.call_count == 1
+                finally:
+                    github_util.keepClients(False)
+                GitHubRepository(mock_repo)
+                assert mock_github_class.call_count == 2
+
+
+class TestPreflightChecks:
+    """Test cases for the checks run before a release."""
+
+    @pytest.fixture
+    def mock_github(self):
+        """Patch the GitHub client, with a writable repository and a token with the repo scope."""
+        with patch.dict(os.environ, {'GITHUB_TOKEN': 'test_token'}):
+            with patch('releaser.utilities.github_util.Github') as mock_github_class:
+                github = mock_github_class.return_value
+                github.oauth_scopes = ["repo"]
+                github.get_repo.return_value.private = True
+                github.get_repo.return_value.permissions.push = True
+                yield github
+
+    def test_repository_name_from_url(self):
+        """Test the repository name is worked out from https and ssh URLs."""
+        assert github_util.repositoryNameFromUrl("https://github.com/owner/repo.git") == "owner/repo"
+        assert github_util.repositoryNameFromUrl("git@github.com:owner/repo/") == "owner/repo"
+
+    def test_check_access_success(self, mock_github):
+        """Test a token with the repo scope and push permission passes."""
+        github_util.checkAccess("owner/repo")
+        mock_github.get_repo.assert_called_once_with("owner/repo")
+
+    def test_check_access_missing_token(self):
+        """Test the check fails without calling GitHub when there is no token."""
+        with patch.dict(os.environ, {}, clear=True):
+            with pytest.raises(GitHubError, match="GITHUB_TOKEN environment variable is not set"):
+                github_util.checkAccess("owner/repo")
+
+    def test_check_access_rejected_token(self, mock_github):
+        """Test a token GitHub rejects fails the check."""
+        mock_github.get_repo.side_effect = BadCredentialsException(401, {"message": "Bad credentials"}, None)
+        with pytest.raises(GitHubError, match="rejected"):
+            github_util.checkAccess("owner/repo")
+
+    def test_check_access_missing_scope(self, mock_github):
+        """Test a classic token without the repo scope fails for a private repository."""
+        mock_github.oauth_scopes = ["public_repo", "read:org"]
+        with pytest.raises(GitHubError, match="does not have the repo scope"):
+            github_util.checkAccess("owner/repo")
+
+    def test_check_access_no_push(self, mock_github):
+        """Test a token without push permission on the repository fails."""
+        mock_github.oauth_scopes = None
+        mock_github.get_repo.return_value.permissions.push = False
+        with pytest.raises(GitHubError, match="cannot push"):
+            github_util.checkAccess("owner/repo")
+
+    def test_check_tag_is_free(self, mock_github):
+        """Test the check passes when neither the tag nor a release of it exists, and fails when the tag does."""
+        repository = mock_github.get_repo.return_value
+        missing = UnknownObjectException(404, {"message": "Not Found"}, None)
+        type(repository.get_git_ref.return_value).object = property(Mock(side_effect=missing))
+        repository.get_release.side_effect = missing
+        github_util.checkTagIsFree("owner/repo", "v1.0")
+        repository.get_git_ref.assert_called_once_with("tags/v1.0")
+        repository.get_release.assert_called_once_with("v1.0")
+        mock_github.get_repo.assert_called_once_with("owner/repo")
+        assert github_util.Github.call_args.kwargs["lazy"] is True
+
+        repository.get_git_ref.return_value = Mock()
+        with pytest.raises(GitHubError, match="already has the tag v1.0"):
+            github_util.checkTagIsFree("owner/repo", "v1.0")
+
+    def test_check_tag_release_exists(self, mock_github):
+        """Test the check fails when there is a release of the tag, even without the tag."""
+        repository = mock_github.get_repo.return_value
+        repository.get_git_ref.side_effect = UnknownObjectException(404, {"message": "Not Found"}, None)
+        with pytest.raises(GitHubError, match="already has the release of the tag v1.0"):
+            github_util.checkTagIsFree("owner/repo", "v1.0")
+
+
+class TestApiTags:
+    """Test cases for creating tags through the API, against a local stand-in for it."""
+
+    @pytest.mark.filterwarnings("error::DeprecationWarning")
+    def test_create_tag_against_stub(self, monkeypatch):
+        """Test the tag object and ref are created on the stub, after which the tag is no longer free and cannot be created again."""
+        from benchmarks.github_stub import GitHubStub
+        mock_repo = Mock(spec=Repo)
+        mock_repo.remotes.origin.url = "https://github.com/owner/repo.git"
+        with GitHubStub() as stub:
+            monkeypatch.setenv("GITHUB_TOKEN", "test_token")
+            monkeypatch.setenv("RELEASER_GITHUB_API_URL", stub.url)
+            github_util.checkTagIsFree("owner/repo", "v1.0.0")
+
+            tag_sha = GitHubRepository(mock_repo).createTag("v1.0.0", "Release 1.0.0", "c" * 40)
+
+            assert stub.tags[tag_sha]["tag"] == "v1.0.0"
+            assert stub.tags[tag_sha]["message"] == "Release 1.0.0"
+            assert stub.tags[tag_sha]["object"] == {"sha": "c" * 40, "type": "commit", "url": f"{stub.url}/repos/owner/repo/git/commits/{'c' * 40}"}
+            assert stub.refs["refs/tags/v1.0.0"]["object"]["sha"] == tag_sha
+            with pytest.raises(GitHubError, match="already has the tag v1.0.0"):
+                github_util.checkTagIsFree("owner/repo", "v1.0.0")
+            with pytest.raises(GitHubError, match="Cannot create the tag v1.0.0"):
+                GitHubRepository(mock_repo).createTag("v1.0.0", "Release 1.0.0", "d" * 40)
+
 
 class TestGitHubError:
     """Test cases for GitHubError class."""
@@ -329,4 +478,4 @@ class TestGitHubError:
     def test_github_error_message(self):
         """Test that GitHubError has correct message."""
         error = GitHubError("Test error message")
-        assert str(error) == "Test error message" 
\ No newline at end of file
+        assert str(error) == "Test error message" 
@@ -0,0 +1,48 @@
+import hashlib
+import os
+import subprocess
+import tempfile
+from pathlib import Path
+import pytest
+from releaser.utilities import hash_util
+
+
+def test_hashFile_matches_hashlib():
+    """Test hashFile produces the SHA-256 digest, whatever the chunk size."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "data.bin")
+        data = os.urandom(10_000)
+        with open(path, "wb") as f:
+            f.write(data)
+        assert hash_util.hashFile(path) == hashlib.sha256(data).hexdigest()
+        assert hash_util.hashFile(path, chunkSize=999) == hashlib.sha256(data).hexdigest()
+
+def test_hashFile_missing():
+    """Test hashFile raises a HashError for a missing file."""
+    with pytest.raises(hash_util.HashError):
+        hash_util.hashFile("does_not_exist.bin")
+
+def test_treeHasher_hashes_files_only():
+    """Test the TreeHasher keys digests by relative path and ignores directories and symbolic links."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        os.makedirs(os.path.join(tmpdir, "sub"))
+        Path(tmpdir, "a.txt").write_text("a")
+        Path(tmpdir, "sub", "b.txt").write_text("b")
+        os.symlink("a.txt", os.path.join(tmpdir, "link"))
+        with hash_util.TreeHasher(tmpdir, workers=2) as hasher:
+            for entry in Path(tmpdir).rglob("*"):
+                hasher.add(entry)
+            digests = hasher.digests()
+        assert digests == {"a.txt": hashlib.sha256(b"a").hexdigest(), "sub/b.txt": hashlib.sha256(b"b").hexdigest()}
+
+def test_sums_file_round_trip_and_sha256sum_compatible():
+    """Test sums files can be read back and are understood by sha256sum."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        Path(tmpdir, "a.txt").write_text("a")
+        sums = os.path.join(tmpdir, "SHA256SUMS")
+        hash_util.writeSumsFile(sums, {"a.txt": hash_util.hashFile(os.path.join(tmpdir, "a.txt"))})
+        hash_util.writeSumsFile(sums, {"b.txt": "bb"}, append=True)
+        assert hash_util.readSumsFile(sums) == {"a.txt": hashlib.sha256(b"a").hexdigest(), "b.txt": "bb"}
+        hash_util.writeSumsFile(sums, {"a.txt": hash_util.hashFile(os.path.join(tmpdir, "a.txt"))})
+        result = subprocess.run(["sha256sum", "-c", "SHA256SUMS"], cwd=tmpdir, capture_output=True, text=True)
+        assert result.returncode == 0
@@ -1,6 +1,7 @@
 import pytest
 import logging
 from releaser.utilities import helpers
+from releaser.utilities.errors_util import ValidationError
 
 def get_dummy_logger():
     logger = logging.getLogger('dummy')
@@ -15,10 +16,10 @@ def test_isSet_false_logs():
     logger = get_dummy_logger()
     assert not helpers.isSet(logger, 'should log', None)
 
-def test_assertSet_exits():
+def test_assertSet_raises():
     logger = get_dummy_logger()
-    with pytest.raises(SystemExit):
-        helpers.assertSet(logger, 'should exit', None)
+    with pytest.raises(ValidationError, match='should raise'):
+        helpers.assertSet(logger, 'should raise', None)
 
 def test_isEmpty():
     assert helpers.isEmpty(None)
@@ -30,6 +31,14 @@ def test_hasValue():
     assert not helpers.hasValue('')
     assert helpers.hasValue('abc')
 
+def test_isValidUrl_accepts_git_remotes():
+    assert helpers.isValidUrl("https://github.com/owner/repo.git")
+    assert helpers.isValidUrl("file:///srv/mirrors/repo.git")
+    assert helpers.isValidUrl("/srv/mirrors/repo.git")
+    assert helpers.isValidUrl("git@github.com:owner/repo.git")
+    assert not helpers.isValidUrl(None)
+    assert not helpers.isValidUrl("not_a_url")
+
 def test_addIfNotNone():
     l = []
     helpers.addIfNotNone(l, None)
@@ -42,4 +51,13 @@ def test_addIfNotNone():
 def test_getKey():
     d = {'a': 1}
     assert helpers.getKey(d, 'a') == 1
-    assert helpers.getKey(d, 'b') is None 
\ No newline at end of file
+    assert helpers.getKey(d, 'b') is None 
+
+
+def test_parseSize():
+    assert helpers.parseSize('1500') == 1500
+    assert helpers.parseSize('512K') == 512 * 1024
+    assert helpers.parseSize('1.5G') == int(1.5 * 1024 ** 3)
+    assert helpers.parseSize('2GiB') == 2 * 1024 ** 3
+    with pytest.raises(ValueError):
+        helpers.parseSize('lots')
@@ -0,0 +1,91 @@
+import pytest
+import os
+import subprocess
+import sys
+import threading
+import time
+from releaser.utilities import lock_util
+from releaser.utilities.lock_util import FileLock, LockError
+
+
+def test_lock_keeps_out_other_holders(tmp_path):
+    """Test an exclusive lock keeps out another holder of the same lock file, in the same process, until it is released."""
+    path = str(tmp_path / "locks" / "a.lock")
+    first = FileLock(path)
+    second = FileLock(path)
+    assert first.acquire()
+    assert not second.acquire(blocking=False)
+    assert not second.acquire(timeout=0.1)
+    first.release()
+    assert second.acquire(blocking=False)
+    with pytest.raises(LockError, match="already held"):
+        second.acquire()
+    second.release()
+
+def test_shared_locks(tmp_path):
+    """Test shared holders let each other in, but keep out an exclusive one."""
+    path = str(tmp_path / "a.lock")
+    with FileLock(path, shared=True), FileLock(path, shared=True):
+        assert not FileLock(path).acquire(blocking=False)
+
+def test_waiting_for_a_lock(tmp_path):
+    """Test a holder waiting for the lock takes it as soon as it is released."""
+    path = str(tmp_path / "a.lock")
+    taken = []
+    with FileLock(path):
+        waiter = threading.Thread(target=lambda: taken.append(FileLock(path).acquire()))
+        waiter.start()
+        time.sleep(0.1)
+        assert taken == []
+    waiter.join(5)
+    assert taken == [True]
+
+def test_lock_keeps_out_other_processes(tmp_path):
+    """Test the lock keeps out a holder in another process, and goes with that process."""
+    path = str(tmp_path / "a.lock")
+    holder = subprocess.Popen([sys.executable, "-c", f"from releaser.utilities.lock_util import FileLock\nlock = FileLock({path!r})\nlock.acquire()\nprint('locked', flush=True)\ninput()"],
+                              stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, cwd=os.getcwd())
+    try:
+        assert holder.stdout.readline().strip() == "locked"
+        assert not FileLock(path).acquire(blocking=False)
+    finally:
+        holder.communicate("\n", timeout=10)
+    assert FileLock(path).acquire(blocking=False)
+
+def test_lockPath(tmp_path):
+    """Test every path to a resource gives the same lock file, in the lock directory, and different resources different ones."""
+    (tmp_path / "clone").mkdir()
+    path = lock_util.lockPath(str(tmp_path / "locks"), str(tmp_path / "clone"))
+    assert os.path.dirname(path) == str(tmp_path / "locks")
+    assert os.path.basename(path).startswith("clone-") and path.endswith(".lock")
+    assert lock_util.lockPath(str(tmp_path / "locks"), str(tmp_path / "." / "clone")) == path
+    assert lock_util.lockPath(str(tmp_path / "locks"), str(tmp_path / "clone-2")) != path
+
+def test_claimWorkspace_derives_siblings(tmp_path):
+    """Test a job is given the directory if it is free, and otherwise the first free numbered sibling, which later jobs reuse."""
+    locks = str(tmp_path / "locks")
+    clone = str(tmp_path / "clone")
+    first = lock_util.claimWorkspace(clone, locks)
+    second = lock_util.claimWorkspace(clone, locks)
+    third = lock_util.claimWorkspace(clone, locks)
+    assert [first.directory, second.directory, third.directory] == [clone, f"{clone}-2", f"{clone}-3"]
+
+    second.release()
+    with lock_util.claimWorkspace(clone, locks) as fourth:
+        assert fourth.directory == f"{clone}-2"
+    first.release()
+    third.release()
+
+def test_claimWorkspace_waits_without_derive(tmp_path):
+    """Test a job that can't be given a sibling waits for the directory."""
+    locks = str(tmp_path / "locks")
+    checkout = str(tmp_path / "checkout")
+    claimed = []
+    with lock_util.claimWorkspace(checkout, locks, derive=False):
+        waiter = threading.Thread(target=lambda: claimed.append(lock_util.claimWorkspace(checkout, locks, derive=False)))
+        waiter.start()
+        time.sleep(0.1)
+        assert claimed == []
+    waiter.join(5)
+    assert claimed[0].directory == checkout
+    claimed[0].release()
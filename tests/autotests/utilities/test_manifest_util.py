@@ -0,0 +1,117 @@
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from unittest import mock
+from releaser.utilities import hash_util, manifest_util
+
+
+def test_pathFor_is_next_to_the_directory():
+    """Test the index is kept beside the directory rather than inside it."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        workspace = os.path.join(tmpdir, "repo")
+        assert manifest_util.ManifestIndex.pathFor(workspace) == os.path.join(tmpdir, ".repo.manifest.sqlite")
+
+def test_refresh_reports_added_changed_removed():
+    """Test refresh diffs the tree against the previous refresh."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        root = os.path.join(tmpdir, "repo")
+        os.makedirs(os.path.join(root, "sub"))
+        Path(root, "keep.txt").write_text("keep")
+        Path(root, "edit.txt").write_text("before")
+        Path(root, "sub", "gone.txt").write_text("gone")
+        index_path = manifest_util.ManifestIndex.pathFor(root)
+
+        with manifest_util.ManifestIndex(index_path) as index:
+            first = index.refresh(root)
+        assert first.added == ["edit.txt", "keep.txt", "sub/gone.txt"]
+        assert first.reused == 0
+
+        Path(root, "edit.txt").write_text("after!")
+        Path(root, "sub", "gone.txt").unlink()
+        Path(root, "sub", "new.txt").write_text("new")
+        with manifest_util.ManifestIndex(index_path) as index:
+            second = index.refresh(root)
+            records = index.records()
+        assert second.added == ["sub/new.txt"]
+        assert second.changed == ["edit.txt"]
+        assert second.removed == ["sub/gone.txt"]
+        assert second.unchanged == 1
+        assert records["edit.txt"].digest == hashlib.sha256(b"after!").hexdigest()
+
+def test_refresh_does_not_rehash_unchanged_files():
+    """Test files whose size, mtime and inode are unchanged keep their recorded digest without being read."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        root = os.path.join(tmpdir, "repo")
+        os.makedirs(root)
+        Path(root, "a.txt").write_text("a")
+        Path(root, "b.txt").write_text("b")
+        with manifest_util.ManifestIndex(manifest_util.ManifestIndex.pathFor(root)) as index:
+            index.refresh(root)
+            with mock.patch.object(hash_util, "hashFile", side_effect=AssertionError("rehashed")):
+                diff = index.refresh(root)
+        assert diff.isEmpty()
+        assert diff.reused == 2
+
+def test_touched_but_identical_file_is_unchanged():
+    """Test a file whose stat changed but whose contents did not is rehashed but not reported as changed."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        root = os.path.join(tmpdir, "repo")
+        os.makedirs(root)
+        path = Path(root, "a.txt")
+        path.write_text("a")
+        with manifest_util.ManifestIndex(manifest_util.ManifestIndex.pathFor(root)) as index:
+            index.refresh(root)
+            stat_result = path.stat()
+            os.utime(path, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns + 1_000_000_000))
+            diff = index.refresh(root)
+        assert diff.isEmpty()
+        assert diff.unchanged == 1
+        assert diff.reused == 0
+
+def test_zip_uses_and_updates_manifest():
+    """Test zipping with a manifest gives the same digests and records what was zipped."""
+    from releaser.utilities import zip_util
+    with tempfile.TemporaryDirectory() as tmpdir:
+        root = os.path.join(tmpdir, "repo")
+        out = os.path.join(tmpdir, "out")
+        os.makedirs(root)
+        os.makedirs(out)
+        Path(root, "a.txt").write_text("a")
+        with manifest_util.ManifestIndex(manifest_util.ManifestIndex.pathFor(root)) as index:
+            digests = {}
+            zip_util.zip(root, out, "release.zip", digests=digests, manifest=index)
+            assert digests == {"a.txt": hashlib.sha256(b"a").hexdigest()}
+            assert index.records()["a.txt"].digest == digests["a.txt"]
+            with mock.patch.object(hash_util, "hashFile", side_effect=AssertionError("rehashed")):
+                again = {}
+                zip_util.zip(root, out, "release.zip", digests=again, manifest=index)
+            assert again == digests
+
+def test_zip_reuses_digests_of_a_fresh_checkout_by_blob():
+    """Test files checked out afresh (new mtime and inode) from the blobs recorded keep their digests, and others are hashed."""
+    from releaser.utilities import zip_util
+    with tempfile.TemporaryDirectory() as tmpdir:
+        root = os.path.join(tmpdir, "repo")
+        out = os.path.join(tmpdir, "out")
+        os.makedirs(out)
+        def checkout(files):
+            if os.path.exists(root):
+                import shutil
+                shutil.rmtree(root)
+            os.makedirs(root)
+            for name, content in files.items():
+                Path(root, name).write_text(content)
+        checkout({"a.txt": "a", "b.txt": "b"})
+        with manifest_util.ManifestIndex(manifest_util.ManifestIndex.pathFor(root)) as index:
+            zip_util.zip(root, out, "release.zip", digests={}, manifest=index, blobShas={"a.txt": "blob-a", "b.txt": "blob-b"})
+            assert index.records()["a.txt"].blob_sha == "blob-a"
+
+            checkout({"a.txt": "a", "b.txt": "changed"})
+            hasher = hash_util.TreeHasher(root, known=index.records(), blobShas={"a.txt": "blob-a", "b.txt": "blob-c"})
+            with hasher:
+                assert hasher.reusableDigest(Path(root, "a.txt"), Path(root, "a.txt").lstat()) == hashlib.sha256(b"a").hexdigest()
+                assert hasher.reusableDigest(Path(root, "b.txt"), Path(root, "b.txt").lstat()) is None
+            # Without the blobs, nothing matches a fresh checkout
+            with hash_util.TreeHasher(root, known=index.records()) as hasher:
+                assert hasher.reusableDigest(Path(root, "a.txt"), Path(root, "a.txt").lstat()) is None
@@ -0,0 +1,55 @@
+import pytest
+import os
+import tempfile
+import threading
+from releaser.utilities import preflight_util
+from releaser.utilities.preflight_util import PreflightError
+
+
+def test_runChecks_runs_checks_at_once():
+    """Test the checks run concurrently: each waits for the other, which would deadlock if they ran one after another."""
+    barrier = threading.Barrier(2, timeout=5)
+    seconds = preflight_util.runChecks({"first": barrier.wait, "second": barrier.wait})
+    assert set(seconds) == {"first", "second"}
+
+def test_runChecks_reports_every_failure():
+    """Test every failing check is reported, not only the first."""
+    def fail(message):
+        def check():
+            raise PreflightError(message)
+        return check
+
+    with pytest.raises(PreflightError) as error_info:
+        preflight_util.runChecks({"token": fail("no token"), "fine": lambda: None, "tag": fail("tag exists")})
+
+    assert error_info.value.failures == {"token": "no token", "tag": "tag exists"}
+    assert "token: no token" in str(error_info.value) and "tag: tag exists" in str(error_info.value)
+
+def test_checkReadableFile():
+    """Test a missing file, or a directory, fails the check."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "clean.txt")
+        with pytest.raises(PreflightError, match="does not exist"):
+            preflight_util.checkReadableFile(path)
+        with pytest.raises(PreflightError, match="is not a file"):
+            preflight_util.checkReadableFile(tmpdir)
+        open(path, "w").close()
+        preflight_util.checkReadableFile(path)
+
+def test_checkWritableDirectory():
+    """Test a directory that doesn't exist yet passes if it can be created, and fails if a file is in the way."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        preflight_util.checkWritableDirectory(os.path.join(tmpdir, "a", "b"))
+        blocker = os.path.join(tmpdir, "file")
+        open(blocker, "w").close()
+        with pytest.raises(PreflightError, match="is not a directory"):
+            preflight_util.checkWritableDirectory(blocker)
+        with pytest.raises(PreflightError, match="cannot be created"):
+            preflight_util.checkWritableDirectory(os.path.join(blocker, "release"))
+
+def test_checkFreeSpace():
+    """Test the free space is checked on the file system the directory will be on."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        preflight_util.checkFreeSpace(os.path.join(tmpdir, "not", "yet"), 1)
+        with pytest.raises(PreflightError, match="is free"):
+            preflight_util.checkFreeSpace(tmpdir, 2 ** 62)
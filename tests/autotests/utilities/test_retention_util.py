@@ -0,0 +1,74 @@
+import os
+import tempfile
+import time
+from datetime import timedelta
+from releaser.utilities import retention_util
+
+
+def _make_releases(dir, releases):
+    """Create release files of the given sizes, each a day older than the one before."""
+    now = time.time()
+    for age_days, (name, size) in enumerate(releases):
+        path = os.path.join(dir, name)
+        with open(path, "wb") as f:
+            f.write(b"x" * size)
+        os.utime(path, (now - age_days * 86400, now - age_days * 86400))
+
+
+def test_familyOf():
+    assert retention_util.familyOf("frontend-20250101.zip") == retention_util.familyOf("frontend-20250102.zip")
+    assert retention_util.familyOf("frontend-20250101.zip") != retention_util.familyOf("backend-20250101.zip")
+    assert retention_util.familyOf("frontend-20250101.zip") == retention_util.familyOf("frontend-20250102.part001.zip")
+
+def test_releaseOf():
+    names = ["frontend-20250101.zip", "frontend-20250101.part001.zip", "frontend-20250101.part012.zip", "frontend-20250101.index.json",
+             "frontend-20250101.SHA256SUMS", "frontend-20250101.delta-v1.0.zip", "frontend-20250101.delta-v1.0.deleted.txt"]
+    assert {retention_util.releaseOf(name) for name in names} == {"frontend-20250101"}
+    assert retention_util.releaseOf("notes.txt") == "notes.txt"
+
+def test_prune_keep_last_per_family():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        _make_releases(tmpdir, [("frontend-3.zip", 1), ("backend-3.zip", 1), ("frontend-2.zip", 1), ("backend-2.zip", 1), ("frontend-1.zip", 1)])
+        report = retention_util.prune(tmpdir, retention_util.RetentionPolicy(keep_last=1))
+        assert sorted(os.listdir(tmpdir)) == ["backend-3.zip", "frontend-3.zip"]
+        assert [entry.name for entry, _ in report.removed] == ["frontend-2.zip", "backend-2.zip", "frontend-1.zip"]
+
+def test_prune_max_age_and_dry_run():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        _make_releases(tmpdir, [("a-1.zip", 1), ("a-2.zip", 1), ("a-3.zip", 1), ("a-4.zip", 1)])
+        report = retention_util.prune(tmpdir, retention_util.RetentionPolicy(max_age=timedelta(days=1, hours=12)), dryRun=True)
+        assert [entry.name for entry, _ in report.removed] == ["a-3.zip", "a-4.zip"]
+        assert len(os.listdir(tmpdir)) == 4  # nothing removed
+        assert report.describe()[0].startswith("Would remove a-3.zip")
+
+def test_prune_max_total_bytes_removes_oldest():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        _make_releases(tmpdir, [("a-1.zip", 40), ("a-2.zip", 40), ("a-3.zip", 10), ("a-4.zip", 5)])
+        report = retention_util.prune(tmpdir, retention_util.RetentionPolicy(max_total_bytes=85))
+        assert sorted(os.listdir(tmpdir)) == ["a-1.zip", "a-2.zip"]
+        assert report.bytesFreed() == 15
+
+def test_prune_protects_and_filters():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        _make_releases(tmpdir, [("a-1.zip", 1), ("a-1.SHA256SUMS", 1), ("a-2.zip", 1), ("notes.txt", 1)])
+        retention_util.prune(tmpdir, retention_util.RetentionPolicy(max_age=timedelta(seconds=-1)), filePattern="a-*", protect=["a-1.*"])
+        assert sorted(os.listdir(tmpdir)) == ["a-1.SHA256SUMS", "a-1.zip", "notes.txt"]
+
+def test_prune_keeps_or_removes_split_releases_whole():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        releases = []
+        for day in ("20250103", "20250102", "20250101"):
+            releases += [(f"frontend-{day}.index.json", 1), (f"frontend-{day}.SHA256SUMS", 1)] + [(f"frontend-{day}.part00{part}.zip", 10) for part in (1, 2, 3)]
+        _make_releases(tmpdir, releases)
+
+        report = retention_util.prune(tmpdir, retention_util.RetentionPolicy(keep_last=2), protect=["frontend-20250103*"], dryRun=True)
+        assert sorted(entry.name for entry, _ in report.removed) == sorted(name for name, _ in releases if "20250101" in name)
+
+        # The budget holds the current release and one more, but not part of a third
+        report = retention_util.prune(tmpdir, retention_util.RetentionPolicy(max_total_bytes=70), protect=["frontend-20250103*"])
+        assert {retention_util.releaseOf(name) for name in os.listdir(tmpdir)} == {"frontend-20250103", "frontend-20250102"}
+        assert len(os.listdir(tmpdir)) == 10
+
+def test_policy_isSet():
+    assert not retention_util.RetentionPolicy().isSet()
+    assert retention_util.RetentionPolicy(keep_last=0).isSet()
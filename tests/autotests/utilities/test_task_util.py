@@ -0,0 +1,84 @@
+import pytest
+import contextvars
+import threading
+import time
+from releaser.utilities.task_util import TaskError, TaskGraph
+
+
+def test_tasks_run_after_what_they_need():
+    """Test a task starts only once every task it comes after has finished, and can use their results."""
+    graph = TaskGraph()
+    graph.add("a", lambda: 1)
+    graph.add("b", lambda: time.sleep(0.05) or 2)
+    graph.add("c", lambda: graph.result("a") + graph.result("b"), after=["a", "b"])
+
+    report = graph.run()
+
+    assert graph.result("c") == 3
+    assert report.spans["c"][0] >= max(report.spans["a"][1], report.spans["b"][1])
+
+def test_independent_tasks_overlap():
+    """Test independent tasks run at once: each waits for the other, which would deadlock if they ran one after another."""
+    barrier = threading.Barrier(2, timeout=5)
+    graph = TaskGraph()
+    graph.add("tag", barrier.wait)
+    graph.add("zip", barrier.wait)
+    graph.run()
+
+def test_failure_skips_what_comes_after():
+    """Test the tasks after a failed task are not run, those already running finish, and the failure is raised."""
+    ran = []
+    graph = TaskGraph()
+    graph.add("tag", lambda: 1 / 0)
+    graph.add("zip", lambda: time.sleep(0.05) or ran.append("zip"))
+    graph.add("upload", lambda: ran.append("upload"), after=["tag", "zip"])
+    graph.add("retention", lambda: ran.append("retention"), after=["upload"])
+
+    with pytest.raises(ZeroDivisionError):
+        graph.run()
+
+    assert ran == ["zip"]
+    with pytest.raises(TaskError, match="because tag failed"):
+        graph.result("retention")
+
+def test_critical_path():
+    """Test the critical path follows the slowest chain back from the task that finished last."""
+    graph = TaskGraph()
+    graph.add("clone", lambda: time.sleep(0.02))
+    graph.add("tag", lambda: time.sleep(0.01), after=["clone"])
+    graph.add("build", lambda: time.sleep(0.1), after=["clone"])
+    graph.add("upload", lambda: None, after=["tag", "build"])
+
+    report = graph.run()
+
+    assert [name for name, _ in report.critical_path] == ["clone", "build", "upload"]
+    assert report.describe().startswith("clone ") and report.describe().endswith(f"of {report.seconds:.2f}s")
+
+def test_add_rejects_unknown_and_duplicate_tasks():
+    """Test tasks can only come after tasks already added, and names are unique."""
+    graph = TaskGraph()
+    graph.add("a", lambda: None)
+    with pytest.raises(TaskError, match="not been added: b"):
+        graph.add("c", lambda: None, after=["b"])
+    with pytest.raises(TaskError, match="already a task a"):
+        graph.add("a", lambda: None)
+
+def test_tasks_run_in_the_callers_context():
+    """Test what the caller has set in its context holds for every task, and what a task sets stays with that task."""
+    job = contextvars.ContextVar("job", default=None)
+    seen = {}
+    def look(name):
+        seen[name] = job.get()
+        job.set(name)
+    graph = TaskGraph()
+    graph.add("a", lambda: look("a"))
+    graph.add("b", lambda: look("b"))
+    graph.add("c", lambda: look("c"), after=["a", "b"])
+
+    token = job.set(7)
+    try:
+        graph.run()
+    finally:
+        job.reset(token)
+
+    assert seen == {"a": 7, "b": 7, "c": 7}
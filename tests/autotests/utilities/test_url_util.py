@@ -0,0 +1,35 @@
+import pytest
+from releaser.utilities import url_util
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("https://github.com/owner/repo.git", url_util.RemoteUrl("https", "github.com", "/owner/repo.git")),
+    ("ssh://git@example.com:2222/owner/repo.git", url_util.RemoteUrl("ssh", "example.com", "/owner/repo.git", "git", 2222)),
+    ("git@github.com:owner/repo.git", url_util.RemoteUrl("ssh", "github.com", "owner/repo.git", "git")),
+    ("file:///srv/mirrors/repo.git", url_util.RemoteUrl("file", None, "/srv/mirrors/repo.git")),
+    ("/srv/mirrors/repo.git", url_util.RemoteUrl("file", None, "/srv/mirrors/repo.git")),
+])
+def test_parseRemote(url, expected):
+    """Test the supported kinds of remote are parsed."""
+    assert url_util.parseRemote(url) == expected
+
+@pytest.mark.parametrize("url", ["", "not_a_url", "relative/path", "ftp://example.com/repo", "https://", "https://github.com/", "file://host/repo", "ssh://-oProxyCommand=x/repo", "host:-upload-pack", "https://github.com/owner/re po"])
+def test_parseRemote_invalid(url):
+    """Test malformed, unsupported and option-like remotes are refused."""
+    with pytest.raises(url_util.UrlError):
+        url_util.parseRemote(url)
+    assert not url_util.isValidRemote(url)
+
+def test_rewrite_with_mirror_root():
+    """Test mirror rewrites redirect each way of addressing the host, and leave other hosts alone."""
+    rewrites = url_util.mirrorRewrites("/srv/mirrors")
+    assert url_util.rewrite("https://github.com/owner/repo.git", rewrites) == "/srv/mirrors/owner/repo.git"
+    assert url_util.rewrite("git@github.com:owner/repo.git", rewrites) == "/srv/mirrors/owner/repo.git"
+    assert url_util.rewrite("https://gitlab.com/owner/repo.git", rewrites) == "https://gitlab.com/owner/repo.git"
+    assert "protocol.file.allow=always" in url_util.gitConfigFor(rewrites)
+    assert "url./srv/mirrors/.insteadOf=https://github.com/" in url_util.gitConfigFor(rewrites)
+
+def test_rewrite_longest_prefix_wins():
+    """Test the longest matching prefix is rewritten, as git does."""
+    rewrites = {"https://github.com/": "/a/", "https://github.com/owner/": "/b/"}
+    assert url_util.rewrite("https://github.com/owner/repo", rewrites) == "/b/repo"
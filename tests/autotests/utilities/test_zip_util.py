@@ -160,3 +160,470 @@ def test_isValidZipPath_empty():
     """Test isValidZipPath with empty path."""
     assert not zip_util.isValidZipPath("") 
 
+
+def test_zipParts_packs_files_into_bounded_parts():
+    """Test zipParts splits the content into self-contained parts with an index."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        source_dir = os.path.join(tmpdir, "source")
+        os.makedirs(os.path.join(source_dir, "sub"))
+        for name, size in [("a.bin", 600), ("b.bin", 500), ("sub/c.bin", 400), ("d.bin", 100)]:
+            with open(os.path.join(source_dir, name), "wb") as f:
+                f.write(os.urandom(size))
+        os.makedirs(os.path.join(source_dir, "empty"))
+        zip_dir = os.path.join(tmpdir, "zip_output")
+        os.makedirs(zip_dir)
+
+        completed = []
+        split = zip_util.zipParts(source_dir, zip_dir, "release.zip", 1000, workers=2, onPartCompleted=completed.append)
+
+        assert sorted(completed) == sorted(split.parts)
+        assert [os.path.basename(p) for p in split.parts] == ["release.part001.zip", "release.part002.zip"]
+
+        import json
+        with open(split.index_path) as f:
+            index = json.load(f)
+        assert index["parts"] == ["release.part001.zip", "release.part002.zip"]
+
+        # Every file is in exactly the part the index says it is, and no part exceeds the limit
+        for part in split.parts:
+            with zipfile.ZipFile(part) as zf:
+                assert sum(info.file_size for info in zf.infolist()) <= 1000
+                for name in zf.namelist():
+                    assert index["files"][name.rstrip("/")] == os.path.basename(part)
+        assert set(index["files"]) == {"a.bin", "b.bin", "sub/c.bin", "d.bin", "empty"}
+
+def test_zipParts_oversized_file_gets_own_part():
+    """Test a file larger than the part size ends up in a part of its own."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        source_dir = create_test_directory_structure(tmpdir)
+        with open(os.path.join(source_dir, "big.bin"), "wb") as f:
+            f.write(os.urandom(50))
+        zip_dir = os.path.join(tmpdir, "zip_output")
+        os.makedirs(zip_dir)
+
+        split = zip_util.zipParts(source_dir, zip_dir, "test.zip", 40)
+
+        with zipfile.ZipFile(split.parts[0]) as zf:
+            assert zf.namelist() == ["big.bin"]
+        assert len(split.parts) == 2
+
+def test_zipParts_invalid_size():
+    """Test zipParts rejects a non-positive part size."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        source_dir = create_test_directory_structure(tmpdir)
+        with pytest.raises(zip_util.ZipError):
+            zip_util.zipParts(source_dir, tmpdir, "test.zip", 0)
+
+def test_zipParts_callback_errors_propagate():
+    """Test an error raised by the part callback (a failed upload, say) reaches the caller as it is, not as a zip error."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        source_dir = create_test_directory_structure(tmpdir)
+        zip_dir = os.path.join(tmpdir, "zip_output")
+        os.makedirs(zip_dir)
+
+        def upload(part_path):
+            raise ConnectionError("upload failed")
+
+        with pytest.raises(ConnectionError, match="upload failed"):
+            zip_util.zipParts(source_dir, zip_dir, "test.zip", 1000, onPartCompleted=upload)
+
+def test_zip_failure_leaves_previous_archive_intact(monkeypatch):
+    """Test a zip that fails part way leaves the archive it was replacing as it was, and no half-written file beside it."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        source_dir = create_test_directory_structure(tmpdir)
+        zip_dir = os.path.join(tmpdir, "zip_output")
+        os.makedirs(zip_dir)
+        zip_path = zip_util.zip(source_dir, zip_dir, "test.zip")
+        with open(zip_path, "rb") as f:
+            previous = f.read()
+
+        write_entry = zip_util._writeEntry
+        written = []
+        def failing_write_entry(zip_file, *args, **kwargs):
+            if written:
+                raise OSError("disk full")
+            written.append(write_entry(zip_file, *args, **kwargs))
+        monkeypatch.setattr(zip_util, "_writeEntry", failing_write_entry)
+
+        with pytest.raises(zip_util.ZipError):
+            zip_util.zip(source_dir, zip_dir, "test.zip")
+
+        assert os.listdir(zip_dir) == ["test.zip"]
+        with open(zip_path, "rb") as f:
+            assert f.read() == previous
+
+def test_zip_collects_digests():
+    """Test zip hashes every file it zips when asked to."""
+    import hashlib
+    with tempfile.TemporaryDirectory() as tmpdir:
+        source_dir = create_test_directory_structure(tmpdir)
+        zip_dir = os.path.join(tmpdir, "zip_output")
+        os.makedirs(zip_dir)
+        digests = {}
+        zip_util.zip(source_dir, zip_dir, "test.zip", digests=digests)
+        assert digests == {
+            "file1.txt": hashlib.sha256(b"content1").hexdigest(),
+            "file2.txt": hashlib.sha256(b"content2").hexdigest(),
+            "subdir/file3.txt": hashlib.sha256(b"content3").hexdigest(),
+            "subdir/nested/file4.txt": hashlib.sha256(b"content4").hexdigest(),
+        }
+
+def test_zip_reproducible_is_byte_identical():
+    """Test reproducible archives of the same contents are identical, whatever the files' times and permissions."""
+    import hashlib
+    with tempfile.TemporaryDirectory() as tmpdir:
+        source_dir = create_test_directory_structure(tmpdir)
+        zip_dir = os.path.join(tmpdir, "zip_output")
+        os.makedirs(zip_dir)
+        first = zip_util.zip(source_dir, zip_dir, "first.zip", reproducible=True, timestamp=1700000000)
+        os.utime(os.path.join(source_dir, "file1.txt"), (1, 1))
+        os.chmod(os.path.join(source_dir, "file2.txt"), 0o600)
+        second = zip_util.zip(source_dir, zip_dir, "second.zip", reproducible=True, timestamp=1700000000)
+        assert hashlib.sha256(open(first, "rb").read()).digest() == hashlib.sha256(open(second, "rb").read()).digest()
+
+        with zipfile.ZipFile(first) as zf:
+            names = zf.namelist()
+            assert names == sorted(names)
+            info = zf.getinfo("file1.txt")
+            assert info.date_time == (2023, 11, 14, 22, 13, 20)
+            assert info.external_attr >> 16 == 0o100644
+            assert zf.getinfo("subdir/").is_dir()
+            assert zf.read("subdir/nested/file4.txt") == b"content4"
+
+def test_zip_reproducible_keeps_executable_bit():
+    """Test reproducible archives keep whether a file is executable, and nothing else of its permissions."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        source_dir = create_test_directory_structure(tmpdir)
+        os.chmod(os.path.join(source_dir, "file1.txt"), 0o700)
+        zip_dir = os.path.join(tmpdir, "zip_output")
+        os.makedirs(zip_dir)
+        zip_path = zip_util.zip(source_dir, zip_dir, "test.zip", reproducible=True)
+        with zipfile.ZipFile(zip_path) as zf:
+            assert zf.getinfo("file1.txt").external_attr >> 16 == 0o100755
+            assert zf.getinfo("file1.txt").date_time == (1980, 1, 1, 0, 0, 0)
+
+def test_zipParts_reproducible_is_byte_identical():
+    """Test reproducible parts of the same contents are identical."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        source_dir = create_test_directory_structure(tmpdir)
+        outputs = []
+        for name in ("a", "b"):
+            zip_dir = os.path.join(tmpdir, name)
+            os.makedirs(zip_dir)
+            split = zip_util.zipParts(source_dir, zip_dir, "test.zip", 10, reproducible=True, timestamp=1700000000)
+            outputs.append([open(part, "rb").read() for part in split.parts])
+            os.utime(os.path.join(source_dir, "subdir", "file3.txt"), (1, 1))
+        assert outputs[0] == outputs[1]
+
+def test_zip_stores_symlinks_as_links_and_unzip_restores_them():
+    """Test symbolic links (to files and directories) are archived as links, not copies, and extracted as links."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        source_dir = create_test_directory_structure(tmpdir)
+        os.symlink("subdir", os.path.join(source_dir, "linked_dir"))
+        os.symlink("file1.txt", os.path.join(source_dir, "linked_file"))
+        os.symlink(".", os.path.join(source_dir, "subdir", "loop"))
+        zip_dir = os.path.join(tmpdir, "zip_output")
+        os.makedirs(zip_dir)
+        zip_path = zip_util.zip(source_dir, zip_dir, "test.zip")
+
+        with zipfile.ZipFile(zip_path) as zf:
+            assert not any(name.startswith("linked_dir/") for name in zf.namelist())
+            assert zf.read("linked_dir") == b"subdir"
+            assert zf.read("linked_file") == b"file1.txt"
+
+        extract_dir = os.path.join(tmpdir, "extracted")
+        zip_util.unzip(zip_path, extract_dir)
+        assert os.readlink(os.path.join(extract_dir, "linked_dir")) == "subdir"
+        assert os.readlink(os.path.join(extract_dir, "subdir", "loop")) == "."
+        with open(os.path.join(extract_dir, "linked_file")) as f:
+            assert f.read() == "content1"
+
+def test_zip_follow_symlinks_detects_loops():
+    """Test following symbolic links copies linked content but stores loops and repeated directories as links."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        source_dir = create_test_directory_structure(tmpdir)
+        os.symlink("..", os.path.join(source_dir, "subdir", "up"))
+        os.symlink("subdir/nested", os.path.join(source_dir, "nested_again"))
+        os.symlink("file1.txt", os.path.join(source_dir, "linked_file"))
+        zip_dir = os.path.join(tmpdir, "zip_output")
+        os.makedirs(zip_dir)
+        zip_path = zip_util.zip(source_dir, zip_dir, "test.zip", followSymlinks=True)
+        with zipfile.ZipFile(zip_path) as zf:
+            assert zf.read("linked_file") == b"content1"
+            assert zip_util._isSymlink(zf.getinfo("subdir/up"))
+            assert zip_util._isSymlink(zf.getinfo("nested_again"))
+            assert zf.read("subdir/nested/file4.txt") == b"content4"
+
+def test_zip_dedup_links_duplicates_to_first_copy():
+    """Test dedup stores files with identical content once, the rest as relative links to the first in path order."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        source_dir = create_test_directory_structure(tmpdir)
+        with open(os.path.join(source_dir, "subdir", "nested", "copy.txt"), "w") as f:
+            f.write("content1")
+        zip_dir = os.path.join(tmpdir, "zip_output")
+        os.makedirs(zip_dir)
+        digests = {}
+        zip_path = zip_util.zip(source_dir, zip_dir, "test.zip", dedup=True, digests=digests)
+        with zipfile.ZipFile(zip_path) as zf:
+            assert zf.read("subdir/nested/copy.txt") == b"../../file1.txt"
+            assert zf.read("file1.txt") == b"content1"
+        assert digests["subdir/nested/copy.txt"] == digests["file1.txt"]
+
+        extract_dir = os.path.join(tmpdir, "extracted")
+        zip_util.unzip(zip_path, extract_dir)
+        with open(os.path.join(extract_dir, "subdir", "nested", "copy.txt")) as f:
+            assert f.read() == "content1"
+
+def test_zipParts_dedup_keeps_links_with_their_target():
+    """Test a duplicate is placed in the same part as the file it links to."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        source_dir = create_test_directory_structure(tmpdir)
+        with open(os.path.join(source_dir, "copy.txt"), "w") as f:
+            f.write("content3")
+        zip_dir = os.path.join(tmpdir, "zip_output")
+        os.makedirs(zip_dir)
+        split = zip_util.zipParts(source_dir, zip_dir, "test.zip", 10, dedup=True)
+        links = 0
+        for part in split.parts:
+            with zipfile.ZipFile(part) as zf:
+                for info in zf.infolist():
+                    if zip_util._isSymlink(info):
+                        links += 1
+                        target = os.path.normpath(os.path.join(os.path.dirname(info.filename), zf.read(info).decode()))
+                        assert zf.read(target) == b"content3"
+        assert links == 1
+
+def test_unzip_in_parallel_restores_permissions():
+    """Test extracting with several workers gives the same tree, with the files' permissions restored."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        source_dir = create_test_directory_structure(tmpdir)
+        os.chmod(os.path.join(source_dir, "file1.txt"), 0o755)
+        os.chmod(os.path.join(source_dir, "file2.txt"), 0o600)
+        os.chmod(os.path.join(source_dir, "subdir/file3.txt"), 0o664)
+        zip_dir = os.path.join(tmpdir, "zip_output")
+        os.makedirs(zip_dir)
+        zip_path = zip_util.zip(source_dir, zip_dir, "test.zip")
+        extract_dir = os.path.join(tmpdir, "extracted")
+        zip_util.unzip(zip_path, extract_dir, workers=3)
+        for path in ("file1.txt", "file2.txt", "subdir/file3.txt", "subdir/nested/file4.txt"):
+            with open(os.path.join(source_dir, path)) as expected, open(os.path.join(extract_dir, path)) as actual:
+                assert actual.read() == expected.read()
+        assert os.stat(os.path.join(extract_dir, "file1.txt")).st_mode & 0o777 == 0o755
+        assert os.stat(os.path.join(extract_dir, "file2.txt")).st_mode & 0o777 == 0o600
+        assert os.stat(os.path.join(extract_dir, "subdir/file3.txt")).st_mode & 0o777 == 0o664
+
+def test_unzip_include_and_exclude():
+    """Test only the selected subtree is extracted."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        source_dir = create_test_directory_structure(tmpdir)
+        zip_dir = os.path.join(tmpdir, "zip_output")
+        os.makedirs(zip_dir)
+        zip_path = zip_util.zip(source_dir, zip_dir, "test.zip")
+        extract_dir = os.path.join(tmpdir, "extracted")
+        zip_util.unzip(zip_path, extract_dir, include=["subdir"], exclude=["file4.txt"])
+        extracted = sorted(os.path.relpath(os.path.join(root, name), extract_dir) for root, _, names in os.walk(extract_dir) for name in names)
+        assert extracted == ["subdir/file3.txt"]
+
+def test_unzip_refuses_paths_outside_target():
+    """Test a member whose path escapes the target directory is refused."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        zip_path = os.path.join(tmpdir, "evil.zip")
+        with zipfile.ZipFile(zip_path, "w") as zf:
+            zf.writestr("../escaped.txt", "x")
+        with pytest.raises(zip_util.ZipError):
+            zip_util.unzip(zip_path, os.path.join(tmpdir, "extracted"))
+        assert not os.path.exists(os.path.join(tmpdir, "escaped.txt"))
+
+def test_verify_accepts_good_archive_and_checks_manifest():
+    """Test verify passes an intact archive and checks its members against the digests it was built from."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        source_dir = create_test_directory_structure(tmpdir)
+        zip_dir = os.path.join(tmpdir, "zip_output")
+        os.makedirs(zip_dir)
+        digests = {}
+        zip_path = zip_util.zip(source_dir, zip_dir, "test.zip", digests=digests)
+        assert "file1.txt" in zip_util.verify(zip_path, digests=digests, workers=2)
+
+        with pytest.raises(zip_util.ZipError, match="missing"):
+            zip_util.verify(zip_path, digests={**digests, "extra.txt": "00"})
+        with pytest.raises(zip_util.ZipError, match="not in the build"):
+            zip_util.verify(zip_path, digests={name: digest for name, digest in digests.items() if name != "file1.txt"})
+        with pytest.raises(zip_util.ZipError, match="does not match"):
+            zip_util.verify(zip_path, digests={**digests, "file1.txt": "00"})
+
+def test_verify_detects_corruption_and_truncation():
+    """Test verify fails a member whose data is corrupt, and an archive that was cut short."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        zip_path = os.path.join(tmpdir, "test.zip")
+        with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_STORED) as zf:
+            zf.writestr("a.txt", b"a" * 1000)
+            zf.writestr("b.txt", b"b" * 1000)
+        data = bytearray(open(zip_path, "rb").read())
+        offset = data.index(b"a" * 1000)
+        data[offset + 10] = ord("x")
+        open(zip_path, "wb").write(data)
+        with pytest.raises(zip_util.ZipError, match="a.txt"):
+            zip_util.verify(zip_path)
+
+        truncated = os.path.join(tmpdir, "truncated.zip")
+        open(truncated, "wb").write(data[: len(data) // 2])
+        with pytest.raises(zip_util.ZipError):
+            zip_util.verify(truncated)
+
+def test_zip_read_ahead_with_small_memory_cap_and_mapped_files():
+    """Test zipping reads files ahead (into reused buffers, or memory mapped when large) without mixing up their contents."""
+    import hashlib
+    with tempfile.TemporaryDirectory() as tmpdir:
+        source_dir = os.path.join(tmpdir, "source")
+        os.makedirs(source_dir)
+        contents = {f"file{number}.bin": os.urandom(size) for number, size in enumerate([5000, 100, 0, 3000, 70000, 10])}
+        for name, data in contents.items():
+            with open(os.path.join(source_dir, name), "wb") as f:
+                f.write(data)
+        zip_dir = os.path.join(tmpdir, "zip_output")
+        os.makedirs(zip_dir)
+        digests = {}
+        zip_path = zip_util.zip(source_dir, zip_dir, "test.zip", digests=digests, readAheadMemory=8192)
+        with zipfile.ZipFile(zip_path) as zf:
+            for name, data in contents.items():
+                assert zf.read(name) == data
+                assert digests[name] == hashlib.sha256(data).hexdigest()
+
+def test_read_ahead_keeps_order_and_memory_cap():
+    """Test the read-ahead gives the entries in order and never holds more than its cap in buffers."""
+    from pathlib import Path
+    with tempfile.TemporaryDirectory() as tmpdir:
+        entries = []
+        for number in range(20):
+            path = Path(tmpdir, f"file{number:02d}")
+            path.write_bytes(bytes([number]) * 1000)
+            entries.append(zip_util._TreeEntry(path, path.lstat()))
+        read_ahead = zip_util._ReadAhead(entries, maxMemory=3000, shouldHash=lambda entry: True)
+        seen = []
+        for entry, data, digest in read_ahead:
+            assert bytes(data) == bytes([len(seen)]) * 1000
+            assert sum(len(buffer) for buffer in read_ahead._free_buffers) <= 3000
+            seen.append(entry)
+        assert seen == entries
+
+def test_zip_with_compression_cache_is_identical_and_reuses_payloads():
+    """Test zipping through the compression cache gives the same archive, and a second build compresses nothing."""
+    from unittest import mock
+    from releaser.utilities import cache_util
+    with tempfile.TemporaryDirectory() as tmpdir:
+        source_dir = create_test_directory_structure(tmpdir)
+        zip_dir = os.path.join(tmpdir, "zip_output")
+        os.makedirs(zip_dir)
+        plain = zip_util.zip(source_dir, zip_dir, "plain.zip", reproducible=True)
+        with cache_util.CompressionCache(os.path.join(tmpdir, "cache"), 1024 * 1024) as cache:
+            first = zip_util.zip(source_dir, zip_dir, "first.zip", reproducible=True, cache=cache)
+            with mock.patch.object(zip_util.zlib, "compressobj", side_effect=AssertionError("compressed again")):
+                second = zip_util.zip(source_dir, zip_dir, "second.zip", reproducible=True, cache=cache)
+            assert (cache.hits, cache.misses) == (4, 4)
+        assert open(first, "rb").read() == open(plain, "rb").read() == open(second, "rb").read()
+        assert "subdir/nested/file4.txt" in zip_util.verify(second)
+
+def test_zip_compression_cache_by_blob_sha_checks_size():
+    """Test files are identified to the cache by blob SHA, and a payload for data of another size is not used."""
+    from releaser.utilities import cache_util
+    with tempfile.TemporaryDirectory() as tmpdir:
+        source_dir = create_test_directory_structure(tmpdir)
+        zip_dir = os.path.join(tmpdir, "zip_output")
+        os.makedirs(zip_dir)
+        blob_shas = {"file1.txt": "1" * 40, "file2.txt": "2" * 40}
+        with cache_util.CompressionCache(os.path.join(tmpdir, "cache"), 1024 * 1024) as cache:
+            zip_util.zip(source_dir, zip_dir, "first.zip", cache=cache, blobShas=blob_shas)
+            assert cache.get("git:" + "1" * 40, zipfile.ZIP_DEFLATED, -1).file_size == len("content1")
+            with open(os.path.join(source_dir, "file1.txt"), "w") as f:
+                f.write("rewritten on checkout")
+            zip_path = zip_util.zip(source_dir, zip_dir, "second.zip", cache=cache, blobShas=blob_shas)
+        with zipfile.ZipFile(zip_path) as zf:
+            assert zf.testzip() is None
+            assert zf.read("file1.txt") == b"rewritten on checkout"
+            assert zf.read("file2.txt") == b"content2"
+
+def test_zip_compression_cache_checks_crc():
+    """Test a cached payload for data of the same size but other content is not used."""
+    from releaser.utilities import cache_util
+    with tempfile.TemporaryDirectory() as tmpdir:
+        source_dir = create_test_directory_structure(tmpdir)
+        zip_dir = os.path.join(tmpdir, "zip_output")
+        os.makedirs(zip_dir)
+        blob_shas = {"file1.txt": "1" * 40}
+        with cache_util.CompressionCache(os.path.join(tmpdir, "cache"), 1024 * 1024) as cache:
+            zip_util.zip(source_dir, zip_dir, "first.zip", cache=cache, blobShas=blob_shas)
+            with open(os.path.join(source_dir, "file1.txt"), "w") as f:
+                f.write("CONTENT1")  # same size as what was cached
+            zip_path = zip_util.zip(source_dir, zip_dir, "second.zip", cache=cache, blobShas=blob_shas)
+        with zipfile.ZipFile(zip_path) as zf:
+            assert zf.testzip() is None
+            assert zf.read("file1.txt") == b"CONTENT1"
+
+def test_zip_compression_cache_splices_non_ascii_and_zip64_entries(monkeypatch):
+    """Test spliced entries round-trip with non-ASCII names and ZIP64 headers (the limit lowered to make them ZIP64-sized)."""
+    from releaser.utilities import cache_util
+    with tempfile.TemporaryDirectory() as tmpdir:
+        source_dir = os.path.join(tmpdir, "source")
+        os.makedirs(os.path.join(source_dir, "café"))
+        contents = {"café/naïve.txt": "crème brûlée " * 50, "日本語.txt": "データ" * 40, "small.txt": "tiny"}
+        for name, content in contents.items():
+            with open(os.path.join(source_dir, name), "w", encoding="utf-8") as f:
+                f.write(content)
+        zip_dir = os.path.join(tmpdir, "zip_output")
+        os.makedirs(zip_dir)
+        monkeypatch.setattr(zipfile, "ZIP64_LIMIT", 100)
+        with cache_util.CompressionCache(os.path.join(tmpdir, "cache"), 1024 * 1024) as cache:
+            plain = zip_util.zip(source_dir, zip_dir, "plain.zip", reproducible=True)
+            zip_util.zip(source_dir, zip_dir, "first.zip", reproducible=True, cache=cache)
+            spliced = zip_util.zip(source_dir, zip_dir, "second.zip", reproducible=True, cache=cache)
+            assert cache.hits == 3
+        assert open(spliced, "rb").read() == open(plain, "rb").read()
+        with zipfile.ZipFile(spliced) as zf:
+            assert zf.testzip() is None
+            assert zf.getinfo("café/naïve.txt").flag_bits & 0x800
+            assert zf.getinfo("日本語.txt").extract_version >= zipfile.ZIP64_VERSION
+        assert {name for name in zip_util.verify(spliced) if not name.endswith("/")} == set(contents)
+        extract_dir = os.path.join(tmpdir, "extracted")
+        zip_util.unzip(spliced, extract_dir)
+        for name, content in contents.items():
+            with open(os.path.join(extract_dir, name), encoding="utf-8") as f:
+                assert f.read() == content
+
+def test_zipParts_with_compression_cache():
+    """Test parts written through the compression cache hold the right content."""
+    from releaser.utilities import cache_util
+    with tempfile.TemporaryDirectory() as tmpdir:
+        source_dir = create_test_directory_structure(tmpdir)
+        zip_dir = os.path.join(tmpdir, "zip_output")
+        os.makedirs(zip_dir)
+        with cache_util.CompressionCache(os.path.join(tmpdir, "cache"), 1024 * 1024) as cache:
+            for _ in range(2):
+                split = zip_util.zipParts(source_dir, zip_dir, "test.zip", 10, cache=cache)
+            assert cache.hits == 4
+        assert sum(len(zip_util.verify(part)) for part in split.parts) == 4
+
+def test_zip_given_paths_zips_only_those():
+    """Test zipping a list of paths (e.g. the files git tracks) leaves everything else out."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        source_dir = create_test_directory_structure(tmpdir)
+        zip_dir = os.path.join(tmpdir, "zip_output")
+        os.makedirs(zip_dir)
+        paths = ["file1.txt", "subdir/nested/file4.txt", "missing.txt", "subdir"]
+        zip_path = zip_util.zip(source_dir, zip_dir, "test.zip", paths=paths)
+        with zipfile.ZipFile(zip_path) as zf:
+            assert zf.namelist() == ["file1.txt", "subdir/nested/file4.txt"]
+        split = zip_util.zipParts(source_dir, zip_dir, "test.zip", 10, paths=paths)
+        assert sorted(name for part in split.parts for name in zipfile.ZipFile(part).namelist()) == ["file1.txt", "subdir/nested/file4.txt"]
+
+def test_zip_excludes_paths_and_what_is_under_them():
+    """Test excluded paths, and everything under an excluded directory, are left out of archives and parts."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        source_dir = create_test_directory_structure(tmpdir)
+        zip_dir = os.path.join(tmpdir, "zip_output")
+        os.makedirs(zip_dir)
+        exclude = ["file2.txt", "subdir/nested"]
+        zip_path = zip_util.zip(source_dir, zip_dir, "test.zip", exclude=exclude)
+        with zipfile.ZipFile(zip_path) as zf:
+            assert sorted(name for name in zf.namelist() if not name.endswith("/")) == ["file1.txt", "subdir/file3.txt"]
+        split = zip_util.zipParts(source_dir, zip_dir, "test.zip", 10, exclude=exclude, paths=["file1.txt", "file2.txt", "subdir/nested/file4.txt"])
+        assert [name for part in split.parts for name in zipfile.ZipFile(part).namelist()] == ["file1.txt"]